@@ -3,14 +3,18 @@
 print("🟢 DEBUG: app.py module loading...")
 
 import os
+import asyncio
 import logging
+from datetime import datetime, timedelta
+from functools import partial
 from contextlib import asynccontextmanager
-from typing import Optional
+from typing import List, Optional
 
 print("🟢 DEBUG: Basic imports done, loading FastAPI...")
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 print("🟢 DEBUG: FastAPI imported, loading DNS automator...")
@@ -21,17 +25,64 @@ print("🟢 DEBUG: DNSAutomator imported")
 from dns_automator.core.logging import setup_logging
 print("🟢 DEBUG: logging setup imported")
 
+from dns_automator.activation import ZoneActivator
+from dns_automator.core.config import settings
+from dns_automator.prewarm import ZonePrewarmer
+from dns_automator.services.supabase_client import SupabaseService
+from dns_automator.utils.batch_stream import NDJSON_MEDIA_TYPE, stream_batch, submit_batch
+from dns_automator.utils.event_stream import SSE_MEDIA_TYPE, sse_events
+from dns_automator.utils.call_ledger import aggregate
+from dns_automator.utils.concurrency import adaptive_limiters
+from dns_automator.utils.job_queue import Job, JobQueue, JobWorker
+from dns_automator.utils.load import load_report
+from dns_automator.utils.nameservers import nameserver_predictor
+from dns_automator.utils.single_flight import SingleFlight
+from dns_automator.utils.site_listener import DNS_PENDING_CHANNEL, SiteChangeListener
+from dns_automator.utils.write_behind import flush_all
+
 # Setup logging
 print("🟢 DEBUG: Setting up logging...")
 logger = setup_logging()
 print("🟢 DEBUG: Logger setup complete in app.py")
 
 
+# Duplicate /process requests for a site attach to the job already running for it
+process_flights = SingleFlight()
+
+# workflow_steps phase run by /process
+DNS_PHASE = "dns_setup"
+
+# Durable queue behind /process, created on first use (see get_job_worker)
+job_worker: Optional[JobWorker] = None
+
+# Queues sites as soon as they become pending (listener mode, see start_listener)
+site_listener: Optional[SiteChangeListener] = None
+
+# Creates zones of queued sites ahead of their jobs (prewarm_zones, see get_zone_prewarmer)
+zone_prewarmer: Optional[ZonePrewarmer] = None
+
+# Marks activating sites active once Cloudflare activates their zones (zone_activation)
+zone_activator: Optional[ZoneActivator] = None
+
+
 class ProcessRequest(BaseModel):
     """Request model for processing DNS"""
     site_id: str
 
 
+class BatchFilter(BaseModel):
+    """Selects pending DNS sites for a batch"""
+    cloudflare_account_id: Optional[str] = None
+    server_id: Optional[str] = None
+    limit: Optional[int] = None
+
+
+class BatchRequest(BaseModel):
+    """Request model for processing a batch of sites"""
+    site_ids: Optional[List[str]] = None
+    filter: Optional[BatchFilter] = None
+
+
 class ProcessResponse(BaseModel):
     """Response model for process request"""
     status: str
@@ -43,8 +94,25 @@ class ProcessResponse(BaseModel):
 async def lifespan(app: FastAPI):
     """Lifecycle manager for the app"""
     logger.info("DNS Automator service starting up...")
+    # Replays jobs left unfinished by the previous process
+    get_job_worker()
+    if settings.listen_database_url:
+        start_listener()
+    if settings.zone_activation:
+        start_zone_activator()
     yield
     logger.info("DNS Automator service shutting down...")
+    if site_listener:
+        site_listener.stop(timeout=5)
+    if zone_prewarmer:
+        zone_prewarmer.close()
+    if zone_activator:
+        zone_activator.stop(timeout=5)
+    # Let running jobs finish; queued jobs stay on disk for the next start
+    if job_worker:
+        job_worker.stop(timeout=settings.shutdown_timeout)
+    # Write status updates still buffered before the process exits
+    flush_all()
 
 
 app = FastAPI(
@@ -129,7 +197,10 @@ def run_dns_automation_sync(site_id: str) -> bool:
                 
             print(f"🟢 DEBUG: Processing site: {sites[0].get('domain', 'unknown')}")
             # Process the site
-            result = automator.process_site(sites[0])
+            try:
+                result = automator.process_site(sites[0])
+            finally:
+                automator.leases.close()
             
             print(f"🟢 DEBUG: Processing result: {result}")
             return result
@@ -146,6 +217,77 @@ def run_dns_automation_sync(site_id: str) -> bool:
         return False
 
 
+def run_job(job: Job) -> bool:
+    """Run a queued /process job"""
+    result, _ = process_flights.do((job.site_id, job.phase), run_dns_automation_sync, job.site_id)
+    return result
+
+
+def get_job_worker() -> JobWorker:
+    """Open the job queue and start its workers once per process"""
+    global job_worker
+    if job_worker is None:
+        job_worker = JobWorker(
+            JobQueue(settings.job_queue_path),
+            run_job,
+            workers=settings.queue_workers,
+            retention_seconds=settings.job_retention_seconds
+        )
+        job_worker.start()
+    return job_worker
+
+
+def get_zone_prewarmer() -> Optional[ZonePrewarmer]:
+    """Create the zone prewarmer once per process, if prewarm_zones is enabled"""
+    global zone_prewarmer
+    if zone_prewarmer is None and settings.prewarm_zones:
+        zone_prewarmer = ZonePrewarmer(DNSAutomator())
+    return zone_prewarmer
+
+
+def queue_site(site_id: str) -> None:
+    """Queue the DNS job of a site that became pending, after pre-warming its zone"""
+    submit_job = partial(get_job_worker().submit, site_id, DNS_PHASE)
+    prewarmer = get_zone_prewarmer()
+    if prewarmer:
+        # The job would otherwise race the pre-warm and create the zone as well
+        prewarmer.submit_id(site_id, then=submit_job)
+    else:
+        submit_job()
+
+
+def queue_pending_sites() -> None:
+    """Queue every site waiting for DNS, for sites that changed while the listener was disconnected"""
+    prewarmer = get_zone_prewarmer()
+    for site in SupabaseService().fetch_pending_dns_sites():
+        submit_job = partial(get_job_worker().submit, site.id, DNS_PHASE)
+        if prewarmer:
+            prewarmer.submit(site, then=submit_job)
+        else:
+            submit_job()
+
+
+def start_listener() -> None:
+    """Queue DNS jobs from database notifications instead of waiting for /process calls"""
+    global site_listener
+    site_listener = SiteChangeListener(
+        settings.listen_database_url,
+        DNS_PENDING_CHANNEL,
+        on_site=queue_site,
+        on_connect=queue_pending_sites
+    )
+    site_listener.start()
+    logger.info("👂 Listener mode enabled, pending sites are queued as they appear")
+
+
+def start_zone_activator() -> None:
+    """Poll activating zones in the background"""
+    global zone_activator
+    zone_activator = ZoneActivator(DNSAutomator())
+    zone_activator.start()
+    logger.info("⏳ Zone activation enabled, activating sites are polled until their zone is active")
+
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -157,28 +299,35 @@ async def process_dns(request: ProcessRequest):
     """
     Process DNS configuration for a specific site
     
-    This endpoint uses Railway shared variables for database access
+    This endpoint uses Railway shared variables for database access. The job
+    is recorded in the durable job queue and run by its workers; a request for
+    a site that is already queued or being processed waits for that job and
+    returns its result instead of starting a second one.
     """
     print("🟢 DEBUG: /process endpoint called")
     print(f"🟢 DEBUG: request.site_id={request.site_id}")
     
     try:
         print("🟢 DEBUG: About to call run_dns_automation_sync...")
-        # Run DNS automation synchronously to get the actual result
-        result = run_dns_automation_sync(request.site_id)
+        # Queue the job and wait for the actual result
+        future, created = get_job_worker().submit(request.site_id, DNS_PHASE)
+        if not created:
+            logger.info(f"🔁 Site {request.site_id} is already queued or being processed, attaching to that job")
+        result = await asyncio.wrap_future(future)
         
         print(f"🟢 DEBUG: run_dns_automation_sync returned: {result}")
+        attached = "" if created else " (attached to the job already running for this site)"
         
         if result:
             return ProcessResponse(
                 status="completed",
-                message="DNS automation completed successfully",
+                message=f"DNS automation completed successfully{attached}",
                 task_id=request.site_id
             )
         else:
             return ProcessResponse(
                 status="failed", 
-                message="DNS automation failed - check logs for details",
+                message=f"DNS automation failed - check logs for details{attached}",
                 task_id=request.site_id
             )
         
@@ -187,6 +336,107 @@ async def process_dns(request: ProcessRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def select_batch_sites(batch_filter: BatchFilter) -> List[str]:
+    """IDs of the pending DNS sites matching a batch filter"""
+    site_ids = [
+        site.id for site in SupabaseService().fetch_pending_dns_sites()
+        if (batch_filter.cloudflare_account_id is None or site.cloudflare_account_id == batch_filter.cloudflare_account_id)
+        and (batch_filter.server_id is None or site.server_id == batch_filter.server_id)
+    ]
+    return site_ids[:batch_filter.limit] if batch_filter.limit else site_ids
+
+
+@app.post("/process/batch")
+async def process_dns_batch(request: BatchRequest):
+    """
+    Process DNS configuration for a batch of sites over one connection
+    
+    Takes site_ids, or a filter over the pending sites, queues every site on
+    the job queue and streams progress as newline-delimited JSON: a queued
+    line per site, the step events of the jobs, a site_done line with the
+    batch throughput as each site finishes, and a final summary line. Sites
+    already queued or being processed attach to their running job.
+    """
+    if not request.site_ids and not request.filter:
+        raise HTTPException(status_code=400, detail="site_ids or filter is required")
+    
+    try:
+        site_ids = request.site_ids or select_batch_sites(request.filter)
+        jobs, subscription = submit_batch(lambda site_id: get_job_worker().submit(site_id, DNS_PHASE), site_ids)
+    except Exception as e:
+        logger.error(f"Failed to queue DNS batch: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    logger.info(f"📦 Queued DNS batch of {len(jobs)} site(s)")
+    return StreamingResponse(stream_batch(jobs, subscription), media_type=NDJSON_MEDIA_TYPE)
+
+
+@app.get("/events")
+async def stream_events(site_id: Optional[List[str]] = Query(None)):
+    """
+    Live DNS job progress as server-sent events
+    
+    Streams the job_started, step and job_finished events of running jobs
+    as they happen, so dashboards need not poll the database. Repeat
+    ?site_id= to follow only some sites; without it every site is streamed.
+    """
+    return StreamingResponse(
+        sse_events(site_id),
+        media_type=SSE_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/calls/report")
+def calls_report(hours: float = 24.0, top: int = 10):
+    """
+    Outbound API calls of recent DNS jobs
+    
+    Aggregates the call ledgers stored with workflow_executions: calls per
+    job, totals per provider and operation, and the most expensive sites.
+    """
+    try:
+        since = datetime.utcnow() - timedelta(hours=hours)
+        executions = SupabaseService().fetch_executions(since)
+        return {"since": since.isoformat(), **aggregate(executions, top)}
+    except Exception as e:
+        logger.error(f"Failed to build call report: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def count_shared_backlog() -> Optional[int]:
+    """Sites pending for all replicas, or None if the database cannot be reached"""
+    try:
+        return SupabaseService().count_pending_dns_sites()
+    except Exception as e:
+        logger.warning(f"⚠️  Could not count pending sites, sizing replicas on the local queue: {e}")
+        return None
+
+
+@app.get("/load")
+def load():
+    """
+    Saturation of this replica, for autoscaling
+    
+    Reports queue depth, active workers, the age of the oldest queued job,
+    recent throughput and per-provider limiter pressure, plus a
+    desired_replicas hint sized to work off the sites pending for all
+    replicas within load_target_drain_seconds.
+    """
+    try:
+        return load_report(
+            get_job_worker(),
+            settings.load_window_seconds,
+            settings.load_target_drain_seconds,
+            settings.min_replicas,
+            settings.max_replicas,
+            shared_backlog=count_shared_backlog()
+        )
+    except Exception as e:
+        logger.error(f"Failed to build load report: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/health")
 async def health_check():
     """Detailed health check"""
@@ -198,7 +448,9 @@ async def health_check():
             "namecheap",
             "spaceship",
             "cloudflare"
-        ]
+        ],
+        "concurrency": adaptive_limiters.snapshot(),
+        "nameserver_predictions": nameserver_predictor.snapshot()
     }
 
 
@@ -0,0 +1,58 @@
+"""
+Throughput benchmark: domain parsing with the public suffix trie
+
+Parses a mix of host names under common gTLD, ccTLD second-level and
+wildcard suffixes, once through the trie (cold, every name distinct) and
+once through the LRU cache of split() (warm, the same names again).
+
+Usage (from dns-automator/):
+    python -m benchmarks.domain_parse [--names 200000]
+"""
+
+import argparse
+import time
+
+from dns_automator.utils import domains
+
+SUFFIXES = ["com", "net", "org", "io", "co.uk", "com.au", "co.jp", "com.br", "de", "a.kawasaki.jp"]
+
+
+def make_names(count: int) -> list:
+    """Distinct host names spread over SUFFIXES"""
+    return [
+        f"{'www.' if i % 3 == 0 else ''}example-site-{i}.{SUFFIXES[i % len(SUFFIXES)]}"
+        for i in range(count)
+    ]
+
+
+def rate(names: list, parse) -> float:
+    """Names parsed per second, in millions"""
+    start = time.perf_counter()
+    for name in names:
+        parse(name)
+    return len(names) / (time.perf_counter() - start) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark public-suffix domain parsing")
+    parser.add_argument("--names", type=int, default=200000, help="Number of distinct names")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    domains._load()
+    print(f"Compiled suffix list in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    names = make_names(args.names)
+    cache_size = domains.split.cache_info().maxsize
+    warm = names[:cache_size]
+
+    cold = rate(names, domains.split.__wrapped__)
+    rate(warm, domains.split)
+    cached = rate(warm, domains.split)
+
+    print(f"{'names':>10} {'trie M/s':>10} {'cached M/s':>11}")
+    print(f"{args.names:>10} {cold:>10.2f} {cached:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Latency benchmark: DNSAutomator.process_site against a recorded cassette
+
+Record the provider traffic of one real run once, then replay it as often as
+needed with identical inputs, at the recorded latency or at zero latency
+(pure pipeline overhead). Replays never touch Supabase, Cloudflare or the
+registrars. Run replays with the same SUPABASE_URL as the recording.
+
+Cassettes contain the credentials the database and providers returned during
+the recording: keep them out of version control.
+
+Usage (from dns-automator/):
+    python -m benchmarks.process_site --site-id <uuid> --record
+    python -m benchmarks.process_site --site-id <uuid> [--fast] [--runs 5]
+"""
+
+import argparse
+import statistics
+import time
+
+from dns_automator.main import DNSAutomator
+from dns_automator.utils.cassette import RECORD, REPLAY, REPLAY_FAST, Cassette
+
+
+def run_once(site_id: str, path: str, mode: str) -> float:
+    """
+    Process the site once with the cassette inserted
+
+    Returns:
+        Seconds spent in process_site
+    """
+    with Cassette(path, mode):
+        automator = DNSAutomator()
+        sites = automator.data_client.fetch_pending_dns_sites(site_id)
+        if not sites:
+            raise SystemExit(f"Site {site_id} not found")
+
+        start = time.perf_counter()
+        result = automator.process_site(sites[0])
+        elapsed = time.perf_counter() - start
+
+    print(f"   process_site -> {result} in {elapsed * 1000:.1f} ms")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark process_site against a recorded cassette")
+    parser.add_argument("--site-id", required=True, help="Site to process (must be pending when recording)")
+    parser.add_argument("--cassette", default="cassettes/process_site.json", help="Cassette file")
+    parser.add_argument("--record", action="store_true", help="Record a live run instead of replaying")
+    parser.add_argument("--fast", action="store_true", help="Replay without the recorded latency")
+    parser.add_argument("--runs", type=int, default=5, help="Replay runs")
+    args = parser.parse_args()
+
+    if args.record:
+        print(f"Recording {args.cassette}")
+        run_once(args.site_id, args.cassette, RECORD)
+        return
+
+    mode = REPLAY_FAST if args.fast else REPLAY
+    print(f"Replaying {args.cassette} ({mode}), {args.runs} run(s)")
+    timings = [run_once(args.site_id, args.cassette, mode) for _ in range(args.runs)]
+
+    print(f"{'runs':>6} {'mean ms':>9} {'min ms':>8} {'max ms':>8}")
+    print(f"{len(timings):>6} {statistics.mean(timings) * 1000:>9.1f} "
+          f"{min(timings) * 1000:>8.1f} {max(timings) * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Memory benchmark: PostgREST row dicts vs compact Site records
+
+Builds a JSON response like select("*") on the sites table returns, parses it,
+and measures the memory retained by keeping the rows as dicts versus keeping
+Site records built from them.
+
+Usage (from dns-automator/):
+    python -m benchmarks.site_memory [--rows 10000 100000]
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+import uuid
+
+from dns_automator.utils.site import Site
+
+
+def make_payload(rows: int) -> str:
+    """
+    Build a sites response body with every column of the table
+
+    Args:
+        rows: Number of rows
+
+    Returns:
+        JSON text
+    """
+    cf_accounts = [str(uuid.uuid4()) for _ in range(25)]
+    servers = [str(uuid.uuid4()) for _ in range(4)]
+
+    data = []
+    for i in range(rows):
+        data.append({
+            "id": str(uuid.uuid4()),
+            "created_at": "2025-01-01T00:00:00.000000+00:00",
+            "domain": f"example-site-{i}.com",
+            "brand_name": f"Example Site {i}",
+            "cloudflare_account_id": cf_accounts[i % len(cf_accounts)],
+            "gsc_account_id": None,
+            "server_id": servers[i % len(servers)],
+            "registrar": "namecheap",
+            "status_dns": "active",
+            "status_hosting": "active",
+            "status_content": "pending",
+            "status_deployment": "pending",
+            "gsc_verification_status": "pending",
+            "hosting_doc_root": f"/home/clp/htdocs/example-site-{i}.com",
+            "matomo_site_id": i,
+            "error_message": None,
+            "dns_checked_at": "2025-01-01T00:00:00+00:00",
+            "dns_steps_completed": 6,
+            "dns_steps_total": 6,
+            "hosting_steps_completed": 5,
+            "hosting_steps_total": 5,
+            "content_steps_completed": 0,
+            "content_steps_total": 8,
+            "deployment_steps_completed": 0,
+            "deployment_steps_total": 4,
+        })
+
+    return json.dumps(data)
+
+
+def measure(payload: str, compact: bool) -> int:
+    """
+    Bytes retained after parsing the payload into the chosen representation
+
+    Args:
+        payload: JSON text
+        compact: Keep Site records instead of row dicts
+
+    Returns:
+        Retained bytes
+    """
+    gc.collect()
+    tracemalloc.start()
+
+    rows = json.loads(payload)
+    if compact:
+        kept = [Site.from_row(row) for row in rows]
+    else:
+        kept = rows
+    del rows
+    gc.collect()
+
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return retained
+
+
+def main():
+    """Run the benchmark and print a comparison table"""
+    parser = argparse.ArgumentParser(description="Compare memory of row dicts and Site records")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000], help="Row counts to measure")
+    args = parser.parse_args()
+
+    print(f"{'rows':>8}  {'dicts (MiB)':>12}  {'Site (MiB)':>11}  {'saved':>6}")
+    for rows in args.rows:
+        payload = make_payload(rows)
+        as_dicts = measure(payload, compact=False)
+        as_sites = measure(payload, compact=True)
+        saved = 1 - as_sites / as_dicts
+        print(f"{rows:>8}  {as_dicts / 2**20:>12.1f}  {as_sites / 2**20:>11.1f}  {saved:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""Zone activation: brings pending Cloudflare zones to active and marks their sites DNS-active"""
+
+import argparse
+import heapq
+import itertools
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from .core.config import settings
+from .services.cloudflare_client import CloudflareClient, CloudflareError
+from .utils.delegation import is_delegated
+from .utils.rate_limit import RateLimiterRegistry
+from .utils.site import Site
+
+logger = logging.getLogger(__name__)
+
+# Status of sites whose nameservers are set but whose zone is not active yet
+ACTIVATING = "activating"
+
+# Zone statuses that will not turn active by waiting
+DEAD_ZONE_STATUSES = {"moved", "deleted", "deactivated"}
+
+
+class Activation:
+    """Polling state of one activating site"""
+
+    __slots__ = ("site", "attempts", "next_check", "check_requested_at")
+
+    def __init__(self, site: Site):
+        self.site = site
+        self.attempts = 0
+        self.next_check = 0.0
+        self.check_requested_at: Optional[float] = None
+
+
+class ZoneActivator:
+    """
+    Polls the zones of 'activating' sites until Cloudflare reports them active
+
+    Cloudflare only notices a new delegation on its periodic checks, which can
+    take hours. Each zone is polled with its own exponential backoff; once
+    public DNS resolves the domain to the zone's nameservers, an activation
+    check is requested (at most once per activation_check_interval, the limit
+    Cloudflare enforces). A site becomes DNS-active, and thereby ready for
+    hosting, only when its zone is active. Every check holds the site's lease,
+    so replicas polling the same sites never check or update one at once.
+    """
+
+    def __init__(self, automator, max_workers: Optional[int] = None):
+        """
+        Initialize activator
+
+        Args:
+            automator: DNSAutomator providing the data client
+            max_workers: Zones checked in parallel
+        """
+        self.automator = automator
+        self.data_client = automator.data_client
+        self.max_workers = max_workers or settings.activation_workers
+
+        self.cloudflare_limiters = RateLimiterRegistry(settings.cloudflare_rate_limit)
+        self._cloudflare_clients: Dict[str, Optional[CloudflareClient]] = {}
+        self._clients_lock = threading.Lock()
+
+        self._activations: Dict[str, Activation] = {}
+        self._schedule: List = []
+        self._sequence = itertools.count()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _cloudflare_client_for(self, cf_account_id: str) -> Optional[CloudflareClient]:
+        """
+        Get a Cloudflare client for an account, sharing one rate limiter per token
+
+        Args:
+            cf_account_id: UUID of the cloudflare_accounts row
+
+        Returns:
+            CloudflareClient instance, or None if the account is unusable
+        """
+        with self._clients_lock:
+            if cf_account_id in self._cloudflare_clients:
+                return self._cloudflare_clients[cf_account_id]
+
+            client = None
+            cf_account = self.data_client.get_cloudflare_account(cf_account_id)
+            if cf_account:
+                try:
+                    client = CloudflareClient(
+                        cf_account["api_token"],
+                        cf_account.get("cloudflare_account_id"),
+                        rate_limiter=self.cloudflare_limiters.get(cf_account["api_token"])
+                    )
+                except CloudflareError as e:
+                    logger.error(f"❌ Cloudflare account {cf_account_id} unusable: {e}")
+
+            self._cloudflare_clients[cf_account_id] = client
+            return client
+
+    def backoff(self, attempts: int) -> float:
+        """Seconds until the next check of a zone checked attempts times"""
+        return min(settings.activation_poll_initial * 2 ** attempts, settings.activation_poll_max)
+
+    def check_site(self, activation: Activation) -> str:
+        """
+        Check the zone of one activating site once
+
+        Args:
+            activation: Polling state of the site
+
+        Returns:
+            Outcome (active, waiting, failed); waiting while another replica holds the site
+        """
+        site = activation.site
+        leases = self.automator.leases
+
+        if not leases.claim(site.id):
+            logger.debug(f"⏭️  {site.domain}: another replica is checking it")
+            return "waiting"
+
+        try:
+            return self._check_zone(activation)
+        finally:
+            # The status is written before another replica can claim the site
+            self.data_client.flush_writes()
+            leases.release(site.id)
+
+    def _check_zone(self, activation: Activation) -> str:
+        """
+        Check the zone of a claimed activating site
+
+        Args:
+            activation: Polling state of the site
+
+        Returns:
+            Outcome (active, waiting, failed)
+        """
+        site = activation.site
+        domain = site.domain
+
+        client = self._cloudflare_client_for(site.cloudflare_account_id)
+        if not client:
+            return "waiting"
+
+        zone_id = site.cloudflare_zone_id or (client.find_zone(domain) or {}).get("id")
+        if not zone_id:
+            self.data_client.update_site_status(site.id, "failed", "Cloudflare zone not found while waiting for activation")
+            return "failed"
+
+        zone = client.get_zone_status(zone_id)
+        status = zone.get("status")
+
+        if status == "active":
+            logger.info(f"🟢 {domain}: zone active after {activation.attempts + 1} check(s)")
+            self.data_client.update_site_status(site.id, "active")
+            return "active"
+
+        if status in DEAD_ZONE_STATUSES:
+            self.data_client.update_site_status(site.id, "failed", f"Cloudflare zone is {status}")
+            return "failed"
+
+        now = time.monotonic()
+        due = (
+            activation.check_requested_at is None
+            or now - activation.check_requested_at >= settings.activation_check_interval
+        )
+        if due and is_delegated(domain, zone.get("name_servers", [])):
+            try:
+                client.request_activation_check(zone_id)
+                activation.check_requested_at = now
+                logger.info(f"📡 {domain}: delegation visible, activation check requested")
+            except CloudflareError as e:
+                # Usually the once-per-interval limit; the periodic check still runs
+                logger.warning(f"⚠️  {domain}: activation check not accepted: {e}")
+                activation.check_requested_at = now
+
+        return "waiting"
+
+    def _check_safely(self, activation: Activation) -> str:
+        """Check a site, treating errors as 'still waiting'"""
+        try:
+            return self.check_site(activation)
+        except Exception as e:
+            logger.warning(f"⚠️  {activation.site.domain}: activation check failed: {type(e).__name__}: {e}")
+            return "waiting"
+
+    def refresh(self) -> int:
+        """
+        Start polling activating sites not polled yet, and stop polling the
+        ones no longer activating (e.g. retired or handled by another replica)
+
+        Returns:
+            Number of sites added
+        """
+        added = 0
+        activating = set()
+        for site in self.data_client.iter_dns_sites(ACTIVATING):
+            activating.add(site.id)
+            if site.id in self._activations:
+                continue
+            activation = Activation(site)
+            self._activations[site.id] = activation
+            self._push(activation)
+            added += 1
+
+        for site_id in set(self._activations) - activating:
+            # Left in the schedule, _due() skips it
+            del self._activations[site_id]
+
+        return added
+
+    def _push(self, activation: Activation) -> None:
+        """Schedule the next check of a site"""
+        heapq.heappush(self._schedule, (activation.next_check, next(self._sequence), activation))
+
+    def _due(self) -> List[Activation]:
+        """Pop every activation whose next check is due"""
+        now = time.monotonic()
+        due = []
+        while self._schedule and self._schedule[0][0] <= now:
+            activation = heapq.heappop(self._schedule)[2]
+            if self._activations.get(activation.site.id) is activation:
+                due.append(activation)
+        return due
+
+    def poll_once(self, executor: ThreadPoolExecutor) -> Dict[str, int]:
+        """
+        Check every due zone in parallel and reschedule the ones still waiting
+
+        Args:
+            executor: Worker pool
+
+        Returns:
+            Count of checked zones per outcome
+        """
+        summary = {"active": 0, "waiting": 0, "failed": 0}
+        due = self._due()
+
+        for activation, outcome in zip(due, executor.map(self._check_safely, due)):
+            summary[outcome] += 1
+            if outcome == "waiting":
+                activation.next_check = time.monotonic() + self.backoff(activation.attempts)
+                activation.attempts += 1
+                self._push(activation)
+            else:
+                self._activations.pop(activation.site.id, None)
+
+        return summary
+
+    def run(self, once: bool = False) -> Dict[str, int]:
+        """
+        Poll activating zones until stopped
+
+        Args:
+            once: Check every activating zone once and return
+
+        Returns:
+            Count of checked zones per outcome
+        """
+        totals = {"active": 0, "waiting": 0, "failed": 0}
+        refreshed_at = None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="activation") as executor:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                if refreshed_at is None or now - refreshed_at >= settings.activation_refresh_interval:
+                    added = self.refresh()
+                    refreshed_at = now
+                    if added:
+                        logger.info(f"⏳ Polling {added} new activating zone(s), {len(self._activations)} in total")
+
+                for outcome, count in self.poll_once(executor).items():
+                    totals[outcome] += count
+
+                if once:
+                    break
+
+                next_check = self._schedule[0][0] if self._schedule else float("inf")
+                next_refresh = refreshed_at + settings.activation_refresh_interval
+                self._stop.wait(max(0.0, min(next_check, next_refresh) - time.monotonic()))
+
+        return totals
+
+    def start(self) -> None:
+        """Poll in a background thread"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run_forever, name="zone-activation", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop polling"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run_forever(self) -> None:
+        """Background loop that survives errors"""
+        while not self._stop.is_set():
+            try:
+                self.run()
+            except Exception as e:
+                logger.error(f"❌ Zone activation loop failed, restarting: {type(e).__name__}: {e}")
+                self._stop.wait(settings.activation_refresh_interval)
+
+
+def main():
+    """Command line entry point for zone activation"""
+    parser = argparse.ArgumentParser(description="Poll pending Cloudflare zones until they are active")
+    parser.add_argument("--once", action="store_true", help="Check every activating zone once and exit")
+    parser.add_argument("--workers", type=int, help="Zones checked in parallel")
+    args = parser.parse_args()
+
+    # Imported here: importing main configures logging for the command
+    from .main import DNSAutomator
+
+    activator = ZoneActivator(DNSAutomator(), max_workers=args.workers)
+    summary = activator.run(once=args.once)
+    logger.info(f"🏁 Zone activation finished: {summary}")
+
+    sys.exit(1 if summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
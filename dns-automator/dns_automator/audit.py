@@ -0,0 +1,241 @@
+"""Credential audit: checks every stored credential in parallel and caches the results"""
+
+import argparse
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import requests
+
+from .core.config import settings
+from .services.cloudflare_client import CloudflareClient
+from .utils.call_ledger import track
+from .utils.credential_health import (
+    AUDITED_TABLES,
+    CLOUDFLARE_ACCOUNTS,
+    INFRASTRUCTURE_CREDENTIALS,
+    REGISTRAR_CREDENTIALS,
+)
+from .utils.deadline import call_timeout
+
+logger = logging.getLogger(__name__)
+
+# Credential row fields never written to audit results
+SECRET_FIELDS = ("api_token", "api_key", "api_secret", "password")
+
+
+class CredentialAuditError(Exception):
+    """Custom exception for credentials that fail the audit"""
+    pass
+
+
+def probe_matomo(row: Dict[str, Any], http=requests) -> Dict[str, Any]:
+    """
+    Check a Matomo token: it must be a super user token to create sites
+
+    Args:
+        row: infrastructure_credentials row of the Matomo instance
+        http: requests module or session
+
+    Returns:
+        version, site_count and scopes (view, admin, superuser)
+    """
+    def call(method: str) -> Any:
+        with track("matomo", method) as ledger_call:
+            response = http.post(
+                row["url"],
+                data={"module": "API", "method": method, "format": "json", "token_auth": row.get("api_token")},
+                timeout=call_timeout(30)
+            )
+            ledger_call.received = len(response.content)
+            ledger_call.error = response.status_code >= 400
+        response.raise_for_status()
+        result = response.json()
+        if isinstance(result, dict) and result.get("result") == "error":
+            raise CredentialAuditError(f"{method}: {result.get('message', 'Matomo API error')}")
+        return result
+
+    version = call("API.getMatomoVersion")
+    site_ids = call("SitesManager.getSitesIdWithAdminAccess")
+    superuser = call("UsersManager.hasSuperUserAccess")
+
+    scopes = ["view"] + (["admin"] if site_ids else [])
+    if (superuser.get("value") if isinstance(superuser, dict) else superuser) is True:
+        scopes.append("superuser")
+    else:
+        raise CredentialAuditError("Token has no super user access, new tracking sites cannot be created")
+
+    return {
+        "version": version.get("value") if isinstance(version, dict) else version,
+        "site_count": len(site_ids),
+        "scopes": scopes,
+    }
+
+
+def probe_url(row: Dict[str, Any], http=requests) -> Dict[str, Any]:
+    """
+    Check that the URL of an infrastructure service without an API probe answers
+
+    Args:
+        row: infrastructure_credentials row
+        http: requests module or session
+
+    Returns:
+        status_code of the URL
+    """
+    response = http.get(row["url"], timeout=call_timeout(15))
+    if response.status_code >= 500:
+        raise CredentialAuditError(f"{row['url']} answered {response.status_code}")
+    return {"status_code": response.status_code}
+
+
+# API checks of infrastructure_credentials rows per service; other services get probe_url
+INFRASTRUCTURE_PROBES: Dict[str, Callable[..., Dict[str, Any]]] = {
+    "matomo": probe_matomo,
+}
+
+
+class CredentialAuditor:
+    """
+    Checks the rows of the credentials tables concurrently
+
+    Every credential gets one result: healthy or the error, the latency of
+    the whole check, and what the provider reports (scopes, zone, domain or
+    site counts, quota headroom). Results are stored in credential_audits
+    with an expiry; until then the automators skip failed credentials.
+    """
+
+    def __init__(self, automator, max_workers: Optional[int] = None, ttl: Optional[float] = None, http=requests):
+        """
+        Initialize auditor
+
+        Args:
+            automator: DNSAutomator providing the data and registrar clients
+            max_workers: Credentials checked in parallel
+            ttl: Seconds an audit result stays valid
+            http: requests module or session for infrastructure probes
+        """
+        self.automator = automator
+        self.data_client = automator.data_client
+        self.max_workers = max_workers or settings.credential_audit_workers
+        self.ttl = ttl or settings.credential_audit_ttl
+        self.http = http
+
+        self.audits: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+            CLOUDFLARE_ACCOUNTS: self.audit_cloudflare,
+            REGISTRAR_CREDENTIALS: self.audit_registrar,
+            INFRASTRUCTURE_CREDENTIALS: self.audit_infrastructure,
+        }
+
+    def audit_cloudflare(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Check a cloudflare_accounts row"""
+        if not row.get("api_token"):
+            raise CredentialAuditError("No API token set")
+        client = CloudflareClient(row["api_token"], row.get("cloudflare_account_id"))
+        return client.audit()
+
+    def audit_registrar(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Check a registrar_credentials row"""
+        client = self.automator.get_registrar_client(row["provider"], skip_failed=False)
+        return client.audit()
+
+    def audit_infrastructure(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Check an infrastructure_credentials row"""
+        probe = INFRASTRUCTURE_PROBES.get(row.get("service"), probe_url)
+        return probe(row, self.http)
+
+    def check(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Audit one credential
+
+        Args:
+            table: Credentials table of the row
+            row: Credential row
+
+        Returns:
+            credential_audits row
+        """
+        label = row.get("account_nickname") or row.get("provider") or row.get("service") or row["id"]
+        started = time.monotonic()
+        try:
+            details = self.audits[table](row)
+            healthy, error = True, None
+        except Exception as e:
+            details, healthy, error = {}, False, self._redact(f"{type(e).__name__}: {e}", row)
+        latency_ms = round((time.monotonic() - started) * 1000)
+
+        checked_at = datetime.now(timezone.utc)
+        return {
+            "credential_table": table,
+            "credential_id": row["id"],
+            "label": label,
+            "healthy": healthy,
+            "error": error,
+            "latency_ms": latency_ms,
+            "details": details,
+            "checked_at": checked_at.isoformat(),
+            "expires_at": (checked_at + timedelta(seconds=self.ttl)).isoformat(),
+        }
+
+    @staticmethod
+    def _redact(message: str, row: Dict[str, Any]) -> str:
+        """Remove the row's secrets from an error message (request URLs can carry them)"""
+        for field in SECRET_FIELDS:
+            secret = row.get(field)
+            if secret:
+                message = message.replace(secret, "***")
+        return message
+
+    def run(self, tables: Iterable[str] = AUDITED_TABLES, save: bool = True) -> List[Dict[str, Any]]:
+        """
+        Audit every active credential of the tables in parallel
+
+        Args:
+            tables: Credentials tables to audit
+            save: Store the results in credential_audits
+
+        Returns:
+            credential_audits rows
+        """
+        jobs = [(table, row) for table in tables for row in self.data_client.fetch_credentials(table)]
+        logger.info(f"🔐 Auditing {len(jobs)} credential(s) with {self.max_workers} workers")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="credential-audit") as executor:
+            results = list(executor.map(lambda job: self.check(*job), jobs))
+
+        if save and not self.data_client.save_credential_audits(results):
+            logger.error("❌ Audit results could not be saved, the automators keep using the previous ones")
+        return results
+
+
+def main():
+    """Command line entry point for the credential audit"""
+    parser = argparse.ArgumentParser(description="Check every stored credential in parallel")
+    parser.add_argument("--table", action="append", choices=AUDITED_TABLES, help="Audit only this table (repeatable)")
+    parser.add_argument("--workers", type=int, help="Credentials checked in parallel")
+    parser.add_argument("--ttl", type=float, help="Seconds the results stay valid")
+    parser.add_argument("--dry-run", action="store_true", help="Report without saving the results")
+    args = parser.parse_args()
+
+    # Imported here: importing main configures logging for the command
+    from .main import DNSAutomator
+
+    auditor = CredentialAuditor(DNSAutomator(), max_workers=args.workers, ttl=args.ttl)
+    results = auditor.run(args.table or AUDITED_TABLES, save=not args.dry_run)
+
+    for result in results:
+        mark = "✅" if result["healthy"] else "❌"
+        outcome = result["details"] if result["healthy"] else result["error"]
+        logger.info(f"{mark} {result['credential_table']} {result['label']} ({result['latency_ms']} ms): {outcome}")
+
+    failed = sum(not result["healthy"] for result in results)
+    logger.info(f"🏁 Credential audit finished: {len(results) - failed} healthy, {failed} failed")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -23,6 +23,65 @@ class Settings(BaseSettings):
     # Testing
     site_id: Optional[str] = Field(None, description="Specific site ID to process (for testing)")
     
+    # Fleet operations
+    fleet_max_workers: int = Field(16, description="Zones processed in parallel by fleet commands")
+    cloudflare_rate_limit: float = Field(4.0, description="Cloudflare API calls per second per API token")
+    namecheap_rate_limit: float = Field(0.19, description="Namecheap API calls per second (700/hour)")
+    spaceship_rate_limit: float = Field(1.0, description="Spaceship API calls per second")
+    drift_max_age_hours: float = Field(24.0, description="Drift scanner only re-checks sites older than this")
+    
+    # Status writes
+    status_flush_interval: float = Field(0.5, description="Seconds between batched writes of buffered status and step updates")
+    
+    # Durable job queue of the API service
+    job_queue_path: str = Field("data/dns-jobs.sqlite3", description="SQLite file of the /process job queue (mount a volume)")
+    queue_workers: int = Field(4, description="Queued /process jobs run in parallel")
+    shutdown_timeout: float = Field(25.0, description="Seconds to wait for running jobs on shutdown")
+    job_retention_seconds: float = Field(604800.0, description="Finished /process jobs older than this are deleted from the queue (0 keeps them)")
+    job_budget_seconds: float = Field(300.0, description="Seconds one site's DNS job may take; calls time out at the deadline and the site is retried later (0 disables)")
+    
+    # Credential audit (see audit.py and migration 016)
+    credential_audit_workers: int = Field(16, description="Credentials checked in parallel by the credential audit")
+    credential_audit_ttl: float = Field(3600.0, description="Seconds an audit result stays valid; failed credentials are skipped until then")
+    credential_health_refresh: float = Field(60.0, description="Seconds jobs reuse the list of failed credentials")
+    
+    # /load report (see utils/load.py)
+    load_window_seconds: float = Field(600.0, description="Look-back in seconds for the throughput in /load")
+    load_target_drain_seconds: float = Field(900.0, description="Seconds the backlog should be worked off in; sizes the desired_replicas hint")
+    min_replicas: int = Field(1, description="Fewest replicas desired_replicas suggests")
+    max_replicas: int = Field(10, description="Most replicas desired_replicas suggests")
+    
+    # Provider response cache
+    response_cache_path: Optional[str] = Field(None, description="SQLite file caching read-only registrar and Cloudflare responses; unset disables the cache")
+    
+    # Zone pre-warming (see prewarm.py and migration 014)
+    prewarm_zones: bool = Field(False, description="In listener mode, create Cloudflare zones and base records as soon as sites are queued")
+    prewarm_workers: int = Field(4, description="Zones pre-warmed in parallel, on top of queue_workers")
+    
+    # Zone performance profile (see utils/zone_profiles.py)
+    zone_profile: Optional[str] = Field("static", description="Performance profile applied to every new Cloudflare zone; empty disables")
+    
+    # Zone activation (see activation.py)
+    zone_activation: bool = Field(False, description="Keep sites 'activating' until Cloudflare reports their zone active; the API service polls them in the background")
+    activation_workers: int = Field(8, description="Zones checked in parallel by the zone activator")
+    activation_poll_initial: float = Field(30.0, description="Seconds before the second status check of a zone; doubles per check")
+    activation_poll_max: float = Field(900.0, description="Longest wait between status checks of a zone")
+    activation_check_interval: float = Field(3600.0, description="Seconds between activation check requests per zone (Cloudflare allows one per hour on free plans)")
+    activation_refresh_interval: float = Field(60.0, description="Seconds between lookups of newly activating sites")
+    
+    # Nameserver prediction
+    speculative_nameservers: bool = Field(True, description="Update the registrar with the account's usual nameserver pair while the zone is created, correcting it if Cloudflare assigns another")
+    
+    # Listener mode (push triggering, see migration 013)
+    listen_database_url: Optional[str] = Field(None, description="Postgres connection string (direct or session pooler); queues sites when status_dns becomes pending")
+    
+    # Multi-replica batch mode
+    lease_ttl_seconds: float = Field(120.0, description="Seconds a claimed site stays reserved without a heartbeat")
+    claim_batch_size: int = Field(5, description="Pending sites claimed at a time in batch mode")
+    
+    # Cloudflare account placement
+    cloudflare_zone_limit: int = Field(1000, description="Zones per Cloudflare account unless the account row sets zone_limit")
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
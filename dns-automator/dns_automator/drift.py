@@ -0,0 +1,367 @@
+"""DNS drift scanner comparing live Cloudflare/registrar state with the sites table"""
+
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from .core.config import settings
+from .services.cloudflare_client import CloudflareClient, CloudflareError
+from .utils.rate_limit import RateLimiterRegistry
+from .utils.record_templates import SINGLE_VALUE_TYPES, RecordTemplate, record_key, render_templates, site_variables
+from .utils.site import Site
+
+logger = logging.getLogger(__name__)
+
+REGISTRARS = ["namecheap", "spaceship"]
+
+
+class DriftScanner:
+    """Checks active sites for DNS drift, many zones at a time"""
+
+    def __init__(self, automator, max_workers: Optional[int] = None, report_path: Optional[str] = None):
+        """
+        Initialize drift scanner
+
+        Args:
+            automator: DNSAutomator providing the data client and registrar clients
+            max_workers: Sites checked in parallel
+            report_path: JSON lines file receiving one line per drifted site
+        """
+        self.automator = automator
+        self.data_client = automator.data_client
+        self.max_workers = max_workers or settings.fleet_max_workers
+        self.report_path = report_path
+
+        self.cloudflare_limiters = RateLimiterRegistry(settings.cloudflare_rate_limit)
+        self.registrar_limiters = {
+            "namecheap": RateLimiterRegistry(settings.namecheap_rate_limit).get("namecheap"),
+            "spaceship": RateLimiterRegistry(settings.spaceship_rate_limit).get("spaceship"),
+        }
+
+        self._cloudflare_clients: Dict[str, Optional[CloudflareClient]] = {}
+        self._clients_lock = threading.Lock()
+        self._report_lock = threading.Lock()
+        self.registrar_clients: Dict[str, Any] = {}
+        self.server_ips: Dict[str, str] = {}
+        self.default_server_ip: Optional[str] = None
+
+    def _prepare(self) -> None:
+        """Load servers and registrar clients once, before fanning out"""
+        for server in self.data_client.fetch_servers():
+            self.server_ips[server["id"]] = server["ip_address"]
+            if server.get("is_default"):
+                self.default_server_ip = server["ip_address"]
+
+        for registrar_type in REGISTRARS:
+            try:
+                client = self.automator.get_registrar_client(registrar_type)
+            except ValueError as e:
+                logger.warning(f"⚠️  {registrar_type} not configured, its domains cannot be checked: {e}")
+                continue
+            client.rate_limiter = self.registrar_limiters[registrar_type]
+            self.registrar_clients[registrar_type] = client
+
+    def _cloudflare_client_for(self, cf_account_id: str) -> Optional[CloudflareClient]:
+        """
+        Get a Cloudflare client for an account, sharing one rate limiter per token
+
+        Args:
+            cf_account_id: UUID of the cloudflare_accounts row
+
+        Returns:
+            CloudflareClient instance, or None if the account is unusable
+        """
+        with self._clients_lock:
+            if cf_account_id in self._cloudflare_clients:
+                return self._cloudflare_clients[cf_account_id]
+
+            client = None
+            cf_account = self.data_client.get_cloudflare_account(cf_account_id)
+            if cf_account:
+                try:
+                    client = CloudflareClient(
+                        cf_account["api_token"],
+                        cf_account.get("cloudflare_account_id"),
+                        rate_limiter=self.cloudflare_limiters.get(cf_account["api_token"])
+                    )
+                except CloudflareError as e:
+                    logger.error(f"❌ Cloudflare account {cf_account_id} unusable: {e}")
+
+            self._cloudflare_clients[cf_account_id] = client
+            return client
+
+    def scan(self, max_age_hours: Optional[float] = None, limit: Optional[int] = None) -> Dict[str, int]:
+        """
+        Check every active site not checked within max_age_hours
+
+        Sites are streamed from the database and checked with a bounded number of
+        checks in flight, so memory stays flat for any fleet size.
+
+        Args:
+            max_age_hours: Skip sites checked more recently than this
+            limit: Stop after this many sites (to spread a scan over several runs)
+
+        Returns:
+            Count of sites per outcome (in_sync, drifted, error)
+        """
+        max_age_hours = settings.drift_max_age_hours if max_age_hours is None else max_age_hours
+        checked_before = datetime.utcnow() - timedelta(hours=max_age_hours)
+
+        self._prepare()
+
+        summary = {"in_sync": 0, "drifted": 0, "error": 0}
+        started_at = time.monotonic()
+        submitted = 0
+        max_in_flight = self.max_workers * 4
+
+        logger.info(f"🔍 Scanning active sites not checked since {checked_before.isoformat()} UTC "
+                    f"with {self.max_workers} workers")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            in_flight = set()
+
+            for site in self.data_client.iter_active_dns_sites(checked_before=checked_before):
+                if limit and submitted >= limit:
+                    break
+
+                if len(in_flight) >= max_in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    self._collect(done, summary)
+
+                in_flight.add(executor.submit(self._scan_site, site))
+                submitted += 1
+
+            self._collect(wait(in_flight).done, summary)
+
+        elapsed = time.monotonic() - started_at
+        logger.info(f"🏁 Drift scan finished: {submitted} site(s) in {elapsed:.0f}s - {summary}")
+        return summary
+
+    def _collect(self, futures, summary: Dict[str, int]) -> None:
+        """Add finished checks to the summary"""
+        for future in futures:
+            summary[future.result()] += 1
+
+    def _scan_site(self, site: Site) -> str:
+        """
+        Check one site and record the outcome
+
+        Args:
+            site: Site record
+
+        Returns:
+            Outcome (in_sync, drifted, error)
+        """
+        domain = site["domain"]
+
+        try:
+            issues, registrar = self.check_site(site)
+        except Exception as e:
+            logger.error(f"❌ {domain}: drift check failed: {type(e).__name__}: {e}")
+            return "error"
+
+        new_registrar = registrar if registrar != site.get("registrar") else None
+        self.data_client.record_dns_drift(site["id"], issues, registrar=new_registrar)
+
+        if not issues:
+            logger.debug(f"✅ {domain}: in sync")
+            return "in_sync"
+
+        logger.warning(f"⚠️  {domain}: {len(issues)} drift issue(s): {', '.join(i['type'] for i in issues)}")
+        self._write_report(site, issues)
+        return "drifted"
+
+    def check_site(self, site: Site) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Compare the live DNS state of a site with what the database expects
+
+        Args:
+            site: Site record
+
+        Returns:
+            Tuple of (issues, registrar managing the domain)
+        """
+        domain = site["domain"]
+        issues: List[Dict[str, Any]] = []
+
+        client = self._cloudflare_client_for(site["cloudflare_account_id"])
+        if not client:
+            return [{"type": "cloudflare_account_unusable", "cloudflare_account_id": site["cloudflare_account_id"]}], None
+
+        zone = client.find_zone(domain)
+        if not zone:
+            return [{"type": "zone_missing"}], site.get("registrar")
+
+        if zone.get("status") != "active":
+            issues.append({"type": "zone_not_active", "actual": zone.get("status")})
+
+        expected_ip = self.server_ips.get(site.get("server_id")) or self.default_server_ip
+        issues.extend(self._check_records(client.get_dns_records(zone["id"]), self._expected_records(site, expected_ip)))
+
+        registrar, registrar_nameservers = self._registrar_nameservers(domain, site.get("registrar"))
+        zone_nameservers = sorted(ns.lower() for ns in zone.get("name_servers", []))
+
+        if registrar_nameservers is None:
+            issues.append({"type": "registrar_unknown"})
+        elif sorted(registrar_nameservers) != zone_nameservers:
+            issues.append({
+                "type": "nameserver_mismatch",
+                "registrar": registrar,
+                "expected": zone_nameservers,
+                "actual": sorted(registrar_nameservers)
+            })
+
+        return issues, registrar
+
+    def _expected_records(self, site: Site, expected_ip: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        Render the records the DNS job creates for a site from its record templates
+
+        Args:
+            site: Site record
+            expected_ip: IP address of the site's hosting server, if known
+
+        Returns:
+            List of records with fully qualified names; content rendered from an
+            unknown server IP is left empty and not compared
+        """
+        assignments = self.data_client.fetch_record_templates(site["id"], site.get("cloudflare_account_id"))
+        templates = [RecordTemplate.from_assignment(assignment) for assignment in assignments]
+        return render_templates(templates, site_variables(site, expected_ip or ""), site["domain"])
+
+    def _check_records(
+        self,
+        records: List[Dict[str, Any]],
+        expected: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Check a zone's records against the records rendered from the site's templates
+
+        Args:
+            records: All DNS records of the zone
+            expected: Records the zone should contain
+
+        Returns:
+            List of record issues
+        """
+        issues = []
+        live_keys = {record_key(record) for record in records}
+
+        for wanted in expected:
+            full_name = wanted["name"]
+
+            if wanted["type"] not in SINGLE_VALUE_TYPES:
+                # Names may hold several MX/TXT values, so only the wanted one is looked for
+                if record_key(wanted) not in live_keys:
+                    issues.append({
+                        "type": "missing_record",
+                        "name": full_name,
+                        "record_type": wanted["type"],
+                        "expected": wanted["content"]
+                    })
+                continue
+
+            matching = [
+                record for record in records
+                if record["name"].lower() == full_name.lower() and record["type"] in SINGLE_VALUE_TYPES
+            ]
+
+            if not matching:
+                issues.append({"type": "missing_record", "name": full_name, "record_type": wanted["type"]})
+                continue
+
+            for record in matching:
+                if record["type"] != wanted["type"]:
+                    issues.append({
+                        "type": "wrong_type",
+                        "name": full_name,
+                        "expected": wanted["type"],
+                        "actual": record["type"]
+                    })
+                    continue
+                if wanted["content"] and record["content"] != wanted["content"]:
+                    issues.append({
+                        "type": "wrong_content",
+                        "name": full_name,
+                        "expected": wanted["content"],
+                        "actual": record["content"]
+                    })
+                if wanted["proxied"] and not record.get("proxied"):
+                    issues.append({"type": "not_proxied", "name": full_name})
+                elif not wanted["proxied"] and record.get("proxied"):
+                    issues.append({"type": "unexpected_proxy", "name": full_name})
+
+        return issues
+
+    def _registrar_nameservers(
+        self,
+        domain: str,
+        known_registrar: Optional[str]
+    ) -> Tuple[Optional[str], Optional[List[str]]]:
+        """
+        Fetch the delegated nameservers, detecting the registrar if unknown
+
+        Args:
+            domain: Domain name
+            known_registrar: Registrar stored on the site, if any
+
+        Returns:
+            Tuple of (registrar, nameservers); nameservers is None if not found anywhere
+        """
+        candidates = [known_registrar] if known_registrar else REGISTRARS
+
+        for registrar_type in candidates:
+            client = self.registrar_clients.get(registrar_type)
+            if not client:
+                continue
+
+            nameservers = client.get_nameservers(domain)
+            if nameservers is not None:
+                return registrar_type, nameservers
+
+        return known_registrar, None
+
+    def _write_report(self, site: Site, issues: List[Dict[str, Any]]) -> None:
+        """Append a drifted site to the JSON lines report"""
+        if not self.report_path:
+            return
+
+        line = json.dumps({
+            "site_id": site["id"],
+            "domain": site["domain"],
+            "cloudflare_account_id": site["cloudflare_account_id"],
+            "checked_at": datetime.utcnow().isoformat(),
+            "issues": issues
+        })
+
+        with self._report_lock:
+            with open(self.report_path, "a", encoding="utf-8") as fh:
+                fh.write(line + "\n")
+
+
+def main():
+    """Command line entry point for the drift scanner"""
+    parser = argparse.ArgumentParser(description="Find sites whose live DNS drifted from the database")
+    parser.add_argument("--max-age-hours", type=float, help="Only check sites not checked within this many hours")
+    parser.add_argument("--limit", type=int, help="Check at most this many sites in this run")
+    parser.add_argument("--workers", type=int, help="Sites checked in parallel")
+    parser.add_argument("--report", default="dns-drift-report.jsonl", help="JSON lines file for drifted sites")
+    args = parser.parse_args()
+
+    # Imported here: importing main configures logging for the command
+    from .main import DNSAutomator
+
+    scanner = DriftScanner(DNSAutomator(), max_workers=args.workers, report_path=args.report)
+    summary = scanner.scan(max_age_hours=args.max_age_hours, limit=args.limit)
+
+    sys.exit(1 if summary["error"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,701 @@
+"""Fleet-wide DNS record changes (e.g. moving sites to a new hosting server)"""
+
+import argparse
+import copy
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from .core.config import settings
+from .services.cloudflare_client import CloudflareClient, CloudflareError
+from .services.supabase_client import SupabaseService
+from .utils.domains import record_name
+from .utils.rate_limit import RateLimiterRegistry
+from .utils.record_templates import RecordTemplate, RecordTemplateError, render_templates, site_variables
+from .utils.site import Site
+from .utils.zone_profiles import ZoneProfile, ZoneProfileError, get_profile
+
+logger = logging.getLogger(__name__)
+
+
+class FleetChangeError(Exception):
+    """Custom exception for fleet change errors"""
+    pass
+
+
+@dataclass
+class FleetSelector:
+    """Selects the sites affected by a fleet change (filters are combined)"""
+    server_id: Optional[str] = None
+    cloudflare_account_id: Optional[str] = None
+    domains: List[str] = field(default_factory=list)
+    all_sites: bool = False
+
+    def is_empty(self) -> bool:
+        """Whether no filter is set and the whole fleet was not asked for explicitly"""
+        return not (self.server_id or self.cloudflare_account_id or self.domains or self.all_sites)
+
+
+@dataclass
+class RecordTransform:
+    """Rewrites matching DNS records of a zone"""
+    record_type: str = "A"
+    names: List[str] = field(default_factory=lambda: ["@", "www"])
+    content: Optional[str] = None
+    proxied: Optional[bool] = None
+    match_content: Optional[str] = None
+
+    def record_names(self, domain: str) -> List[str]:
+        """
+        Expand relative record names to fully qualified names
+
+        Args:
+            domain: Zone name
+
+        Returns:
+            List of fully qualified record names
+        """
+        return [record_name(name, domain) for name in self.names]
+
+    def rewrite(self, record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Compute the new body for a record
+
+        Args:
+            record: Existing Cloudflare DNS record
+
+        Returns:
+            New record body, or None if the record is not affected or already up to date
+        """
+        if self.match_content and record["content"] != self.match_content:
+            return None
+
+        new_record = record_body(record)
+        if self.content is not None:
+            new_record["content"] = self.content
+        if self.proxied is not None:
+            new_record["proxied"] = self.proxied
+
+        if new_record == record_body(record):
+            return None
+        return new_record
+
+
+def record_body(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reduce a Cloudflare DNS record to the fields accepted by a PUT
+
+    Args:
+        record: Cloudflare DNS record
+
+    Returns:
+        Writable record body
+    """
+    return {
+        "type": record["type"],
+        "name": record["name"],
+        "content": record["content"],
+        "proxied": record.get("proxied", False),
+        "ttl": record.get("ttl", 1)
+    }
+
+
+class FleetChangeState:
+    """
+    JSON checkpoint of a fleet change
+
+    Stores the outcome per domain together with the original record bodies, so an
+    interrupted run can be resumed and a finished run can be rolled back.
+    """
+
+    def __init__(self, path: str):
+        """
+        Load or create checkpoint file
+
+        Args:
+            path: Path of the JSON state file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as fh:
+                self.data = json.load(fh)
+        else:
+            self.data = {"created_at": datetime.now().isoformat(), "change": None, "zones": {}}
+
+    def begin(self, change: Dict[str, Any]) -> None:
+        """
+        Bind the state file to a change, refusing to resume a different one
+
+        Args:
+            change: JSON-serializable description of the change
+        """
+        with self._lock:
+            if self.data["change"] and self.data["change"] != change:
+                raise FleetChangeError(
+                    f"State file {self.path} belongs to a different change; use a new --state-file"
+                )
+            self.data["change"] = change
+            self._save()
+
+    def get(self, domain: str) -> Optional[Dict[str, Any]]:
+        """Get a copy of the checkpoint entry for a domain"""
+        with self._lock:
+            return copy.deepcopy(self.data["zones"].get(domain))
+
+    def put(self, domain: str, entry: Dict[str, Any]) -> None:
+        """Store a copy of the checkpoint entry for a domain and persist the file"""
+        with self._lock:
+            # Copied so callers changing their entry afterwards never race _save() of other workers
+            self.data["zones"][domain] = copy.deepcopy(entry)
+            self._save()
+
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        """Snapshot of all checkpoint entries"""
+        with self._lock:
+            return copy.deepcopy(self.data["zones"])
+
+    def _save(self) -> None:
+        """Atomically write the state file"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(self.data, fh, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class FleetChangeEngine:
+    """Applies a record transformation to many zones in parallel"""
+
+    def __init__(
+        self,
+        data_client: SupabaseService,
+        state: FleetChangeState,
+        max_workers: Optional[int] = None,
+        rate_limit: Optional[float] = None
+    ):
+        """
+        Initialize fleet change engine
+
+        Args:
+            data_client: Supabase service
+            state: Checkpoint state
+            max_workers: Zones processed in parallel
+            rate_limit: Cloudflare calls per second per API token
+        """
+        self.data_client = data_client
+        self.state = state
+        self.max_workers = max_workers or settings.fleet_max_workers
+        self.rate_limiters = RateLimiterRegistry(rate_limit or settings.cloudflare_rate_limit)
+        self._clients: Dict[str, CloudflareClient] = {}
+        self._clients_lock = threading.Lock()
+
+    def _client_for(self, cf_account_id: str) -> CloudflareClient:
+        """
+        Get a Cloudflare client for an account, sharing one rate limiter per token
+
+        Args:
+            cf_account_id: UUID of the cloudflare_accounts row
+
+        Returns:
+            CloudflareClient instance
+        """
+        with self._clients_lock:
+            client = self._clients.get(cf_account_id)
+        if client:
+            return client
+
+        # Built outside the lock: the account lookup and client setup call the network,
+        # and other accounts' workers should not wait for them
+        cf_account = self.data_client.get_cloudflare_account(cf_account_id)
+        if not cf_account:
+            raise FleetChangeError(f"Cloudflare account not found: {cf_account_id}")
+
+        client = CloudflareClient(
+            cf_account["api_token"],
+            cf_account.get("cloudflare_account_id"),
+            rate_limiter=self.rate_limiters.get(cf_account["api_token"])
+        )
+        with self._clients_lock:
+            # Another worker may have built one meanwhile; keep the first
+            return self._clients.setdefault(cf_account_id, client)
+
+    def apply(
+        self,
+        selector: FleetSelector,
+        transform: RecordTransform,
+        to_server_id: Optional[str] = None,
+        dry_run: bool = False
+    ) -> Dict[str, int]:
+        """
+        Apply a record transformation to every selected zone
+
+        Zones already completed in the state file are skipped, so re-running the
+        same command resumes an interrupted change.
+
+        Args:
+            selector: Fleet selector
+            transform: Record transformation
+            to_server_id: Move the sites to this server once their records are changed
+            dry_run: Only compute and log the changes
+
+        Returns:
+            Count of zones per outcome
+        """
+        if selector.is_empty():
+            raise FleetChangeError("Refusing to change the whole fleet without a selector")
+
+        sites = self.data_client.fetch_sites(
+            server_id=selector.server_id,
+            cloudflare_account_id=selector.cloudflare_account_id,
+            domains=selector.domains or None
+        )
+
+        if not dry_run:
+            self.state.begin({
+                "selector": asdict(selector),
+                "transform": asdict(transform),
+                "to_server_id": to_server_id
+            })
+
+        pending = []
+        for site in sites:
+            entry = self.state.get(site["domain"])
+            if entry and entry["status"] == "done" and not dry_run:
+                continue
+            pending.append(site)
+
+        logger.info(f"📊 {len(sites)} site(s) selected, {len(sites) - len(pending)} already done, "
+                    f"{len(pending)} to process with {self.max_workers} workers")
+
+        return self._run_parallel(
+            pending,
+            lambda site: self._change_zone(site, transform, to_server_id, dry_run),
+            lambda site: site["domain"],
+            "dry-run" if dry_run else "change"
+        )
+
+    def apply_templates(self, selector: FleetSelector) -> Dict[str, int]:
+        """
+        Re-apply each selected site's DNS record templates to its zone
+
+        Every zone costs one record listing and at most one batched write, so
+        attaching a new fleet-wide template and running this is one write per zone.
+
+        Args:
+            selector: Fleet selector
+
+        Returns:
+            Count of zones per outcome
+        """
+        if selector.is_empty():
+            raise FleetChangeError("Refusing to change the whole fleet without a selector")
+
+        sites = self.data_client.fetch_sites(
+            server_id=selector.server_id,
+            cloudflare_account_id=selector.cloudflare_account_id,
+            domains=selector.domains or None
+        )
+
+        self.state.begin({"selector": asdict(selector), "apply_templates": True})
+
+        server_ips = {}
+        default_ip = None
+        for server in self.data_client.fetch_servers():
+            server_ips[server["id"]] = server["ip_address"]
+            if server.get("is_default"):
+                default_ip = server["ip_address"]
+
+        pending = [
+            site for site in sites
+            if (self.state.get(site["domain"]) or {}).get("status") != "done"
+        ]
+        logger.info(f"📊 Applying record templates to {len(pending)} of {len(sites)} zone(s)")
+
+        return self._run_parallel(
+            pending,
+            lambda site: self._apply_zone_templates(site, server_ips.get(site.get("server_id")) or default_ip),
+            lambda site: site["domain"],
+            "change"
+        )
+
+    def apply_profile(self, selector: FleetSelector, profile: ZoneProfile) -> Dict[str, int]:
+        """
+        Apply a zone performance profile to every selected zone
+
+        Every zone costs one bulk settings PATCH and one cache rules write.
+
+        Args:
+            selector: Fleet selector
+            profile: Zone profile
+
+        Returns:
+            Count of zones per outcome
+        """
+        if selector.is_empty():
+            raise FleetChangeError("Refusing to change the whole fleet without a selector")
+
+        sites = self.data_client.fetch_sites(
+            server_id=selector.server_id,
+            cloudflare_account_id=selector.cloudflare_account_id,
+            domains=selector.domains or None
+        )
+
+        self.state.begin({"selector": asdict(selector), "apply_profile": profile.name})
+
+        pending = [
+            site for site in sites
+            if site.get("cloudflare_account_id")
+            and (self.state.get(site["domain"]) or {}).get("status") != "done"
+        ]
+        logger.info(f"📊 Applying zone profile '{profile.name}' to {len(pending)} of {len(sites)} zone(s)")
+
+        return self._run_parallel(
+            pending,
+            lambda site: self._apply_zone_profile(site, profile),
+            lambda site: site["domain"],
+            "change"
+        )
+
+    def rollback(self) -> Dict[str, int]:
+        """
+        Restore the original records of every zone touched by the stored change
+
+        Zones are selected by their status, not by whether records changed, so
+        a site moved to another server is moved back even if its records
+        already matched.
+
+        Returns:
+            Count of zones per outcome
+        """
+        domains = [
+            domain for domain, entry in self.state.entries().items()
+            if entry["status"] in ("in_progress", "done", "failed") and "changes" in entry
+        ]
+
+        logger.info(f"⏪ Rolling back {len(domains)} zone(s)")
+
+        return self._run_parallel(domains, self._rollback_zone, lambda domain: domain, "rollback")
+
+    def _change_zone(
+        self,
+        site: Site,
+        transform: RecordTransform,
+        to_server_id: Optional[str],
+        dry_run: bool
+    ) -> str:
+        """
+        Apply the transformation to a single zone
+
+        The original records are checkpointed before anything is written.
+
+        Args:
+            site: Site record
+            transform: Record transformation
+            to_server_id: Server the site is moved to, if any
+            dry_run: Only compute and log the changes
+
+        Returns:
+            Outcome of the zone
+        """
+        domain = site["domain"]
+        client = self._client_for(site["cloudflare_account_id"])
+        zone_id = client.get_zone_id(domain)
+
+        # Keep the original bodies of a previous, interrupted attempt
+        previous = self.state.get(domain) or {}
+        originals = {change["record_id"]: change["before"] for change in previous.get("changes", [])}
+
+        wanted_names = set(transform.record_names(domain))
+        changes = []
+        for record in client.get_dns_records(zone_id, record_type=transform.record_type):
+            if record["name"] not in wanted_names:
+                continue
+
+            if record["id"] in originals:
+                before = originals.pop(record["id"])
+            else:
+                before = record_body(record)
+
+            after = transform.rewrite(record)
+            if after is None and before == record_body(record):
+                continue
+
+            changes.append({"record_id": record["id"], "before": before, "after": after or record_body(record)})
+
+        if dry_run:
+            for change in changes:
+                logger.info(f"   {domain}: {change['before']['name']} {change['before']['content']} "
+                            f"-> {change['after']['content']} (proxied={change['after']['proxied']})")
+            return "planned" if changes else "unchanged"
+
+        entry = {
+            "status": "in_progress",
+            "site_id": site["id"],
+            "zone_id": zone_id,
+            "cf_account_id": site["cloudflare_account_id"],
+            "previous_server_id": previous.get("previous_server_id", site.get("server_id")),
+            "changes": changes
+        }
+        self.state.put(domain, entry)
+
+        for change in changes:
+            client.update_dns_record(zone_id, change["record_id"], change["after"])
+
+        if to_server_id and site.get("server_id") != to_server_id:
+            if not self.data_client.update_site_server(site["id"], to_server_id):
+                raise FleetChangeError(f"Could not move {domain} to server {to_server_id}")
+
+        entry["status"] = "done"
+        entry["completed_at"] = datetime.now().isoformat()
+        self.state.put(domain, entry)
+        return "done" if changes else "unchanged"
+
+    def _apply_zone_templates(self, site: Site, server_ip: Optional[str]) -> str:
+        """
+        Render and batch-apply the record templates of a single zone
+
+        Args:
+            site: Site record
+            server_ip: IP address of the site's hosting server
+
+        Returns:
+            Outcome of the zone
+        """
+        if not server_ip:
+            raise FleetChangeError(f"No server IP known for {site['domain']}")
+
+        domain = site["domain"]
+        client = self._client_for(site["cloudflare_account_id"])
+        zone_id = client.get_zone_id(domain)
+
+        assignments = self.data_client.fetch_record_templates(site["id"], site.get("cloudflare_account_id"))
+        templates = [RecordTemplate.from_assignment(assignment) for assignment in assignments]
+        records = render_templates(templates, site_variables(site, server_ip), domain)
+
+        summary = client.apply_dns_records(zone_id, records)
+        self.state.put(domain, {"status": "done", "site_id": site["id"], "zone_id": zone_id, "records": summary})
+        return "done" if summary["created"] or summary["updated"] else "unchanged"
+
+    def _apply_zone_profile(self, site: Site, profile: ZoneProfile) -> str:
+        """
+        Apply a zone profile to a single zone
+
+        Args:
+            site: Site record
+            profile: Zone profile
+
+        Returns:
+            Outcome of the zone
+        """
+        domain = site["domain"]
+        client = self._client_for(site["cloudflare_account_id"])
+        zone_id = site.get("cloudflare_zone_id") or client.get_zone_id(domain)
+
+        client.apply_zone_profile(zone_id, profile)
+        self.state.put(domain, {"status": "done", "site_id": site["id"], "zone_id": zone_id, "profile": profile.name})
+        return "done"
+
+    def _rollback_zone(self, domain: str) -> str:
+        """
+        Restore the original records of a single zone
+
+        Args:
+            domain: Domain from the state file
+
+        Returns:
+            Outcome of the zone
+        """
+        entry = self.state.get(domain)
+        client = self._client_for(entry["cf_account_id"])
+
+        for change in entry["changes"]:
+            client.update_dns_record(entry["zone_id"], change["record_id"], change["before"])
+
+        change_info = self.state.data.get("change") or {}
+        if change_info.get("to_server_id") and entry.get("previous_server_id"):
+            if not self.data_client.update_site_server(entry["site_id"], entry["previous_server_id"]):
+                raise FleetChangeError(f"Could not move {domain} back to server {entry['previous_server_id']}")
+
+        entry["status"] = "rolled_back"
+        entry["rolled_back_at"] = datetime.now().isoformat()
+        self.state.put(domain, entry)
+        return "rolled_back"
+
+    def _run_parallel(
+        self,
+        items: List[Any],
+        func: Callable[[Any], str],
+        label_of: Callable[[Any], str],
+        action: str
+    ) -> Dict[str, int]:
+        """
+        Run func over items on the worker pool with progress reporting
+
+        Args:
+            items: Work items
+            func: Function returning the outcome of one item
+            label_of: Function returning a display label for one item
+            action: Action name used in progress logs
+
+        Returns:
+            Count of items per outcome
+        """
+        summary: Dict[str, int] = {}
+        total = len(items)
+        started_at = time.monotonic()
+
+        if not total:
+            return summary
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(func, item): item for item in items}
+
+            for finished, future in enumerate(as_completed(futures), 1):
+                label = label_of(futures[future])
+                error = None
+                try:
+                    outcome = future.result()
+                    logger.info(f"✅ [{finished}/{total}] {label}: {outcome}")
+                except (CloudflareError, FleetChangeError, RecordTemplateError) as e:
+                    outcome, error = "failed", str(e)
+                    logger.error(f"❌ [{finished}/{total}] {label}: {e}")
+                except Exception as e:
+                    outcome, error = "failed", f"{type(e).__name__}: {e}"
+                    logger.error(f"❌ [{finished}/{total}] {label}: unexpected {error}")
+
+                if error and action == "change":
+                    entry = self.state.get(label) or {}
+                    entry.update({"status": "failed", "error": error})
+                    self.state.put(label, entry)
+
+                summary[outcome] = summary.get(outcome, 0) + 1
+
+                elapsed = time.monotonic() - started_at
+                rate = finished / elapsed if elapsed else 0.0
+                eta = (total - finished) / rate if rate else 0.0
+                if finished % 10 == 0 or finished == total:
+                    logger.info(f"📈 {action}: {finished}/{total} zones, {rate:.1f} zones/s, ETA {eta:.0f}s")
+
+        return summary
+
+
+def _parse_bool(value: Optional[str]) -> Optional[bool]:
+    """Parse a true/false CLI flag value"""
+    if value is None:
+        return None
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def main():
+    """Command line entry point for fleet DNS changes"""
+    parser = argparse.ArgumentParser(
+        description="Apply a DNS record change to many Cloudflare zones in parallel"
+    )
+    parser.add_argument("--server-id", help="Select sites hosted on this server")
+    parser.add_argument("--cloudflare-account-id", help="Select sites in this Cloudflare account (UUID)")
+    parser.add_argument("--domain", action="append", default=[], help="Select a domain (repeatable)")
+    parser.add_argument("--domains-file", help="File with one domain per line to select")
+    parser.add_argument("--record-type", default="A", help="Record type to change (default: A)")
+    parser.add_argument("--names", default="@,www", help="Comma separated record names (default: @,www)")
+    parser.add_argument("--content", help="New record content")
+    parser.add_argument("--to-server-id", help="Move sites to this server: content becomes its IP address")
+    parser.add_argument("--from-ip", help="Only change records currently pointing at this content")
+    parser.add_argument("--proxied", help="Set the proxied flag (true/false)")
+    parser.add_argument("--workers", type=int, help="Zones processed in parallel")
+    parser.add_argument("--rate", type=float, help="Cloudflare calls per second per API token")
+    parser.add_argument("--state-file", default="fleet-change-state.json", help="Checkpoint file for resume/rollback")
+    parser.add_argument("--dry-run", action="store_true", help="Only show the planned changes")
+    parser.add_argument("--rollback", action="store_true", help="Restore the records stored in --state-file")
+    parser.add_argument("--apply-templates", action="store_true",
+                        help="Re-apply each selected site's DNS record templates in one batch per zone")
+    parser.add_argument("--apply-profile", metavar="NAME",
+                        help="Apply a zone performance profile (settings and cache rules) to the selected zones")
+    parser.add_argument("--all-sites", action="store_true", help="Select every site of the fleet")
+    args = parser.parse_args()
+
+    from .core.logging import setup_logging
+    setup_logging()
+
+    data_client = SupabaseService()
+    state = FleetChangeState(args.state_file)
+    engine = FleetChangeEngine(data_client, state, max_workers=args.workers, rate_limit=args.rate)
+
+    if args.rollback:
+        summary = engine.rollback()
+        logger.info(f"🏁 Rollback finished: {summary}")
+        sys.exit(1 if summary.get("failed") else 0)
+
+    domains = list(args.domain)
+    if args.domains_file:
+        with open(args.domains_file, "r", encoding="utf-8") as fh:
+            domains.extend(line.strip() for line in fh if line.strip() and not line.startswith("#"))
+
+    selector = FleetSelector(
+        server_id=args.server_id,
+        cloudflare_account_id=args.cloudflare_account_id,
+        domains=domains,
+        all_sites=args.all_sites
+    )
+
+    if args.apply_profile:
+        try:
+            summary = engine.apply_profile(selector, get_profile(args.apply_profile))
+        except (FleetChangeError, ZoneProfileError) as e:
+            parser.error(str(e))
+        logger.info(f"🏁 Zone profile application finished: {summary}")
+        sys.exit(1 if summary.get("failed") else 0)
+
+    if args.apply_templates:
+        try:
+            summary = engine.apply_templates(selector)
+        except FleetChangeError as e:
+            parser.error(str(e))
+        logger.info(f"🏁 Template application finished: {summary}")
+        sys.exit(1 if summary.get("failed") else 0)
+
+    content = args.content
+    if args.to_server_id:
+        target_server = data_client.fetch_server(args.to_server_id)
+        if not target_server:
+            parser.error(f"Server not found: {args.to_server_id}")
+        content = target_server["ip_address"]
+
+    match_content = args.from_ip
+    if not match_content and args.server_id and args.record_type == "A":
+        # Only touch records that still point at the server being migrated away from
+        source_server = data_client.fetch_server(args.server_id)
+        if source_server:
+            match_content = source_server["ip_address"]
+
+    transform = RecordTransform(
+        record_type=args.record_type,
+        names=[name.strip() for name in args.names.split(",") if name.strip()],
+        content=content,
+        proxied=_parse_bool(args.proxied),
+        match_content=match_content
+    )
+
+    if transform.content is None and transform.proxied is None:
+        parser.error("Nothing to change: pass --content, --to-server-id or --proxied")
+
+    try:
+        summary = engine.apply(selector, transform, to_server_id=args.to_server_id, dry_run=args.dry_run)
+    except FleetChangeError as e:
+        parser.error(str(e))
+
+    logger.info(f"🏁 Fleet change finished: {summary}")
+    if summary.get("failed"):
+        logger.info(f"   Re-run the same command to retry failed zones, or --rollback --state-file {args.state_file}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
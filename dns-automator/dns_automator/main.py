@@ -4,7 +4,9 @@ print("🟢 DEBUG: dns_automator/main.py module loading...")
 
 import sys
 import logging
-from typing import Optional
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Tuple
 from datetime import datetime
 
 print("🟢 DEBUG: Basic imports done, loading local modules...")
@@ -15,7 +17,7 @@ print("🟢 DEBUG: config imported")
 from .core.logging import setup_logging
 print("🟢 DEBUG: logging imported")
 
-from .services.supabase_client import SupabaseService
+from .services.supabase_client import DNS_PHASE, SupabaseService
 print("🟢 DEBUG: supabase_client imported")
 
 # Hub API client removed - using shared Railway variables instead
@@ -29,10 +31,30 @@ print("🟢 DEBUG: spaceship_client imported")
 from .services.cloudflare_client import CloudflareClient, CloudflareError
 print("🟢 DEBUG: cloudflare_client imported")
 
+from .activation import ACTIVATING, DEAD_ZONE_STATUSES
+from .services.placement import AccountPlacementService, PlacementError, load_tracker
+
+from .utils.record_templates import RecordTemplate, RecordTemplateError, render_templates, site_variables
+from .utils.call_ledger import CallLedger, ledger_scope
+from .utils.cassette import from_env as cassette_from_env
+from .utils.credential_health import CLOUDFLARE_ACCOUNTS, REGISTRAR_CREDENTIALS, CredentialHealth
+from .utils.deadline import Deadline, deadline_scope
+from .utils.leases import LeaseLostError, LeaseManager
+from .utils.nameservers import nameserver_key, nameserver_predictor
+from .utils.response_cache import shared_cache
+from .utils.site import Site
+from .utils.zone_profiles import ZoneProfileError, get_profile
+
 # Setup logging
 print("🟢 DEBUG: Setting up logging...")
 logger = setup_logging()
 print("🟢 DEBUG: Logger setup complete")
+
+# workflow_steps recorded by process_site, in order
+DNS_STEPS = ["cloudflare_account", "cloudflare_zone", "dns_records", "registrar_nameservers", "finalize"]
+
+# Runs registrar updates started on predicted nameservers while the zone is created
+speculation_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ns-speculation")
 print("🟢 DEBUG: dns_automator/main.py module loaded successfully")
 
 
@@ -54,17 +76,24 @@ class DNSAutomator:
             )
         
         self.data_client = SupabaseService()
+        # Fails at startup instead of processing nothing when migrations 008/014 are missing
+        self.data_client.verify_schema()
+        self.placement = AccountPlacementService(self.data_client)
+        self.credential_health = CredentialHealth(self.data_client, settings.credential_health_refresh)
+        self.leases = LeaseManager(self.data_client.client, DNS_PHASE, settings.lease_ttl_seconds)
+        self.response_cache = shared_cache(settings.response_cache_path) if settings.response_cache_path else None
         
         self.registrar_clients = {}
         print("🟢 DEBUG: DNSAutomator initialization complete")
         logger.info("DNS Automator initialized")
     
-    def get_registrar_client(self, registrar_type: str):
+    def get_registrar_client(self, registrar_type: str, skip_failed: bool = True):
         """
         Get or create registrar client
         
         Args:
             registrar_type: Type of registrar (namecheap or spaceship)
+            skip_failed: Refuse credentials whose latest credential audit failed
             
         Returns:
             Registrar client instance
@@ -98,6 +127,10 @@ class DNSAutomator:
             raise ValueError(error_msg + ". Please configure via Management Hub Settings.")
         
         logger.info(f"✅ Found {registrar_type} credentials in database")
+        
+        problem = self.credential_health.problem(REGISTRAR_CREDENTIALS, creds.get("id")) if skip_failed else None
+        if problem:
+            raise ValueError(f"{registrar_type} credentials failed the credential audit: {problem}")
         logger.info(f"   Validating required fields...")
         
         # Validate credentials structure for each registrar type
@@ -151,7 +184,8 @@ class DNSAutomator:
                 api_user=creds["api_user"],
                 api_key=creds["api_key"],
                 username=creds["username"],
-                client_ip=client_ip
+                client_ip=client_ip,
+                cache=self.response_cache
             )
             
         elif registrar_type == "spaceship":
@@ -177,7 +211,8 @@ class DNSAutomator:
             
             client = SpaceshipClient(
                 api_key=creds["api_key"],
-                api_secret=creds["api_secret"]
+                api_secret=creds["api_secret"],
+                cache=self.response_cache
             )
         else:
             error_msg = f"Unknown registrar type: {registrar_type}"
@@ -245,16 +280,424 @@ class DNSAutomator:
             logger.error(f"         ❌ Error checking Spaceship domain: {e}")
             return False
     
-    def process_site(self, site: dict) -> bool:
+    def render_site_records(self, site: Site, server_ip: str) -> list:
+        """
+        Render the DNS records a site's zone should contain
+        
+        Args:
+            site: Site record from database
+            server_ip: IP address of the hosting server
+            
+        Returns:
+            List of records with fully qualified names
+        """
+        assignments = self.data_client.fetch_record_templates(site["id"], site.get("cloudflare_account_id"))
+        templates = [RecordTemplate.from_assignment(assignment) for assignment in assignments]
+        logger.info(f"   Record templates: {', '.join(t.name for t in templates) or 'built-in base'}")
+        
+        return render_templates(templates, site_variables(site, server_ip), site["domain"])
+    
+    def verify_prewarmed_zone(self, cf_client: CloudflareClient, site: Site) -> Optional[List[str]]:
+        """
+        Check that the zone stored for a site by the pre-warmer still exists
+        
+        The zone may have been deleted or moved to another account since it
+        was pre-warmed; the job then creates it again instead of pointing the
+        registrar at nameservers of a zone that is gone.
+        
+        Args:
+            cf_client: Cloudflare client of the site's account
+            site: Site record with cloudflare_zone_id and cloudflare_nameservers set
+            
+        Returns:
+            The zone's current nameservers, or None if it must be created again
+        """
+        zone = cf_client.find_zone(site.domain)
+        
+        if not zone or zone.get("id") != site.cloudflare_zone_id:
+            logger.warning(f"   ⚠️  Pre-warmed zone {site.cloudflare_zone_id} no longer exists, creating the zone again")
+            return None
+        if zone.get("status") in DEAD_ZONE_STATUSES:
+            logger.warning(f"   ⚠️  Pre-warmed zone {site.cloudflare_zone_id} is {zone['status']}, creating the zone again")
+            return None
+        
+        return zone.get("name_servers") or site.cloudflare_nameservers
+    
+    def apply_zone_profile(self, cf_client: CloudflareClient, zone_id: str, domain: str) -> bool:
+        """
+        Apply the configured performance profile (zone_profile) to a new zone
+        
+        A failure is only logged: the site works with Cloudflare's defaults and
+        the fleet command can apply the profile later.
+        
+        Args:
+            cf_client: Cloudflare client of the zone's account
+            zone_id: Zone ID
+            domain: Zone name
+            
+        Returns:
+            Whether the profile was applied
+        """
+        if not settings.zone_profile:
+            return False
+        
+        try:
+            profile = get_profile(settings.zone_profile)
+            cf_client.apply_zone_profile(zone_id, profile)
+        except (ZoneProfileError, CloudflareError) as e:
+            logger.warning(f"   ⚠️  Zone profile not applied to {domain}: {e}")
+            return False
+        
+        logger.info(f"   ⚡ Zone profile '{profile.name}' applied")
+        return True
+    
+    def set_registrar_nameservers(self, domain: str, nameservers: List[str]) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Find the registrar managing a domain and point the domain at nameservers
+        
+        Args:
+            domain: Domain name
+            nameservers: Nameservers to set
+            
+        Returns:
+            Tuple of (registrar that was updated, or None; last registrar error)
+        """
+        registrar_error = None
+        
+        # Try to detect which registrar manages this domain
+        logger.info(f"   🔍 Detecting registrar for {domain}...")
+        
+        for registrar_type in ["namecheap", "spaceship"]:
+            logger.info(f"")
+            logger.info(f"   🔄 Testing {registrar_type.title()} registrar...")
+            try:
+                # Get registrar client with credentials
+                logger.info(f"      📋 Fetching {registrar_type} credentials from database...")
+                registrar_client = self.get_registrar_client(registrar_type)
+                logger.info(f"      ✅ {registrar_type.title()} client initialized successfully")
+                
+                # Check if domain belongs to this registrar
+                logger.info(f"      🔍 Checking if {domain} is managed by {registrar_type.title()}...")
+                
+                if registrar_type == "namecheap":
+                    domain_belongs = self._check_namecheap_domain(registrar_client, domain)
+                elif registrar_type == "spaceship":
+                    domain_belongs = self._check_spaceship_domain(registrar_client, domain)
+                
+                if domain_belongs:
+                    logger.info(f"      ✅ Domain {domain} IS managed by {registrar_type.title()}")
+                    
+                    # Update nameservers
+                    logger.info(f"      📡 Updating nameservers at {registrar_type.title()}...")
+                    logger.info(f"         Domain: {domain}")
+                    logger.info(f"         New nameservers: {nameservers}")
+                    
+                    success = registrar_client.set_nameservers(domain, nameservers)
+                    
+                    if success:
+                        logger.info(f"      ✅ Nameservers updated successfully at {registrar_type.title()}")
+                        return registrar_type, None
+                    else:
+                        logger.error(f"      ❌ Failed to update nameservers at {registrar_type.title()}")
+                        registrar_error = f"Nameserver update failed at {registrar_type}"
+                else:
+                    logger.info(f"      ❌ Domain {domain} is NOT managed by {registrar_type.title()}")
+                    logger.info(f"      ➡️  Trying next registrar...")
+                    continue
+                
+            except ValueError as e:
+                # No credentials for this registrar, skip
+                logger.warning(f"      ⚠️  No credentials configured for {registrar_type}: {e}")
+                logger.info(f"      ➡️  Skipping {registrar_type}, trying next registrar...")
+                continue
+                
+            except (NamecheapError, SpaceshipError) as e:
+                # API error with this registrar
+                registrar_error = str(e)
+                logger.error(f"      ❌ {registrar_type.title()} API error:")
+                logger.error(f"         Error: {str(e)}")
+                logger.error(f"         Error Type: {type(e).__name__}")
+                logger.error(f"      💡 Common causes for {registrar_type} errors:")
+                if registrar_type == "namecheap":
+                    logger.error(f"         - Invalid API key or username")
+                    logger.error(f"         - Client IP not whitelisted in Namecheap")
+                    logger.error(f"           DNS automator IP: {getattr(registrar_client, 'client_ip', 'unknown')}")
+                    logger.error(f"           Add this IP to Namecheap API whitelist")
+                    logger.error(f"         - Domain not in this Namecheap account")
+                    logger.error(f"         - API rate limiting")
+                elif registrar_type == "spaceship":
+                    logger.error(f"         - Invalid API key or secret")
+                    logger.error(f"         - Domain not in this Spaceship account")
+                    logger.error(f"         - API authentication issues")
+                logger.info(f"      ➡️  Trying next registrar...")
+                continue
+                
+            except Exception as e:
+                # Unexpected error
+                registrar_error = str(e)
+                logger.error(f"      ❌ Unexpected error with {registrar_type}: {e}")
+                logger.info(f"      ➡️  Trying next registrar...")
+                continue
+        
+        
+        return None, registrar_error
+    
+    def predict_nameservers(self, cf_account_id: str) -> Optional[List[str]]:
+        """
+        Nameservers the next zone of a Cloudflare account will most likely receive
+        
+        The account's history is loaded from the sites table the first time.
+        
+        Args:
+            cf_account_id: UUID of the cloudflare_accounts row
+            
+        Returns:
+            Predicted nameservers, or None to wait for create_zone
+        """
+        if not settings.speculative_nameservers:
+            return None
+        if not nameserver_predictor.known(cf_account_id):
+            pairs = self.data_client.fetch_account_nameservers(cf_account_id, nameserver_predictor.history)
+            nameserver_predictor.seed(cf_account_id, reversed(pairs))
+        return nameserver_predictor.predict(cf_account_id)
+    
+    def speculate_nameservers(
+        self,
+        domain: str,
+        predicted: List[str]
+    ) -> Tuple[Optional[str], Optional[str], Optional[List[str]]]:
+        """
+        Point a domain at predicted nameservers, remembering the ones it had
+        
+        Runs on the speculation pool while the zone is created, so reading
+        the current delegation adds no latency to the job.
+        
+        Args:
+            domain: Domain name
+            predicted: Predicted nameservers
+            
+        Returns:
+            Tuple of (registrar that was updated, or None; last registrar error;
+            nameservers before the update, or None if they could not be read)
+        """
+        previous = None
+        for registrar_type in ["namecheap", "spaceship"]:
+            try:
+                previous = self.get_registrar_client(registrar_type).get_nameservers(domain)
+            except ValueError:
+                # No credentials for this registrar
+                continue
+            except Exception as e:
+                # Only needed to undo the update, which then is left to the next run
+                logger.warning(f"   ⚠️  Could not read the nameservers of {domain} at {registrar_type}: {e}")
+            if previous:
+                break
+        
+        registrar, registrar_error = self.set_registrar_nameservers(domain, predicted)
+        return registrar, registrar_error, previous
+    
+    def abandon_speculation(self, site: Site, speculation: Optional[Future], error_msg: str) -> str:
+        """
+        Undo a speculative registrar update of a job that failed before step 3
+        
+        The domain would otherwise stay delegated to nameservers without a
+        zone. The previous nameservers are restored; if that is not possible
+        the delegation is left to the next run of the site and the failure
+        status says so.
+        
+        Args:
+            site: Site record
+            speculation: Future of speculate_nameservers, or None if there was no speculation
+            error_msg: Error the job failed with
+            
+        Returns:
+            error_msg, extended with what happened to the registrar
+        """
+        if not speculation or speculation.exception():
+            return error_msg
+        
+        registrar, _, previous = speculation.result()
+        if not registrar:
+            return error_msg
+        
+        domain = site["domain"]
+        if previous:
+            try:
+                if self.get_registrar_client(registrar).set_nameservers(domain, previous):
+                    logger.info(f"   ↩️  Restored the previous nameservers of {domain} at {registrar.title()}")
+                    return f"{error_msg} (speculative nameserver update at {registrar} reverted)"
+            except (ValueError, NamecheapError, SpaceshipError) as e:
+                logger.error(f"   ❌ Could not restore the nameservers of {domain} at {registrar.title()}: {e}")
+        
+        logger.warning(f"   ⚠️  {domain} stays on the predicted nameservers at {registrar.title()} until it is processed again")
+        return (f"{error_msg} (nameservers were speculatively changed at {registrar} "
+                f"from {', '.join(previous) if previous else 'unknown'}; the next run sets the zone's nameservers)")
+    
+    def finish_speculation(
+        self,
+        site: Site,
+        speculation: Future,
+        predicted: List[str],
+        nameservers: List[str]
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Verify a registrar update started on predicted nameservers and correct it if needed
+        
+        Args:
+            site: Site record
+            speculation: Future of speculate_nameservers
+            predicted: Predicted nameservers
+            nameservers: Nameservers create_zone returned
+            
+        Returns:
+            Tuple of (registrar that was updated, or None; last registrar error)
+        """
+        domain = site["domain"]
+        registrar, registrar_error, _ = speculation.result()
+        
+        if not registrar:
+            logger.info(f"   Speculative registrar update failed, retrying with the assigned nameservers")
+            return self.set_registrar_nameservers(domain, nameservers)
+        
+        if nameserver_key(predicted) == nameserver_key(nameservers):
+            logger.info(f"   🎯 Predicted nameservers confirmed, registrar already updated")
+            return registrar, None
+        
+        logger.warning(f"   ⚠️  Predicted nameservers were wrong, correcting them at {registrar.title()}")
+        try:
+            if self.get_registrar_client(registrar).set_nameservers(domain, nameservers):
+                return registrar, None
+            registrar_error = f"Nameserver correction failed at {registrar}"
+        except (ValueError, NamecheapError, SpaceshipError) as e:
+            registrar_error = str(e)
+        
+        logger.error(f"   ❌ {registrar_error}")
+        return None, registrar_error
+    
+    def place_site(self, site: Site) -> Optional[str]:
+        """
+        Choose a Cloudflare account for a site that has none and persist it
+        
+        A job slot is reserved on the chosen account; the caller releases it.
+        
+        Args:
+            site: Site record without cloudflare_account_id
+            
+        Returns:
+            UUID of the chosen cloudflare_accounts row, or None if placement failed
+        """
+        logger.info(f"📍 No Cloudflare account set for {site['domain']}, choosing the least loaded one...")
+        
+        try:
+            account = self.placement.choose()
+        except PlacementError as e:
+            error_msg = f"❌ Cloudflare account placement failed: {str(e)}"
+            logger.error(error_msg)
+            self.data_client.update_site_status(site["id"], "failed", error_msg)
+            return None
+        
+        if not self.data_client.assign_cloudflare_account(site["id"], account["id"]):
+            load_tracker.end(account["id"])
+            self.data_client.update_site_status(site["id"], "failed", "Could not save the chosen Cloudflare account")
+            return None
+        
+        return account["id"]
+    
+    def process_site(self, site: Site) -> bool:
         """
         Process DNS configuration for a single site
         
+        The site is claimed first so no other replica processes it at the same
+        time. Sites without a Cloudflare account are placed on the least loaded
+        one. The job runs under a deadline of job_budget_seconds: every
+        provider call times out at the latest when it passes, and a site that
+        failed because it ran out of time is put back to pending. Its
+        outbound calls are counted and stored with its workflow_executions
+        row.
+        
         Args:
             site: Site record from database
             
         Returns:
             Success boolean
         """
+        if not self.leases.holds(site.id) and not self.leases.claim(site.id):
+            logger.warning(f"⏭️  Skipping {site.domain}: another replica is processing it")
+            return False
+        
+        try:
+            problem = self.credential_health.problem(CLOUDFLARE_ACCOUNTS, site.cloudflare_account_id)
+            if problem:
+                error_msg = f"Cloudflare account failed the credential audit, waiting for it to pass: {problem}"
+                logger.warning(f"⏭️  Skipping {site.domain}: {error_msg}")
+                # Written while the lease is held so it cannot land on another replica's job
+                self.data_client.update_site_status(site.id, "pending", error_msg)
+                self.data_client.finish_job(site.id, False)
+                return False
+            
+            if site.get("cloudflare_account_id"):
+                load_tracker.begin(site["cloudflare_account_id"])
+            else:
+                cf_account_id = self.place_site(site)
+                if not cf_account_id:
+                    return False
+                site = site.replace(cloudflare_account_id=cf_account_id)
+            
+            self.data_client.start_job(site["id"], len(DNS_STEPS))
+            success = False
+            status = "failed"
+            lease_lost = False
+            ledger = CallLedger()
+            started_at = datetime.utcnow()
+            try:
+                with ledger_scope(ledger), deadline_scope(settings.job_budget_seconds, f"DNS job for {site.domain}") as deadline:
+                    success = self._process_site(site)
+                if success:
+                    status = "completed"
+                elif deadline and deadline.expired():
+                    self.retry_later(site, deadline)
+                    status = "retrying"
+                return success
+            except LeaseLostError as e:
+                # The replica that took the site over owns its status now
+                lease_lost = True
+                logger.warning(f"🔒 Stopped {site.domain} without saving its status: {e}")
+                return False
+            finally:
+                load_tracker.end(site["cloudflare_account_id"])
+                if lease_lost:
+                    self.data_client.abandon_job(site["id"])
+                else:
+                    self.data_client.finish_job(site["id"], success)
+                    self.data_client.record_execution(site["id"], status, started_at, ledger.summary())
+        finally:
+            self.leases.release(site.id)
+    
+    def retry_later(self, site: Site, deadline: Deadline) -> None:
+        """
+        Put a site whose job ran out of time back to pending for the next run
+        
+        Args:
+            site: Site record
+            deadline: The expired deadline
+        """
+        error_msg = f"Timed out after {deadline.budget:g}s, will be retried"
+        logger.warning(f"⏱️  {site.domain}: {error_msg}")
+        self.data_client.update_site_status(site.id, "pending", error_msg)
+    
+    def _process_site(self, site: Site) -> bool:
+        """
+        Run the DNS steps for a site pinned to a Cloudflare account
+        
+        Args:
+            site: Site record with cloudflare_account_id set
+            
+        Returns:
+            Success boolean
+            
+        Raises:
+            LeaseLostError: If another replica may have taken the site over between steps
+        """
         print("🟢 DEBUG: process_site() called")
         print(f"🟢 DEBUG: process_site() called with site: {site}")
         
@@ -267,10 +710,15 @@ class DNSAutomator:
         logger.info(f"Site ID: {site_id}")
         logger.info(f"Site data: {site}")
         
+        predicted_nameservers = None
+        speculation = None
+        
         try:
             # Step 1: Fetch Cloudflare credentials
             cf_account_id = site["cloudflare_account_id"]
             logger.info(f"📋 STEP 1: Fetching Cloudflare account credentials")
+            self.leases.check(site_id)
+            self.data_client.record_step(site_id, "cloudflare_account", "Fetch Cloudflare account credentials")
             logger.info(f"CF Account ID from site: {cf_account_id}")
             
             cf_account = self.data_client.get_cloudflare_account(cf_account_id)
@@ -288,6 +736,8 @@ class DNSAutomator:
             
             # Step 2: Create Cloudflare zone FIRST to get nameservers
             logger.info(f"📋 STEP 2: Creating Cloudflare zone for {domain}")
+            self.leases.check(site_id)
+            self.data_client.record_step(site_id, "cloudflare_zone", "Create Cloudflare zone")
             
             try:
                 api_token = cf_account["api_token"]
@@ -304,60 +754,84 @@ class DNSAutomator:
                     return False
                 
                 logger.info(f"   Initializing Cloudflare client...")
-                cf_client = CloudflareClient(api_token, account_id)
-                
-                # Create zone and get assigned nameservers
-                logger.info(f"   Creating zone for {domain}...")
-                zone_id, cloudflare_nameservers = cf_client.create_zone(domain)
+                cf_client = CloudflareClient(api_token, account_id, cache=self.response_cache)
                 
-                if not cloudflare_nameservers:
-                    error_msg = "❌ STEP 2 FAILED: No nameservers returned by Cloudflare"
-                    logger.error(error_msg)
-                    self.data_client.update_site_status(site_id, "failed", error_msg)
-                    return False
+                prewarmed_nameservers = None
+                if site.cloudflare_zone_id and site.cloudflare_nameservers:
+                    prewarmed_nameservers = self.verify_prewarmed_zone(cf_client, site)
                 
-                logger.info(f"   ✅ Zone created! ID: {zone_id}")
-                logger.info(f"   📋 Assigned nameservers: {', '.join(cloudflare_nameservers)}")
-                
-                # Get hosting server IP from database
-                logger.info(f"   Fetching server configuration from database...")
-                server_config = self.data_client.get_default_server()
-                if not server_config:
-                    error_msg = "❌ STEP 2 FAILED: No default server configured in database"
-                    logger.error(error_msg)
-                    logger.error("   Please add a server via Management Hub Settings and mark it as default")
-                    self.data_client.update_site_status(site_id, "failed", error_msg)
-                    return False
-                
-                server_ip = server_config["ip_address"]
-                logger.info(f"   Server IP: {server_ip}")
-                
-                # Create DNS records - only A records for @ and www
-                logger.info(f"   Creating DNS records...")
-                
-                # A record for root domain
-                logger.info(f"   Creating A record: @ -> {server_ip}")
-                cf_client.create_dns_record(
-                    zone_id=zone_id,
-                    record_type="A",
-                    name="@",
-                    content=server_ip,
-                    proxied=True
-                )
-                
-                # A record for www subdomain  
-                logger.info(f"   Creating A record: www -> {server_ip}")
-                cf_client.create_dns_record(
-                    zone_id=zone_id,
-                    record_type="A",
-                    name="www",
-                    content=server_ip,
-                    proxied=True
-                )
+                if prewarmed_nameservers:
+                    # Zone and base records were created ahead of the job (see prewarm.py)
+                    zone_id, cloudflare_nameservers = site.cloudflare_zone_id, prewarmed_nameservers
+                    self.data_client.record_step(site_id, "dns_records", "Create DNS records")
+                    logger.info(f"   ♻️  Reusing pre-warmed zone {zone_id}")
+                    logger.info(f"   📋 Assigned nameservers: {', '.join(cloudflare_nameservers)}")
+                else:
+                    predicted_nameservers = self.predict_nameservers(cf_account_id)
+                    if predicted_nameservers:
+                        # Point the registrar at the account's usual pair while the zone is created
+                        logger.info(f"   🔮 Predicted nameservers: {', '.join(predicted_nameservers)}, "
+                                    f"updating the registrar in parallel")
+                        speculation = speculation_pool.submit(
+                            contextvars.copy_context().run,
+                            self.speculate_nameservers, domain, predicted_nameservers
+                        )
+                    
+                    # Create zone and get assigned nameservers
+                    logger.info(f"   Creating zone for {domain}...")
+                    zone_id, cloudflare_nameservers = cf_client.create_zone(domain)
+                    
+                    if not cloudflare_nameservers:
+                        error_msg = "❌ STEP 2 FAILED: No nameservers returned by Cloudflare"
+                        logger.error(error_msg)
+                        error_msg = self.abandon_speculation(site, speculation, error_msg)
+                        self.data_client.update_site_status(site_id, "failed", error_msg)
+                        return False
+                    
+                    nameserver_predictor.record(cf_account_id, cloudflare_nameservers, predicted_nameservers)
+                    logger.info(f"   ✅ Zone created! ID: {zone_id}")
+                    logger.info(f"   📋 Assigned nameservers: {', '.join(cloudflare_nameservers)}")
+                    
+                    # Get hosting server IP from database
+                    logger.info(f"   Fetching server configuration from database...")
+                    server_config = self.data_client.get_default_server()
+                    if not server_config:
+                        error_msg = "❌ STEP 2 FAILED: No default server configured in database"
+                        logger.error(error_msg)
+                        logger.error("   Please add a server via Management Hub Settings and mark it as default")
+                        error_msg = self.abandon_speculation(site, speculation, error_msg)
+                        self.data_client.update_site_status(site_id, "failed", error_msg)
+                        return False
+                    
+                    server_ip = server_config["ip_address"]
+                    logger.info(f"   Server IP: {server_ip}")
+                    
+                    # Create DNS records from the templates attached to this site
+                    logger.info(f"   Creating DNS records...")
+                    self.leases.check(site_id)
+                    self.data_client.record_step(site_id, "dns_records", "Create DNS records")
+                    records = self.render_site_records(site, server_ip)
+                    
+                    for record in records:
+                        logger.info(f"   {record['type']} record: {record['name']} -> {record['content']}")
+                    
+                    record_summary = cf_client.apply_dns_records(zone_id, records)
+                    logger.info(f"   Records created: {record_summary['created']}, "
+                                f"updated: {record_summary['updated']}, unchanged: {record_summary['unchanged']}")
+                    self.apply_zone_profile(cf_client, zone_id, domain)
+                    self.data_client.save_zone(site_id, zone_id, cloudflare_nameservers)
                 
                 logger.info(f"✅ STEP 2 SUCCESS: Cloudflare DNS configured for {domain}")
                 
+            except RecordTemplateError as e:
+                error_msg = f"❌ STEP 2 FAILED: DNS record template error: {str(e)}"
+                logger.error(error_msg)
+                error_msg = self.abandon_speculation(site, speculation, error_msg)
+                self.data_client.update_site_status(site_id, "failed", error_msg)
+                return False
+                
             except CloudflareError as e:
+                load_tracker.record_error(cf_account_id, e.code)
                 error_msg = f"Cloudflare error: {str(e)}"
                 logger.error(f"❌ STEP 2 FAILED - Cloudflare Error:")
                 logger.error(f"   Error Message: {error_msg}")
@@ -366,94 +840,26 @@ class DNSAutomator:
                 logger.error(f"   - Missing Cloudflare Account ID")
                 logger.error(f"   - Insufficient API token permissions")
                 logger.error(f"   - Rate limiting or billing issues")
+                error_msg = self.abandon_speculation(site, speculation, error_msg)
                 self.data_client.update_site_status(site_id, "failed", error_msg)
                 return False
             
             # Step 3: Update nameservers at registrar with Cloudflare's nameservers
             logger.info(f"📋 STEP 3: Detecting domain registrar and updating nameservers")
+            self.leases.check(site_id)
+            self.data_client.record_step(site_id, "registrar_nameservers", "Update nameservers at registrar")
             logger.info(f"   Domain: {domain}")
             logger.info(f"   New nameservers to set: {', '.join(cloudflare_nameservers)}")
             
-            registrar_updated = False
-            registrar_error = None
-            detected_registrar = None
-            
-            # Try to detect which registrar manages this domain
-            logger.info(f"   🔍 Detecting registrar for {domain}...")
-            
-            for registrar_type in ["namecheap", "spaceship"]:
-                logger.info(f"")
-                logger.info(f"   🔄 Testing {registrar_type.title()} registrar...")
-                try:
-                    # Get registrar client with credentials
-                    logger.info(f"      📋 Fetching {registrar_type} credentials from database...")
-                    registrar_client = self.get_registrar_client(registrar_type)
-                    logger.info(f"      ✅ {registrar_type.title()} client initialized successfully")
-                    
-                    # Check if domain belongs to this registrar
-                    logger.info(f"      🔍 Checking if {domain} is managed by {registrar_type.title()}...")
-                    
-                    if registrar_type == "namecheap":
-                        domain_belongs = self._check_namecheap_domain(registrar_client, domain)
-                    elif registrar_type == "spaceship":
-                        domain_belongs = self._check_spaceship_domain(registrar_client, domain)
-                    
-                    if domain_belongs:
-                        logger.info(f"      ✅ Domain {domain} IS managed by {registrar_type.title()}")
-                        detected_registrar = registrar_type
-                        
-                        # Update nameservers
-                        logger.info(f"      📡 Updating nameservers at {registrar_type.title()}...")
-                        logger.info(f"         Domain: {domain}")
-                        logger.info(f"         New nameservers: {cloudflare_nameservers}")
-                        
-                        success = registrar_client.set_nameservers(domain, cloudflare_nameservers)
-                        
-                        if success:
-                            logger.info(f"      ✅ Nameservers updated successfully at {registrar_type.title()}")
-                            registrar_updated = True
-                            break
-                        else:
-                            logger.error(f"      ❌ Failed to update nameservers at {registrar_type.title()}")
-                            registrar_error = f"Nameserver update failed at {registrar_type}"
-                    else:
-                        logger.info(f"      ❌ Domain {domain} is NOT managed by {registrar_type.title()}")
-                        logger.info(f"      ➡️  Trying next registrar...")
-                        continue
-                    
-                except ValueError as e:
-                    # No credentials for this registrar, skip
-                    logger.warning(f"      ⚠️  No credentials configured for {registrar_type}: {e}")
-                    logger.info(f"      ➡️  Skipping {registrar_type}, trying next registrar...")
-                    continue
-                    
-                except (NamecheapError, SpaceshipError) as e:
-                    # API error with this registrar
-                    registrar_error = str(e)
-                    logger.error(f"      ❌ {registrar_type.title()} API error:")
-                    logger.error(f"         Error: {str(e)}")
-                    logger.error(f"         Error Type: {type(e).__name__}")
-                    logger.error(f"      💡 Common causes for {registrar_type} errors:")
-                    if registrar_type == "namecheap":
-                        logger.error(f"         - Invalid API key or username")
-                        logger.error(f"         - Client IP not whitelisted in Namecheap")
-                        logger.error(f"           DNS automator IP: {getattr(registrar_client, 'client_ip', 'unknown')}")
-                        logger.error(f"           Add this IP to Namecheap API whitelist")
-                        logger.error(f"         - Domain not in this Namecheap account")
-                        logger.error(f"         - API rate limiting")
-                    elif registrar_type == "spaceship":
-                        logger.error(f"         - Invalid API key or secret")
-                        logger.error(f"         - Domain not in this Spaceship account")
-                        logger.error(f"         - API authentication issues")
-                    logger.info(f"      ➡️  Trying next registrar...")
-                    continue
-                    
-                except Exception as e:
-                    # Unexpected error
-                    registrar_error = str(e)
-                    logger.error(f"      ❌ Unexpected error with {registrar_type}: {e}")
-                    logger.info(f"      ➡️  Trying next registrar...")
-                    continue
+            if speculation:
+                detected_registrar, registrar_error = self.finish_speculation(
+                    site, speculation, predicted_nameservers, cloudflare_nameservers
+                )
+                # Settled: the registrar now has the zone's nameservers, or step 3 reports why not
+                speculation = None
+            else:
+                detected_registrar, registrar_error = self.set_registrar_nameservers(domain, cloudflare_nameservers)
+            registrar_updated = detected_registrar is not None
             
             logger.info(f"")
             if registrar_updated:
@@ -475,24 +881,34 @@ class DNSAutomator:
             
             # Step 4: Mark DNS configuration as complete
             logger.info(f"📋 STEP 4: Finalizing DNS configuration")
-            logger.info(f"   Updating database status to 'active'...")
+            self.leases.check(site_id)
+            self.data_client.record_step(site_id, "finalize", "Mark DNS configuration active")
+            # With zone activation the site only becomes active once Cloudflare activates the zone
+            final_status = ACTIVATING if settings.zone_activation else "active"
+            logger.info(f"   Updating database status to '{final_status}'...")
             
-            self.data_client.update_site_status(site_id, "active")
+            # sites.registrar (migration 008) is checked at startup by verify_schema();
+            # it is only written when detection found a different registrar
+            new_registrar = detected_registrar if detected_registrar != site.registrar else None
+            self.data_client.update_site_status(site_id, final_status, registrar=new_registrar)
             
-            logger.info(f"✅ STEP 4 SUCCESS: Database updated")
+            logger.info(f"✅ STEP 4 SUCCESS: Database update queued")
             logger.info(f"")
             logger.info(f"🎉 ===== DNS PROCESSING COMPLETED SUCCESSFULLY FOR {domain} =====")
             logger.info(f"✅ All steps completed:")
             logger.info(f"   1. ✅ Cloudflare account fetched and validated")
             logger.info(f"   2. ✅ Cloudflare zone created with DNS records")
             logger.info(f"   3. ✅ Domain nameservers updated at registrar")
-            logger.info(f"   4. ✅ Database status updated to 'active'")
+            logger.info(f"   4. ✅ Database status updated to '{final_status}'")
             logger.info(f"")
             logger.info(f"🌐 Website {domain} is now configured and should be accessible!")
             logger.info(f"📡 DNS propagation may take 24-48 hours to complete globally")
             logger.info(f"")
             return True
             
+        except LeaseLostError:
+            raise
+            
         except Exception as e:
             error_msg = f"Unexpected error: {str(e)}"
             logger.error(f"")
@@ -504,10 +920,54 @@ class DNSAutomator:
             logger.error(f"")
             
             logger.info(f"📋 Updating database status to 'failed'...")
+            error_msg = self.abandon_speculation(site, speculation, error_msg)
             self.data_client.update_site_status(site_id, "failed", error_msg)
             logger.info(f"✅ Database updated with error status")
             logger.error(f"")
             return False
+        
+        finally:
+            # A registrar update started on predicted nameservers never outlives its job
+            if speculation:
+                speculation.exception()
+    
+    def iter_claimed_sites(self, batch_size: int):
+        """
+        Claim pending sites batch by batch until none are left
+        
+        Without the lease functions (single replica) all pending sites are
+        returned as one batch.
+        
+        Args:
+            batch_size: Sites claimed per batch
+            
+        Yields:
+            Lists of claimed sites
+        """
+        seen = set()
+        
+        while True:
+            site_ids = self.leases.claim_pending(batch_size)
+            if site_ids is None:
+                sites = self.data_client.fetch_pending_dns_sites()
+                if sites:
+                    yield sites
+                return
+            
+            # A site still pending after this run processed it (its status could
+            # not be saved) is given back instead of being retried in a loop
+            fresh = [site_id for site_id in site_ids if site_id not in seen]
+            for site_id in set(site_ids) - set(fresh):
+                self.leases.release(site_id)
+            if not fresh:
+                return
+            
+            sites = self.data_client.fetch_sites_by_ids(fresh)
+            seen.update(fresh)
+            # Claimed sites that disappeared in between are given back
+            for site_id in set(fresh) - {site.id for site in sites}:
+                self.leases.release(site_id)
+            yield sites
     
     def run(self):
         """Main execution method"""
@@ -533,52 +993,55 @@ class DNSAutomator:
             # Get site from data client (Hub API or Supabase)
             if settings.site_id:
                 site = self.data_client.get_site(settings.site_id)
-                sites = [site] if site else []
+                batches = [[site]] if site else []
             else:
-                # For Hub API mode, we'll implement batch processing later
-                # For now, we expect a specific site_id
-                sites = []
-            
-            if not sites:
-                logger.info("✅ No pending DNS sites found to process")
-                logger.info("🏁 DNS Automator run complete - nothing to do")
-                return
-            
-            logger.info(f"📊 Found {len(sites)} site(s) to process")
-            for i, site in enumerate(sites, 1):
-                logger.info(f"   {i}. {site['domain']} (ID: {site['id']})")
-            logger.info("")
+                # Batch mode: claim sites a few at a time so replicas work on disjoint sites
+                logger.info(f"🔒 Claiming sites in batches of {settings.claim_batch_size} as replica {self.leases.owner}")
+                batches = self.iter_claimed_sites(settings.claim_batch_size)
             
             # Process each site
+            processed = 0
             success_count = 0
             failed_sites = []
             
-            for i, site in enumerate(sites, 1):
-                logger.info(f"🔄 Processing site {i}/{len(sites)}: {site['domain']}")
-                
-                if self.process_site(site):
-                    success_count += 1
-                    logger.info(f"✅ Site {i}/{len(sites)} completed successfully")
-                else:
-                    failed_sites.append(site['domain'])
-                    logger.error(f"❌ Site {i}/{len(sites)} failed")
+            for batch in batches:
+                logger.info(f"📊 Got {len(batch)} site(s) to process")
+                for site in batch:
+                    logger.info(f"   - {site['domain']} (ID: {site['id']})")
+                logger.info("")
                 
-                logger.info("")  # Add spacing between sites
+                for site in batch:
+                    processed += 1
+                    logger.info(f"🔄 Processing site {processed}: {site['domain']}")
+                    
+                    if self.process_site(site):
+                        success_count += 1
+                        logger.info(f"✅ Site {processed} completed successfully")
+                    else:
+                        failed_sites.append(site['domain'])
+                        logger.error(f"❌ Site {processed} failed")
+                    
+                    logger.info("")  # Add spacing between sites
+            
+            if not processed:
+                logger.info("✅ No pending DNS sites found to process")
+                logger.info("🏁 DNS Automator run complete - nothing to do")
+                return
             
             # Final summary
             logger.info("=" * 80)
             logger.info("📊 DNS AUTOMATOR RUN SUMMARY")
             logger.info("=" * 80)
-            logger.info(f"🎯 Total sites processed: {len(sites)}")
+            logger.info(f"🎯 Total sites processed: {processed}")
             logger.info(f"✅ Successful: {success_count}")
-            logger.info(f"❌ Failed: {len(sites) - success_count}")
+            logger.info(f"❌ Failed: {processed - success_count}")
             
             if failed_sites:
                 logger.info(f"💥 Failed sites:")
                 for domain in failed_sites:
                     logger.info(f"   - {domain}")
             
-            if success_count == len(sites):
+            if success_count == processed:
                 logger.info("🎉 All sites processed successfully!")
             elif success_count > 0:
                 logger.info("⚠️  Some sites failed - check logs above for details")
@@ -599,6 +1062,10 @@ class DNSAutomator:
             logger.error(f"🛠️  Check configuration and database connectivity")
             logger.error("=" * 80)
             sys.exit(1)
+        
+        finally:
+            # Stop the lease heartbeat and give back sites claimed but not processed
+            self.leases.close()
 
 
 def main():
@@ -606,6 +1073,13 @@ def main():
     print("🟢 DEBUG: main() function called")
     print("🟢 DEBUG: About to create DNSAutomator instance...")
     
+    # CASSETTE_PATH / CASSETTE_MODE record or replay all provider traffic of the run
+    cassette = cassette_from_env()
+    if cassette:
+        with cassette:
+            DNSAutomator().run()
+        return
+    
     automator = DNSAutomator()
     
     print("🟢 DEBUG: DNSAutomator created, about to call run()...")
@@ -0,0 +1,265 @@
+"""Pre-warms Cloudflare zones for queued sites ahead of their DNS job"""
+
+import argparse
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Optional, Tuple
+
+from .core.config import settings
+from .services.cloudflare_client import CloudflareClient, CloudflareError
+from .services.placement import load_tracker
+from .utils.nameservers import nameserver_predictor
+from .utils.rate_limit import RateLimiterRegistry
+from .utils.record_templates import RecordTemplateError
+from .utils.site import Site
+
+logger = logging.getLogger(__name__)
+
+
+class ZonePrewarmer:
+    """
+    Creates the Cloudflare zone and base records of pending sites
+
+    Zone creation is the first multi-second step of a DNS job. The prewarmer
+    runs it for queued sites with its own pool of workers, ahead of the job
+    workers, and stores the zone ID and nameservers on the site; step 2 of
+    process_site then reuses them instead of calling Cloudflare. Failures are
+    only logged: the DNS job creates the zone itself and reports the error.
+    Sites without a Cloudflare account are left alone, placement stays with
+    the DNS job.
+
+    A site is claimed (see LeaseManager) while its zone is created, so no DNS
+    job creates a second zone for it meanwhile. In listener mode the job of a
+    site is submitted only once its pre-warm has finished.
+    """
+
+    def __init__(self, automator, max_workers: Optional[int] = None, cache_ttl: float = 300.0):
+        """
+        Initialize prewarmer
+
+        Args:
+            automator: DNSAutomator providing the data client and record templates
+            max_workers: Zones created in parallel
+            cache_ttl: Seconds Cloudflare clients (or an unusable account) and
+                the default server IP are reused before being loaded again
+        """
+        self.automator = automator
+        self.data_client = automator.data_client
+        self.max_workers = max_workers or settings.prewarm_workers
+        self.cache_ttl = cache_ttl
+
+        self.cloudflare_limiters = RateLimiterRegistry(settings.cloudflare_rate_limit)
+        self._cloudflare_clients: Dict[str, Tuple[float, Optional[CloudflareClient]]] = {}
+        self._clients_lock = threading.Lock()
+        self._server_ip: Optional[Tuple[float, Optional[str]]] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def _cloudflare_client_for(self, cf_account_id: str) -> Optional[CloudflareClient]:
+        """
+        Get a Cloudflare client for an account, sharing one rate limiter per token
+
+        Args:
+            cf_account_id: UUID of the cloudflare_accounts row
+
+        Returns:
+            CloudflareClient instance, or None if the account is unusable
+        """
+        with self._clients_lock:
+            cached = self._cloudflare_clients.get(cf_account_id)
+            if cached and time.monotonic() - cached[0] < self.cache_ttl:
+                return cached[1]
+
+            client = None
+            cf_account = self.data_client.get_cloudflare_account(cf_account_id)
+            if cf_account and cf_account.get("cloudflare_account_id"):
+                try:
+                    client = CloudflareClient(
+                        cf_account["api_token"],
+                        cf_account["cloudflare_account_id"],
+                        rate_limiter=self.cloudflare_limiters.get(cf_account["api_token"]),
+                        cache=self.automator.response_cache
+                    )
+                except CloudflareError as e:
+                    logger.error(f"❌ Cloudflare account {cf_account_id} unusable: {e}")
+
+            self._cloudflare_clients[cf_account_id] = (time.monotonic(), client)
+            return client
+
+    def _default_server_ip(self) -> Optional[str]:
+        """IP address of the default hosting server, reloaded once cache_ttl has passed"""
+        cached = self._server_ip
+        if cached and time.monotonic() - cached[0] < self.cache_ttl:
+            return cached[1]
+
+        server = self.data_client.get_default_server()
+        server_ip = server["ip_address"] if server else None
+        self._server_ip = (time.monotonic(), server_ip)
+        return server_ip
+
+    def prewarm_site(self, site: Site) -> str:
+        """
+        Create the zone and base records of one site and remember the zone
+
+        Args:
+            site: Site record
+
+        Returns:
+            Outcome (warmed, skipped, error)
+        """
+        domain = site.domain
+
+        if site.cloudflare_zone_id or not site.cloudflare_account_id:
+            return "skipped"
+        if site.status_dns and site.status_dns != "pending":
+            return "skipped"
+
+        client = self._cloudflare_client_for(site.cloudflare_account_id)
+        server_ip = self._default_server_ip()
+        if not client or not server_ip:
+            logger.warning(f"⚠️  {domain}: cannot pre-warm zone (no usable Cloudflare account or default server)")
+            return "error"
+
+        if not self.automator.leases.claim(site.id):
+            # Its DNS job is running and creates the zone itself
+            return "skipped"
+        try:
+            return self._warm_zone(site, client, server_ip)
+        finally:
+            self.automator.leases.release(site.id)
+
+    def _warm_zone(self, site: Site, client: CloudflareClient, server_ip: str) -> str:
+        """Create the zone and base records of a claimed site and save the zone"""
+        domain = site.domain
+
+        try:
+            with load_tracker.track(site.cloudflare_account_id):
+                zone_id, nameservers = client.create_zone(domain)
+                if not nameservers:
+                    logger.warning(f"⚠️  {domain}: Cloudflare returned no nameservers, leaving the zone to the DNS job")
+                    return "error"
+                nameserver_predictor.record(site.cloudflare_account_id, nameservers)
+                records = self.automator.render_site_records(site, server_ip)
+                client.apply_dns_records(zone_id, records)
+                self.automator.apply_zone_profile(client, zone_id, domain)
+        except CloudflareError as e:
+            load_tracker.record_error(site.cloudflare_account_id, e.code)
+            logger.warning(f"⚠️  {domain}: zone pre-warm failed: {e}")
+            return "error"
+        except RecordTemplateError as e:
+            logger.warning(f"⚠️  {domain}: zone pre-warm failed: DNS record template error: {e}")
+            return "error"
+
+        if not self.data_client.save_zone(site.id, zone_id, nameservers):
+            return "error"
+
+        logger.info(f"🔥 {domain}: zone {zone_id} pre-warmed ({', '.join(nameservers)})")
+        return "warmed"
+
+    def run(self, sites) -> Dict[str, int]:
+        """
+        Pre-warm many sites in parallel
+
+        Args:
+            sites: Site records
+
+        Returns:
+            Count of sites per outcome (warmed, skipped, error)
+        """
+        summary = {"warmed": 0, "skipped": 0, "error": 0}
+        started_at = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self._prewarm_safely, site) for site in sites]
+            for future in as_completed(futures):
+                summary[future.result()] += 1
+
+        elapsed = time.monotonic() - started_at
+        logger.info(f"🏁 Zone pre-warm finished: {len(futures)} site(s) in {elapsed:.0f}s - {summary}")
+        return summary
+
+    def submit(self, site: Site, then: Optional[Callable[[], object]] = None) -> None:
+        """
+        Pre-warm a site in the background (listener mode)
+
+        Args:
+            site: Site record
+            then: Called once the pre-warm has finished, whatever its outcome
+        """
+        self._get_executor().submit(self._run_then, self._prewarm_safely, site, then)
+
+    def submit_id(self, site_id: str, then: Optional[Callable[[], object]] = None) -> None:
+        """
+        Pre-warm a site in the background, loading it first
+
+        Args:
+            site_id: UUID of the site
+            then: Called once the pre-warm has finished, whatever its outcome
+        """
+        self._get_executor().submit(self._run_then, self._prewarm_by_id, site_id, then)
+
+    def close(self) -> None:
+        """
+        Drop queued pre-warms and wait for running ones
+
+        The then callbacks of dropped pre-warms do not run; their sites stay
+        pending and are queued again when the listener reconnects.
+        """
+        with self._executor_lock:
+            if self._executor:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Background pool of submit(), created on first use"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="prewarm")
+            return self._executor
+
+    def _run_then(self, prewarm: Callable[..., str], target, then: Optional[Callable[[], object]]) -> str:
+        """Run a pre-warm, then its callback"""
+        try:
+            return prewarm(target)
+        finally:
+            if then:
+                try:
+                    then()
+                except Exception as e:
+                    logger.error(f"❌ Callback after pre-warm of {target} failed: {type(e).__name__}: {e}")
+
+    def _prewarm_by_id(self, site_id: str) -> str:
+        """Load a site and pre-warm it"""
+        site = self.data_client.get_site(site_id)
+        return self._prewarm_safely(site) if site else "skipped"
+
+    def _prewarm_safely(self, site: Site) -> str:
+        """Pre-warm a site, turning unexpected errors into the error outcome"""
+        try:
+            return self.prewarm_site(site)
+        except Exception as e:
+            logger.error(f"❌ {site.domain}: zone pre-warm failed: {type(e).__name__}: {e}")
+            return "error"
+
+
+def main():
+    """Command line entry point for zone pre-warming"""
+    parser = argparse.ArgumentParser(description="Create Cloudflare zones for pending sites ahead of their DNS job")
+    parser.add_argument("--workers", type=int, help="Zones created in parallel")
+    args = parser.parse_args()
+
+    # Imported here: importing main configures logging for the command
+    from .main import DNSAutomator
+
+    automator = DNSAutomator()
+    prewarmer = ZonePrewarmer(automator, max_workers=args.workers)
+    summary = prewarmer.run(automator.data_client.fetch_pending_dns_sites())
+
+    sys.exit(1 if summary["error"] else 0)
+
+
+if __name__ == "__main__":
+    main()
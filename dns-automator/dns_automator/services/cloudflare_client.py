@@ -4,26 +4,102 @@ import logging
 from typing import Dict, List, Optional, Any
 
 import CloudFlare
+import requests
 from CloudFlare.exceptions import CloudFlareAPIError
+from requests.adapters import HTTPAdapter
+
+from ..utils.call_ledger import track, url_operation
+from ..utils.concurrency import adaptive_limiters, signals_from_response
+from ..utils.deadline import call_timeout
+from ..utils.domains import record_name as qualify_record_name
+from ..utils.record_templates import plan_batch
+from ..utils.response_cache import scope
+from ..utils.zone_profiles import CACHE_RULES_PHASE, ZoneProfile
 
 logger = logging.getLogger(__name__)
 
+# Path prefix of API operations in the call ledger
+API_PATH = "/client/v4/"
+
+# Seconds per API request when neither the SDK nor the job's deadline sets a shorter one
+REQUEST_TIMEOUT = 30
+
+
+class _LimitedNetwork:
+    """
+    Sends the SDK's API requests with a timeout, within an AdaptiveLimiter
+    
+    Replaces the SDK's per-client network callable. The SDK turns responses
+    into results or CloudFlareAPIError without exposing headers, and sends
+    without a timeout unless configured, so the limiter is fed here, where
+    the raw response (status, Retry-After, Ratelimit) is still visible,
+    every request gets a timeout bounded by the job's deadline, and every
+    request is recorded in the job's call ledger.
+    """
+    
+    def __init__(self, network, limiter):
+        self._network = network
+        self._limiter = limiter
+        self._session = requests.Session()
+        if network.max_request_retries is not None:
+            self._session.mount("https://", HTTPAdapter(max_retries=network.max_request_retries))
+    
+    def __call__(self, method, url, headers=None, params=None, data_str=None, data_json=None, files=None):
+        timeout = call_timeout(self._network.global_request_timeout or REQUEST_TIMEOUT)
+        self._limiter.acquire()
+        signals = None
+        try:
+            with track("cloudflare", url_operation(method, url, API_PATH)) as call:
+                response = self._session.request(
+                    method.upper(),
+                    url,
+                    headers=headers,
+                    params=params,
+                    data=data_str,
+                    json=data_json,
+                    files=files,
+                    timeout=timeout
+                )
+                call.sent = len(response.request.body or b"")
+                call.received = len(response.content)
+                call.error = response.status_code >= 400
+            signals = signals_from_response(response.status_code, response.headers)
+            return response
+        finally:
+            self._limiter.release(signals)
+    
+    def __getattr__(self, name):
+        return getattr(self._network, name)
+
 
 class CloudflareError(Exception):
     """Custom exception for Cloudflare API errors"""
-    pass
+    
+    def __init__(self, message: str, code: Optional[int] = None):
+        """
+        Initialize error
+        
+        Args:
+            message: Error message
+            code: Cloudflare API error code, if the error came from the API
+        """
+        super().__init__(message)
+        self.code = code
 
 
 class CloudflareClient:
     """Client for interacting with Cloudflare API"""
     
-    def __init__(self, api_token: str, account_id: str = None):
+    def __init__(self, api_token: str, account_id: str = None, rate_limiter=None, cache=None, concurrency=None):
         """
         Initialize Cloudflare client
         
         Args:
             api_token: Cloudflare API token (scoped)
             account_id: Cloudflare Account ID (required for zone creation)
+            rate_limiter: Optional RateLimiter shared by all clients using this token
+            cache: Optional ResponseCache for zone lookups
+            concurrency: Optional AdaptiveLimiter; defaults to the process-wide one of this token
         """
         logger.info(f"🔧 Initializing Cloudflare client...")
         logger.info(f"   API Token: {api_token[:10]}...{api_token[-4:]} (length: {len(api_token)})")
@@ -32,11 +108,18 @@ class CloudflareClient:
         try:
             self.cf = CloudFlare.CloudFlare(token=api_token)
             self.account_id = account_id
+            self.rate_limiter = rate_limiter
+            self.cache = cache
+            self._cache_scope = scope(api_token)
+            self.concurrency = concurrency or adaptive_limiters.get("cloudflare", self._cache_scope)
+            self._limit_network()
+            self._register_batch_endpoint()
             logger.info(f"✅ Cloudflare client initialized successfully")
             
             # Test the API token by making a simple API call
             logger.info(f"🧪 Testing API token validity...")
             try:
+                self._throttle()
                 user_info = self.cf.user.get()
                 logger.info(f"✅ API token is valid - authenticated as: {user_info.get('email', 'unknown')}")
             except CloudFlareAPIError as test_e:
@@ -55,6 +138,37 @@ class CloudflareClient:
             logger.error(f"❌ Failed to initialize Cloudflare client: {e}")
             raise CloudflareError(f"Failed to initialize Cloudflare client: {str(e)}")
     
+    def _register_batch_endpoint(self) -> None:
+        """Add POST /zones/:id/dns_records/batch, which this SDK version does not ship"""
+        try:
+            self.cf.add("AUTH", "zones", "dns_records", "batch")
+        except CloudFlareAPIError:
+            # Already known to the SDK
+            pass
+    
+    def _limit_network(self) -> None:
+        """Send every API call of this client with a timeout, through its adaptive concurrency limiter"""
+        base = getattr(self.cf, "_base", None)
+        if getattr(base, "network", None) is None:
+            logger.warning("⚠️ Cloudflare SDK network layer not found, adaptive concurrency and timeouts disabled")
+            return
+        base.network = _LimitedNetwork(base.network, self.concurrency)
+    
+    def _throttle(self) -> None:
+        """Wait for the shared per-token rate limiter, if one is configured"""
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+    
+    def _get_zone(self, zone_id: str) -> Dict[str, Any]:
+        """zones.get(zone_id), through the response cache if one is configured"""
+        def fetch():
+            self._throttle()
+            return self.cf.zones.get(zone_id)
+        
+        if not self.cache:
+            return fetch()
+        return self.cache.fetch("cloudflare.zones.get", [self._cache_scope, zone_id], f"cloudflare:{zone_id}", fetch)
+    
     def create_zone(self, domain: str) -> tuple[str, list[str]]:
         """
         Create a new DNS zone
@@ -78,7 +192,10 @@ class CloudflareClient:
                     "id": self.account_id
                 }
             
+            self._throttle()
             result = self.cf.zones.post(data=zone_data)
+            if self.cache:
+                self.cache.invalidate(f"cloudflare:{domain}")
             
             zone_id = result["id"]
             nameservers = result.get("name_servers", [])
@@ -120,7 +237,7 @@ class CloudflareClient:
                 logger.error(f"   Go to Cloudflare Dashboard > My Profile > API Tokens")
                 logger.error(f"   Create/edit token with these permissions: Zone:Edit, Zone:Read, Account:Read")
             
-            raise CloudflareError(f"Cloudflare API error (code {e.code}): {str(e)}")
+            raise CloudflareError(f"Cloudflare API error (code {e.code}): {str(e)}", code=e.code)
         except Exception as e:
             logger.error(f"❌ Unexpected error creating zone for {domain}:")
             logger.error(f"   Error: {str(e)}")
@@ -139,17 +256,45 @@ class CloudflareClient:
         Returns:
             Zone ID
         """
+        # A zone keeps its ID, so only misses go to the API
+        cache_parts = [self._cache_scope, domain]
+        if self.cache:
+            zone_id = self.cache.get("cloudflare.zones.get_by_name", cache_parts)
+            if zone_id:
+                return zone_id
+        
         try:
+            self._throttle()
             zones = self.cf.zones.get(params={"name": domain})
             
             if not zones:
                 raise CloudflareError(f"Zone not found for domain: {domain}")
             
+            if self.cache:
+                self.cache.put("cloudflare.zones.get_by_name", cache_parts, f"cloudflare:{domain}", zones[0]["id"])
             return zones[0]["id"]
             
         except CloudFlareAPIError as e:
             logger.error(f"Error fetching zone for {domain}: {e}")
-            raise CloudflareError(f"Failed to get zone: {str(e)}")
+            raise CloudflareError(f"Failed to get zone: {str(e)}", code=e.code)
+    
+    def find_zone(self, domain: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a zone by name, including its status and nameservers
+        
+        Args:
+            domain: Domain name
+            
+        Returns:
+            Zone information, or None if the zone does not exist
+        """
+        try:
+            self._throttle()
+            zones = self.cf.zones.get(params={"name": domain})
+            return zones[0] if zones else None
+        except CloudFlareAPIError as e:
+            logger.error(f"Error looking up zone for {domain}: {e}")
+            raise CloudflareError(f"Failed to look up zone: {str(e)}", code=e.code)
     
     def get_zone_info(self, zone_id: str) -> Dict[str, Any]:
         """
@@ -162,11 +307,125 @@ class CloudflareClient:
             Zone information
         """
         try:
-            zone = self.cf.zones.get(zone_id)
-            return zone
+            return self._get_zone(zone_id)
         except CloudFlareAPIError as e:
             logger.error(f"Error fetching zone info: {e}")
-            raise CloudflareError(f"Failed to get zone info: {str(e)}")
+            raise CloudflareError(f"Failed to get zone info: {str(e)}", code=e.code)
+    
+    def get_zone_status(self, zone_id: str) -> Dict[str, Any]:
+        """
+        Get the current zone information, bypassing the response cache
+        
+        Args:
+            zone_id: Zone ID
+            
+        Returns:
+            Zone information (status is 'initializing', 'pending', 'active', 'moved' or 'deleted')
+        """
+        try:
+            self._throttle()
+            return self.cf.zones.get(zone_id)
+        except CloudFlareAPIError as e:
+            logger.error(f"Error fetching status of zone {zone_id}: {e}")
+            raise CloudflareError(f"Failed to get zone status: {str(e)}", code=e.code)
+    
+    def request_activation_check(self, zone_id: str) -> None:
+        """
+        Ask Cloudflare to check the delegation of a pending zone now
+        
+        Cloudflare accepts this once per hour for free zones (every 5 minutes
+        on paid plans).
+        
+        Args:
+            zone_id: Zone ID
+        """
+        try:
+            self._throttle()
+            self.cf.zones.activation_check.put(zone_id)
+        except CloudFlareAPIError as e:
+            logger.error(f"Error requesting activation check of zone {zone_id}: {e}")
+            raise CloudflareError(f"Failed to request activation check: {str(e)}", code=e.code)
+    
+    def delete_zone(self, zone_id: str, domain: str) -> None:
+        """
+        Delete a zone with all its records and settings
+        
+        Args:
+            zone_id: Zone ID
+            domain: Zone name, to drop its cached zone ID
+        """
+        try:
+            self._throttle()
+            self.cf.zones.delete(zone_id)
+            if self.cache:
+                self.cache.invalidate(f"cloudflare:{domain}")
+            logger.info(f"🗑️  Deleted zone {zone_id} ({domain})")
+        except CloudFlareAPIError as e:
+            logger.error(f"Error deleting zone {zone_id} ({domain}): {e}")
+            raise CloudflareError(f"Failed to delete zone: {str(e)}", code=e.code)
+    
+    def audit(self) -> Dict[str, Any]:
+        """
+        Check the token for the credential audit
+        
+        Write permissions cannot be tested without writing, so scopes lists
+        the read probes that passed (token:verify, zone:read, account:read).
+        
+        Returns:
+            token_status, expires_on, scopes, zone_count and quota_remaining
+            (requests left in the rate limit window, if reported)
+            
+        Raises:
+            CloudflareError: If the token cannot be verified or is not active
+        """
+        try:
+            self._throttle()
+            token = self.cf.user.tokens.verify.get()
+        except CloudFlareAPIError as e:
+            raise CloudflareError(f"Token verification failed: {str(e)}", code=e.code)
+        
+        status = token.get("status")
+        if status != "active":
+            raise CloudflareError(f"Token is {status}")
+        
+        scopes = ["token:verify"]
+        zone_count = None
+        try:
+            zone_count = self._count_zones()
+            scopes.append("zone:read")
+        except CloudFlareAPIError as e:
+            logger.warning(f"⚠️  Token cannot list zones: {e}")
+        
+        if self.account_id:
+            try:
+                self._throttle()
+                self.cf.accounts.get(self.account_id)
+                scopes.append("account:read")
+            except CloudFlareAPIError as e:
+                logger.warning(f"⚠️  Token cannot read account {self.account_id}: {e}")
+        
+        return {
+            "token_status": status,
+            "expires_on": token.get("expires_on"),
+            "scopes": scopes,
+            "zone_count": zone_count,
+            "quota_remaining": self.concurrency.remaining
+        }
+    
+    def _count_zones(self, per_page: int = 50) -> int:
+        """Count the zones visible to the token (of its account, if set) page by page"""
+        params = {"per_page": per_page, "page": 1}
+        if self.account_id:
+            params["account.id"] = self.account_id
+        
+        count = 0
+        while True:
+            self._throttle()
+            zones = self.cf.zones.get(params=params)
+            count += len(zones)
+            if len(zones) < per_page:
+                return count
+            params["page"] += 1
     
     def create_dns_record(
         self, 
@@ -193,16 +452,11 @@ class CloudflareClient:
         """
         try:
             # Get zone info to get the domain name
-            zone_info = self.cf.zones.get(zone_id)
+            zone_info = self._get_zone(zone_id)
             domain = zone_info["name"]
             
             # Format the record name
-            if name == "@" or name == domain:
-                record_name = domain
-            elif name.endswith(domain):
-                record_name = name
-            else:
-                record_name = f"{name}.{domain}"
+            record_name = qualify_record_name(name, domain)
             
             record_data = {
                 "type": record_type,
@@ -212,6 +466,7 @@ class CloudflareClient:
                 "ttl": ttl
             }
             
+            self._throttle()
             result = self.cf.zones.dns_records.post(zone_id, data=record_data)
             record_id = result["id"]
             
@@ -223,7 +478,7 @@ class CloudflareClient:
                 return self.update_or_get_existing_record(zone_id, record_type, name, content, proxied)
             
             logger.error(f"Cloudflare API error creating record: {e}")
-            raise CloudflareError(f"Failed to create record: {str(e)}")
+            raise CloudflareError(f"Failed to create record: {str(e)}", code=e.code)
         except Exception as e:
             logger.error(f"Unexpected error creating record: {e}")
             raise CloudflareError(f"Failed to create record: {str(e)}")
@@ -251,18 +506,14 @@ class CloudflareClient:
         """
         try:
             # Get zone info
-            zone_info = self.cf.zones.get(zone_id)
+            zone_info = self._get_zone(zone_id)
             domain = zone_info["name"]
             
             # Format the record name
-            if name == "@" or name == domain:
-                search_name = domain
-            elif name.endswith(domain):
-                search_name = name
-            else:
-                search_name = f"{name}.{domain}"
+            search_name = qualify_record_name(name, domain)
             
             # Find existing record
+            self._throttle()
             records = self.cf.zones.dns_records.get(
                 zone_id, 
                 params={"type": record_type, "name": search_name}
@@ -282,6 +533,7 @@ class CloudflareClient:
                         "ttl": 1
                     }
                     
+                    self._throttle()
                     self.cf.zones.dns_records.put(zone_id, record_id, data=update_data)
                 
                 return record_id
@@ -304,8 +556,137 @@ class CloudflareClient:
             List of DNS records
         """
         try:
+            self._throttle()
             records = self.cf.zones.dns_records.get(zone_id)
             return records
         except Exception as e:
             logger.error(f"Error listing DNS records: {e}")
-            return []
\ No newline at end of file
+            return []
+    
+    def get_dns_records(
+        self,
+        zone_id: str,
+        record_type: Optional[str] = None,
+        name: Optional[str] = None,
+        per_page: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch DNS records of a zone, optionally filtered by type and full name
+        
+        Unlike list_dns_records, errors are raised instead of swallowed so that
+        callers changing records never mistake a failed lookup for an empty zone.
+        All pages are read, so a diff against the result sees every record.
+        
+        Args:
+            zone_id: Zone ID
+            record_type: Optional record type filter (A, CNAME, etc.)
+            name: Optional fully qualified record name filter
+            per_page: Records per request
+            
+        Returns:
+            List of DNS records
+        """
+        params = {"per_page": per_page, "page": 1}
+        if record_type:
+            params["type"] = record_type
+        if name:
+            params["name"] = name
+        
+        try:
+            records = []
+            while True:
+                self._throttle()
+                page = self.cf.zones.dns_records.get(zone_id, params=dict(params))
+                records.extend(page)
+                if len(page) < per_page:
+                    return records
+                params["page"] += 1
+        except CloudFlareAPIError as e:
+            logger.error(f"Error fetching DNS records for zone {zone_id}: {e}")
+            raise CloudflareError(f"Failed to fetch records: {str(e)}", code=e.code)
+    
+    def update_dns_record(self, zone_id: str, record_id: str, record_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Overwrite an existing DNS record
+        
+        Args:
+            zone_id: Zone ID
+            record_id: Record ID
+            record_data: Full record body (type, name, content, proxied, ttl)
+            
+        Returns:
+            Updated record
+        """
+        try:
+            self._throttle()
+            return self.cf.zones.dns_records.put(zone_id, record_id, data=record_data)
+        except CloudFlareAPIError as e:
+            logger.error(f"Error updating DNS record {record_id} in zone {zone_id}: {e}")
+            raise CloudflareError(f"Failed to update record: {str(e)}", code=e.code)
+    
+    def apply_dns_records(self, zone_id: str, records: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Make a zone contain the given records using a single batched write
+        
+        Existing records that already match are left alone, records that differ
+        are patched and missing ones created. Records not listed are never deleted.
+        
+        Args:
+            zone_id: Zone ID
+            records: Desired records with fully qualified names
+            
+        Returns:
+            Count of created, updated and unchanged records
+        """
+        existing = self.get_dns_records(zone_id)
+        posts, patches = plan_batch(records, existing)
+        
+        summary = {
+            "created": len(posts),
+            "updated": len(patches),
+            "unchanged": len(records) - len(posts) - len(patches)
+        }
+        
+        if not posts and not patches:
+            return summary
+        
+        try:
+            self._throttle()
+            self.cf.zones.dns_records.batch.post(zone_id, data={"posts": posts, "patches": patches})
+            return summary
+        except CloudFlareAPIError as e:
+            logger.error(f"Error applying DNS record batch to zone {zone_id}: {e}")
+            if hasattr(e, 'errors') and e.errors:
+                for i, error in enumerate(e.errors, 1):
+                    logger.error(f"     {i}. {error}")
+            raise CloudflareError(f"Failed to apply record batch: {str(e)}", code=e.code)
+    
+    def apply_zone_profile(self, zone_id: str, profile: ZoneProfile) -> Dict[str, int]:
+        """
+        Apply a performance profile to a zone
+        
+        All zone settings are written in one bulk settings PATCH; the cache
+        rules replace the zone's cache rules ruleset. Both calls are
+        idempotent, so a profile can be re-applied at any time.
+        
+        Args:
+            zone_id: Zone ID
+            profile: Zone profile
+            
+        Returns:
+            Count of settings and cache rules written
+        """
+        try:
+            self._throttle()
+            self.cf.zones.settings.patch(zone_id, data={"items": profile.setting_items()})
+            
+            if profile.cache_rules:
+                self._throttle()
+                self.cf.zones.rulesets.phases.entrypoint.put(
+                    zone_id, CACHE_RULES_PHASE, data={"rules": profile.cache_rules}
+                )
+            
+            return {"settings": len(profile.settings), "cache_rules": len(profile.cache_rules)}
+        except CloudFlareAPIError as e:
+            logger.error(f"Error applying zone profile '{profile.name}' to zone {zone_id}: {e}")
+            raise CloudflareError(f"Failed to apply zone profile: {str(e)}", code=e.code)
@@ -2,12 +2,23 @@
 
 import logging
 import xml.etree.ElementTree as ET
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional, Tuple
+
+import re
 
 import requests
 
+from ..utils.call_ledger import track
+from ..utils.concurrency import adaptive_limiters, signals_from_response
+from ..utils.deadline import call_timeout
+from ..utils.domains import split
+from ..utils.response_cache import scope
+
 logger = logging.getLogger(__name__)
 
+# Namecheap answers throttled calls with HTTP 200 and this error in the body
+THROTTLE_ERROR = re.compile(r'Number="500000"|too many requests', re.IGNORECASE)
+
 
 class NamecheapError(Exception):
     """Custom exception for Namecheap API errors"""
@@ -17,7 +28,8 @@ class NamecheapError(Exception):
 class NamecheapClient:
     """Client for interacting with Namecheap API"""
     
-    def __init__(self, api_user: str, api_key: str, username: str, client_ip: str):
+    def __init__(self, api_user: str, api_key: str, username: str, client_ip: str, rate_limiter=None, cache=None,
+                 concurrency=None):
         """
         Initialize Namecheap client
         
@@ -26,6 +38,9 @@ class NamecheapClient:
             api_key: Namecheap API key
             username: Namecheap username
             client_ip: Whitelisted IP address
+            rate_limiter: Optional RateLimiter shared by all users of this account
+            cache: Optional ResponseCache for read-only commands
+            concurrency: Optional AdaptiveLimiter; defaults to the process-wide one of this account
         """
         logger.info(f"🔧 Initializing Namecheap client...")
         logger.info(f"   API User: {api_user}")
@@ -38,6 +53,10 @@ class NamecheapClient:
         self.username = username
         self.client_ip = client_ip
         self.base_url = "https://api.namecheap.com/xml.response"
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self._cache_scope = scope(f"{api_user}:{username}")
+        self.concurrency = concurrency or adaptive_limiters.get("namecheap", self._cache_scope)
         
         logger.info(f"✅ Namecheap client initialized successfully for user: {username}")
     
@@ -52,6 +71,15 @@ class NamecheapClient:
         Returns:
             XML response root element
         """
+        # Commands on a domain share one cache resource; any other command on it is a write
+        resource = f"namecheap:{params['SLD']}.{params['TLD']}".lower() if "SLD" in params else "namecheap"
+        cache_parts = [self._cache_scope, params]
+        if self.cache and self.cache.cacheable(command):
+            cached = self.cache.get(command, cache_parts)
+            if cached is not None:
+                logger.info(f"📦 {command} for {resource} served from cache")
+                return ET.fromstring(cached)
+        
         logger.info(f"📤 Making Namecheap API request...")
         logger.info(f"   Command: {command}")
         logger.info(f"   Additional params: {params}")
@@ -73,8 +101,11 @@ class NamecheapClient:
         logger.info(f"   Request URL: {self.base_url}")
         
         try:
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            
             logger.info(f"   🌐 Sending GET request to Namecheap...")
-            response = requests.get(self.base_url, params=request_params, timeout=30)
+            response = self._send(request_params)
             
             logger.info(f"   📥 Response received - Status Code: {response.status_code}")
             logger.info(f"   Response Headers: {dict(response.headers)}")
@@ -110,6 +141,11 @@ class NamecheapClient:
                     raise NamecheapError("Unknown Namecheap API error")
             
             logger.info(f"   ✅ Namecheap API request successful")
+            if self.cache:
+                if self.cache.cacheable(command):
+                    self.cache.put(command, cache_parts, resource, response.text)
+                else:
+                    self.cache.invalidate(resource)
             return root
             
         except requests.RequestException as e:
@@ -133,6 +169,64 @@ class NamecheapClient:
             logger.error(f"     Traceback: {traceback.format_exc()}")
             raise NamecheapError(f"Unexpected error: {str(e)}")
     
+    def _send(self, request_params: Dict[str, str]) -> requests.Response:
+        """GET the API within the account's adaptive concurrency limit, recording the call"""
+        self.concurrency.acquire()
+        signals = None
+        try:
+            with track("namecheap", request_params["Command"]) as call:
+                response = requests.get(self.base_url, params=request_params, timeout=call_timeout(30))
+                call.received = len(response.content)
+                call.error = response.status_code >= 400 or 'Status="ERROR"' in response.text
+            signals = signals_from_response(response.status_code, response.headers)
+            if THROTTLE_ERROR.search(response.text):
+                signals = signals._replace(throttled=True)
+            return response
+        finally:
+            self.concurrency.release(signals)
+    
+    def audit(self) -> Dict[str, Any]:
+        """
+        Check the credentials for the credential audit
+        
+        Returns:
+            scopes (commands that succeeded), domain_count and available_balance
+            
+        Raises:
+            NamecheapError: If the API rejects the credentials
+        """
+        root = self._make_request("namecheap.users.getBalances", {})
+        balances = root.find(".//{*}UserGetBalancesResult")
+        balance = balances.get("AvailableBalance") if balances is not None else None
+        
+        root = self._make_request("namecheap.domains.getList", {"PageSize": "10"})
+        total = root.find(".//{*}Paging/{*}TotalItems")
+        
+        return {
+            "scopes": ["users.getBalances", "domains.getList"],
+            "domain_count": int(total.text) if total is not None and total.text else None,
+            "available_balance": float(balance) if balance else None
+        }
+    
+    @staticmethod
+    def _split_domain(domain: str) -> Tuple[str, str]:
+        """
+        Split domain into the SLD and TLD parameters expected by Namecheap
+        
+        The TLD is the public suffix, so example.co.uk gives ("example", "co.uk").
+        
+        Args:
+            domain: Domain name (e.g., example.com)
+            
+        Returns:
+            Tuple of (sld, tld); tld is empty for invalid domains
+        """
+        parts = split(domain)
+        if not parts.sld:
+            return domain, ""
+        
+        return parts.sld, parts.tld
+    
     def set_nameservers(self, domain: str, nameservers: List[str]) -> bool:
         """
         Update domain nameservers
@@ -148,13 +242,10 @@ class NamecheapClient:
             raise NamecheapError("No nameservers provided")
         
         # Split domain into SLD and TLD
-        parts = domain.split(".")
-        if len(parts) < 2:
+        sld, tld = self._split_domain(domain)
+        if not tld:
             raise NamecheapError(f"Invalid domain format: {domain}")
         
-        sld = ".".join(parts[:-1])
-        tld = parts[-1]
-        
         # Build nameserver parameters
         params = {
             "SLD": sld,
@@ -207,6 +298,29 @@ class NamecheapClient:
             logger.error(f"   Traceback: {traceback.format_exc()}")
             raise NamecheapError(f"Failed to update nameservers: {str(e)}")
     
+    def reset_nameservers(self, domain: str) -> bool:
+        """
+        Point a domain back at Namecheap's default nameservers
+        
+        Args:
+            domain: Domain name (e.g., example.com)
+            
+        Returns:
+            Success boolean
+        """
+        sld, tld = self._split_domain(domain)
+        if not tld:
+            raise NamecheapError(f"Invalid domain format: {domain}")
+        
+        root = self._make_request("namecheap.domains.dns.setDefault", {"SLD": sld, "TLD": tld})
+        result = root.find(".//{*}DomainDNSSetDefaultResult")
+        if result is not None and result.get("Updated") == "true":
+            logger.info(f"✅ Reset nameservers of {domain} to Namecheap defaults")
+            return True
+        
+        logger.error(f"❌ Failed to reset nameservers of {domain}")
+        return False
+    
     def get_domain_info(self, domain: str) -> Optional[Dict[str, str]]:
         """
         Get domain information (for testing/verification)
@@ -218,13 +332,10 @@ class NamecheapClient:
             Domain info dict or None
         """
         # Split domain
-        parts = domain.split(".")
-        if len(parts) < 2:
+        sld, tld = self._split_domain(domain)
+        if not tld:
             return None
         
-        sld = ".".join(parts[:-1])
-        tld = parts[-1]
-        
         params = {
             "SLD": sld,
             "TLD": tld
@@ -245,4 +356,30 @@ class NamecheapClient:
             
         except Exception as e:
             logger.error(f"Error getting domain info for {domain}: {e}")
-            return None
\ No newline at end of file
+            return None
+    
+    def get_nameservers(self, domain: str) -> Optional[List[str]]:
+        """
+        Get the nameservers currently delegated at Namecheap
+        
+        Args:
+            domain: Domain name
+            
+        Returns:
+            Lowercase nameservers, or None if the domain is not in this account
+        """
+        sld, tld = self._split_domain(domain)
+        if not tld:
+            return None
+        
+        try:
+            root = self._make_request("namecheap.domains.dns.getList", {"SLD": sld, "TLD": tld})
+        except NamecheapError as e:
+            logger.info(f"Could not fetch Namecheap nameservers for {domain}: {e}")
+            return None
+        
+        result = root.find(".//{*}DomainDNSGetListResult")
+        if result is None:
+            return None
+        
+        return [ns.text.strip().lower() for ns in result.findall("{*}Nameserver") if ns.text]
@@ -0,0 +1,230 @@
+"""Load-aware placement of new sites onto Cloudflare accounts"""
+
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, List, Optional
+
+from ..core.config import settings
+from ..utils.credential_health import CLOUDFLARE_ACCOUNTS
+
+logger = logging.getLogger(__name__)
+
+# Cloudflare error codes that mean an account is being throttled
+RATE_LIMIT_CODES = {429, 971}
+
+# Cloudflare error code returned when an account cannot hold more zones
+ZONE_LIMIT_CODES = {1001}
+
+
+class PlacementError(Exception):
+    """Custom exception for sites that cannot be placed on any account"""
+    pass
+
+
+class AccountLoadTracker:
+    """
+    In-process view of Cloudflare account load: jobs in flight and recent errors
+
+    Shared by every job of the process, so concurrent placements see each
+    other's reservations before the sites table catches up.
+    """
+
+    def __init__(self, error_window: float = 600.0):
+        """
+        Initialize load tracker
+
+        Args:
+            error_window: Seconds an error keeps counting against an account
+        """
+        self.error_window = error_window
+        self.lock = threading.RLock()
+        self._in_flight: Dict[str, int] = defaultdict(int)
+        self._rate_limited: Dict[str, Deque[float]] = defaultdict(deque)
+        self._zone_limited: Dict[str, float] = {}
+
+    def begin(self, account_id: str) -> None:
+        """Count a job against an account"""
+        with self.lock:
+            self._in_flight[account_id] += 1
+
+    def end(self, account_id: str) -> None:
+        """Release a job counted with begin()"""
+        with self.lock:
+            self._in_flight[account_id] = max(0, self._in_flight[account_id] - 1)
+
+    @contextmanager
+    def track(self, account_id: str):
+        """Count a job against an account for the duration of the block"""
+        self.begin(account_id)
+        try:
+            yield
+        finally:
+            self.end(account_id)
+
+    def record_error(self, account_id: str, code: Optional[int]) -> None:
+        """
+        Remember a Cloudflare error that says something about account load
+
+        Args:
+            account_id: UUID of the cloudflare_accounts row
+            code: Cloudflare error code (other codes are ignored)
+        """
+        now = time.monotonic()
+        with self.lock:
+            if code in RATE_LIMIT_CODES:
+                self._rate_limited[account_id].append(now)
+                logger.warning(f"⚠️  Cloudflare account {account_id} is rate limited (code {code})")
+            elif code in ZONE_LIMIT_CODES:
+                self._zone_limited[account_id] = now
+                logger.warning(f"⚠️  Cloudflare account {account_id} reached its zone limit (code {code})")
+
+    def in_flight(self, account_id: str) -> int:
+        """Jobs currently running against an account"""
+        with self.lock:
+            return self._in_flight[account_id]
+
+    def recent_rate_limits(self, account_id: str) -> int:
+        """Rate limit errors of an account within the error window"""
+        cutoff = time.monotonic() - self.error_window
+        with self.lock:
+            errors = self._rate_limited[account_id]
+            while errors and errors[0] < cutoff:
+                errors.popleft()
+            return len(errors)
+
+    def zone_limited(self, account_id: str) -> bool:
+        """Whether the account reported a zone limit error within the error window"""
+        with self.lock:
+            hit_at = self._zone_limited.get(account_id)
+            return hit_at is not None and time.monotonic() - hit_at < self.error_window
+
+
+# Process-wide tracker fed by DNSAutomator.process_site
+load_tracker = AccountLoadTracker()
+
+
+class AccountPlacementService:
+    """Picks the least loaded Cloudflare account for a new site"""
+
+    # Score added per job in flight and per recent rate limit error; a full
+    # account scores 1.0 from its zone count alone
+    IN_FLIGHT_WEIGHT = 0.05
+    RATE_LIMIT_WEIGHT = 0.25
+
+    def __init__(
+        self,
+        data_client,
+        tracker: Optional[AccountLoadTracker] = None,
+        zone_limit: Optional[int] = None,
+        cache_ttl: float = 60.0
+    ):
+        """
+        Initialize placement service
+
+        Args:
+            data_client: SupabaseService instance
+            tracker: Load tracker, the process-wide one by default
+            zone_limit: Zones per account when the account row sets no zone_limit
+            cache_ttl: Seconds account rows and zone counts are reused between placements
+        """
+        self.data_client = data_client
+        self.tracker = tracker or load_tracker
+        self.zone_limit = zone_limit or settings.cloudflare_zone_limit
+        self.cache_ttl = cache_ttl
+
+        self._accounts: List[Dict[str, Any]] = []
+        self._zone_counts: Dict[str, Optional[int]] = {}
+        self._failed: Dict[str, str] = {}
+        self._loaded_at: Optional[float] = None
+        self._refresh_lock = threading.Lock()
+
+    def _refresh(self) -> None:
+        """
+        Reload accounts, their zone counts and failed credential audits once the cache expires
+
+        The queries run without holding tracker.lock, so jobs starting and
+        ending on other accounts are not blocked by a slow database; only
+        swapping in the results takes the lock.
+        """
+        with self._refresh_lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.cache_ttl:
+                return
+
+            accounts = self.data_client.fetch_placement_accounts()
+            zone_counts = {
+                account["id"]: self.data_client.count_sites_for_cloudflare_account(account["id"])
+                for account in accounts
+            }
+            failed = self.data_client.fetch_failed_credentials(CLOUDFLARE_ACCOUNTS)
+
+            for account_id, count in zone_counts.items():
+                if count is None:
+                    logger.warning(f"⚠️  Zone count of Cloudflare account {account_id} unknown, skipping it until the next refresh")
+
+            with self.tracker.lock:
+                self._accounts = accounts
+                self._zone_counts = zone_counts
+                self._failed = failed
+                self._loaded_at = time.monotonic()
+
+    def score(self, account: Dict[str, Any]) -> Optional[float]:
+        """
+        Load score of an account, lower is better
+
+        Args:
+            account: cloudflare_accounts row
+
+        Returns:
+            Score, or None if the account cannot take another zone or its zone count is unknown
+        """
+        account_id = account["id"]
+        zone_limit = account.get("zone_limit") or self.zone_limit
+        zone_count = self._zone_counts.get(account_id)
+
+        if account.get("is_active") is False or not account.get("cloudflare_account_id"):
+            return None
+        if account_id in self._failed or zone_count is None:
+            return None
+        if zone_count >= zone_limit or self.tracker.zone_limited(account_id):
+            return None
+
+        return (
+            zone_count / zone_limit
+            + self.IN_FLIGHT_WEIGHT * self.tracker.in_flight(account_id)
+            + self.RATE_LIMIT_WEIGHT * self.tracker.recent_rate_limits(account_id)
+        )
+
+    def choose(self) -> Dict[str, Any]:
+        """
+        Pick the least loaded account and reserve a job slot on it
+
+        The caller must release the slot with tracker.end(account["id"]).
+
+        Returns:
+            cloudflare_accounts row of the chosen account
+
+        Raises:
+            PlacementError: If no account can take another zone
+        """
+        self._refresh()
+
+        with self.tracker.lock:
+            scored = []
+            for account in self._accounts:
+                score = self.score(account)
+                if score is not None:
+                    scored.append((score, account["account_nickname"], account))
+
+            if not scored:
+                raise PlacementError(f"No Cloudflare account can take another zone ({len(self._accounts)} checked)")
+
+            score, _, account = min(scored, key=lambda item: item[:2])
+            self.tracker.begin(account["id"])
+            # Count the new zone now so placements before the next refresh see it
+            self._zone_counts[account["id"]] += 1
+
+        logger.info(f"📍 Placed on Cloudflare account {account['account_nickname']} (score {score:.2f})")
+        return account
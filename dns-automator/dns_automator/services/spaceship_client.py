@@ -1,10 +1,16 @@
 """Spaceship API client for domain management"""
 
 import logging
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
 
 import requests
 
+from ..utils.call_ledger import track
+from ..utils.concurrency import adaptive_limiters, signals_from_response
+from ..utils.deadline import call_timeout
+from ..utils.domains import registrable_domain
+from ..utils.response_cache import scope
+
 logger = logging.getLogger(__name__)
 
 
@@ -16,13 +22,16 @@ class SpaceshipError(Exception):
 class SpaceshipClient:
     """Client for interacting with Spaceship API"""
     
-    def __init__(self, api_key: str, api_secret: str):
+    def __init__(self, api_key: str, api_secret: str, rate_limiter=None, cache=None, concurrency=None):
         """
         Initialize Spaceship client
         
         Args:
             api_key: Spaceship API key
             api_secret: Spaceship API secret
+            rate_limiter: Optional RateLimiter shared by all users of this account
+            cache: Optional ResponseCache for domain lookups
+            concurrency: Optional AdaptiveLimiter; defaults to the process-wide one of this account
         """
         logger.info(f"🔧 Initializing Spaceship client...")
         logger.info(f"   API Key: {api_key[:8]}...{api_key[-4:]} (length: {len(api_key)})")
@@ -32,6 +41,10 @@ class SpaceshipClient:
         self.api_secret = api_secret
         self.base_url = "https://api.spaceship.com/v2"
         self.session = requests.Session()
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self._cache_scope = scope(api_key)
+        self.concurrency = concurrency or adaptive_limiters.get("spaceship", self._cache_scope)
         
         logger.info(f"   🔐 Attempting authentication...")
         self._authenticate()
@@ -48,7 +61,9 @@ class SpaceshipClient:
                 "client_secret": self.api_secret
             }
             
-            response = self.session.post(auth_url, json=auth_data, timeout=30)
+            with track("spaceship", "POST /oauth/token") as call:
+                response = self.session.post(auth_url, json=auth_data, timeout=call_timeout(30))
+                call.error = response.status_code >= 400
             response.raise_for_status()
             
             token_data = response.json()
@@ -69,6 +84,21 @@ class SpaceshipClient:
             logger.error(f"Authentication error: {e}")
             raise SpaceshipError(f"Authentication failed: {str(e)}")
     
+    def _send(self, method: str, url: str, data: Optional[Dict], operation: str) -> requests.Response:
+        """Send one request within the account's adaptive concurrency limit, recording the call"""
+        self.concurrency.acquire()
+        signals = None
+        try:
+            with track("spaceship", operation) as call:
+                response = self.session.request(method=method, url=url, json=data, timeout=call_timeout(30))
+                call.sent = len(response.request.body or b"")
+                call.received = len(response.content)
+                call.error = response.status_code >= 400
+            signals = signals_from_response(response.status_code, response.headers)
+            return response
+        finally:
+            self.concurrency.release(signals)
+    
     def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None) -> Dict:
         """
         Make API request to Spaceship
@@ -83,28 +113,39 @@ class SpaceshipClient:
         """
         url = f"{self.base_url}{endpoint}"
         
+        # "/domains/example.com/nameservers" -> endpoint "spaceship.PUT /domains", resource "spaceship:example.com"
+        segments = endpoint.split("/")
+        operation = f"{method} {'/'.join(segments[:2])}"
+        cache_endpoint = f"spaceship.{operation}"
+        resource = f"spaceship:{segments[2]}" if len(segments) > 2 else "spaceship"
+        cache_parts = [self._cache_scope, endpoint, data]
+        if self.cache and self.cache.cacheable(cache_endpoint):
+            cached = self.cache.get(cache_endpoint, cache_parts)
+            if cached is not None:
+                return cached
+        
         try:
-            response = self.session.request(
-                method=method,
-                url=url,
-                json=data,
-                timeout=30
-            )
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            
+            response = self._send(method, url, data, operation)
             
             # Handle token expiration
             if response.status_code == 401:
                 logger.info("Token expired, re-authenticating...")
                 self._authenticate()
                 # Retry the request
-                response = self.session.request(
-                    method=method,
-                    url=url,
-                    json=data,
-                    timeout=30
-                )
+                response = self._send(method, url, data, operation)
             
             response.raise_for_status()
-            return response.json()
+            result = response.json()
+            
+            if self.cache:
+                if self.cache.cacheable(cache_endpoint):
+                    self.cache.put(cache_endpoint, cache_parts, resource, result)
+                elif method != "GET":
+                    self.cache.invalidate(resource)
+            return result
             
         except requests.RequestException as e:
             logger.error(f"Request error: {e}")
@@ -112,6 +153,23 @@ class SpaceshipClient:
                 logger.error(f"Response body: {e.response.text}")
             raise SpaceshipError(f"Request failed: {str(e)}")
     
+    def audit(self) -> Dict[str, Any]:
+        """
+        Check the credentials for the credential audit (they authenticated when the client was created)
+        
+        Returns:
+            scopes (requests that succeeded), domain_count and quota_remaining
+            
+        Raises:
+            SpaceshipError: If the API rejects the request
+        """
+        result = self._make_request("GET", "/domains?take=1&skip=0")
+        return {
+            "scopes": ["oauth", "domains:read"],
+            "domain_count": result.get("total"),
+            "quota_remaining": self.concurrency.remaining
+        }
+    
     def set_nameservers(self, domain: str, nameservers: List[str]) -> bool:
         """
         Update domain nameservers
@@ -126,6 +184,11 @@ class SpaceshipClient:
         if not nameservers:
             raise SpaceshipError("No nameservers provided")
         
+        # Spaceship addresses domains by their registrable name
+        domain = registrable_domain(domain)
+        if not domain:
+            raise SpaceshipError("Invalid domain format")
+        
         try:
             logger.info(f"Setting nameservers for {domain} to: {', '.join(nameservers)}")
             
@@ -151,6 +214,28 @@ class SpaceshipClient:
             logger.error(f"Unexpected error updating nameservers for {domain}: {e}")
             raise SpaceshipError(f"Failed to update nameservers: {str(e)}")
     
+    def reset_nameservers(self, domain: str) -> bool:
+        """
+        Point a domain back at Spaceship's default nameservers
+        
+        Args:
+            domain: Domain name (e.g., example.com)
+            
+        Returns:
+            Success boolean
+        """
+        domain = registrable_domain(domain)
+        if not domain:
+            raise SpaceshipError("Invalid domain format")
+        
+        result = self._make_request("PUT", f"/domains/{domain}/nameservers", {"provider": "basic"})
+        if result.get("success", False):
+            logger.info(f"Reset nameservers of {domain} to Spaceship defaults")
+            return True
+        
+        logger.error(f"Failed to reset nameservers of {domain}: {result.get('message', 'Unknown error')}")
+        return False
+    
     def get_domain_info(self, domain: str) -> Optional[Dict[str, str]]:
         """
         Get domain information (for testing/verification)
@@ -161,6 +246,10 @@ class SpaceshipClient:
         Returns:
             Domain info dict or None
         """
+        domain = registrable_domain(domain)
+        if not domain:
+            return None
+        
         try:
             endpoint = f"/domains/{domain}"
             result = self._make_request("GET", endpoint)
@@ -177,4 +266,25 @@ class SpaceshipClient:
             
         except Exception as e:
             logger.error(f"Error getting domain info for {domain}: {e}")
-            return None
\ No newline at end of file
+            return None
+    
+    def get_nameservers(self, domain: str) -> Optional[List[str]]:
+        """
+        Get the nameservers currently delegated at Spaceship
+        
+        Args:
+            domain: Domain name
+            
+        Returns:
+            Lowercase nameservers, or None if the domain is not in this account
+        """
+        domain_info = self.get_domain_info(domain)
+        if not domain_info:
+            return None
+        
+        nameservers = domain_info.get("nameservers") or []
+        # Spaceship returns either a plain list or {"provider": ..., "hosts": [...]}
+        if isinstance(nameservers, dict):
+            nameservers = nameservers.get("hosts", [])
+        
+        return [ns.strip().lower() for ns in nameservers if ns]
@@ -7,9 +7,49 @@ from uuid import UUID
 
 from supabase import create_client, Client
 from ..core.config import settings
+from ..utils.call_ledger import instrument_httpx
+from ..utils.events import event_bus
+from ..utils.record_templates import RecordTemplateError
+from ..utils.site import Site
+from ..utils.write_behind import WriteBehindBuffer
 
 logger = logging.getLogger(__name__)
 
+# workflow_steps phase of the DNS Automator
+DNS_PHASE = "dns_setup"
+
+# workflow_executions.workflow_type of the DNS Automator
+DNS_WORKFLOW = "dns"
+
+# Postgres error code for a selected or updated column that does not exist
+UNDEFINED_COLUMN = "42703"
+
+# Domains per in_() filter of fetch_sites, keeping the request URL short
+DOMAIN_CHUNK_SIZE = 100
+
+# sites columns of Site.COLUMNS added by migrations, which must run before deploying
+SITE_COLUMN_MIGRATIONS = {
+    "registrar": "migration_008_dns_drift_scan.sql",
+    "cloudflare_zone_id": "migration_014_prewarmed_zones.sql",
+    "cloudflare_nameservers": "migration_014_prewarmed_zones.sql",
+}
+
+
+class SchemaError(Exception):
+    """Custom exception for database schemas missing required migrations"""
+    pass
+
+
+def _raise_for_schema(error: Exception) -> None:
+    """Turn an undefined column error into a SchemaError naming the missing migrations"""
+    if getattr(error, "code", None) != UNDEFINED_COLUMN:
+        return
+    message = str(error)
+    missing = sorted({
+        migration for column, migration in SITE_COLUMN_MIGRATIONS.items() if column in message
+    }) or sorted(set(SITE_COLUMN_MIGRATIONS.values()))
+    raise SchemaError(f"sites table is missing columns ({message}); run {', '.join(missing)}") from error
+
 
 class SupabaseService:
     """Service for interacting with Supabase database"""
@@ -41,6 +81,9 @@ class SupabaseService:
             )
             print("🟢 DEBUG: Supabase client created successfully")
             logger.info("Supabase client initialized")
+            # Count this client's PostgREST calls in the call ledger of the running job
+            instrument_httpx(self.client.postgrest.session, "supabase", "/rest/v1/")
+            self.writes = WriteBehindBuffer(self.client, settings.status_flush_interval)
         except Exception as e:
             print(f"🔴 DEBUG: Failed to create Supabase client: {e}")
             print(f"🔴 DEBUG: Exception type: {type(e).__name__}")
@@ -48,14 +91,27 @@ class SupabaseService:
             print(f"🔴 DEBUG: Service key length: {len(settings.supabase_service_key) if settings.supabase_service_key else 0}")
             raise
     
-    def get_site(self, site_id: str) -> Optional[Dict[str, Any]]:
+    def verify_schema(self) -> None:
+        """
+        Check that the sites table has every column the pipelines read and write
+        
+        Raises:
+            SchemaError: If a required migration has not been run
+        """
+        try:
+            self.client.table("sites").select(Site.COLUMNS).limit(1).execute()
+        except Exception as e:
+            _raise_for_schema(e)
+            logger.warning(f"⚠️  Could not verify the sites schema: {e}")
+    
+    def get_site(self, site_id: str) -> Optional[Site]:
         """
         Get single site details (alias for compatibility)
         """
         sites = self.fetch_pending_dns_sites(site_id)
         return sites[0] if sites else None
     
-    def fetch_pending_dns_sites(self, site_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    def fetch_pending_dns_sites(self, site_id: Optional[str] = None) -> List[Site]:
         """
         Fetch sites with pending DNS status
         
@@ -66,7 +122,7 @@ class SupabaseService:
             List of site records
         """
         try:
-            query = self.client.table("sites").select("*")
+            query = self.client.table("sites").select(Site.COLUMNS)
             
             if site_id:
                 query = query.eq("id", site_id)
@@ -74,15 +130,35 @@ class SupabaseService:
                 query = query.eq("status_dns", "pending")
             
             response = query.execute()
-            sites = response.data
+            sites = [Site.from_row(row) for row in response.data]
             
             logger.info(f"Fetched {len(sites)} pending DNS sites")
             return sites
             
         except Exception as e:
+            # A missing migration must not look like an empty queue
+            _raise_for_schema(e)
             logger.error(f"Error fetching pending sites: {e}")
             return []
     
+    def count_pending_dns_sites(self) -> Optional[int]:
+        """
+        Count the sites waiting for DNS setup on any replica
+        
+        Returns:
+            Number of pending sites, or None if the count failed
+        """
+        try:
+            response = self.client.table("sites")\
+                .select("id", count="exact")\
+                .eq("status_dns", "pending")\
+                .limit(1)\
+                .execute()
+            return response.count or 0
+        except Exception as e:
+            logger.error(f"Error counting pending DNS sites: {e}")
+            return None
+    
     def get_cloudflare_account(self, account_id: str) -> Optional[Dict[str, Any]]:
         """
         Get Cloudflare account details (alias for compatibility)
@@ -120,6 +196,132 @@ class SupabaseService:
             logger.error(f"Error fetching all Cloudflare accounts: {e}")
             return []
     
+    def fetch_placement_accounts(self) -> List[Dict[str, Any]]:
+        """
+        Fetch the Cloudflare accounts new sites can be placed on
+        
+        Returns:
+            List of account records
+        """
+        try:
+            response = self.client.table("cloudflare_accounts").select("*").execute()
+            return response.data
+        except Exception as e:
+            logger.error(f"Error fetching Cloudflare accounts for placement: {e}")
+            return []
+    
+    def count_sites_for_cloudflare_account(self, cloudflare_account_id: str) -> Optional[int]:
+        """
+        Count the sites (zones) assigned to a Cloudflare account
+        
+        Retired sites keep their cloudflare_account_id for the record but no
+        longer have a zone, so they do not count toward the zone limit.
+        
+        Args:
+            cloudflare_account_id: UUID of the cloudflare_accounts row
+            
+        Returns:
+            Number of sites, or None if the count failed
+        """
+        try:
+            response = self.client.table("sites")\
+                .select("id", count="exact")\
+                .eq("cloudflare_account_id", cloudflare_account_id)\
+                .or_("status_dns.is.null,status_dns.neq.retired")\
+                .limit(1)\
+                .execute()
+            return response.count or 0
+        except Exception as e:
+            logger.error(f"Error counting sites for Cloudflare account {cloudflare_account_id}: {e}")
+            return None
+    
+    def assign_cloudflare_account(self, site_id: str, cloudflare_account_id: str) -> bool:
+        """
+        Pin a site to the Cloudflare account chosen for it
+        
+        Args:
+            site_id: UUID of the site
+            cloudflare_account_id: UUID of the cloudflare_accounts row
+            
+        Returns:
+            Success boolean
+        """
+        try:
+            self.client.table("sites").update({"cloudflare_account_id": cloudflare_account_id}).eq("id", site_id).execute()
+            logger.info(f"Assigned site {site_id} to Cloudflare account {cloudflare_account_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Error assigning site {site_id} to Cloudflare account: {e}")
+            return False
+    
+    def save_zone(self, site_id: str, zone_id: str, nameservers: List[str]) -> bool:
+        """
+        Remember the Cloudflare zone of a site and its assigned nameservers
+        
+        Args:
+            site_id: UUID of the site
+            zone_id: Cloudflare zone ID
+            nameservers: Nameservers Cloudflare assigned to the zone
+            
+        Returns:
+            Success boolean
+        """
+        try:
+            self.client.table("sites").update({
+                "cloudflare_zone_id": zone_id,
+                "cloudflare_nameservers": nameservers
+            }).eq("id", site_id).execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error saving Cloudflare zone of site {site_id}: {e}")
+            return False
+    
+    def retire_site_dns(self, site_id: str) -> bool:
+        """
+        Mark a torn down site's DNS as retired and forget its Cloudflare zone
+        
+        Args:
+            site_id: UUID of the site
+            
+        Returns:
+            Success boolean
+        """
+        try:
+            self.client.table("sites").update({
+                "status_dns": "retired",
+                "cloudflare_zone_id": None,
+                "cloudflare_nameservers": None,
+                "error_message": None
+            }).eq("id", site_id).execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error retiring DNS of site {site_id}: {e}")
+            return False
+    
+    def fetch_account_nameservers(self, cloudflare_account_id: str, limit: int = 20) -> List[List[str]]:
+        """
+        Fetch the nameservers of the most recent zones of a Cloudflare account
+        
+        Args:
+            cloudflare_account_id: UUID of the cloudflare_accounts row
+            limit: Zones returned
+            
+        Returns:
+            Nameserver lists, newest zone first
+        """
+        try:
+            response = self.client.table("sites")\
+                .select("cloudflare_nameservers")\
+                .eq("cloudflare_account_id", cloudflare_account_id)\
+                .not_.is_("cloudflare_nameservers", "null")\
+                .order("created_at", desc=True)\
+                .limit(limit)\
+                .execute()
+            return [row["cloudflare_nameservers"] for row in response.data]
+        except Exception as e:
+            logger.error(f"Error fetching nameservers of Cloudflare account {cloudflare_account_id}: {e}")
+            return []
+    
     def get_registrar_credentials(self, registrar_type: str = "namecheap") -> Optional[Dict[str, Any]]:
         """
         Fetch domain registrar credentials from the database
@@ -137,6 +339,65 @@ class SupabaseService:
             logger.error(f"Error fetching {registrar_type} credentials: {e}")
             return None
     
+    def fetch_credentials(self, table: str) -> List[Dict[str, Any]]:
+        """
+        Fetch the active rows of a credentials table for the credential audit
+        
+        Args:
+            table: cloudflare_accounts, registrar_credentials or infrastructure_credentials
+            
+        Returns:
+            Credential records
+        """
+        try:
+            response = self.client.table(table).select("*").execute()
+            return [row for row in response.data if row.get("is_active") is not False]
+        except Exception as e:
+            logger.error(f"Error fetching {table}: {e}")
+            return []
+    
+    def save_credential_audits(self, results: List[Dict[str, Any]]) -> bool:
+        """
+        Store credential audit results, replacing the previous result of each credential
+        
+        Args:
+            results: credential_audits rows
+            
+        Returns:
+            Success boolean
+        """
+        if not results:
+            return True
+        try:
+            self.client.table("credential_audits").upsert(
+                results, on_conflict="credential_table,credential_id"
+            ).execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error saving credential audits: {e}")
+            return False
+    
+    def fetch_failed_credentials(self, table: str) -> Dict[str, str]:
+        """
+        Fetch the credentials of a table whose latest audit failed and has not expired
+        
+        Args:
+            table: Audited credentials table
+            
+        Returns:
+            Audit error per credential ID; empty if the audit never ran or the query failed
+        """
+        try:
+            response = self.client.table("credential_audits").select("credential_id, error")\
+                .eq("credential_table", table)\
+                .eq("healthy", False)\
+                .gt("expires_at", datetime.utcnow().isoformat())\
+                .execute()
+            return {row["credential_id"]: row.get("error") or "audit failed" for row in response.data}
+        except Exception as e:
+            logger.warning(f"⚠️  Could not read credential audits of {table}: {e}")
+            return {}
+    
     def get_default_server(self) -> Optional[Dict[str, Any]]:
         """
         Get default server configuration (alias for compatibility)
@@ -157,34 +418,423 @@ class SupabaseService:
             logger.error(f"Error fetching default server: {e}")
             return None
     
-    def update_site_status(self, site_id: str, status: str, error_message: Optional[str] = None) -> bool:
+    def update_site_status(
+        self,
+        site_id: str,
+        status: str,
+        error_message: Optional[str] = None,
+        registrar: Optional[str] = None
+    ) -> bool:
         """
         Update site DNS status
         
+        The update is buffered and written in the background, coalesced with
+        other updates of the site (see WriteBehindBuffer).
+        
         Args:
             site_id: UUID of the site
-            status: New status (active, failed)
-            error_message: Optional error message if failed
+            status: New status (active, activating while the zone is pending, failed, or pending to retry)
+            error_message: Optional error message if failed or retried
+            registrar: Registrar detected for the domain, if known
             
         Returns:
-            Success boolean
+            True once the update is queued; finish_job reports whether it was stored
         """
         try:
             update_data = {
                 "status_dns": status
             }
             
+            if registrar:
+                update_data["registrar"] = registrar
+            
             if error_message:
                 update_data["error_message"] = error_message
             elif status == "active":
                 # Clear error message on success
                 update_data["error_message"] = None
             
-            response = self.client.table("sites").update(update_data).eq("id", site_id).execute()
+            self.writes.update_site(site_id, update_data)
             
             logger.info(f"Updated site {site_id} DNS status to {status}")
             return True
             
         except Exception as e:
             logger.error(f"Error updating site {site_id} status: {e}")
-            return False
\ No newline at end of file
+            return False
+    
+    def fetch_sites_by_ids(self, site_ids: List[str]) -> List[Site]:
+        """
+        Fetch specific sites, e.g. the ones claimed by this replica
+        
+        Args:
+            site_ids: UUIDs of the sites
+            
+        Returns:
+            List of site records
+        """
+        if not site_ids:
+            return []
+        
+        try:
+            response = self.client.table("sites").select(Site.COLUMNS).in_("id", site_ids).execute()
+            return [Site.from_row(row) for row in response.data]
+        except Exception as e:
+            _raise_for_schema(e)
+            logger.error(f"Error fetching sites {site_ids}: {e}")
+            return []
+    
+    def start_job(self, site_id: str, steps_total: int) -> None:
+        """
+        Reset the DNS step progress of a site before processing it
+        
+        Args:
+            site_id: UUID of the site
+            steps_total: Number of steps the job records
+        """
+        self.writes.update_site(site_id, {"dns_steps_completed": 0, "dns_steps_total": steps_total})
+        event_bus.publish("job_started", site_id, phase=DNS_PHASE, steps_total=steps_total)
+    
+    def record_step(
+        self,
+        site_id: str,
+        step_name: str,
+        description: Optional[str] = None,
+        status: str = "running"
+    ) -> None:
+        """
+        Record a DNS workflow step for the status page (buffered)
+        
+        Starting a step completes the previous one. The step is also published
+        on the event bus for progress streams.
+        
+        Args:
+            site_id: UUID of the site
+            step_name: Step identifier
+            description: Human readable step description
+            status: running, completed or failed
+        """
+        self.writes.step(site_id, DNS_PHASE, step_name, status, description)
+        event_bus.publish(
+            "step", site_id, phase=DNS_PHASE, step=step_name, description=description, status=status
+        )
+    
+    def finish_job(self, site_id: str, success: bool) -> bool:
+        """
+        Close the running DNS step of a site and write its buffered state now
+        
+        Args:
+            site_id: UUID of the site
+            success: Whether the job succeeded
+            
+        Returns:
+            Whether all buffered writes of the site were stored
+        """
+        stored = self.writes.finish(site_id, DNS_PHASE, success)
+        if not stored:
+            logger.error(f"Status of site {site_id} was not fully stored, see the write errors above")
+        event_bus.publish("job_finished", site_id, phase=DNS_PHASE, success=success)
+        return stored
+    
+    def flush_writes(self) -> None:
+        """
+        Write every buffered status and step now, e.g. before releasing a
+        site's lease outside of a DNS job
+        """
+        self.writes.flush()
+    
+    def abandon_job(self, site_id: str) -> None:
+        """
+        Drop the buffered state of a job whose lease was lost, so it does not
+        overwrite the replica that took the site over
+        
+        Args:
+            site_id: UUID of the site
+        """
+        self.writes.discard(site_id, DNS_PHASE)
+        event_bus.publish("job_finished", site_id, phase=DNS_PHASE, success=False)
+    
+    def record_execution(
+        self,
+        site_id: str,
+        status: str,
+        started_at: datetime,
+        calls: Dict[str, Any],
+        error_message: Optional[str] = None
+    ) -> bool:
+        """
+        Insert the workflow_executions row of a finished DNS job
+        
+        Args:
+            site_id: UUID of the site
+            status: completed, failed or retrying
+            started_at: When the job started (UTC)
+            calls: CallLedger summary, stored as metadata.calls
+            error_message: Error of a failed job
+            
+        Returns:
+            Success boolean
+        """
+        try:
+            self.client.table("workflow_executions").insert({
+                "site_id": site_id,
+                "workflow_type": DNS_WORKFLOW,
+                "status": status,
+                "started_at": started_at.isoformat(),
+                "completed_at": datetime.utcnow().isoformat(),
+                "error_message": error_message,
+                "metadata": {"calls": calls}
+            }).execute()
+            return True
+        except Exception as e:
+            logger.warning(f"Could not record workflow execution for site {site_id}: {e}")
+            return False
+    
+    def fetch_executions(self, since: datetime, limit: int = 5000) -> List[Dict[str, Any]]:
+        """
+        Fetch recent DNS workflow executions with their call ledgers
+        
+        Args:
+            since: Oldest creation time (UTC)
+            limit: Most recent rows returned at most
+            
+        Returns:
+            Rows with site_id, status, metadata and created_at
+        """
+        try:
+            response = self.client.table("workflow_executions").select(
+                "site_id, status, metadata, created_at"
+            ).eq("workflow_type", DNS_WORKFLOW).gte("created_at", since.isoformat()).order(
+                "created_at", desc=True
+            ).limit(limit).execute()
+            return response.data
+        except Exception as e:
+            logger.error(f"Error fetching workflow executions: {e}")
+            return []
+    
+    def fetch_sites(
+        self,
+        server_id: Optional[str] = None,
+        cloudflare_account_id: Optional[str] = None,
+        domains: Optional[List[str]] = None,
+        page_size: int = 500
+    ) -> List[Site]:
+        """
+        Fetch sites matching a fleet selector
+        
+        All given filters are combined (AND). Without filters every site is
+        returned. Sites are read page by page on the primary key, like
+        iter_dns_sites, so large fleets are not cut off at the API's row
+        limit; long domain lists are sent in chunks of DOMAIN_CHUNK_SIZE.
+        
+        Args:
+            server_id: Only sites hosted on this server
+            cloudflare_account_id: Only sites in this Cloudflare account
+            domains: Only these domains
+            page_size: Rows fetched per request
+            
+        Returns:
+            List of site records
+        """
+        if domains:
+            unique = list(dict.fromkeys(domains))
+            chunks = [unique[i:i + DOMAIN_CHUNK_SIZE] for i in range(0, len(unique), DOMAIN_CHUNK_SIZE)]
+        else:
+            chunks = [None]
+        
+        sites = []
+        for chunk in chunks:
+            last_id = None
+            
+            while True:
+                query = self.client.table("sites").select(Site.COLUMNS)
+                
+                if server_id:
+                    query = query.eq("server_id", server_id)
+                if cloudflare_account_id:
+                    query = query.eq("cloudflare_account_id", cloudflare_account_id)
+                if chunk:
+                    query = query.in_("domain", chunk)
+                if last_id:
+                    query = query.gt("id", last_id)
+                
+                response = query.order("id").limit(page_size).execute()
+                sites.extend(Site.from_row(row) for row in response.data)
+                
+                if len(response.data) < page_size:
+                    break
+                
+                last_id = response.data[-1]["id"]
+        
+        logger.info(f"Fetched {len(sites)} sites for fleet selector")
+        return sites
+    
+    def fetch_server(self, server_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch a server configuration by ID
+        
+        Args:
+            server_id: UUID of the server
+            
+        Returns:
+            Server record or None
+        """
+        try:
+            response = self.client.table("servers").select("*").eq("id", server_id).single().execute()
+            return response.data
+        except Exception as e:
+            logger.error(f"Error fetching server {server_id}: {e}")
+            return None
+    
+    def update_site_server(self, site_id: str, server_id: str) -> bool:
+        """
+        Point a site at a different hosting server
+        
+        Args:
+            site_id: UUID of the site
+            server_id: UUID of the new server
+            
+        Returns:
+            Success boolean
+        """
+        try:
+            self.client.table("sites").update({"server_id": server_id}).eq("id", site_id).execute()
+            logger.info(f"Updated site {site_id} server to {server_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Error updating site {site_id} server: {e}")
+            return False
+    
+    def iter_active_dns_sites(self, checked_before: Optional[datetime] = None, page_size: int = 500):
+        """
+        Stream sites with active DNS, page by page
+        
+        Args:
+            checked_before: Only sites never checked or last checked before this UTC time
+            page_size: Rows fetched per request
+            
+        Yields:
+            Site records
+        """
+        return self.iter_dns_sites("active", checked_before, page_size)
+    
+    def iter_dns_sites(self, status: str, checked_before: Optional[datetime] = None, page_size: int = 500):
+        """
+        Stream sites with a DNS status, page by page
+        
+        Uses keyset pagination on the primary key so rows updated while the
+        stream is consumed (e.g. dns_checked_at) do not shift later pages.
+        
+        Args:
+            status: DNS status (active, activating, ...)
+            checked_before: Only sites never checked or last checked before this UTC time
+            page_size: Rows fetched per request
+            
+        Yields:
+            Site records
+        """
+        last_id = None
+        
+        while True:
+            query = self.client.table("sites").select(Site.COLUMNS).eq("status_dns", status)
+            
+            if checked_before:
+                query = query.or_(f"dns_checked_at.is.null,dns_checked_at.lt.{checked_before.strftime('%Y-%m-%dT%H:%M:%S')}")
+            if last_id:
+                query = query.gt("id", last_id)
+            
+            response = query.order("id").limit(page_size).execute()
+            
+            for row in response.data:
+                yield Site.from_row(row)
+            
+            if len(response.data) < page_size:
+                return
+            
+            last_id = response.data[-1]["id"]
+    
+    def fetch_servers(self) -> List[Dict[str, Any]]:
+        """
+        Fetch all server configurations
+        
+        Returns:
+            List of server records
+        """
+        try:
+            response = self.client.table("servers").select("*").execute()
+            return response.data
+        except Exception as e:
+            logger.error(f"Error fetching servers: {e}")
+            return []
+    
+    def record_dns_drift(
+        self,
+        site_id: str,
+        issues: List[Dict[str, Any]],
+        registrar: Optional[str] = None
+    ) -> bool:
+        """
+        Store a drift report and mark the site as checked
+        
+        Args:
+            site_id: UUID of the site
+            issues: Drift found for the site (empty if in sync)
+            registrar: Registrar detected during the check, if newly known
+            
+        Returns:
+            Success boolean
+        """
+        try:
+            self.client.table("dns_drift_reports").insert({
+                "site_id": site_id,
+                "in_sync": not issues,
+                "issues": issues
+            }).execute()
+            
+            update_data = {"dns_checked_at": datetime.utcnow().isoformat()}
+            if registrar:
+                update_data["registrar"] = registrar
+            self.client.table("sites").update(update_data).eq("id", site_id).execute()
+            
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error recording DNS drift for site {site_id}: {e}")
+            return False
+    
+    def fetch_record_templates(self, site_id: str, cloudflare_account_id: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        Fetch DNS record templates attached to a site, its Cloudflare account or the whole fleet
+        
+        Args:
+            site_id: UUID of the site
+            cloudflare_account_id: UUID of the site's Cloudflare account
+            
+        Returns:
+            Assignment rows with the template embedded under "dns_record_templates",
+            fleet-wide first, then account, then site attachments
+            
+        Raises:
+            RecordTemplateError: If the templates could not be loaded, so the
+                zone is not set up without its MX/TXT/verification records
+        """
+        scopes = [f"site_id.eq.{site_id}", "and(site_id.is.null,cloudflare_account_id.is.null)"]
+        if cloudflare_account_id:
+            scopes.append(f"cloudflare_account_id.eq.{cloudflare_account_id}")
+        
+        try:
+            response = self.client.table("dns_template_assignments")\
+                .select("site_id, cloudflare_account_id, variables, dns_record_templates(name, records, is_active)")\
+                .or_(",".join(scopes))\
+                .execute()
+        except Exception as e:
+            logger.error(f"Error fetching DNS record templates for site {site_id}: {e}")
+            raise RecordTemplateError(f"Could not load the record templates of site {site_id}: {e}") from e
+        
+        assignments = [
+            row for row in response.data
+            if row.get("dns_record_templates") and row["dns_record_templates"].get("is_active", True)
+        ]
+        
+        # Most specific attachment last so it wins when records overlap
+        return sorted(assignments, key=lambda row: (bool(row.get("site_id")), bool(row.get("cloudflare_account_id"))))
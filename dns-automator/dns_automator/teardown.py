@@ -0,0 +1,279 @@
+"""Tears down the DNS of retired sites: registrar nameservers and Cloudflare zone"""
+
+import argparse
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .core.config import settings
+from .fleet import FleetChangeError, FleetChangeState
+from .services.cloudflare_client import CloudflareClient, CloudflareError
+from .services.namecheap_client import NamecheapError
+from .services.spaceship_client import SpaceshipError
+from .utils.rate_limit import RateLimiterRegistry
+from .utils.site import Site
+
+logger = logging.getLogger(__name__)
+
+REGISTRARS = ["namecheap", "spaceship"]
+
+# Nameservers go back to the registrar first: a domain still delegated to a
+# deleted zone could be claimed by whoever adds the zone to their account next
+TEARDOWN_STEPS = ["registrar_nameservers", "cloudflare_zone"]
+
+
+class TeardownError(Exception):
+    """Custom exception for site teardown errors"""
+    pass
+
+
+class DNSTeardown:
+    """
+    Resets the nameservers and deletes the Cloudflare zone of many sites in parallel
+
+    Every finished step is checkpointed per domain in a JSON state file, so
+    re-running the same command resumes an interrupted teardown where it
+    stopped. Both steps are idempotent: a zone or delegation that is already
+    gone counts as torn down. Once both are done the site's DNS status
+    becomes 'retired'.
+    """
+
+    def __init__(self, automator, state: FleetChangeState, max_workers: Optional[int] = None):
+        """
+        Initialize teardown
+
+        Args:
+            automator: DNSAutomator providing the data client and registrar clients
+            state: Checkpoint state
+            max_workers: Sites torn down in parallel
+        """
+        self.automator = automator
+        self.data_client = automator.data_client
+        self.state = state
+        self.max_workers = max_workers or settings.fleet_max_workers
+
+        self.cloudflare_limiters = RateLimiterRegistry(settings.cloudflare_rate_limit)
+        self.registrar_limiters = {
+            "namecheap": RateLimiterRegistry(settings.namecheap_rate_limit).get("namecheap"),
+            "spaceship": RateLimiterRegistry(settings.spaceship_rate_limit).get("spaceship"),
+        }
+
+        self._cloudflare_clients: Dict[str, CloudflareClient] = {}
+        self._clients_lock = threading.Lock()
+        self.registrar_clients: Dict[str, Any] = {}
+
+    def _prepare(self) -> None:
+        """Load the registrar clients once, before fanning out"""
+        for registrar_type in REGISTRARS:
+            try:
+                client = self.automator.get_registrar_client(registrar_type)
+            except ValueError as e:
+                logger.warning(f"⚠️  {registrar_type} not usable, its domains keep their nameservers: {e}")
+                continue
+            client.rate_limiter = self.registrar_limiters[registrar_type]
+            self.registrar_clients[registrar_type] = client
+
+    def _cloudflare_client_for(self, cf_account_id: str) -> CloudflareClient:
+        """
+        Get a Cloudflare client for an account, sharing one rate limiter per token
+
+        Args:
+            cf_account_id: UUID of the cloudflare_accounts row
+
+        Returns:
+            CloudflareClient instance
+        """
+        with self._clients_lock:
+            client = self._cloudflare_clients.get(cf_account_id)
+            if client:
+                return client
+
+            cf_account = self.data_client.get_cloudflare_account(cf_account_id)
+            if not cf_account:
+                raise TeardownError(f"Cloudflare account not found: {cf_account_id}")
+
+            client = CloudflareClient(
+                cf_account["api_token"],
+                cf_account.get("cloudflare_account_id"),
+                rate_limiter=self.cloudflare_limiters.get(cf_account["api_token"]),
+                cache=self.automator.response_cache
+            )
+            self._cloudflare_clients[cf_account_id] = client
+            return client
+
+    def reset_nameservers(self, site: Site) -> str:
+        """
+        Point a domain back at its registrar's default nameservers
+
+        Args:
+            site: Site record
+
+        Returns:
+            Outcome of the step (reset, or absent if no configured registrar holds the domain)
+        """
+        domain = site.domain
+
+        if site.registrar:
+            registrar_type, client = site.registrar, self.registrar_clients.get(site.registrar)
+            if not client:
+                raise TeardownError(f"{registrar_type} is not configured, cannot reset nameservers of {domain}")
+        else:
+            # Detect the registrar like the drift scanner does
+            registrar_type, client = next(
+                ((name, client) for name, client in self.registrar_clients.items()
+                 if client.get_nameservers(domain) is not None),
+                (None, None)
+            )
+            if not client:
+                return "absent"
+
+        if not client.reset_nameservers(domain):
+            raise TeardownError(f"{registrar_type} did not reset the nameservers of {domain}")
+        return "reset"
+
+    def delete_zone(self, site: Site) -> str:
+        """
+        Delete the Cloudflare zone of a site
+
+        The zone is looked up by name, so a stale zone ID on the site does
+        not delete somebody else's zone.
+
+        Args:
+            site: Site record
+
+        Returns:
+            Outcome of the step (deleted, or absent if there is no zone)
+        """
+        if not site.cloudflare_account_id:
+            return "absent"
+
+        client = self._cloudflare_client_for(site.cloudflare_account_id)
+        zone = client.find_zone(site.domain)
+        if not zone:
+            return "absent"
+
+        client.delete_zone(zone["id"], site.domain)
+        return "deleted"
+
+    def teardown_site(self, site: Site) -> str:
+        """
+        Run the steps of one site that are not checkpointed yet
+
+        Args:
+            site: Site record
+
+        Returns:
+            Outcome of the site
+        """
+        run_step = {"registrar_nameservers": self.reset_nameservers, "cloudflare_zone": self.delete_zone}
+        done = dict((self.state.get(site.domain) or {}).get("steps", {}))
+
+        for step in TEARDOWN_STEPS:
+            if step in done:
+                continue
+            done[step] = run_step[step](site)
+            # New dicts per write: other workers serialize the state file meanwhile
+            self.state.put(site.domain, {"site_id": site.id, "status": "in_progress", "steps": dict(done)})
+
+        if not self.data_client.retire_site_dns(site.id):
+            raise TeardownError(f"Could not mark the DNS of {site.domain} as retired")
+
+        self.state.put(site.domain, {
+            "site_id": site.id,
+            "status": "done",
+            "steps": done,
+            "completed_at": datetime.now().isoformat()
+        })
+        return "done"
+
+    def run(self, sites: List[Site]) -> Dict[str, int]:
+        """
+        Tear down many sites in parallel, skipping the ones already done
+
+        Args:
+            sites: Site records
+
+        Returns:
+            Count of sites per outcome (done, failed)
+        """
+        self.state.begin({"teardown": "dns"})
+        pending = [site for site in sites if (self.state.get(site.domain) or {}).get("status") != "done"]
+        logger.info(f"🗑️  Tearing down DNS of {len(pending)} of {len(sites)} site(s) with {self.max_workers} workers")
+
+        self._prepare()
+
+        summary: Dict[str, int] = {}
+        started_at = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="teardown") as executor:
+            futures = {executor.submit(self.teardown_site, site): site for site in pending}
+
+            for finished, future in enumerate(as_completed(futures), 1):
+                domain = futures[future].domain
+                try:
+                    outcome = future.result()
+                    logger.info(f"✅ [{finished}/{len(pending)}] {domain}: {self.state.get(domain)['steps']}")
+                except (CloudflareError, NamecheapError, SpaceshipError, TeardownError) as e:
+                    outcome = self._fail(domain, str(e))
+                    logger.error(f"❌ [{finished}/{len(pending)}] {domain}: {e}")
+                except Exception as e:
+                    outcome = self._fail(domain, f"{type(e).__name__}: {e}")
+                    logger.error(f"❌ [{finished}/{len(pending)}] {domain}: unexpected {type(e).__name__}: {e}")
+
+                summary[outcome] = summary.get(outcome, 0) + 1
+
+        elapsed = time.monotonic() - started_at
+        logger.info(f"🏁 DNS teardown finished: {len(pending)} site(s) in {elapsed:.0f}s - {summary}")
+        return summary
+
+    def _fail(self, domain: str, error: str) -> str:
+        """Checkpoint the error of a site, keeping its finished steps"""
+        entry = self.state.get(domain) or {"steps": {}}
+        self.state.put(domain, {**entry, "status": "failed", "error": error})
+        return "failed"
+
+
+def main():
+    """Command line entry point for the DNS teardown"""
+    parser = argparse.ArgumentParser(
+        description="Reset the nameservers and delete the Cloudflare zones of retired sites"
+    )
+    parser.add_argument("--domain", action="append", default=[], help="Domain to tear down (repeatable)")
+    parser.add_argument("--domains-file", help="File with one domain per line to tear down")
+    parser.add_argument("--workers", type=int, help="Sites torn down in parallel")
+    parser.add_argument("--state-file", default="dns-teardown-state.json", help="Checkpoint file for resuming")
+    args = parser.parse_args()
+
+    domains = list(args.domain)
+    if args.domains_file:
+        with open(args.domains_file, "r", encoding="utf-8") as fh:
+            domains.extend(line.strip() for line in fh if line.strip() and not line.startswith("#"))
+    if not domains:
+        parser.error("Nothing to tear down: pass --domain or --domains-file")
+
+    # Imported here: importing main configures logging for the command
+    from .main import DNSAutomator
+
+    automator = DNSAutomator()
+    sites = automator.data_client.fetch_sites(domains=domains)
+    missing = sorted(set(domains) - {site.domain for site in sites})
+    if missing:
+        logger.warning(f"⚠️  {len(missing)} domain(s) not found in the sites table: {', '.join(missing)}")
+
+    teardown = DNSTeardown(automator, FleetChangeState(args.state_file), max_workers=args.workers)
+    try:
+        summary = teardown.run(sites)
+    except FleetChangeError as e:
+        parser.error(str(e))
+
+    if summary.get("failed"):
+        logger.info(f"   Re-run the same command to resume the failed sites from {args.state_file}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""Per-job accounting of outbound API calls, bytes and time"""
+
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+# Path segments that identify a resource rather than an operation (Cloudflare IDs, UUIDs, numbers)
+_ID_SEGMENT = re.compile(r"^(?:[0-9a-f]{32}|[0-9a-f-]{36}|\d+)$", re.IGNORECASE)
+
+
+class Call:
+    """One call being tracked; clients fill in bytes and errors"""
+
+    __slots__ = ("sent", "received", "error")
+
+    def __init__(self):
+        self.sent = 0
+        self.received = 0
+        self.error = False
+
+
+class CallLedger:
+    """
+    Counts calls, errors, bytes and seconds per provider and operation
+
+    A job opens a ledger with ledger_scope(); service clients report each
+    call with track(), which records into the ledger of the current thread
+    (context) and does nothing outside a job. Work done on other threads
+    (e.g. the write-behind status flusher) is not attributed to the job.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        provider: str,
+        operation: str,
+        seconds: float,
+        sent: int = 0,
+        received: int = 0,
+        error: bool = False
+    ) -> None:
+        """
+        Add one call
+
+        Args:
+            provider: cloudflare, namecheap, spaceship, supabase, ...
+            operation: Operation name, e.g. "GET zones/:id/dns_records"
+            seconds: Wall time of the call
+            sent: Request bytes
+            received: Response bytes
+            error: Whether the call failed
+        """
+        with self._lock:
+            entry = self._entries.setdefault(provider, {}).setdefault(
+                operation, {"calls": 0, "errors": 0, "seconds": 0.0, "bytes_sent": 0, "bytes_received": 0}
+            )
+            entry["calls"] += 1
+            entry["errors"] += int(error)
+            entry["seconds"] += seconds
+            entry["bytes_sent"] += sent
+            entry["bytes_received"] += received
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        JSON summary, as stored in workflow_executions.metadata["calls"]
+
+        Returns:
+            {"total_calls", "total_seconds", "providers": {provider: {operation: counters}}}
+        """
+        with self._lock:
+            providers = {
+                provider: {
+                    operation: {**entry, "seconds": round(entry["seconds"], 3)}
+                    for operation, entry in operations.items()
+                }
+                for provider, operations in self._entries.items()
+            }
+
+        entries = [entry for operations in providers.values() for entry in operations.values()]
+        return {
+            "total_calls": sum(entry["calls"] for entry in entries),
+            "total_seconds": round(sum(entry["seconds"] for entry in entries), 3),
+            "providers": providers,
+        }
+
+
+_current: ContextVar[Optional[CallLedger]] = ContextVar("call_ledger", default=None)
+
+
+def current_ledger() -> Optional[CallLedger]:
+    """Ledger of the running job, if any"""
+    return _current.get()
+
+
+@contextmanager
+def ledger_scope(ledger: Optional[CallLedger] = None) -> Iterator[CallLedger]:
+    """
+    Record the calls of a block
+
+    Args:
+        ledger: Ledger to record into; a new one by default
+
+    Yields:
+        The ledger
+    """
+    ledger = ledger or CallLedger()
+    token = _current.set(ledger)
+    try:
+        yield ledger
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def track(provider: str, operation: str) -> Iterator[Call]:
+    """
+    Time one outbound call and record it in the current ledger
+
+    An exception escaping the block counts as an error.
+
+    Args:
+        provider: Provider name
+        operation: Operation name
+
+    Yields:
+        Call whose sent, received and error the caller may set
+    """
+    call = Call()
+    start = time.perf_counter()
+    try:
+        yield call
+    except BaseException:
+        call.error = True
+        raise
+    finally:
+        ledger = _current.get()
+        if ledger is not None:
+            ledger.record(provider, operation, time.perf_counter() - start, call.sent, call.received, call.error)
+
+
+def url_operation(method: str, url: str, prefix: str = "") -> str:
+    """
+    Operation name of a REST call, with resource IDs replaced by ":id"
+
+    Args:
+        method: HTTP method
+        url: Request URL
+        prefix: Path prefix to drop, e.g. "/client/v4/"
+
+    Returns:
+        e.g. "GET zones/:id/dns_records"
+    """
+    path = urlsplit(url).path
+    if prefix and path.startswith(prefix):
+        path = path[len(prefix):]
+    segments = [":id" if _ID_SEGMENT.match(segment) else segment for segment in path.strip("/").split("/")]
+    return f"{method.upper()} {'/'.join(segments)}"
+
+
+def instrument_httpx(session, provider: str, prefix: str = "") -> None:
+    """
+    Record every request of an httpx client (e.g. the PostgREST session) in the current ledger
+
+    Args:
+        session: httpx.Client
+        provider: Provider name
+        prefix: Path prefix to drop from operation names
+    """
+    def on_request(request):
+        request.extensions["ledger_started"] = time.perf_counter()
+
+    def on_response(response):
+        ledger = _current.get()
+        request = response.request
+        started = request.extensions.get("ledger_started")
+        if ledger is None or started is None:
+            return
+        body = response.read()
+        ledger.record(
+            provider,
+            url_operation(request.method, str(request.url), prefix),
+            time.perf_counter() - started,
+            int(request.headers.get("content-length", 0)),
+            len(body),
+            response.status_code >= 400
+        )
+
+    session.event_hooks["request"].append(on_request)
+    session.event_hooks["response"].append(on_response)
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    if not values:
+        return 0
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def aggregate(executions: Iterable[Dict[str, Any]], top: int = 10) -> Dict[str, Any]:
+    """
+    Combine the ledgers of many jobs into a report
+
+    Args:
+        executions: workflow_executions rows with site_id and metadata
+        top: Number of most expensive sites listed
+
+    Returns:
+        Jobs, calls per job (mean, p50, p95, max), totals per provider and
+        operation, and the sites with the most calls
+    """
+    providers: Dict[str, Dict[str, Dict[str, float]]] = {}
+    per_job: List[int] = []
+    sites: Dict[str, int] = {}
+
+    for execution in executions:
+        calls = (execution.get("metadata") or {}).get("calls")
+        if not calls:
+            continue
+
+        per_job.append(calls.get("total_calls", 0))
+        site_id = execution.get("site_id")
+        sites[site_id] = max(sites.get(site_id, 0), calls.get("total_calls", 0))
+
+        for provider, operations in calls.get("providers", {}).items():
+            for operation, entry in operations.items():
+                total = providers.setdefault(provider, {}).setdefault(operation, {})
+                for counter, value in entry.items():
+                    total[counter] = total.get(counter, 0) + value
+
+    for operations in providers.values():
+        for entry in operations.values():
+            entry["seconds"] = round(entry.get("seconds", 0), 3)
+            entry["calls_per_job"] = round(entry.get("calls", 0) / len(per_job), 2)
+
+    per_job.sort()
+    expensive = sorted(sites.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "jobs": len(per_job),
+        "calls_per_job": {
+            "mean": round(sum(per_job) / len(per_job), 2) if per_job else 0,
+            "p50": _percentile(per_job, 0.5),
+            "p95": _percentile(per_job, 0.95),
+            "max": per_job[-1] if per_job else 0,
+        },
+        "providers": providers,
+        "most_expensive_sites": [{"site_id": site_id, "calls": calls} for site_id, calls in expensive],
+    }
@@ -0,0 +1,302 @@
+"""Record/replay of outbound provider traffic for repeatable offline runs"""
+
+import base64
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+RECORD = "record"
+REPLAY = "replay"
+# Replay without the recorded latency
+REPLAY_FAST = "replay-fast"
+MODES = (RECORD, REPLAY, REPLAY_FAST)
+
+# Query parameters and command arguments never written to a cassette
+SECRET_PARAMS = {"apikey", "api_key", "token_auth", "client_secret", "password", "access_token"}
+SECRET_ARGUMENT = re.compile(r"(?i)(--?[\w-]*(?:password|secret|token)[\w-]*[= ])('[^']*'|\"[^\"]*\"|\S+)")
+REDACTED = "***"
+
+# Response headers describing the wire encoding; recorded bodies are already decoded
+_ENCODING_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "set-cookie"}
+
+
+class CassetteError(Exception):
+    """Custom exception for cassette errors"""
+    pass
+
+
+def scrub_url(url: str) -> str:
+    """URL with secret query parameters replaced"""
+    parts = urlsplit(url)
+    query = [
+        (name, REDACTED if name.lower() in SECRET_PARAMS else value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+    ]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def scrub_command(command: str) -> str:
+    """Shell command with password, secret and token arguments replaced"""
+    return SECRET_ARGUMENT.sub(lambda m: m.group(1) + REDACTED, command)
+
+
+def _headers(headers) -> Dict[str, str]:
+    """Response headers worth replaying"""
+    return {name: value for name, value in headers.items() if name.lower() not in _ENCODING_HEADERS}
+
+
+class Cassette:
+    """
+    Records or replays outbound traffic while active
+
+    Covers HTTP through requests (Namecheap, Spaceship, Matomo and the
+    Cloudflare SDK), httpx (PostgREST) and paramiko exec_command. In record
+    mode every exchange is stored with its duration; in replay mode requests
+    are answered from the file, after the recorded duration (replay) or
+    immediately (replay-fast), and nothing leaves the machine.
+
+    Requests are matched by method and URL (or SSH command) in recorded
+    order; a request repeated more often than recorded gets the last
+    response again. Secret query parameters, command arguments and all
+    request headers are left out of the file.
+
+    Use as a context manager:
+        with Cassette("cassettes/site.json", "record"):
+            automator.process_site(site)
+    """
+
+    def __init__(self, path: str, mode: str = REPLAY):
+        """
+        Initialize cassette
+
+        Args:
+            path: Cassette file (JSON)
+            mode: record, replay or replay-fast
+        """
+        if mode not in MODES:
+            raise CassetteError(f"Unknown cassette mode: {mode}")
+
+        self.path = path
+        self.mode = mode
+        self.interactions: List[Dict[str, Any]] = []
+
+        self._lock = threading.Lock()
+        self._queues: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._last: Dict[str, Dict[str, Any]] = {}
+        self._patches: List[Tuple[Any, str, Any]] = []
+
+        if mode != RECORD:
+            self._load()
+
+    def _load(self) -> None:
+        """Read recorded interactions"""
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                self.interactions = json.load(fh)["interactions"]
+        except (OSError, ValueError, KeyError) as e:
+            raise CassetteError(f"Cannot read cassette {self.path}: {e}")
+
+        for interaction in self.interactions:
+            self._queues[interaction["key"]].append(interaction)
+
+    def save(self) -> None:
+        """Write recorded interactions"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as fh:
+            json.dump({"version": 1, "interactions": self.interactions}, fh, indent=1)
+        logger.info(f"📼 Recorded {len(self.interactions)} interaction(s) to {self.path}")
+
+    def _record(self, key: str, response: Dict[str, Any], elapsed: float) -> None:
+        """Store one exchange"""
+        with self._lock:
+            self.interactions.append({"key": key, "elapsed": round(elapsed, 6), "response": response})
+
+    def _play(self, key: str) -> Dict[str, Any]:
+        """Response recorded for a request, after its recorded latency"""
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue:
+                interaction = queue.popleft()
+                self._last[key] = interaction
+            elif key in self._last:
+                interaction = self._last[key]
+            else:
+                raise CassetteError(f"No recorded response for {key} in {self.path}")
+
+        if self.mode == REPLAY:
+            time.sleep(interaction["elapsed"])
+        return interaction["response"]
+
+    def _patch(self, owner: Any, name: str, replacement: Any) -> None:
+        """Replace an attribute until the cassette is ejected"""
+        self._patches.append((owner, name, getattr(owner, name)))
+        setattr(owner, name, replacement)
+
+    def __enter__(self) -> "Cassette":
+        self._patch_requests()
+        self._patch_httpx()
+        self._patch_paramiko()
+        logger.info(f"📼 Cassette {self.path} inserted ({self.mode})")
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for owner, name, original in reversed(self._patches):
+            setattr(owner, name, original)
+        self._patches = []
+        if self.mode == RECORD:
+            self.save()
+
+    def _patch_requests(self) -> None:
+        """Intercept requests (all sessions go through HTTPAdapter.send)"""
+        from requests import Response
+        from requests.adapters import HTTPAdapter
+        from requests.structures import CaseInsensitiveDict
+        from requests.utils import get_encoding_from_headers
+
+        original = HTTPAdapter.send
+        cassette = self
+
+        def send(adapter, request, *args, **kwargs):
+            key = f"{request.method} {scrub_url(request.url)}"
+            if cassette.mode == RECORD:
+                start = time.perf_counter()
+                response = original(adapter, request, *args, **kwargs)
+                cassette._record(key, {
+                    "status": response.status_code,
+                    "reason": response.reason,
+                    "headers": _headers(response.headers),
+                    "body": base64.b64encode(response.content).decode("ascii"),
+                }, time.perf_counter() - start)
+                return response
+
+            recorded = cassette._play(key)
+            response = Response()
+            response.status_code = recorded["status"]
+            response.reason = recorded["reason"]
+            response.headers = CaseInsensitiveDict(recorded["headers"])
+            response.encoding = get_encoding_from_headers(response.headers)
+            response._content = base64.b64decode(recorded["body"])
+            response.url = request.url
+            response.request = request
+            return response
+
+        self._patch(HTTPAdapter, "send", send)
+
+    def _patch_httpx(self) -> None:
+        """Intercept httpx clients (PostgREST)"""
+        try:
+            import httpx
+        except ImportError:
+            return
+
+        original = httpx.Client.send
+        cassette = self
+
+        def send(client, request, *args, **kwargs):
+            key = f"{request.method} {scrub_url(str(request.url))}"
+            if cassette.mode == RECORD:
+                start = time.perf_counter()
+                response = original(client, request, *args, **kwargs)
+                response.read()
+                cassette._record(key, {
+                    "status": response.status_code,
+                    "headers": _headers(response.headers),
+                    "body": base64.b64encode(response.content).decode("ascii"),
+                }, time.perf_counter() - start)
+                return response
+
+            recorded = cassette._play(key)
+            return httpx.Response(
+                recorded["status"],
+                headers=recorded["headers"],
+                content=base64.b64decode(recorded["body"]),
+                request=request
+            )
+
+        self._patch(httpx.Client, "send", send)
+
+    def _patch_paramiko(self) -> None:
+        """Intercept SSH connections and commands"""
+        try:
+            from paramiko import SSHClient
+        except ImportError:
+            return
+
+        connect = SSHClient.connect
+        exec_command = SSHClient.exec_command
+        cassette = self
+
+        def patched_connect(client, *args, **kwargs):
+            if cassette.mode == RECORD:
+                return connect(client, *args, **kwargs)
+
+        def patched_exec_command(client, command, *args, **kwargs):
+            key = f"SSH {scrub_command(command)}"
+            if cassette.mode == RECORD:
+                start = time.perf_counter()
+                stdin, stdout, stderr = exec_command(client, command, *args, **kwargs)
+                out, err = stdout.read(), stderr.read()
+                status = stdout.channel.recv_exit_status()
+                cassette._record(key, {
+                    "stdout": base64.b64encode(out).decode("ascii"),
+                    "stderr": base64.b64encode(err).decode("ascii"),
+                    "exit_status": status,
+                }, time.perf_counter() - start)
+            else:
+                recorded = cassette._play(key)
+                out = base64.b64decode(recorded["stdout"])
+                err = base64.b64decode(recorded["stderr"])
+                status = recorded["exit_status"]
+            return _RecordedStream(b"", status), _RecordedStream(out, status), _RecordedStream(err, status)
+
+        self._patch(SSHClient, "connect", patched_connect)
+        self._patch(SSHClient, "exec_command", patched_exec_command)
+
+
+class _RecordedChannel:
+    """Channel stand-in reporting a recorded exit status"""
+
+    def __init__(self, exit_status: int):
+        self.exit_status = exit_status
+
+    def recv_exit_status(self) -> int:
+        return self.exit_status
+
+
+class _RecordedStream:
+    """File-like stand-in for the stdin/stdout/stderr of exec_command"""
+
+    def __init__(self, data: bytes, exit_status: int):
+        self._data = data
+        self.channel = _RecordedChannel(exit_status)
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._data if size < 0 else self._data[:size]
+        self._data = self._data[len(data):]
+        return data
+
+    def readlines(self) -> List[str]:
+        return self.read().decode().splitlines(keepends=True)
+
+    def write(self, data) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def from_env() -> Optional[Cassette]:
+    """Cassette configured by CASSETTE_PATH and CASSETTE_MODE (default replay), if any"""
+    path = os.environ.get("CASSETTE_PATH")
+    if not path:
+        return None
+    return Cassette(path, os.environ.get("CASSETTE_MODE", REPLAY))
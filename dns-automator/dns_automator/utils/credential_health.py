@@ -0,0 +1,68 @@
+"""Cached view of failed credential audits, so jobs skip bad credentials up front"""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Tables checked by the credential audit (see audit.py and migration 016)
+CLOUDFLARE_ACCOUNTS = "cloudflare_accounts"
+REGISTRAR_CREDENTIALS = "registrar_credentials"
+INFRASTRUCTURE_CREDENTIALS = "infrastructure_credentials"
+AUDITED_TABLES = (CLOUDFLARE_ACCOUNTS, REGISTRAR_CREDENTIALS, INFRASTRUCTURE_CREDENTIALS)
+
+
+class CredentialHealth:
+    """
+    Credentials whose latest audit failed, reloaded at most every refresh_interval
+
+    Credentials never audited, or whose result expired, count as healthy, so
+    nothing is skipped before the audit has run.
+    """
+
+    def __init__(self, data_client, refresh_interval: float = 60.0):
+        """
+        Initialize view
+
+        Args:
+            data_client: SupabaseService providing fetch_failed_credentials
+            refresh_interval: Seconds a table's failures are reused
+        """
+        self.data_client = data_client
+        self.refresh_interval = refresh_interval
+        self._failed: Dict[str, Tuple[float, Dict[str, str]]] = {}
+        self._lock = threading.Lock()
+
+    def failed(self, table: str) -> Dict[str, str]:
+        """
+        Failed credentials of a table
+
+        Args:
+            table: Audited credentials table
+
+        Returns:
+            Audit error per credential ID
+        """
+        with self._lock:
+            cached = self._failed.get(table)
+            if cached and time.monotonic() - cached[0] < self.refresh_interval:
+                return cached[1]
+
+        failures = self.data_client.fetch_failed_credentials(table)
+        with self._lock:
+            self._failed[table] = (time.monotonic(), failures)
+        return failures
+
+    def problem(self, table: str, credential_id: Optional[str]) -> Optional[str]:
+        """
+        Audit error of a credential
+
+        Args:
+            table: Audited credentials table
+            credential_id: Row ID of the credential
+
+        Returns:
+            Error of the failed audit, or None if the credential may be used
+        """
+        if not credential_id:
+            return None
+        return self.failed(table).get(credential_id)
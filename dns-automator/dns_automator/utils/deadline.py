@@ -0,0 +1,108 @@
+"""Per-job deadlines propagated into client calls as shrinking timeouts"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+
+class DeadlineExceeded(Exception):
+    """Custom exception for jobs that ran out of their time budget"""
+    pass
+
+
+class Deadline:
+    """
+    Time budget of one job
+
+    Clients do not take the deadline as an argument: a job opens it with
+    deadline_scope() and every outbound call asks call_timeout() for its
+    timeout, which is the call's usual timeout cut down to what is left of
+    the budget. Once the budget is spent, calls fail immediately.
+    """
+
+    def __init__(self, budget: float, label: str = ""):
+        """
+        Initialize deadline
+
+        Args:
+            budget: Seconds the job may take
+            label: What the deadline belongs to, for messages
+        """
+        self.budget = budget
+        self.label = label
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        """Seconds left, never negative"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        """Whether the budget is spent"""
+        return time.monotonic() >= self.expires_at
+
+    def timeout(self, default: Optional[float] = None) -> float:
+        """
+        Timeout for the next call
+
+        Args:
+            default: The call's usual timeout; None for calls without one
+
+        Returns:
+            default, or the remaining budget if that is shorter
+
+        Raises:
+            DeadlineExceeded: If the budget is spent
+        """
+        remaining = self.expires_at - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"{self.label or 'Job'} exceeded its {self.budget:g}s budget")
+        return remaining if default is None else min(default, remaining)
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Deadline of the running job, if any"""
+    return _current.get()
+
+
+def call_timeout(default: Optional[float] = None) -> Optional[float]:
+    """
+    Timeout for an outbound call under the current deadline
+
+    Args:
+        default: The call's usual timeout; None for calls without one
+
+    Returns:
+        Timeout in seconds (default when no deadline is set)
+
+    Raises:
+        DeadlineExceeded: If the current deadline has passed
+    """
+    deadline = _current.get()
+    return default if deadline is None else deadline.timeout(default)
+
+
+@contextmanager
+def deadline_scope(budget: Optional[float], label: str = "") -> Iterator[Optional[Deadline]]:
+    """
+    Run a block under a deadline
+
+    The deadline is bound to the current thread (context); threads started
+    inside the block do not inherit it.
+
+    Args:
+        budget: Seconds the block may take; None or 0 for no deadline
+        label: What the deadline belongs to, for messages
+
+    Yields:
+        The Deadline, or None without a budget
+    """
+    deadline = Deadline(budget, label) if budget else None
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
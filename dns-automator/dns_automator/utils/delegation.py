@@ -0,0 +1,66 @@
+"""Checks whether a domain's public delegation points at the expected nameservers"""
+
+import logging
+from typing import List, Optional
+
+import requests
+
+from .call_ledger import track
+from .deadline import call_timeout
+from .nameservers import nameserver_key
+
+logger = logging.getLogger(__name__)
+
+# DNS-over-HTTPS JSON endpoint used to resolve NS records
+DOH_URL = "https://cloudflare-dns.com/dns-query"
+
+# DNS record type number of NS records in DoH answers
+NS_TYPE = 2
+
+
+def resolve_nameservers(domain: str, doh_url: str = DOH_URL, session=None) -> Optional[List[str]]:
+    """
+    Resolve the NS records of a domain through DNS-over-HTTPS
+
+    Args:
+        domain: Domain name
+        doh_url: DoH JSON endpoint
+        session: Optional requests session
+
+    Returns:
+        Nameservers, an empty list if the domain has none, or None if the lookup failed
+    """
+    http = session or requests
+    try:
+        with track("doh", "NS") as call:
+            response = http.get(
+                doh_url,
+                params={"name": domain, "type": "NS"},
+                headers={"accept": "application/dns-json"},
+                timeout=call_timeout(10)
+            )
+            call.received = len(response.content)
+            response.raise_for_status()
+            answer = response.json().get("Answer") or []
+    except (requests.RequestException, ValueError) as e:
+        logger.warning(f"⚠️  NS lookup of {domain} failed: {e}")
+        return None
+
+    return [record["data"] for record in answer if record.get("type") == NS_TYPE]
+
+
+def is_delegated(domain: str, expected: List[str], doh_url: str = DOH_URL, session=None) -> bool:
+    """
+    Whether public DNS already resolves a domain to the expected nameservers
+
+    Args:
+        domain: Domain name
+        expected: Nameservers the domain should be delegated to
+        doh_url: DoH JSON endpoint
+        session: Optional requests session
+
+    Returns:
+        True if the resolved NS set equals the expected one
+    """
+    resolved = resolve_nameservers(domain, doh_url, session)
+    return bool(resolved) and nameserver_key(resolved) == nameserver_key(expected)
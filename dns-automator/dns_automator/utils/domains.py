@@ -0,0 +1,163 @@
+"""Public-suffix-aware domain parsing"""
+
+import os
+from functools import lru_cache
+from typing import Dict, Iterable, NamedTuple, Optional
+
+# ICANN section of the Public Suffix List (https://publicsuffix.org/list/);
+# refresh by replacing the file with a newer copy of that section
+SUFFIX_LIST_PATH = os.path.join(os.path.dirname(__file__), "public_suffix_list.dat")
+
+# Trie node markers: a rule ends at this node / an exception rule ends here
+_END = ""
+_EXCEPTION = "!"
+_WILDCARD = "*"
+
+Trie = Dict[str, "Trie"]
+
+
+class DomainParts(NamedTuple):
+    """
+    A domain split at its public suffix
+
+    For "www.example.co.uk": sld="example", tld="co.uk",
+    registrable="example.co.uk". sld and registrable are empty when the name
+    is itself a public suffix (e.g. "co.uk").
+    """
+    sld: str
+    tld: str
+    registrable: str
+
+
+def compile_rules(lines: Iterable[str]) -> Trie:
+    """
+    Build a suffix trie from Public Suffix List lines
+
+    Labels are stored right to left, so "co.uk" is root["uk"]["co"].
+    Internationalized rules are added in both Unicode and punycode form.
+
+    Args:
+        lines: Lines of the list; comments and blank lines are skipped
+
+    Returns:
+        Root node of the trie
+    """
+    root: Trie = {}
+    for line in lines:
+        rule = line.strip().split(" ", 1)[0].lower()
+        if not rule or rule.startswith("//"):
+            continue
+
+        exception = rule.startswith(_EXCEPTION)
+        name = rule.lstrip(_EXCEPTION)
+        forms = [name]
+        if not name.isascii():
+            try:
+                forms.append(name.encode("idna").decode("ascii"))
+            except UnicodeError:
+                pass
+
+        for form in forms:
+            node = root
+            for label in reversed(form.split(".")):
+                node = node.setdefault(label, {})
+            node[_EXCEPTION if exception else _END] = {}
+    return root
+
+
+_trie: Optional[Trie] = None
+
+
+def _load() -> Trie:
+    """Compile the bundled list once"""
+    global _trie
+    if _trie is None:
+        with open(SUFFIX_LIST_PATH, encoding="utf-8") as fh:
+            _trie = compile_rules(fh)
+    return _trie
+
+
+def suffix_length(labels: list, trie: Trie) -> int:
+    """
+    Number of trailing labels forming the public suffix
+
+    Follows the list's algorithm: the longest matching rule wins, an
+    exception rule removes its leftmost label, and an unlisted TLD is a
+    suffix of its own (the implicit "*" rule).
+
+    Args:
+        labels: Domain labels, left to right
+        trie: Compiled rules
+
+    Returns:
+        Suffix length in labels
+    """
+    length = 1
+    node = trie
+    for depth, label in enumerate(reversed(labels), 1):
+        child = node.get(label)
+        wildcard = node.get(_WILDCARD)
+
+        if child is not None:
+            if _EXCEPTION in child:
+                return depth - 1
+            if _END in child or wildcard is not None:
+                length = depth
+            node = child
+        elif wildcard is not None:
+            length = depth
+            node = wildcard
+        else:
+            break
+    return length
+
+
+@lru_cache(maxsize=65536)
+def split(domain: str) -> DomainParts:
+    """
+    Split a domain into registrar SLD, public suffix and registrable domain
+
+    Args:
+        domain: Domain or host name, e.g. "www.example.co.uk"
+
+    Returns:
+        DomainParts; sld and registrable are empty if the name has no label
+        left of its public suffix
+    """
+    labels = domain.strip().rstrip(".").lower().split(".")
+    if not all(labels):
+        return DomainParts("", "", "")
+
+    length = suffix_length(labels, _load())
+    tld = ".".join(labels[-length:])
+    if len(labels) <= length:
+        return DomainParts("", tld, "")
+
+    sld = labels[-length - 1]
+    return DomainParts(sld, tld, f"{sld}.{tld}")
+
+
+def registrable_domain(domain: str) -> str:
+    """Registrable domain of a name ("" if there is none), e.g. example.co.uk for www.example.co.uk"""
+    return split(domain).registrable
+
+
+def record_name(name: str, zone: str) -> str:
+    """
+    Fully qualified DNS record name for a name relative to a zone
+
+    Args:
+        name: "@", a relative name ("www") or a name already inside the zone
+        zone: Zone name (registrable domain)
+
+    Returns:
+        Fully qualified name, e.g. www.example.co.uk
+    """
+    name = name.strip().rstrip(".").lower()
+    zone = zone.rstrip(".").lower()
+
+    if name in ("@", "", zone):
+        return zone
+    if name.endswith(f".{zone}") and registrable_domain(name) == registrable_domain(zone):
+        return name
+    return f"{name}.{zone}"
@@ -0,0 +1,206 @@
+"""In-process event bus carrying job progress to API streams"""
+
+import asyncio
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class Subscription:
+    """
+    Queue of the events one consumer asked for
+
+    The queue is bounded: a consumer that falls behind loses events (counted
+    in dropped) instead of slowing down the jobs that publish them.
+    """
+
+    def __init__(self, bus: "EventBus", site_ids: Optional[Iterable[str]] = None, maxsize: int = 1000):
+        """
+        Initialize subscription
+
+        Args:
+            bus: Bus the subscription belongs to
+            site_ids: Only events of these sites; all events if None
+            maxsize: Events buffered before new ones are dropped
+        """
+        self.bus = bus
+        self.site_ids = set(site_ids) if site_ids is not None else None
+        self.queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize)
+        self.dropped = 0
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        """Whether the event belongs to a site of this subscription"""
+        return self.site_ids is None or event.get("site_id") in self.site_ids
+
+    def deliver(self, event: Dict[str, Any]) -> None:
+        """Queue an event without blocking the publisher"""
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Next event
+
+        Args:
+            timeout: Seconds to wait; 0 returns immediately
+
+        Returns:
+            Event, or None if none arrived in time
+        """
+        try:
+            if timeout == 0:
+                return self.queue.get_nowait()
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        """Stop receiving events"""
+        self.bus.unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class AsyncSubscription(Subscription):
+    """
+    Subscription read from an event loop
+
+    Events are handed to the loop with call_soon_threadsafe, so a reader
+    waits on an asyncio queue instead of holding a thread.
+    """
+
+    def __init__(
+        self,
+        bus: "EventBus",
+        loop: asyncio.AbstractEventLoop,
+        site_ids: Optional[Iterable[str]] = None,
+        maxsize: int = 1000
+    ):
+        """
+        Initialize subscription; must be called on the loop's thread
+
+        Args:
+            bus: Bus the subscription belongs to
+            loop: Event loop of the reader
+            site_ids: Only events of these sites; all events if None
+            maxsize: Events buffered before new ones are dropped
+        """
+        super().__init__(bus, site_ids, maxsize)
+        self.loop = loop
+        self.events: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize)
+
+    def deliver(self, event: Dict[str, Any]) -> None:
+        """Hand an event to the reader's loop"""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # Loop already closed; the reader is gone
+            self.dropped += 1
+
+    def _put(self, event: Dict[str, Any]) -> None:
+        try:
+            self.events.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def next(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Next event
+
+        Args:
+            timeout: Seconds to wait
+
+        Returns:
+            Event, or None if none arrived in time
+        """
+        try:
+            return await asyncio.wait_for(self.events.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBus:
+    """
+    Fans job progress events out to subscribers
+
+    Jobs publish from worker threads; API endpoints subscribe, optionally to
+    a set of sites, and read their subscription's queue. Events are plain
+    dicts with type, site_id and at (epoch seconds) plus event fields.
+    """
+
+    def __init__(self):
+        """Initialize with no subscribers"""
+        self._subscribers: List[Subscription] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, site_ids: Optional[Iterable[str]] = None, maxsize: int = 1000) -> Subscription:
+        """
+        Start receiving events
+
+        Args:
+            site_ids: Only events of these sites; all events if None
+            maxsize: Events buffered before new ones are dropped
+
+        Returns:
+            Subscription, to be closed when done
+        """
+        return self._add(Subscription(self, site_ids, maxsize))
+
+    def subscribe_async(self, site_ids: Optional[Iterable[str]] = None, maxsize: int = 1000) -> AsyncSubscription:
+        """
+        Start receiving events in the running event loop
+
+        Args:
+            site_ids: Only events of these sites; all events if None
+            maxsize: Events buffered before new ones are dropped
+
+        Returns:
+            AsyncSubscription, to be closed when done
+        """
+        return self._add(AsyncSubscription(self, asyncio.get_running_loop(), site_ids, maxsize))
+
+    def _add(self, subscription: Subscription) -> Subscription:
+        with self._lock:
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a subscription"""
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def publish(self, event_type: str, site_id: Optional[str] = None, **fields: Any) -> None:
+        """
+        Deliver an event to every matching subscriber without blocking
+
+        Args:
+            event_type: Event type, e.g. job_started, step, job_finished
+            site_id: Site the event belongs to
+            **fields: Event fields
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return
+
+        event = {"type": event_type, "site_id": site_id, "at": round(time.time(), 3), **fields}
+        for subscription in subscribers:
+            if subscription.matches(event):
+                subscription.deliver(event)
+
+    def subscriber_count(self) -> int:
+        """Number of open subscriptions"""
+        with self._lock:
+            return len(self._subscribers)
+
+
+# Process-wide bus fed by the job progress calls of SupabaseService
+event_bus = EventBus()
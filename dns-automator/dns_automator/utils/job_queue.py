@@ -0,0 +1,377 @@
+"""Durable on-disk job queue (SQLite in WAL mode) with a worker pool"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Job states; queued and running jobs are unfinished and replayed after a restart
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    site_id TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_unfinished ON jobs(site_id, phase) WHERE state IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state, id);
+"""
+
+# Seconds between deletions of old finished jobs by a running worker
+PRUNE_INTERVAL = 3600.0
+
+
+class Job(NamedTuple):
+    """A queued unit of work: one phase for one site"""
+    id: int
+    site_id: str
+    phase: str
+    attempts: int
+    created_at: float
+
+
+class JobQueue:
+    """
+    Durable queue of (site_id, phase) jobs
+
+    Only site IDs are stored, never credentials. The database runs in WAL mode
+    with synchronous=NORMAL: commits append to the log without an fsync, so
+    enqueueing stays cheap, and committed jobs survive a process or container
+    restart. At most one unfinished job exists per site and phase.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the queue database
+
+        Args:
+            path: SQLite file; use a persistent volume in containers
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def enqueue(self, site_id: str, phase: str) -> Tuple[int, bool]:
+        """
+        Add a job unless an unfinished one exists for the site and phase
+
+        Args:
+            site_id: UUID of the site ("*" for all pending sites)
+            phase: Workflow phase
+
+        Returns:
+            Tuple of (job ID, whether a new job was created)
+        """
+        now = time.time()
+        with self._lock:
+            try:
+                cursor = self._db.execute(
+                    "INSERT INTO jobs (site_id, phase, state, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (site_id, phase, QUEUED, now, now)
+                )
+                return cursor.lastrowid, True
+            except sqlite3.IntegrityError:
+                row = self._db.execute(
+                    "SELECT id FROM jobs WHERE site_id = ? AND phase = ? AND state IN (?, ?)",
+                    (site_id, phase, QUEUED, RUNNING)
+                ).fetchone()
+                return row[0], False
+
+    def claim_next(self) -> Optional[Job]:
+        """
+        Move the oldest queued job to running
+
+        Returns:
+            The job, or None if the queue is empty
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT id, site_id, phase, attempts, created_at FROM jobs WHERE state = ? ORDER BY id LIMIT 1",
+                    (QUEUED,)
+                ).fetchone()
+                if row is None:
+                    return None
+
+                self._db.execute(
+                    "UPDATE jobs SET state = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (RUNNING, time.time(), row[0])
+                )
+                return Job(row[0], row[1], row[2], row[3] + 1, row[4])
+            finally:
+                self._db.execute("COMMIT")
+
+    def finish(self, job_id: int, success: bool, error: Optional[str] = None) -> None:
+        """
+        Record the outcome of a job
+
+        Args:
+            job_id: Job ID
+            success: Whether the job succeeded
+            error: Error message of a failed job
+        """
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET state = ?, error = ?, updated_at = ? WHERE id = ?",
+                (DONE if success else FAILED, error, time.time(), job_id)
+            )
+
+    def requeue_running(self) -> int:
+        """
+        Put jobs that were running when the process stopped back in the queue
+
+        Returns:
+            Number of jobs requeued
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET state = ?, updated_at = ? WHERE state = ?",
+                (QUEUED, time.time(), RUNNING)
+            )
+            return cursor.rowcount
+
+    def prune(self, max_age_seconds: float) -> int:
+        """
+        Delete finished jobs older than max_age_seconds
+
+        Returns:
+            Number of jobs deleted
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM jobs WHERE state IN (?, ?) AND updated_at < ?",
+                (DONE, FAILED, time.time() - max_age_seconds)
+            )
+            return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per state"""
+        with self._lock:
+            rows = self._db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        return dict(rows)
+
+    def stats(self, window_seconds: float) -> Dict[str, Any]:
+        """
+        Backlog and recent output of the queue
+
+        Args:
+            window_seconds: Look-back for finished jobs
+
+        Returns:
+            queued, running, oldest_queued_at (epoch seconds or None), and
+            done and failed jobs finished within the window
+        """
+        with self._lock:
+            unfinished = self._db.execute(
+                "SELECT state, COUNT(*), MIN(created_at) FROM jobs WHERE state IN (?, ?) GROUP BY state",
+                (QUEUED, RUNNING)
+            ).fetchall()
+            finished = self._db.execute(
+                "SELECT state, COUNT(*) FROM jobs WHERE state IN (?, ?) AND updated_at >= ? GROUP BY state",
+                (DONE, FAILED, time.time() - window_seconds)
+            ).fetchall()
+
+        counts = {state: (count, oldest) for state, count, oldest in unfinished}
+        recent = dict(finished)
+        return {
+            "queued": counts.get(QUEUED, (0, None))[0],
+            "running": counts.get(RUNNING, (0, None))[0],
+            "oldest_queued_at": counts.get(QUEUED, (0, None))[1],
+            "done": recent.get(DONE, 0),
+            "failed": recent.get(FAILED, 0),
+        }
+
+    def unfinished(self) -> List[Job]:
+        """Queued and running jobs, oldest first"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, site_id, phase, attempts, created_at FROM jobs WHERE state IN (?, ?) ORDER BY id",
+                (QUEUED, RUNNING)
+            ).fetchall()
+        return [Job(*row) for row in rows]
+
+    def close(self) -> None:
+        """Close the database"""
+        with self._lock:
+            self._db.close()
+
+
+class JobWorker:
+    """
+    Runs queued jobs on a pool of threads
+
+    Unfinished jobs from a previous process are replayed when the worker
+    starts. submit() returns a future resolved with the handler's result, so
+    callers can wait for a job (a duplicate submission gets the same future).
+    Finished jobs older than retention_seconds are deleted on start and then
+    every PRUNE_INTERVAL seconds.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handler: Callable[[Job], bool],
+        workers: int = 1,
+        max_attempts: int = 3,
+        retention_seconds: float = 0
+    ):
+        """
+        Initialize worker
+
+        Args:
+            queue: Job queue
+            handler: Runs a job and returns whether it succeeded
+            workers: Jobs run in parallel
+            max_attempts: Runs of a job (including replays) before it is given up
+            retention_seconds: Age after which finished jobs are deleted (0 keeps them)
+        """
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retention_seconds = retention_seconds
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._futures: Dict[int, Future] = {}
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._active = 0
+        self._pruned_at = 0.0
+
+    def start(self) -> None:
+        """Replay unfinished jobs and start the worker threads"""
+        replayed = self.queue.requeue_running()
+        pending = len(self.queue.unfinished())
+        if pending:
+            logger.info(f"♻️  Replaying {pending} unfinished job(s) from {self.queue.path} ({replayed} were running)")
+
+        self._prune()
+
+        self._stopping = False
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, site_id: str, phase: str) -> Tuple[Future, bool]:
+        """
+        Enqueue a job, or attach to the unfinished job for the same site and phase
+
+        Args:
+            site_id: UUID of the site
+            phase: Workflow phase
+
+        Returns:
+            Tuple of (future with the handler's result, whether a new job was created)
+        """
+        with self._lock:
+            job_id, created = self.queue.enqueue(site_id, phase)
+            future = self._futures.get(job_id)
+            if future is None:
+                future = Future()
+                self._futures[job_id] = future
+            self._wakeup.notify()
+        return future, created
+
+    def active(self) -> int:
+        """Worker threads currently running a job"""
+        with self._lock:
+            return self._active
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop taking new jobs and wait for running ones
+
+        Jobs still queued stay in the database and are replayed on next start.
+
+        Args:
+            timeout: Seconds to wait for each worker thread
+        """
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _prune(self) -> None:
+        """Delete finished jobs past their retention"""
+        self._pruned_at = time.monotonic()
+        if not self.retention_seconds:
+            return
+        try:
+            pruned = self.queue.prune(self.retention_seconds)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️  Failed to prune finished jobs: {e}")
+            return
+        if pruned:
+            logger.info(f"🧹 Pruned {pruned} finished job(s) older than {self.retention_seconds:g}s")
+
+    def _run(self) -> None:
+        """Worker loop"""
+        while True:
+            with self._lock:
+                if self._stopping:
+                    return
+                if time.monotonic() - self._pruned_at >= PRUNE_INTERVAL:
+                    self._prune()
+                job = self.queue.claim_next()
+                if job is None:
+                    self._wakeup.wait(timeout=1.0)
+                    continue
+                self._active += 1
+
+            try:
+                self._execute(job)
+            finally:
+                with self._lock:
+                    self._active -= 1
+
+    def _execute(self, job: Job) -> None:
+        """Run one job and publish its outcome"""
+        if job.attempts > self.max_attempts:
+            self._complete(job, False, f"Gave up after {self.max_attempts} attempts")
+            return
+
+        try:
+            success = bool(self.handler(job))
+        except Exception as e:
+            logger.error(f"❌ Job {job.id} ({job.phase} {job.site_id}) crashed: {type(e).__name__}: {e}")
+            self._complete(job, False, str(e), exception=e)
+            return
+
+        self._complete(job, success, None if success else "Job reported failure")
+
+    def _complete(self, job: Job, success: bool, error: Optional[str], exception: Optional[Exception] = None) -> None:
+        """Record the outcome and resolve the job's future"""
+        with self._lock:
+            self.queue.finish(job.id, success, error)
+            future = self._futures.pop(job.id, None)
+
+        if future is not None:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(success)
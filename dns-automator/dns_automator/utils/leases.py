@@ -0,0 +1,225 @@
+"""Lease-based site claims on active_processing, for running several replicas"""
+
+import logging
+import os
+import socket
+import threading
+import uuid
+from typing import Any, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# PostgREST error code for an unknown RPC function
+FUNCTION_NOT_FOUND = "PGRST202"
+
+
+def default_owner() -> str:
+    """Identity of this replica: hostname, process ID and a per-process nonce"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _ids(data: Optional[Iterable[Any]]) -> List[str]:
+    """Site IDs from a SETOF uuid RPC response (plain values or single-key rows)"""
+    ids = []
+    for item in data or []:
+        ids.append(next(iter(item.values())) if isinstance(item, dict) else item)
+    return ids
+
+
+class LeaseLostError(Exception):
+    """Custom exception for a site lease that another replica may have taken over"""
+    pass
+
+
+class LeaseManager:
+    """
+    Claims sites for one workflow phase and keeps the claims alive
+
+    A claim is a lease on the site's active_processing row that expires after
+    ttl seconds. While leases are held a heartbeat thread renews them every
+    heartbeat seconds; a lease that could not be renewed (it expired and
+    another replica took the site) is reported by lost(), and check() raises
+    LeaseLostError for it so a job stops before its next step. Without the
+    lease functions of migration 012 every claim succeeds, which is the
+    single replica behaviour.
+    """
+
+    def __init__(
+        self,
+        client,
+        phase: str,
+        ttl: float = 120.0,
+        heartbeat: Optional[float] = None,
+        owner: Optional[str] = None
+    ):
+        """
+        Initialize lease manager
+
+        Args:
+            client: Supabase client
+            phase: Workflow phase claimed (dns_setup, hosting_setup)
+            ttl: Lease duration in seconds
+            heartbeat: Seconds between renewals, a third of ttl by default
+            owner: Replica identity, generated by default
+        """
+        self.client = client
+        self.phase = phase
+        self.ttl = ttl
+        self.heartbeat = heartbeat or ttl / 3
+        self.owner = owner or default_owner()
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._held: Set[str] = set()
+        self._lost: Set[str] = set()
+        self._enabled = True
+
+    def _rpc(self, name: str, params: dict):
+        """Call a lease function; returns None when the functions are not installed"""
+        if not self._enabled:
+            return None
+        try:
+            return self.client.rpc(name, params).execute()
+        except Exception as e:
+            if getattr(e, "code", None) != FUNCTION_NOT_FOUND:
+                raise
+            logger.warning("⚠️  Lease functions not installed (migration 012), claims are not shared between replicas")
+            self._enabled = False
+            return None
+
+    def claim(self, site_id: str) -> bool:
+        """
+        Claim a single site
+
+        Args:
+            site_id: UUID of the site
+
+        Returns:
+            True if this replica now holds the site
+        """
+        response = self._rpc("claim_site", {
+            "p_site_id": site_id,
+            "p_phase": self.phase,
+            "p_owner": self.owner,
+            "p_ttl_seconds": int(self.ttl)
+        })
+        if response is not None and not response.data:
+            logger.info(f"🔒 Site {site_id} is claimed by another replica")
+            return False
+
+        self._hold([site_id])
+        return True
+
+    def claim_pending(self, limit: int) -> Optional[List[str]]:
+        """
+        Claim up to limit sites waiting for this phase
+
+        Args:
+            limit: Maximum sites to claim
+
+        Returns:
+            Claimed site IDs, or None if the lease functions are not installed
+        """
+        response = self._rpc("claim_pending_sites", {
+            "p_phase": self.phase,
+            "p_owner": self.owner,
+            "p_ttl_seconds": int(self.ttl),
+            "p_limit": limit
+        })
+        if response is None:
+            return None
+
+        site_ids = _ids(response.data)
+        self._hold(site_ids)
+        return site_ids
+
+    def release(self, site_id: str) -> None:
+        """
+        Give up a site once its job is done
+
+        Args:
+            site_id: UUID of the site
+        """
+        with self._lock:
+            self._held.discard(site_id)
+            self._lost.discard(site_id)
+
+        try:
+            self._rpc("release_site", {"p_site_id": site_id, "p_owner": self.owner})
+        except Exception as e:
+            # The lease simply expires
+            logger.warning(f"⚠️  Failed to release site {site_id}: {e}")
+
+    def holds(self, site_id: str) -> bool:
+        """Whether this replica holds the site"""
+        with self._lock:
+            return site_id in self._held
+
+    def lost(self, site_id: str) -> bool:
+        """Whether the lease on a site could not be renewed"""
+        with self._lock:
+            return site_id in self._lost
+
+    def check(self, site_id: str) -> None:
+        """
+        Make sure this replica still holds a site before its next step
+
+        Args:
+            site_id: UUID of the site
+
+        Raises:
+            LeaseLostError: If the lease could not be renewed
+        """
+        if self.lost(site_id):
+            raise LeaseLostError(f"Lost the lease on site {site_id}, another replica may be processing it")
+
+    def close(self) -> None:
+        """Stop the heartbeat and release every held site"""
+        self._stop.set()
+        with self._lock:
+            held = list(self._held)
+        for site_id in held:
+            self.release(site_id)
+
+    def _hold(self, site_ids: List[str]) -> None:
+        """Track claimed sites and make sure the heartbeat runs"""
+        if not site_ids:
+            return
+
+        with self._lock:
+            self._held.update(site_ids)
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="lease-heartbeat", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        """Heartbeat loop; exits once no lease is held"""
+        while not self._stop.wait(self.heartbeat):
+            with self._lock:
+                held = list(self._held)
+                if not held:
+                    self._thread = None
+                    return
+
+            try:
+                response = self._rpc("renew_site_leases", {
+                    "p_site_ids": held,
+                    "p_owner": self.owner,
+                    "p_ttl_seconds": int(self.ttl)
+                })
+            except Exception as e:
+                logger.warning(f"⚠️  Lease renewal failed, retrying in {self.heartbeat:.0f}s: {e}")
+                continue
+
+            if response is None:
+                continue
+
+            renewed = set(_ids(response.data))
+            with self._lock:
+                for site_id in set(held) - renewed:
+                    if site_id in self._held and site_id not in self._lost:
+                        logger.warning(f"⚠️  Lost the lease on site {site_id}, another replica may take it over")
+                        self._lost.add(site_id)
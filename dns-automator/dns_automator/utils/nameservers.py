@@ -0,0 +1,110 @@
+"""Prediction of the nameserver pair Cloudflare assigns to new zones of an account"""
+
+import threading
+from collections import Counter, deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+
+def nameserver_key(nameservers: Iterable[str]) -> Tuple[str, ...]:
+    """Order- and case-insensitive form of a nameserver set, for comparisons"""
+    return tuple(sorted(ns.lower().rstrip(".") for ns in nameservers))
+
+
+class NameserverPredictor:
+    """
+    Remembers the nameservers Cloudflare assigned per account and predicts the next pair
+
+    Cloudflare usually gives every zone of an account the same pair, so once
+    an account has shown the same pair often enough, the registrar update of
+    a new site can start before create_zone returns. Only the most recent
+    observations of an account count, so a change of pair is picked up
+    quickly; a pair is only predicted while it clearly dominates them.
+    """
+
+    def __init__(self, history: int = 20, min_observations: int = 2, min_share: float = 0.8):
+        """
+        Initialize predictor
+
+        Args:
+            history: Observations kept per account
+            min_observations: Observations of a pair before it is predicted
+            min_share: Share of the kept observations the pair must hold
+        """
+        self.history = history
+        self.min_observations = min_observations
+        self.min_share = min_share
+        self.hits = 0
+        self.misses = 0
+        self._observed: Dict[str, Deque[Tuple[str, ...]]] = {}
+        self._lock = threading.Lock()
+
+    def known(self, account_id: str) -> bool:
+        """Whether the account has been recorded or seeded"""
+        with self._lock:
+            return account_id in self._observed
+
+    def seed(self, account_id: str, pairs: Iterable[Iterable[str]]) -> None:
+        """
+        Load earlier observations of an account (e.g. from the sites table), oldest first
+
+        Args:
+            account_id: UUID of the cloudflare_accounts row
+            pairs: Nameserver lists of the account's zones
+        """
+        with self._lock:
+            observed = self._observed.setdefault(account_id, deque(maxlen=self.history))
+            for pair in pairs:
+                if pair:
+                    observed.append(nameserver_key(pair))
+
+    def record(self, account_id: str, nameservers: List[str], predicted: Optional[List[str]] = None) -> bool:
+        """
+        Record the nameservers a new zone of an account received
+
+        Args:
+            account_id: UUID of the cloudflare_accounts row
+            nameservers: Nameservers returned by create_zone
+            predicted: Pair predicted for this zone, if any
+
+        Returns:
+            Whether the prediction matched (False without one)
+        """
+        key = nameserver_key(nameservers)
+        with self._lock:
+            self._observed.setdefault(account_id, deque(maxlen=self.history)).append(key)
+            if predicted is None:
+                return False
+            matched = nameserver_key(predicted) == key
+            if matched:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return matched
+
+    def predict(self, account_id: str) -> Optional[List[str]]:
+        """
+        Nameserver pair the next zone of an account will most likely receive
+
+        Args:
+            account_id: UUID of the cloudflare_accounts row
+
+        Returns:
+            Nameservers, or None if the account has no dominant pair
+        """
+        with self._lock:
+            observed = self._observed.get(account_id)
+            if not observed:
+                return None
+            pair, count = Counter(observed).most_common(1)[0]
+            if count < self.min_observations or count / len(observed) < self.min_share:
+                return None
+            return list(pair)
+
+    def snapshot(self) -> Dict[str, int]:
+        """Prediction counters, for /health"""
+        with self._lock:
+            return {"accounts": len(self._observed), "hits": self.hits, "misses": self.misses}
+
+
+# Process-wide predictor fed by DNSAutomator.process_site and the zone prewarmer
+nameserver_predictor = NameserverPredictor()
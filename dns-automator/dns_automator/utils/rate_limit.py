@@ -0,0 +1,84 @@
+"""Rate limiting helpers for fanning out over provider APIs"""
+
+import threading
+import time
+from typing import Dict, Hashable
+
+
+class RateLimiter:
+    """Thread-safe token bucket limiting calls to a fixed rate per second"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Initialize rate limiter
+
+        Args:
+            rate: Sustained number of calls allowed per second
+            burst: Number of calls that may be made back-to-back
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Block until a call is allowed
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+
+                delay = (1 - self._tokens) / self.rate
+
+            time.sleep(delay)
+            waited += delay
+
+
+class RateLimiterRegistry:
+    """Hands out one shared RateLimiter per key (e.g. per API token)"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Initialize registry
+
+        Args:
+            rate: Calls per second for every limiter created
+            burst: Burst size for every limiter created
+        """
+        self.rate = rate
+        self.burst = burst
+        self._limiters: Dict[Hashable, RateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> RateLimiter:
+        """
+        Get the limiter for a key, creating it on first use
+
+        Args:
+            key: Limiter key
+
+        Returns:
+            RateLimiter instance
+        """
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = RateLimiter(self.rate, self.burst)
+                self._limiters[key] = limiter
+            return limiter
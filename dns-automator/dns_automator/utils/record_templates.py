@@ -0,0 +1,206 @@
+"""Declarative DNS record templates rendered per zone"""
+
+from dataclasses import dataclass, field
+from string import Template
+from typing import Any, Dict, List, Optional, Tuple
+
+from .domains import record_name
+
+BASE_TEMPLATE_NAME = "base"
+
+# Fields of a template record that are passed through to Cloudflare
+RECORD_FIELDS = ("type", "name", "content", "proxied", "ttl", "priority")
+
+# Record types that hold exactly one value per name; others (TXT, MX, ...) may repeat
+SINGLE_VALUE_TYPES = {"A", "AAAA", "CNAME"}
+
+
+class RecordTemplateError(Exception):
+    """Custom exception for invalid or unrenderable templates"""
+    pass
+
+
+@dataclass
+class RecordTemplate:
+    """A named set of DNS records containing ${variables}"""
+    name: str
+    records: List[Dict[str, Any]]
+    variables: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_assignment(cls, assignment: Dict[str, Any]) -> "RecordTemplate":
+        """
+        Build a template from a dns_template_assignments row with its embedded template
+
+        Args:
+            assignment: Row with "variables" and "dns_record_templates"
+
+        Returns:
+            RecordTemplate instance
+        """
+        template = assignment["dns_record_templates"]
+        return cls(
+            name=template["name"],
+            records=template.get("records") or [],
+            variables=assignment.get("variables") or {}
+        )
+
+    def render(self, variables: Dict[str, str]) -> List[Dict[str, Any]]:
+        """
+        Substitute variables into every record
+
+        Args:
+            variables: Built-in variables (domain, server_ip, ...); attachment variables take precedence
+
+        Returns:
+            List of rendered records
+        """
+        values = {**variables, **self.variables}
+        rendered = []
+
+        for record in self.records:
+            if not record.get("type") or not record.get("name") or "content" not in record:
+                raise RecordTemplateError(f"Template '{self.name}' has an incomplete record: {record}")
+
+            out = {}
+            for key in RECORD_FIELDS:
+                if key not in record:
+                    continue
+                value = record[key]
+                if isinstance(value, str):
+                    try:
+                        value = Template(value).substitute(values)
+                    except (KeyError, ValueError) as e:
+                        raise RecordTemplateError(f"Template '{self.name}' cannot render {key}={value!r}: {e}")
+                out[key] = value
+
+            out["type"] = out["type"].upper()
+            out.setdefault("proxied", False)
+            out.setdefault("ttl", 1)
+            rendered.append(out)
+
+        return rendered
+
+
+# Records the DNS Automator creates when no "base" template is stored in the database
+BASE_TEMPLATE = RecordTemplate(
+    name=BASE_TEMPLATE_NAME,
+    records=[
+        {"type": "A", "name": "@", "content": "${server_ip}", "proxied": True},
+        {"type": "A", "name": "www", "content": "${server_ip}", "proxied": True},
+    ]
+)
+
+
+def site_variables(site: Dict[str, Any], server_ip: str) -> Dict[str, str]:
+    """
+    Built-in template variables of a site
+
+    Args:
+        site: Site record
+        server_ip: IP address of the site's hosting server
+
+    Returns:
+        Variables available to every template
+    """
+    return {
+        "domain": site["domain"],
+        "server_ip": server_ip,
+        "site_id": site["id"],
+        "brand_name": site.get("brand_name") or ""
+    }
+
+
+def fqdn(name: str, domain: str) -> str:
+    """
+    Expand a relative record name (@, www) to a fully qualified name
+
+    Args:
+        name: Record name
+        domain: Zone name
+
+    Returns:
+        Fully qualified record name
+    """
+    return record_name(name, domain)
+
+
+def render_templates(
+    templates: List[RecordTemplate],
+    variables: Dict[str, str],
+    domain: str
+) -> List[Dict[str, Any]]:
+    """
+    Render templates into the final record list of a zone
+
+    The built-in base template is used unless one named "base" is given. Later
+    templates override earlier ones for single-value records (A, AAAA, CNAME)
+    with the same name; multi-value records are de-duplicated on content.
+
+    Args:
+        templates: Templates attached to the site
+        variables: Built-in variables
+        domain: Zone name
+
+    Returns:
+        List of records with fully qualified names
+    """
+    if not any(template.name == BASE_TEMPLATE_NAME for template in templates):
+        templates = [BASE_TEMPLATE] + list(templates)
+
+    records: Dict[Tuple[str, str, Optional[str]], Dict[str, Any]] = {}
+    for template in templates:
+        for record in template.render(variables):
+            record["name"] = fqdn(record["name"], domain)
+            key = record_key(record)
+            records[key] = record
+
+    return list(records.values())
+
+
+def record_key(record: Dict[str, Any]) -> Tuple[str, str, Optional[str]]:
+    """
+    Identity of a record when matching desired against existing records
+
+    Args:
+        record: DNS record with a fully qualified name
+
+    Returns:
+        (type, name, content) for multi-value types, (type, name, None) otherwise
+    """
+    record_type = record["type"].upper()
+    content = None if record_type in SINGLE_VALUE_TYPES else record["content"]
+    return record_type, record["name"].lower(), content
+
+
+def plan_batch(
+    desired: List[Dict[str, Any]],
+    existing: List[Dict[str, Any]]
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Diff desired records against a zone's existing records
+
+    Args:
+        desired: Rendered records
+        existing: Records currently in the zone
+
+    Returns:
+        Tuple of (records to create, patches with "id" for records to update)
+    """
+    existing_by_key = {record_key(record): record for record in existing}
+    posts, patches = [], []
+
+    for record in desired:
+        current = existing_by_key.get(record_key(record))
+        if current is None:
+            posts.append(record)
+            continue
+
+        changed = {
+            key: value for key, value in record.items()
+            if current.get(key) != value and key != "name"
+        }
+        if changed:
+            patches.append({"id": current["id"], **changed})
+
+    return posts, patches
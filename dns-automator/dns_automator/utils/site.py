@@ -0,0 +1,126 @@
+"""Compact site record used by the DNS pipelines"""
+
+from typing import Any, Dict, List, Optional
+
+
+class Site:
+    """
+    Immutable site record holding only the columns the DNS pipelines use
+
+    Uses __slots__ instead of a per-instance __dict__, so a batch of tens of
+    thousands of sites costs a fraction of the PostgREST row dicts. Supports
+    site["domain"] and site.get("registrar") so code written against row
+    dicts keeps working.
+    """
+
+    __slots__ = (
+        "id",
+        "domain",
+        "brand_name",
+        "cloudflare_account_id",
+        "server_id",
+        "registrar",
+        "status_dns",
+        "cloudflare_zone_id",
+        "cloudflare_nameservers",
+    )
+
+    # Column list for PostgREST select() calls
+    COLUMNS = ", ".join(__slots__)
+
+    def __init__(
+        self,
+        id: str,
+        domain: str,
+        brand_name: Optional[str] = None,
+        cloudflare_account_id: Optional[str] = None,
+        server_id: Optional[str] = None,
+        registrar: Optional[str] = None,
+        status_dns: Optional[str] = None,
+        cloudflare_zone_id: Optional[str] = None,
+        cloudflare_nameservers: Optional[List[str]] = None
+    ):
+        """
+        Initialize site record
+
+        Args:
+            id: UUID of the site
+            domain: Domain name
+            brand_name: Brand name used in record templates
+            cloudflare_account_id: UUID of the cloudflare_accounts row, if placed
+            server_id: UUID of the hosting server
+            registrar: Registrar detected for the domain
+            status_dns: DNS status
+            cloudflare_zone_id: Cloudflare zone ID, once the zone exists
+            cloudflare_nameservers: Nameservers Cloudflare assigned to the zone
+        """
+        setter = object.__setattr__
+        setter(self, "id", id)
+        setter(self, "domain", domain)
+        setter(self, "brand_name", brand_name)
+        setter(self, "cloudflare_account_id", cloudflare_account_id)
+        setter(self, "server_id", server_id)
+        setter(self, "registrar", registrar)
+        setter(self, "status_dns", status_dns)
+        setter(self, "cloudflare_zone_id", cloudflare_zone_id)
+        setter(self, "cloudflare_nameservers", cloudflare_nameservers)
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "Site":
+        """
+        Build a site from a PostgREST row without copying its values
+
+        The strings parsed from the response are referenced, not copied; other
+        columns of the row are dropped with the row.
+
+        Args:
+            row: Row of the sites table
+
+        Returns:
+            Site instance
+        """
+        site = cls.__new__(cls)
+        setter = object.__setattr__
+        for name in cls.__slots__:
+            setter(site, name, row.get(name))
+        return site
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"Site is immutable, use replace() to change {name}")
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Dict-style access; columns not held by Site return default"""
+        return getattr(self, key, default)
+
+    def replace(self, **changes: Any) -> "Site":
+        """
+        Copy of the site with some fields changed
+
+        Args:
+            **changes: Field values to change
+
+        Returns:
+            New Site instance
+        """
+        return type(self)(**{**self.to_dict(), **changes})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Fields of the site as a dict"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Site):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+    def __repr__(self) -> str:
+        return f"Site(id={self.id!r}, domain={self.domain!r})"
@@ -17,6 +17,7 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/Website-Factory-System/dns-automator",
     packages=find_packages(),
+    package_data={"dns_automator.utils": ["public_suffix_list.dat"]},
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Developers",
@@ -30,6 +31,8 @@ setup(
     entry_points={
         "console_scripts": [
             "dns-automator=dns_automator.main:main",
+            "dns-automator-fleet=dns_automator.fleet:main",
+            "dns-automator-drift=dns_automator.drift:main",
         ],
     },
 )
\ No newline at end of file
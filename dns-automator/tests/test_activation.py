@@ -0,0 +1,143 @@
+"""Tests for zone activation polling"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from dns_automator import activation as activation_module
+from dns_automator.activation import Activation, ZoneActivator
+from dns_automator.utils.site import Site
+
+NAMESERVERS = ["ana.ns.cloudflare.com", "bob.ns.cloudflare.com"]
+
+
+class FakeCloudflareClient:
+    """Zone whose status changes between checks"""
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.activation_checks = 0
+
+    def get_zone_status(self, zone_id):
+        return {"id": zone_id, "status": self.statuses.pop(0), "name_servers": NAMESERVERS}
+
+    def request_activation_check(self, zone_id):
+        self.activation_checks += 1
+
+
+class FakeDataClient:
+    """Activating sites and the statuses written"""
+
+    def __init__(self, sites):
+        self.sites = sites
+        self.statuses = {}
+
+    def iter_dns_sites(self, status):
+        return iter(self.sites)
+
+    def update_site_status(self, site_id, status, error_message=None):
+        self.statuses[site_id] = status
+        return True
+
+    def flush_writes(self):
+        pass
+
+
+class FakeLeases:
+    """Claims that fail for the sites held by another replica"""
+
+    def __init__(self, held_elsewhere=()):
+        self.held_elsewhere = set(held_elsewhere)
+        self.held = set()
+
+    def claim(self, site_id):
+        if site_id in self.held_elsewhere:
+            return False
+        self.held.add(site_id)
+        return True
+
+    def release(self, site_id):
+        self.held.discard(site_id)
+
+
+@pytest.fixture
+def site():
+    return Site("site-1", "example.com", cloudflare_account_id="cf-1", status_dns="activating", cloudflare_zone_id="z1")
+
+
+def make_activator(client, sites, leases=None):
+    automator = SimpleNamespace(data_client=FakeDataClient(sites), leases=leases or FakeLeases())
+    activator = ZoneActivator(automator, max_workers=2)
+    activator._cloudflare_clients["cf-1"] = client
+    return activator
+
+
+def test_activation_check_requested_once_delegated(monkeypatch, site):
+    monkeypatch.setattr(activation_module, "is_delegated", lambda domain, expected: True)
+    client = FakeCloudflareClient(["pending", "pending", "active"])
+    activator = make_activator(client, [site])
+    activation = Activation(site)
+
+    assert activator.check_site(activation) == "waiting"
+    assert activator.check_site(activation) == "waiting"
+    assert client.activation_checks == 1
+    assert activator.check_site(activation) == "active"
+    assert activator.data_client.statuses == {"site-1": "active"}
+
+
+def test_no_activation_check_before_delegation(monkeypatch, site):
+    monkeypatch.setattr(activation_module, "is_delegated", lambda domain, expected: False)
+    client = FakeCloudflareClient(["pending"])
+    activator = make_activator(client, [site])
+
+    assert activator.check_site(Activation(site)) == "waiting"
+    assert client.activation_checks == 0
+
+
+def test_poll_backs_off_per_zone(monkeypatch, site):
+    monkeypatch.setattr(activation_module, "is_delegated", lambda domain, expected: False)
+    activator = make_activator(FakeCloudflareClient(["pending", "deleted"]), [site])
+
+    assert activator.run(once=True) == {"active": 0, "waiting": 1, "failed": 0}
+    activation = activator._activations["site-1"]
+    assert activation.attempts == 1
+    assert activator.backoff(0) < activator.backoff(3) <= activator.backoff(20)
+
+    activation.next_check = 0.0
+    activator._schedule = [(0.0, 0, activation)]
+    assert activator.run(once=True)["failed"] == 1
+    assert activator.data_client.statuses == {"site-1": "failed"}
+    assert activator._activations == {}
+
+
+def test_site_held_by_another_replica_is_not_checked(site):
+    client = FakeCloudflareClient(["deleted"])
+    activator = make_activator(client, [site], leases=FakeLeases(held_elsewhere={"site-1"}))
+
+    assert activator.check_site(Activation(site)) == "waiting"
+    assert client.statuses == ["deleted"]
+    assert activator.data_client.statuses == {}
+
+
+def test_sites_no_longer_activating_are_dropped(site):
+    client = FakeCloudflareClient(["deleted"])
+    activator = make_activator(client, [site])
+    assert activator.refresh() == 1
+
+    # The site was retired before its first check
+    activator.data_client.sites = []
+    assert activator.refresh() == 0
+    assert activator._activations == {}
+    assert activator.run(once=True) == {"active": 0, "waiting": 0, "failed": 0}
+    assert activator.data_client.statuses == {}
+
+
+def test_delegation_compares_resolved_nameservers():
+    from dns_automator.utils.delegation import is_delegated
+
+    answer = {"Answer": [{"type": 2, "data": "BOB.ns.cloudflare.com."}, {"type": 2, "data": "ana.ns.cloudflare.com."}]}
+    response = SimpleNamespace(content=b"{}", raise_for_status=lambda: None, json=lambda: answer)
+    session = SimpleNamespace(get=lambda url, **kwargs: response)
+
+    assert is_delegated("example.com", NAMESERVERS, session=session)
+    assert not is_delegated("example.com", ["kim.ns.cloudflare.com"], session=session)
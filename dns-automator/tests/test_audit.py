@@ -0,0 +1,107 @@
+"""Tests for the credential audit"""
+
+from types import SimpleNamespace
+
+from dns_automator.audit import CredentialAuditor, CredentialAuditError, probe_matomo
+from dns_automator.utils.credential_health import (
+    CLOUDFLARE_ACCOUNTS,
+    INFRASTRUCTURE_CREDENTIALS,
+    REGISTRAR_CREDENTIALS,
+    CredentialHealth,
+)
+
+
+class FakeDataClient:
+    """Serves credential rows and records saved audits"""
+
+    def __init__(self, rows, failed=None):
+        self.rows = rows
+        self.failed = failed or {}
+        self.saved = []
+        self.failed_reads = 0
+
+    def fetch_credentials(self, table):
+        return self.rows.get(table, [])
+
+    def save_credential_audits(self, results):
+        self.saved.extend(results)
+        return True
+
+    def fetch_failed_credentials(self, table):
+        self.failed_reads += 1
+        return self.failed.get(table, {})
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+        self.content = b"{}"
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class FakeMatomo:
+    """Answers Matomo API calls from a method -> result mapping"""
+
+    def __init__(self, results):
+        self.results = results
+
+    def post(self, url, data, timeout):
+        return FakeResponse(self.results[data["method"]])
+
+
+def test_audit_checks_every_table_and_redacts_secrets():
+    rows = {
+        REGISTRAR_CREDENTIALS: [{"id": "r1", "provider": "namecheap", "api_key": "secret-key"}],
+        INFRASTRUCTURE_CREDENTIALS: [{"id": "i1", "service": "matomo", "url": "https://m", "api_token": "t"}],
+    }
+
+    def get_registrar_client(provider, skip_failed):
+        assert skip_failed is False
+        raise ValueError("Request failed: https://api.namecheap.com/?ApiKey=secret-key")
+
+    automator = SimpleNamespace(data_client=FakeDataClient(rows), get_registrar_client=get_registrar_client)
+    matomo = FakeMatomo({
+        "API.getMatomoVersion": {"value": "5.1.0"},
+        "SitesManager.getSitesIdWithAdminAccess": [1, 2, 3],
+        "UsersManager.hasSuperUserAccess": {"value": True},
+    })
+    auditor = CredentialAuditor(automator, max_workers=2, ttl=60, http=matomo)
+
+    results = {result["credential_id"]: result for result in auditor.run()}
+
+    assert results["r1"]["healthy"] is False
+    assert "secret-key" not in results["r1"]["error"]
+    assert results["i1"]["healthy"] is True
+    assert results["i1"]["details"] == {"version": "5.1.0", "site_count": 3, "scopes": ["view", "admin", "superuser"]}
+    assert len(automator.data_client.saved) == 2
+
+
+def test_matomo_token_without_super_user_access_fails():
+    matomo = FakeMatomo({
+        "API.getMatomoVersion": {"value": "5.1.0"},
+        "SitesManager.getSitesIdWithAdminAccess": [],
+        "UsersManager.hasSuperUserAccess": {"value": False},
+    })
+
+    try:
+        probe_matomo({"url": "https://m", "api_token": "t"}, matomo)
+    except CredentialAuditError as e:
+        assert "super user" in str(e)
+    else:
+        raise AssertionError("expected CredentialAuditError")
+
+
+def test_credential_health_reuses_failures_until_refresh():
+    data_client = FakeDataClient({}, {CLOUDFLARE_ACCOUNTS: {"cf-1": "Token is expired"}})
+    health = CredentialHealth(data_client, refresh_interval=60)
+
+    assert health.problem(CLOUDFLARE_ACCOUNTS, "cf-1") == "Token is expired"
+    assert health.problem(CLOUDFLARE_ACCOUNTS, "cf-2") is None
+    assert health.problem(CLOUDFLARE_ACCOUNTS, None) is None
+    assert data_client.failed_reads == 1
@@ -0,0 +1,114 @@
+"""Tests for the event bus and the batch and server-sent event streams"""
+
+import asyncio
+import json
+import threading
+from concurrent.futures import Future
+
+from dns_automator.utils.batch_stream import stream_batch, submit_batch
+from dns_automator.utils.event_stream import sse_events
+from dns_automator.utils.events import EventBus
+
+
+def collect(stream):
+    async def run():
+        return [json.loads(line) async for line in stream]
+    return asyncio.run(run())
+
+
+def test_subscription_filters_by_site_and_drops_when_full():
+    bus = EventBus()
+    subscription = bus.subscribe(["site-1"], maxsize=1)
+
+    bus.publish("step", "site-2", step="create_zone")
+    bus.publish("step", "site-1", step="create_zone")
+    bus.publish("step", "site-1", step="apply_records")
+
+    assert subscription.get(0)["step"] == "create_zone"
+    assert subscription.get(0) is None
+    assert subscription.dropped == 1
+
+    subscription.close()
+    assert bus.subscriber_count() == 0
+
+
+def test_stream_reports_steps_outcomes_and_summary():
+    bus = EventBus()
+
+    def submit(site_id):
+        # Jobs run synchronously here: events are published before the future resolves
+        bus.publish("job_started", site_id, steps_total=2)
+        bus.publish("step", site_id, step="create_zone")
+        bus.publish("job_finished", site_id, success=site_id != "site-2")
+        future = Future()
+        future.set_result(True)
+        return future, site_id != "site-1"
+
+    jobs, subscription = submit_batch(submit, ["site-1", "site-2", "site-1"], bus)
+    lines = collect(stream_batch(jobs, subscription, poll_interval=0.01))
+
+    assert [line["site_id"] for line in lines if line["type"] == "queued"] == ["site-1", "site-2"]
+    assert lines[0]["attached"] is True
+    assert [line["step"] for line in lines if line["type"] == "step"] == ["create_zone", "create_zone"]
+
+    done = {line["site_id"]: line for line in lines if line["type"] == "site_done"}
+    assert done["site-1"]["success"] is True
+    assert done["site-2"]["success"] is False
+    assert lines[-1]["type"] == "summary"
+    assert (lines[-1]["total"], lines[-1]["succeeded"], lines[-1]["failed"]) == (2, 1, 1)
+    assert bus.subscriber_count() == 0
+
+
+def test_job_without_events_uses_future_result():
+    bus = EventBus()
+
+    def submit(site_id):
+        future = Future()
+        future.set_exception(RuntimeError("queue closed"))
+        return future, True
+
+    jobs, subscription = submit_batch(submit, ["site-1"], bus)
+    lines = collect(stream_batch(jobs, subscription, poll_interval=0.01))
+
+    assert lines[-2]["type"] == "site_done"
+    assert lines[-2]["success"] is False
+    assert lines[-1]["failed"] == 1
+
+
+def test_async_subscription_receives_events_from_threads():
+    bus = EventBus()
+
+    async def run():
+        subscription = bus.subscribe_async(["site-1"])
+        thread = threading.Thread(target=bus.publish, args=("step", "site-1"), kwargs={"step": "ssl_certificate"})
+        thread.start()
+        event = await subscription.next(1)
+        thread.join()
+        subscription.close()
+        return event
+
+    assert asyncio.run(run())["step"] == "ssl_certificate"
+    assert bus.subscriber_count() == 0
+
+
+def test_sse_events_sends_keepalives_and_named_events():
+    bus = EventBus()
+
+    async def run():
+        stream = sse_events(["site-1"], bus, keepalive=0.01)
+        messages = [await stream.__anext__(), await stream.__anext__()]
+        bus.publish("step", "site-2", step="cloudflare_zone")
+        bus.publish("job_finished", "site-1", success=True)
+        message = await stream.__anext__()
+        while message.startswith(":"):
+            message = await stream.__anext__()
+        messages.append(message)
+        await stream.aclose()
+        return messages
+
+    connected, keepalive, message = asyncio.run(run())
+    assert (connected, keepalive) == (": connected\n\n", ": keepalive\n\n")
+    lines = message.splitlines()
+    assert lines[:2] == ["id: 1", "event: job_finished"]
+    assert json.loads(lines[2][len("data: "):])["success"] is True
+    assert bus.subscriber_count() == 0
@@ -0,0 +1,74 @@
+"""Tests for the per-job call ledger"""
+
+import httpx
+import pytest
+
+from dns_automator.utils.call_ledger import (
+    CallLedger,
+    aggregate,
+    instrument_httpx,
+    ledger_scope,
+    track,
+    url_operation,
+)
+
+
+def test_track_records_into_current_ledger():
+    with ledger_scope() as ledger:
+        with track("namecheap", "namecheap.domains.getInfo") as call:
+            call.received = 120
+        with track("namecheap", "namecheap.domains.getInfo"):
+            pass
+        with pytest.raises(RuntimeError):
+            with track("cloudflare", "POST zones"):
+                raise RuntimeError("boom")
+
+    summary = ledger.summary()
+    assert summary["total_calls"] == 3
+    info = summary["providers"]["namecheap"]["namecheap.domains.getInfo"]
+    assert (info["calls"], info["errors"], info["bytes_received"]) == (2, 0, 120)
+    assert summary["providers"]["cloudflare"]["POST zones"]["errors"] == 1
+
+
+def test_track_outside_job_records_nothing():
+    ledger = CallLedger()
+    with track("cloudflare", "GET zones"):
+        pass
+    assert ledger.summary()["total_calls"] == 0
+
+
+def test_url_operation_replaces_ids():
+    url = "https://api.cloudflare.com/client/v4/zones/023e105f4ecef8ad9ca31a8372d0c353/dns_records?page=2"
+    assert url_operation("get", url, "/client/v4/") == "GET zones/:id/dns_records"
+    assert url_operation("POST", "https://x.supabase.co/rest/v1/rpc/claim_sites", "/rest/v1/") == "POST rpc/claim_sites"
+
+
+def test_instrument_httpx_counts_requests():
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json=[{"id": 1}]))
+    session = httpx.Client(base_url="https://x.supabase.co", transport=transport)
+    instrument_httpx(session, "supabase", "/rest/v1/")
+
+    session.get("/rest/v1/sites")
+    with ledger_scope() as ledger:
+        session.get("/rest/v1/sites")
+        session.get("/rest/v1/sites")
+
+    entry = ledger.summary()["providers"]["supabase"]["GET sites"]
+    assert entry["calls"] == 2
+    assert entry["bytes_received"] > 0
+
+
+def test_aggregate_reports_calls_per_job():
+    def execution(site_id, calls):
+        return {"site_id": site_id, "metadata": {"calls": {
+            "total_calls": calls,
+            "providers": {"cloudflare": {"GET zones": {"calls": calls, "errors": 0, "seconds": 0.5}}},
+        }}}
+
+    report = aggregate([execution("a", 2), execution("b", 10), execution("c", 4), {"site_id": "d", "metadata": {}}])
+
+    assert report["jobs"] == 3
+    assert report["calls_per_job"] == {"mean": 5.33, "p50": 4, "p95": 10, "max": 10}
+    assert report["providers"]["cloudflare"]["GET zones"]["calls"] == 16
+    assert report["providers"]["cloudflare"]["GET zones"]["calls_per_job"] == 5.33
+    assert report["most_expensive_sites"][0] == {"site_id": "b", "calls": 10}
@@ -0,0 +1,96 @@
+"""Tests for provider traffic record/replay"""
+
+import base64
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import httpx
+import pytest
+import requests
+
+from dns_automator.utils.cassette import (
+    RECORD,
+    REPLAY_FAST,
+    Cassette,
+    CassetteError,
+    scrub_command,
+)
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_http_is_replayed_offline(server, tmp_path):
+    path = str(tmp_path / "cassette.json")
+
+    with Cassette(path, RECORD):
+        assert requests.get(f"{server}/zones?ApiKey=secret").json() == {"path": "/zones?ApiKey=secret"}
+        with httpx.Client() as client:
+            assert client.get(f"{server}/rest/v1/sites").json() == {"path": "/rest/v1/sites"}
+
+    recorded = open(path).read()
+    assert "secret" not in recorded
+
+    # The server is not needed any more
+    with Cassette(path, REPLAY_FAST):
+        assert requests.get(f"{server}/zones?ApiKey=other").json() == {"path": "/zones?ApiKey=secret"}
+        with httpx.Client() as client:
+            response = client.get(f"{server}/rest/v1/sites")
+        assert response.status_code == 200
+        assert response.json() == {"path": "/rest/v1/sites"}
+
+        with pytest.raises(CassetteError):
+            requests.get(f"{server}/not-recorded")
+
+    # Patches are removed on exit
+    assert requests.get(f"{server}/live").json() == {"path": "/live"}
+
+
+def test_ssh_commands_are_replayed(tmp_path):
+    # paramiko is a hosting-automator dependency
+    paramiko = pytest.importorskip("paramiko")
+    path = tmp_path / "cassette.json"
+    path.write_text(json.dumps({"version": 1, "interactions": [{
+        "key": "SSH clpctl site:add:static --domainName=example.com --siteUserPassword=***",
+        "elapsed": 1.5,
+        "response": {
+            "stdout": base64.b64encode(b"Site has been added").decode(),
+            "stderr": "",
+            "exit_status": 0,
+        },
+    }]}))
+
+    with Cassette(str(path), REPLAY_FAST):
+        client = paramiko.SSHClient()
+        client.connect("203.0.113.10", username="root")
+        _, stdout, stderr = client.exec_command(
+            "clpctl site:add:static --domainName=example.com --siteUserPassword='n3w-Pa55'"
+        )
+        assert stdout.read() == b"Site has been added"
+        assert stderr.read() == b""
+        assert stdout.channel.recv_exit_status() == 0
+
+
+def test_scrub_command():
+    assert scrub_command("clpctl user:add --password=abc --email=a@b.c") == "clpctl user:add --password=*** --email=a@b.c"
@@ -0,0 +1,123 @@
+"""Tests for the adaptive concurrency limiter"""
+
+import threading
+import time
+
+from requests.structures import CaseInsensitiveDict
+
+from dns_automator.utils.concurrency import (
+    AdaptiveLimiter,
+    AdaptiveLimiterRegistry,
+    Signals,
+    signals_from_response,
+)
+
+OK = Signals()
+THROTTLED = Signals(throttled=True)
+
+
+def test_signals_from_headers():
+    signals = signals_from_response(429, CaseInsensitiveDict({"Retry-After": "7"}))
+    assert signals == Signals(True, 7.0, None)
+
+    signals = signals_from_response(200, CaseInsensitiveDict({"ratelimit": '"default";r=42;t=30'}))
+    assert signals == Signals(False, None, 42)
+
+    signals = signals_from_response(200, CaseInsensitiveDict({"X-RateLimit-Remaining": "3"}))
+    assert signals.remaining == 3
+
+    # A 503 is only a throttle when the provider asks to retry later
+    assert not signals_from_response(503, CaseInsensitiveDict()).throttled
+    assert signals_from_response(503, CaseInsensitiveDict({"Retry-After": "1"})).throttled
+
+
+def test_additive_increase_multiplicative_decrease():
+    limiter = AdaptiveLimiter("test", initial=4, maximum=8, cooldown=0)
+
+    for _ in range(20):
+        limiter.acquire()
+        limiter.release(OK)
+    assert 6 <= limiter.limit <= 8
+
+    before = limiter.limit
+    limiter.acquire()
+    limiter.release(THROTTLED)
+    assert limiter.limit == before / 2
+    assert limiter.throttled == 1
+
+
+def test_throttle_burst_counts_once():
+    limiter = AdaptiveLimiter("test", initial=8, cooldown=60)
+    for _ in range(4):
+        limiter.acquire()
+    for _ in range(4):
+        limiter.release(THROTTLED)
+    assert limiter.limit == 4
+
+
+def test_low_remaining_holds_growth():
+    limiter = AdaptiveLimiter("test", initial=4)
+    for _ in range(10):
+        limiter.acquire()
+        limiter.release(Signals(remaining=2))
+    assert limiter.limit == 4
+
+
+def test_failed_call_does_not_adapt():
+    limiter = AdaptiveLimiter("test", initial=4)
+    limiter.acquire()
+    limiter.release(None)
+    assert limiter.limit == 4
+    assert limiter.in_flight() == 0
+
+
+def test_acquire_blocks_at_limit():
+    limiter = AdaptiveLimiter("test", initial=1)
+    limiter.acquire()
+
+    acquired = threading.Event()
+    thread = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()))
+    thread.start()
+    assert not acquired.wait(0.1)
+
+    limiter.release(OK)
+    assert acquired.wait(1)
+    thread.join()
+
+
+def test_retry_after_pauses_new_calls():
+    limiter = AdaptiveLimiter("test", initial=4)
+    limiter.acquire()
+    limiter.release(Signals(throttled=True, retry_after=0.2))
+
+    start = time.monotonic()
+    waited = limiter.acquire()
+    assert time.monotonic() - start >= 0.15
+    assert waited >= 0.15
+
+
+def test_registry_shares_limiter_per_credential():
+    registry = AdaptiveLimiterRegistry(initial=2)
+    assert registry.get("cloudflare", "a") is registry.get("cloudflare", "a")
+    assert registry.get("cloudflare", "a") is not registry.get("cloudflare", "b")
+    assert registry.snapshot()["cloudflare:a"]["limit"] == 2
+
+
+def test_registry_sums_limiters_per_provider():
+    registry = AdaptiveLimiterRegistry(initial=1)
+    registry.get("cloudflare", "a").acquire()
+    registry.get("cloudflare", "b")
+    registry.get("namecheap", "c")
+
+    blocked = threading.Thread(target=registry.get("cloudflare", "a").acquire)
+    blocked.start()
+    time.sleep(0.05)
+
+    providers = registry.by_provider()
+    assert providers["cloudflare"]["limiters"] == 2
+    assert providers["cloudflare"]["in_flight"] == 1
+    assert providers["cloudflare"]["waiting"] == 1
+    assert providers["namecheap"]["waiting"] == 0
+
+    registry.get("cloudflare", "a").release(None)
+    blocked.join(1)
@@ -0,0 +1,48 @@
+"""Tests for per-job deadlines"""
+
+import time
+
+import pytest
+
+from dns_automator.utils.deadline import (
+    DeadlineExceeded,
+    call_timeout,
+    current_deadline,
+    deadline_scope,
+)
+
+
+def test_no_deadline_keeps_default():
+    assert current_deadline() is None
+    assert call_timeout(30) == 30
+    assert call_timeout() is None
+
+
+def test_timeout_shrinks_with_budget():
+    with deadline_scope(5, "job") as deadline:
+        assert current_deadline() is deadline
+        assert call_timeout(30) <= 5
+        assert call_timeout(1) == 1
+        assert 4 < call_timeout() <= 5
+    assert current_deadline() is None
+
+
+def test_spent_budget_fails_calls():
+    with deadline_scope(0.05, "DNS job for example.com") as deadline:
+        time.sleep(0.06)
+        assert deadline.expired()
+        with pytest.raises(DeadlineExceeded, match="example.com"):
+            call_timeout(30)
+
+
+def test_zero_budget_disables_deadline():
+    with deadline_scope(0) as deadline:
+        assert deadline is None
+        assert call_timeout(30) == 30
+
+
+def test_scopes_nest_and_restore():
+    with deadline_scope(100) as outer:
+        with deadline_scope(1) as inner:
+            assert current_deadline() is inner
+        assert current_deadline() is outer
@@ -0,0 +1,39 @@
+"""Tests for public-suffix-aware domain parsing"""
+
+import pytest
+
+from dns_automator.services.namecheap_client import NamecheapClient
+from dns_automator.utils.domains import DomainParts, compile_rules, record_name, split, suffix_length
+
+
+@pytest.mark.parametrize("domain, expected", [
+    ("example.com", ("example", "com", "example.com")),
+    ("www.example.co.uk", ("example", "co.uk", "example.co.uk")),
+    ("Shop.Example.COM.AU.", ("example", "com.au", "example.com.au")),
+    ("co.uk", ("", "co.uk", "")),
+    ("example.unlisted", ("example", "unlisted", "example.unlisted")),
+    ("a..com", ("", "", "")),
+])
+def test_split(domain, expected):
+    assert split(domain) == DomainParts(*expected)
+
+
+def test_wildcard_and_exception_rules():
+    trie = compile_rules(["// comment", "", "jp", "*.kawasaki.jp", "!city.kawasaki.jp"])
+
+    assert suffix_length("a.b.kawasaki.jp".split("."), trie) == 3
+    assert suffix_length("a.city.kawasaki.jp".split("."), trie) == 2
+    assert suffix_length("example.jp".split("."), trie) == 1
+
+
+def test_namecheap_split_uses_public_suffix():
+    assert NamecheapClient._split_domain("example.co.uk") == ("example", "co.uk")
+    assert NamecheapClient._split_domain("co.uk") == ("co.uk", "")
+
+
+def test_record_name():
+    assert record_name("@", "example.co.uk") == "example.co.uk"
+    assert record_name("www", "example.co.uk") == "www.example.co.uk"
+    assert record_name("www.example.co.uk", "example.co.uk") == "www.example.co.uk"
+    # Only names inside the zone are kept as they are
+    assert record_name("badexample.co.uk", "example.co.uk") == "badexample.co.uk.example.co.uk"
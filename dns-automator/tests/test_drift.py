@@ -0,0 +1,143 @@
+"""Tests for the DNS drift scanner"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from dns_automator.drift import DriftScanner
+from dns_automator.utils.record_templates import RecordTemplateError
+
+
+class FakeCloudflareClient:
+    """In-memory stand-in for CloudflareClient"""
+
+    def __init__(self, zone, records):
+        self.zone = zone
+        self.records = records
+
+    def find_zone(self, domain):
+        return self.zone
+
+    def get_dns_records(self, zone_id, record_type=None, name=None):
+        return self.records
+
+
+class FakeRegistrarClient:
+    """Registrar stand-in returning fixed nameservers"""
+
+    def __init__(self, nameservers):
+        self.nameservers = nameservers
+
+    def get_nameservers(self, domain):
+        return self.nameservers
+
+
+def make_record(name, content="1.1.1.1", proxied=True, record_type="A"):
+    return {"type": record_type, "name": name, "content": content, "proxied": proxied}
+
+
+class FakeDataClient:
+    """Serves the record template assignments of every site"""
+
+    def __init__(self):
+        self.assignments = []
+        self.error = None
+
+    def fetch_record_templates(self, site_id, cloudflare_account_id):
+        if self.error:
+            raise RecordTemplateError(self.error)
+        return self.assignments
+
+
+@pytest.fixture
+def scanner():
+    scanner = DriftScanner(SimpleNamespace(data_client=FakeDataClient()), max_workers=1)
+    scanner.server_ips = {"server-1": "1.1.1.1"}
+    return scanner
+
+
+@pytest.fixture
+def site():
+    return {
+        "id": "site-1",
+        "domain": "example.com",
+        "cloudflare_account_id": "cf-1",
+        "server_id": "server-1",
+        "registrar": "namecheap",
+    }
+
+
+def test_site_in_sync(scanner, site):
+    zone = {"id": "z1", "status": "active", "name_servers": ["ana.ns.cloudflare.com", "bob.ns.cloudflare.com"]}
+    scanner._cloudflare_clients["cf-1"] = FakeCloudflareClient(
+        zone, [make_record("example.com"), make_record("www.example.com")]
+    )
+    scanner.registrar_clients["namecheap"] = FakeRegistrarClient(["bob.ns.cloudflare.com", "ana.ns.cloudflare.com"])
+
+    issues, registrar = scanner.check_site(site)
+
+    assert issues == []
+    assert registrar == "namecheap"
+
+
+def test_site_drift_is_reported(scanner, site):
+    zone = {"id": "z1", "status": "pending", "name_servers": ["ana.ns.cloudflare.com", "bob.ns.cloudflare.com"]}
+    scanner._cloudflare_clients["cf-1"] = FakeCloudflareClient(
+        zone, [make_record("example.com", content="9.9.9.9", proxied=False)]
+    )
+    scanner.registrar_clients["namecheap"] = FakeRegistrarClient(["dns1.registrar-servers.com"])
+
+    issues, _ = scanner.check_site(site)
+
+    assert sorted(issue["type"] for issue in issues) == [
+        "missing_record",
+        "nameserver_mismatch",
+        "not_proxied",
+        "wrong_content",
+        "zone_not_active",
+    ]
+
+
+def test_unknown_registrar_is_detected(scanner, site):
+    site["registrar"] = None
+    zone = {"id": "z1", "status": "active", "name_servers": ["ana.ns.cloudflare.com"]}
+    scanner._cloudflare_clients["cf-1"] = FakeCloudflareClient(
+        zone, [make_record("example.com"), make_record("www.example.com")]
+    )
+    scanner.registrar_clients["namecheap"] = FakeRegistrarClient(None)
+    scanner.registrar_clients["spaceship"] = FakeRegistrarClient(["ana.ns.cloudflare.com"])
+
+    issues, registrar = scanner.check_site(site)
+
+    assert issues == []
+    assert registrar == "spaceship"
+
+
+def test_records_are_checked_against_the_site_templates(scanner, site):
+    scanner.data_client.assignments = [{
+        "variables": {},
+        "dns_record_templates": {
+            "name": "mail",
+            "records": [{"type": "MX", "name": "@", "content": "mx.${domain}", "priority": 10}]
+        }
+    }]
+    zone = {"id": "z1", "status": "active", "name_servers": ["ana.ns.cloudflare.com"]}
+    scanner._cloudflare_clients["cf-1"] = FakeCloudflareClient(
+        zone, [make_record("example.com"), make_record("www.example.com")]
+    )
+    scanner.registrar_clients["namecheap"] = FakeRegistrarClient(["ana.ns.cloudflare.com"])
+
+    issues, _ = scanner.check_site(site)
+    assert issues == [{"type": "missing_record", "name": "example.com", "record_type": "MX", "expected": "mx.example.com"}]
+
+    scanner._cloudflare_clients["cf-1"].records.append(make_record("example.com", "mx.example.com", False, "MX"))
+    assert scanner.check_site(site)[0] == []
+
+
+def test_unloadable_templates_fail_the_check(scanner, site):
+    scanner.data_client.error = "connection reset"
+    zone = {"id": "z1", "status": "active", "name_servers": ["ana.ns.cloudflare.com"]}
+    scanner._cloudflare_clients["cf-1"] = FakeCloudflareClient(zone, [])
+
+    with pytest.raises(RecordTemplateError):
+        scanner.check_site(site)
@@ -0,0 +1,215 @@
+"""Tests for fleet-wide DNS changes"""
+
+import pytest
+
+from dns_automator.fleet import FleetChangeEngine, FleetChangeError, FleetChangeState, FleetSelector, RecordTransform
+from dns_automator.services.supabase_client import SupabaseService
+from dns_automator.utils.zone_profiles import STATIC_SITE, ZoneProfileError, get_profile
+
+
+class FakeCloudflareClient:
+    """In-memory stand-in for CloudflareClient"""
+
+    def __init__(self, records):
+        self.records = records
+        self.updates = []
+        self.profiles = []
+
+    def get_zone_id(self, domain):
+        return f"zone-{domain}"
+
+    def get_dns_records(self, zone_id, record_type=None, name=None):
+        return [dict(record) for record in self.records if record["type"] == record_type]
+
+    def update_dns_record(self, zone_id, record_id, record_data):
+        self.updates.append((record_id, record_data))
+        for record in self.records:
+            if record["id"] == record_id:
+                record.update(record_data)
+
+    def apply_zone_profile(self, zone_id, profile):
+        self.profiles.append((zone_id, profile.name))
+        return {"settings": len(profile.settings), "cache_rules": len(profile.cache_rules)}
+
+
+class FakeDataClient:
+    """In-memory stand-in for SupabaseService"""
+
+    def __init__(self, sites):
+        self.sites = sites
+        self.server_updates = []
+        self.move_fails = False
+
+    def fetch_sites(self, server_id=None, cloudflare_account_id=None, domains=None):
+        return [site for site in self.sites if not server_id or site["server_id"] == server_id]
+
+    def update_site_server(self, site_id, server_id):
+        if self.move_fails:
+            return False
+        self.server_updates.append((site_id, server_id))
+        return True
+
+
+def make_record(record_id, name, content, proxied=True):
+    return {"id": record_id, "type": "A", "name": name, "content": content, "proxied": proxied, "ttl": 1}
+
+
+@pytest.fixture
+def zone():
+    return FakeCloudflareClient([
+        make_record("r1", "example.com", "1.1.1.1"),
+        make_record("r2", "www.example.com", "1.1.1.1"),
+        make_record("r3", "mail.example.com", "1.1.1.1", proxied=False),
+    ])
+
+
+@pytest.fixture
+def engine(tmp_path, zone):
+    data_client = FakeDataClient([
+        {"id": "site-1", "domain": "example.com", "cloudflare_account_id": "cf-1", "server_id": "old"}
+    ])
+    engine = FleetChangeEngine(data_client, FleetChangeState(str(tmp_path / "state.json")), max_workers=2, rate_limit=100)
+    engine._clients["cf-1"] = zone
+    return engine
+
+
+def test_transform_only_touches_matching_records():
+    transform = RecordTransform(content="2.2.2.2", match_content="1.1.1.1")
+    assert transform.record_names("example.com") == ["example.com", "www.example.com"]
+    assert transform.rewrite(make_record("r1", "example.com", "9.9.9.9")) is None
+    assert transform.rewrite(make_record("r1", "example.com", "1.1.1.1"))["content"] == "2.2.2.2"
+
+
+def test_apply_changes_records_and_moves_server(engine, zone):
+    transform = RecordTransform(content="2.2.2.2", match_content="1.1.1.1")
+    summary = engine.apply(FleetSelector(server_id="old"), transform, to_server_id="new")
+
+    assert summary == {"done": 1}
+    assert sorted(record_id for record_id, _ in zone.updates) == ["r1", "r2"]
+    assert engine.data_client.server_updates == [("site-1", "new")]
+    assert engine.state.get("example.com")["status"] == "done"
+
+
+def test_apply_resumes_and_rolls_back(engine, zone, tmp_path):
+    transform = RecordTransform(content="2.2.2.2", match_content="1.1.1.1")
+    engine.apply(FleetSelector(server_id="old"), transform)
+    zone.updates.clear()
+
+    # A second run with the same state file skips finished zones
+    assert engine.apply(FleetSelector(server_id="old"), transform) == {}
+
+    assert engine.rollback() == {"rolled_back": 1}
+    assert {record["content"] for record in zone.records} == {"1.1.1.1"}
+
+
+def test_rollback_moves_back_a_site_whose_records_were_unchanged(engine, zone):
+    transform = RecordTransform(content="1.1.1.1", match_content="1.1.1.1")
+    assert engine.apply(FleetSelector(server_id="old"), transform, to_server_id="new") == {"unchanged": 1}
+
+    assert engine.rollback() == {"rolled_back": 1}
+    assert engine.data_client.server_updates == [("site-1", "new"), ("site-1", "old")]
+    assert zone.updates == []
+
+
+def test_failed_server_move_fails_the_zone(engine):
+    engine.data_client.move_fails = True
+    transform = RecordTransform(content="2.2.2.2", match_content="1.1.1.1")
+
+    assert engine.apply(FleetSelector(server_id="old"), transform, to_server_id="new") == {"failed": 1}
+    assert engine.state.get("example.com")["status"] == "failed"
+
+
+def test_state_file_refuses_a_different_change(engine):
+    engine.apply(FleetSelector(server_id="old"), RecordTransform(content="2.2.2.2"))
+    with pytest.raises(FleetChangeError):
+        engine.apply(FleetSelector(server_id="old"), RecordTransform(content="3.3.3.3"))
+
+
+def test_empty_selector_is_rejected(engine):
+    with pytest.raises(FleetChangeError):
+        engine.apply(FleetSelector(), RecordTransform(content="2.2.2.2"))
+
+
+def test_apply_profile_to_whole_fleet(engine, zone):
+    summary = engine.apply_profile(FleetSelector(all_sites=True), get_profile("static"))
+
+    assert summary == {"done": 1}
+    assert zone.profiles == [("zone-example.com", "static")]
+    assert engine.state.get("example.com")["profile"] == "static"
+
+
+def test_profile_settings_form_one_bulk_patch():
+    items = STATIC_SITE.setting_items()
+    assert {"id": "brotli", "value": "on"} in items
+    assert {"id": "ssl", "value": "full"} in items
+    with pytest.raises(ZoneProfileError, match="static"):
+        get_profile("dynamic")
+
+
+def test_state_entries_are_copies(tmp_path):
+    state = FleetChangeState(str(tmp_path / "state.json"))
+    entry = {"status": "in_progress", "changes": []}
+    state.put("example.com", entry)
+
+    entry["status"] = "done"
+    state.get("example.com")["changes"].append("x")
+
+    assert state.get("example.com") == {"status": "in_progress", "changes": []}
+
+
+class FakeSitesQuery:
+    """PostgREST query over in-memory site rows, counting the requests sent"""
+
+    def __init__(self, rows, requests):
+        self.rows = rows
+        self.requests = requests
+        self.filters = []
+        self.row_limit = None
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row[column] == value)
+        return self
+
+    def in_(self, column, values):
+        assert len(values) <= 100
+        self.filters.append(lambda row: row[column] in values)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda row: row[column] > value)
+        return self
+
+    def order(self, column):
+        return self
+
+    def limit(self, count):
+        self.row_limit = count
+        return self
+
+    def execute(self):
+        self.requests.append(self)
+        rows = sorted((row for row in self.rows if all(f(row) for f in self.filters)), key=lambda row: row["id"])
+        return type("Response", (), {"data": rows[:self.row_limit]})
+
+
+def test_fetch_sites_reads_every_page_and_chunks_domains():
+    rows = [
+        {"id": f"site-{i:04d}", "domain": f"d{i}.com", "server_id": "srv-1" if i % 2 else "srv-2"}
+        for i in range(250)
+    ]
+    requests = []
+    service = SupabaseService.__new__(SupabaseService)
+    service.client = type("Client", (), {"table": lambda self, name: FakeSitesQuery(rows, requests)})()
+
+    sites = service.fetch_sites(server_id="srv-1", page_size=50)
+    assert len(sites) == 125
+    assert len(requests) == 3
+
+    requests.clear()
+    sites = service.fetch_sites(domains=[f"d{i}.com" for i in range(220)], page_size=50)
+    assert len(sites) == 220
+    assert len({site.id for site in sites}) == 220
+    assert len(requests) == 7
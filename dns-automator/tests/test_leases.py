@@ -0,0 +1,155 @@
+"""Tests for lease-based site claims"""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from dns_automator.main import DNSAutomator
+from dns_automator.utils.leases import LeaseLostError, LeaseManager
+from dns_automator.utils.site import Site
+
+
+class FakeAPIError(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+
+class FakeLeaseClient:
+    """Implements the lease functions of migration 012 in memory"""
+
+    def __init__(self, installed=True):
+        self.installed = installed
+        self.leases = {}
+        self.pending = []
+
+    def rpc(self, name, params):
+        return SimpleNamespace(execute=lambda: self._call(name, params))
+
+    def _call(self, name, params):
+        if not self.installed:
+            raise FakeAPIError("PGRST202")
+
+        owner = params.get("p_owner")
+        if name == "claim_site":
+            holder = self.leases.get(params["p_site_id"])
+            if holder not in (None, owner):
+                return SimpleNamespace(data=False)
+            self.leases[params["p_site_id"]] = owner
+            return SimpleNamespace(data=True)
+        if name == "claim_pending_sites":
+            free = [s for s in self.pending if s not in self.leases][:params["p_limit"]]
+            for site_id in free:
+                self.leases[site_id] = owner
+            return SimpleNamespace(data=free)
+        if name == "renew_site_leases":
+            return SimpleNamespace(data=[s for s in params["p_site_ids"] if self.leases.get(s) == owner])
+        if name == "release_site":
+            if self.leases.get(params["p_site_id"]) == owner:
+                del self.leases[params["p_site_id"]]
+            return SimpleNamespace(data=None)
+
+
+def test_replicas_claim_disjoint_sites():
+    client = FakeLeaseClient()
+    client.pending = ["s1", "s2", "s3"]
+    a = LeaseManager(client, "dns_setup", owner="a")
+    b = LeaseManager(client, "dns_setup", owner="b")
+
+    assert a.claim_pending(2) == ["s1", "s2"]
+    assert b.claim_pending(2) == ["s3"]
+    assert not b.claim("s1")
+
+    a.release("s1")
+    assert b.claim("s1")
+    a.close()
+    b.close()
+
+
+def test_heartbeat_detects_lost_lease():
+    client = FakeLeaseClient()
+    leases = LeaseManager(client, "dns_setup", heartbeat=0.01, owner="a")
+
+    assert leases.claim("s1")
+    client.leases["s1"] = "b"  # expired and taken over elsewhere
+
+    deadline = time.monotonic() + 2
+    while not leases.lost("s1") and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert leases.lost("s1")
+    leases.close()
+
+
+def test_claims_always_succeed_without_lease_functions():
+    leases = LeaseManager(FakeLeaseClient(installed=False), "dns_setup", owner="a")
+
+    assert leases.claim("s1")
+    assert leases.claim_pending(5) is None
+    leases.close()
+
+
+def test_check_raises_once_the_lease_is_lost():
+    client = FakeLeaseClient()
+    leases = LeaseManager(client, "dns_setup", heartbeat=0.01, owner="a")
+
+    assert leases.claim("s1")
+    leases.check("s1")
+    client.leases["s1"] = "b"
+
+    deadline = time.monotonic() + 2
+    while not leases.lost("s1") and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    with pytest.raises(LeaseLostError):
+        leases.check("s1")
+    leases.close()
+
+
+class FakeDataClient:
+    """Records the job writes of process_site"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append(name)
+
+
+def test_job_stops_without_status_when_its_lease_is_lost():
+    automator = DNSAutomator.__new__(DNSAutomator)
+    automator.credential_health = SimpleNamespace(problem=lambda *args: None)
+    automator.leases = LeaseManager(FakeLeaseClient(), "dns_setup", owner="a")
+    automator.data_client = FakeDataClient()
+
+    def lose_lease(site):
+        automator.leases._lost.add(site.id)
+        automator.leases.check(site.id)
+
+    automator._process_site = lose_lease
+
+    assert not automator.process_site(Site("s1", "a.com", cloudflare_account_id="cf-1"))
+    assert automator.data_client.calls == ["start_job", "abandon_job"]
+    assert not automator.leases.holds("s1")
+
+
+def test_credential_audit_skip_only_writes_under_the_lease():
+    client = FakeLeaseClient()
+    client.leases["s1"] = "b"
+    automator = DNSAutomator.__new__(DNSAutomator)
+    automator.credential_health = SimpleNamespace(problem=lambda *args: "Token is expired")
+    automator.leases = LeaseManager(client, "dns_setup", owner="a")
+    automator.data_client = FakeDataClient()
+    site = Site("s1", "a.com", cloudflare_account_id="cf-1")
+
+    # Held by another replica: nothing is written
+    assert not automator.process_site(site)
+    assert automator.data_client.calls == []
+
+    # Claimed: the site is put back to pending and the lease is released
+    del client.leases["s1"]
+    assert not automator.process_site(site)
+    assert automator.data_client.calls == ["update_site_status", "finish_job"]
+    assert not automator.leases.holds("s1")
+    automator.leases.close()
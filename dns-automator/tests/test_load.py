@@ -0,0 +1,51 @@
+"""Tests for the load report"""
+
+from dns_automator.utils.concurrency import AdaptiveLimiterRegistry
+from dns_automator.utils.job_queue import JobQueue, JobWorker
+from dns_automator.utils.load import desired_replicas, load_report
+
+
+def test_desired_replicas_follows_backlog_and_throughput():
+    assert desired_replicas(0, 0.0, 4, 600, 1, 10) == 1
+    # No recent throughput: one job per worker within the target
+    assert desired_replicas(20, 0.0, 4, 600, 1, 10) == 5
+    # 3 jobs/minute per replica finish 30 jobs in 10 minutes
+    assert desired_replicas(90, 3.0, 4, 600, 1, 10) == 3
+    assert desired_replicas(10_000, 3.0, 4, 600, 1, 10) == 10
+
+
+def test_load_report_counts_backlog_and_recent_jobs(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    for site_id in ("s1", "s2", "s3"):
+        queue.enqueue(site_id, "dns_setup")
+    queue.finish(queue.claim_next().id, success=True)
+    queue.claim_next()
+    worker = JobWorker(queue, lambda job: True, workers=2)
+
+    report = load_report(worker, 600, 600, 1, 10, AdaptiveLimiterRegistry())
+
+    assert report["queue"]["queued"] == 1
+    assert report["queue"]["running"] == 1
+    assert report["queue"]["oldest_queued_age_seconds"] >= 0
+    assert report["workers"] == {"total": 2, "active": 0, "utilization": 0.0}
+    assert report["throughput"]["done"] == 1
+    assert report["throughput"]["jobs_per_minute"] == 0.1
+    assert report["saturated_providers"] == []
+    assert report["desired_replicas"] == 1
+    queue.close()
+
+
+def test_desired_replicas_uses_the_shared_backlog(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    queue.enqueue("s1", "dns_setup")
+    worker = JobWorker(queue, lambda job: True, workers=2)
+
+    # Other replicas hold most of the pending sites
+    report = load_report(worker, 600, 600, 1, 10, AdaptiveLimiterRegistry(), shared_backlog=9)
+
+    assert report["queue"]["queued"] == 1
+    assert report["queue"]["shared_pending"] == 9
+    assert report["backlog_source"] == "shared"
+    assert report["desired_replicas"] == 5
+    assert load_report(worker, 600, 600, 1, 10, AdaptiveLimiterRegistry())["backlog_source"] == "local"
+    queue.close()
@@ -0,0 +1,115 @@
+"""Tests for nameserver-pair prediction and speculative registrar updates"""
+
+from concurrent.futures import Future
+
+from dns_automator.main import DNSAutomator
+from dns_automator.utils.nameservers import NameserverPredictor
+from dns_automator.utils.site import Site
+
+PAIR = ["ana.ns.cloudflare.com", "bob.ns.cloudflare.com"]
+OTHER = ["kim.ns.cloudflare.com", "lee.ns.cloudflare.com"]
+
+
+def test_predicts_dominant_pair_after_enough_zones():
+    predictor = NameserverPredictor(min_observations=2)
+
+    predictor.record("cf-1", PAIR)
+    assert predictor.predict("cf-1") is None
+
+    predictor.record("cf-1", ["BOB.ns.cloudflare.com.", "ana.ns.cloudflare.com"])
+    assert predictor.predict("cf-1") == PAIR
+    assert predictor.predict("cf-2") is None
+
+
+def test_mixed_pairs_are_not_predicted():
+    predictor = NameserverPredictor(history=4, min_share=0.8)
+    predictor.seed("cf-1", [PAIR, PAIR, OTHER])
+    assert predictor.predict("cf-1") is None
+
+    for _ in range(3):
+        predictor.record("cf-1", OTHER)
+    assert predictor.predict("cf-1") == OTHER
+
+
+def test_record_counts_hits_and_misses():
+    predictor = NameserverPredictor()
+
+    assert predictor.record("cf-1", PAIR, predicted=list(reversed(PAIR)))
+    assert not predictor.record("cf-1", OTHER, predicted=PAIR)
+    assert predictor.snapshot() == {"accounts": 1, "hits": 1, "misses": 1}
+
+
+class FakeRegistrarClient:
+    """Registrar stand-in remembering the nameservers set"""
+
+    def __init__(self, fail=False):
+        self.nameservers = {}
+        self.fail = fail
+
+    def set_nameservers(self, domain, nameservers):
+        if self.fail:
+            return False
+        self.nameservers[domain] = nameservers
+        return True
+
+
+def speculation_result(registrar, previous=None):
+    future = Future()
+    future.set_result((registrar, None, previous))
+    return future
+
+
+def test_wrong_prediction_is_corrected_at_detected_registrar():
+    registrar = FakeRegistrarClient()
+    automator = DNSAutomator.__new__(DNSAutomator)
+    automator.get_registrar_client = lambda registrar_type: registrar
+    site = {"domain": "example.com"}
+
+    assert automator.finish_speculation(site, speculation_result("namecheap"), PAIR, PAIR) == ("namecheap", None)
+    assert registrar.nameservers == {}
+
+    assert automator.finish_speculation(site, speculation_result("namecheap"), PAIR, OTHER) == ("namecheap", None)
+    assert registrar.nameservers == {"example.com": OTHER}
+
+
+def test_failed_job_restores_nameservers_changed_by_speculation():
+    registrar = FakeRegistrarClient()
+    automator = DNSAutomator.__new__(DNSAutomator)
+    automator.get_registrar_client = lambda registrar_type: registrar
+    site = {"domain": "example.com"}
+
+    error = automator.abandon_speculation(site, speculation_result("namecheap", OTHER), "Zone creation failed")
+
+    assert registrar.nameservers == {"example.com": OTHER}
+    assert error == "Zone creation failed (speculative nameserver update at namecheap reverted)"
+    assert automator.abandon_speculation(site, speculation_result(None), "Zone creation failed") == "Zone creation failed"
+
+
+def test_unrestorable_speculation_is_recorded_in_the_error():
+    automator = DNSAutomator.__new__(DNSAutomator)
+    automator.get_registrar_client = lambda registrar_type: FakeRegistrarClient(fail=True)
+
+    error = automator.abandon_speculation(
+        {"domain": "example.com"}, speculation_result("spaceship", OTHER), "Zone creation failed"
+    )
+
+    assert "speculatively changed at spaceship from kim.ns.cloudflare.com, lee.ns.cloudflare.com" in error
+
+
+class FakeZoneLookup:
+    def __init__(self, zone):
+        self.zone = zone
+
+    def find_zone(self, domain):
+        return self.zone
+
+
+def test_prewarmed_zone_is_verified_before_reuse():
+    automator = DNSAutomator.__new__(DNSAutomator)
+    site = Site("s1", "a.com", cloudflare_zone_id="z1", cloudflare_nameservers=["ana.ns.cloudflare.com"])
+    live = {"id": "z1", "status": "pending", "name_servers": ["bob.ns.cloudflare.com"]}
+
+    assert automator.verify_prewarmed_zone(FakeZoneLookup(live), site) == ["bob.ns.cloudflare.com"]
+    assert automator.verify_prewarmed_zone(FakeZoneLookup(None), site) is None
+    assert automator.verify_prewarmed_zone(FakeZoneLookup({**live, "id": "z2"}), site) is None
+    assert automator.verify_prewarmed_zone(FakeZoneLookup({**live, "status": "moved"}), site) is None
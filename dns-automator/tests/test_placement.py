@@ -0,0 +1,93 @@
+"""Tests for Cloudflare account placement"""
+
+import threading
+
+import pytest
+
+from dns_automator.services.placement import AccountLoadTracker, AccountPlacementService, PlacementError
+
+
+class FakeDataClient:
+    """In-memory stand-in for SupabaseService"""
+
+    def __init__(self, accounts, zone_counts, failed=None):
+        self.accounts = accounts
+        self.zone_counts = zone_counts
+        self.failed = failed or {}
+
+    def fetch_placement_accounts(self):
+        return self.accounts
+
+    def count_sites_for_cloudflare_account(self, cloudflare_account_id):
+        return self.zone_counts.get(cloudflare_account_id, 0)
+
+    def fetch_failed_credentials(self, table):
+        return self.failed
+
+
+def make_account(account_id, **fields):
+    return {"id": account_id, "account_nickname": account_id, "cloudflare_account_id": f"cf-{account_id}", **fields}
+
+
+@pytest.fixture
+def tracker():
+    return AccountLoadTracker()
+
+
+def test_least_filled_account_is_chosen(tracker):
+    data_client = FakeDataClient([make_account("a"), make_account("b")], {"a": 500, "b": 100})
+    placement = AccountPlacementService(data_client, tracker, zone_limit=1000)
+
+    assert placement.choose()["id"] == "b"
+    assert tracker.in_flight("b") == 1
+
+
+def test_rate_limited_and_full_accounts_are_avoided(tracker):
+    accounts = [make_account("a"), make_account("b", zone_limit=100), make_account("c", is_active=False)]
+    data_client = FakeDataClient(accounts, {"a": 300, "b": 100, "c": 0})
+    placement = AccountPlacementService(data_client, tracker, zone_limit=1000)
+
+    tracker.record_error("a", 1001)
+
+    with pytest.raises(PlacementError):
+        placement.choose()
+
+
+def test_concurrent_jobs_spread_over_accounts(tracker):
+    data_client = FakeDataClient([make_account("a"), make_account("b")], {"a": 100, "b": 100})
+    placement = AccountPlacementService(data_client, tracker, zone_limit=1000)
+
+    tracker.record_error("a", 429)
+    chosen = [placement.choose()["id"] for _ in range(6)]
+
+    assert chosen.count("b") > chosen.count("a") > 0
+
+
+def test_accounts_failing_the_credential_audit_are_avoided(tracker):
+    data_client = FakeDataClient([make_account("a"), make_account("b")], {"a": 100, "b": 500}, {"a": "Token is expired"})
+    placement = AccountPlacementService(data_client, tracker, zone_limit=1000)
+
+    assert placement.choose()["id"] == "b"
+
+
+def test_accounts_with_unknown_zone_counts_are_avoided(tracker):
+    data_client = FakeDataClient([make_account("a"), make_account("b")], {"a": None, "b": 900})
+    placement = AccountPlacementService(data_client, tracker, zone_limit=1000)
+
+    assert placement.choose()["id"] == "b"
+
+
+def test_zone_counts_are_queried_without_holding_the_tracker_lock(tracker):
+    class SlowCounts(FakeDataClient):
+        def count_sites_for_cloudflare_account(self, cloudflare_account_id):
+            # A job on another thread must be able to start while the count runs
+            job = threading.Thread(target=tracker.begin, args=("other",))
+            job.start()
+            job.join(timeout=1)
+            assert not job.is_alive()
+            return super().count_sites_for_cloudflare_account(cloudflare_account_id)
+
+    placement = AccountPlacementService(SlowCounts([make_account("a")], {"a": 10}), tracker, zone_limit=1000)
+
+    assert placement.choose()["id"] == "a"
+    assert tracker.in_flight("other") == 1
@@ -0,0 +1,145 @@
+"""Tests for Cloudflare zone pre-warming"""
+
+import time
+from types import SimpleNamespace
+
+from dns_automator.prewarm import ZonePrewarmer
+from dns_automator.services.cloudflare_client import CloudflareError
+from dns_automator.utils.site import Site
+
+
+class FakeCloudflareClient:
+    """In-memory stand-in for CloudflareClient"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.zones = []
+        self.applied = {}
+
+    def create_zone(self, domain):
+        if self.error:
+            raise self.error
+        self.zones.append(domain)
+        return f"zone-{domain}", ["ana.ns.cloudflare.com", "bob.ns.cloudflare.com"]
+
+    def apply_dns_records(self, zone_id, records):
+        self.applied[zone_id] = records
+        return {"created": len(records), "updated": 0, "unchanged": 0}
+
+
+class FakeDataClient:
+    """Records saved zones"""
+
+    def __init__(self):
+        self.zones = {}
+
+    def get_default_server(self):
+        return {"ip_address": "1.1.1.1"}
+
+    def save_zone(self, site_id, zone_id, nameservers):
+        self.zones[site_id] = (zone_id, nameservers)
+        return True
+
+
+class FakeLeases:
+    """Claims that fail for the sites held by another replica"""
+
+    def __init__(self, held_elsewhere=()):
+        self.held_elsewhere = set(held_elsewhere)
+        self.held = set()
+
+    def claim(self, site_id):
+        if site_id in self.held_elsewhere:
+            return False
+        self.held.add(site_id)
+        return True
+
+    def release(self, site_id):
+        self.held.discard(site_id)
+
+
+def make_prewarmer(client, leases=None):
+    automator = SimpleNamespace(
+        data_client=FakeDataClient(),
+        leases=leases or FakeLeases(),
+        response_cache=None,
+        render_site_records=lambda site, server_ip: [{"type": "A", "name": site.domain, "content": server_ip}],
+        apply_zone_profile=lambda client, zone_id, domain: True
+    )
+    prewarmer = ZonePrewarmer(automator, max_workers=2)
+    prewarmer._cloudflare_clients["cf-1"] = (time.monotonic(), client)
+    return prewarmer
+
+
+def test_run_warms_placed_sites_only():
+    client = FakeCloudflareClient()
+    prewarmer = make_prewarmer(client)
+    sites = [
+        Site("site-1", "example.com", cloudflare_account_id="cf-1", status_dns="pending"),
+        Site("site-2", "example.org", cloudflare_account_id="cf-1", status_dns="pending"),
+        Site("site-3", "unplaced.com", status_dns="pending"),
+        Site("site-4", "warm.com", cloudflare_account_id="cf-1", status_dns="pending", cloudflare_zone_id="z"),
+    ]
+
+    summary = prewarmer.run(sites)
+
+    assert summary == {"warmed": 2, "skipped": 2, "error": 0}
+    assert sorted(client.zones) == ["example.com", "example.org"]
+    assert client.applied["zone-example.com"][0]["content"] == "1.1.1.1"
+    assert prewarmer.data_client.zones["site-1"] == (
+        "zone-example.com", ["ana.ns.cloudflare.com", "bob.ns.cloudflare.com"]
+    )
+
+
+def test_cloudflare_error_leaves_zone_to_job():
+    prewarmer = make_prewarmer(FakeCloudflareClient(error=CloudflareError("rate limited", code=971)))
+    site = Site("site-1", "example.com", cloudflare_account_id="cf-1", status_dns="pending")
+
+    assert prewarmer.prewarm_site(site) == "error"
+    assert prewarmer.data_client.zones == {}
+
+
+def test_site_claimed_by_a_job_is_not_prewarmed():
+    client = FakeCloudflareClient()
+    prewarmer = make_prewarmer(client, FakeLeases(held_elsewhere={"site-1"}))
+    site = Site("site-1", "example.com", cloudflare_account_id="cf-1", status_dns="pending")
+
+    assert prewarmer.prewarm_site(site) == "skipped"
+    assert client.zones == []
+
+
+def test_unusable_account_and_server_ip_are_reloaded_after_the_ttl(monkeypatch):
+    prewarmer = make_prewarmer(FakeCloudflareClient())
+    prewarmer.data_client.get_cloudflare_account = lambda account_id: None
+    servers = [None, {"ip_address": "2.2.2.2"}]
+    prewarmer.data_client.get_default_server = lambda: servers.pop(0)
+
+    assert prewarmer._cloudflare_client_for("cf-2") is None
+    assert prewarmer._default_server_ip() is None
+
+    # Within the TTL the cached values are reused
+    prewarmer.data_client.get_cloudflare_account = lambda account_id: {"api_token": "t", "cloudflare_account_id": "a"}
+    assert prewarmer._cloudflare_client_for("cf-2") is None
+    assert prewarmer._default_server_ip() is None
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + prewarmer.cache_ttl)
+    assert prewarmer._cloudflare_client_for("cf-2") is not None
+    assert prewarmer._default_server_ip() == "2.2.2.2"
+
+
+def test_submit_runs_in_background_before_the_job():
+    client = FakeCloudflareClient()
+    prewarmer = make_prewarmer(client)
+    jobs = []
+
+    prewarmer.submit(
+        Site("site-1", "example.com", cloudflare_account_id="cf-1", status_dns="pending"),
+        then=lambda: jobs.append(list(client.zones))
+    )
+    prewarmer.close()
+
+    assert client.zones == ["example.com"]
+    # The job is queued after the zone exists, and the claim is given back
+    assert jobs == [["example.com"]]
+    assert prewarmer.automator.leases.held == set()
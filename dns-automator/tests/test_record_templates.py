@@ -0,0 +1,78 @@
+"""Tests for DNS record templates"""
+
+import pytest
+
+from dns_automator.services.cloudflare_client import CloudflareClient
+from dns_automator.utils.record_templates import (
+    RecordTemplate,
+    RecordTemplateError,
+    plan_batch,
+    render_templates,
+)
+
+VARIABLES = {"domain": "example.com", "server_ip": "1.1.1.1", "site_id": "site-1", "brand_name": "Example"}
+
+
+def test_builtin_base_template_is_always_rendered():
+    gsc = RecordTemplate(
+        name="gsc",
+        records=[{"type": "txt", "name": "@", "content": "google-site-verification=${token}"}],
+        variables={"token": "abc"},
+    )
+
+    records = render_templates([gsc], VARIABLES, "example.com")
+
+    assert records == [
+        {"type": "A", "name": "example.com", "content": "1.1.1.1", "proxied": True, "ttl": 1},
+        {"type": "A", "name": "www.example.com", "content": "1.1.1.1", "proxied": True, "ttl": 1},
+        {"type": "TXT", "name": "example.com", "content": "google-site-verification=abc", "proxied": False, "ttl": 1},
+    ]
+
+
+def test_later_template_overrides_single_value_records():
+    override = RecordTemplate(name="origin", records=[{"type": "A", "name": "www", "content": "2.2.2.2"}])
+
+    records = render_templates([override], VARIABLES, "example.com")
+
+    www = [record for record in records if record["name"] == "www.example.com"]
+    assert www == [{"type": "A", "name": "www.example.com", "content": "2.2.2.2", "proxied": False, "ttl": 1}]
+
+
+def test_missing_variable_raises():
+    broken = RecordTemplate(name="mx", records=[{"type": "MX", "name": "@", "content": "${mail_host}"}])
+
+    with pytest.raises(RecordTemplateError):
+        render_templates([broken], VARIABLES, "example.com")
+
+
+def test_plan_batch_only_writes_differences():
+    desired = render_templates([], VARIABLES, "example.com")
+    existing = [
+        {"id": "r1", "type": "A", "name": "example.com", "content": "1.1.1.1", "proxied": True, "ttl": 1},
+        {"id": "r2", "type": "A", "name": "www.example.com", "content": "9.9.9.9", "proxied": True, "ttl": 1},
+    ]
+
+    posts, patches = plan_batch(desired, existing)
+
+    assert posts == []
+    assert patches == [{"id": "r2", "content": "1.1.1.1"}]
+
+
+class PagedRecords:
+    """Stand-in for cf.zones.dns_records serving records page by page"""
+
+    def __init__(self, records):
+        self.records = records
+
+    def get(self, zone_id, params):
+        start = (params["page"] - 1) * params["per_page"]
+        return self.records[start:start + params["per_page"]]
+
+
+def test_get_dns_records_reads_every_page():
+    records = [{"id": f"r{i}", "type": "TXT", "name": f"t{i}.example.com"} for i in range(5)]
+    client = CloudflareClient.__new__(CloudflareClient)
+    client.rate_limiter = None
+    client.cf = type("CF", (), {"zones": type("Zones", (), {"dns_records": PagedRecords(records)})})()
+
+    assert client.get_dns_records("zone-1", per_page=2) == records
@@ -0,0 +1,62 @@
+"""Tests for the provider response cache"""
+
+import time
+
+import pytest
+
+from dns_automator.utils.response_cache import ResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"), ttls={"test.read": 60})
+    yield cache
+    cache.close()
+
+
+def test_fetch_calls_provider_once(cache):
+    calls = []
+
+    def read():
+        calls.append(1)
+        return {"status": "ok"}
+
+    assert cache.fetch("test.read", ["acct", "example.com"], "test:example.com", read) == {"status": "ok"}
+    assert cache.fetch("test.read", ["acct", "example.com"], "test:example.com", read) == {"status": "ok"}
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Other accounts and endpoints without a TTL are not served from the entry
+    cache.fetch("test.read", ["other", "example.com"], "test:example.com", read)
+    cache.fetch("test.write", ["acct", "example.com"], "test:example.com", read)
+    assert len(calls) == 3
+
+
+def test_write_invalidates_resource(cache):
+    cache.put("test.read", ["a"], "test:example.com", 1)
+    cache.put("test.read", ["b"], "test:other.com", 2)
+
+    assert cache.invalidate("test:example.com") == 1
+    assert cache.get("test.read", ["a"]) is None
+    assert cache.get("test.read", ["b"]) == 2
+
+
+def test_expired_entries_are_misses(cache):
+    cache.ttls["test.read"] = 0.001
+    cache.put("test.read", ["a"], "test:a", 1)
+
+    time.sleep(0.01)
+    assert cache.get("test.read", ["a"]) is None
+
+
+def test_least_recently_read_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"), ttls={"test.read": 60}, max_entries=50)
+    cache.put("test.read", ["keep"], "test:keep", "kept")
+    for i in range(99):
+        if i == 60:
+            assert cache.get("test.read", ["keep"]) == "kept"
+        cache.put("test.read", [i], f"test:{i}", i)
+
+    assert cache.get("test.read", ["keep"]) == "kept"
+    assert cache.get("test.read", [0]) is None
+    cache.close()
@@ -0,0 +1,50 @@
+"""Tests for single-flight request coalescing"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from dns_automator.utils.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_run():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    runs = []
+
+    def job():
+        runs.append(1)
+        started.set()
+        release.wait(5)
+        return "done"
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        leader = executor.submit(flights.do, ("site-1", "dns_setup"), job)
+        started.wait(5)
+        followers = [executor.submit(flights.do, ("site-1", "dns_setup"), job) for _ in range(2)]
+        release.set()
+
+        assert leader.result() == ("done", False)
+        assert [f.result() for f in followers] == [("done", True), ("done", True)]
+
+    assert len(runs) == 1
+    assert flights.in_flight() == 0
+
+
+def test_errors_reach_attached_callers_and_free_the_key():
+    flights = SingleFlight()
+    future, leader = flights.join("site-1")
+    follower, follower_leads = flights.join("site-1")
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        flights.run("site-1", future, fail)
+
+    assert leader and not follower_leads
+    with pytest.raises(RuntimeError):
+        follower.result()
+    assert flights.do("site-1", lambda: 42) == (42, False)
@@ -0,0 +1,63 @@
+"""Tests for the compact Site record"""
+
+import pytest
+
+from dns_automator.services.supabase_client import SchemaError, SupabaseService
+from dns_automator.utils.site import Site
+
+
+def test_from_row_keeps_only_pipeline_columns():
+    row = {"id": "site-1", "domain": "example.com", "status_content": "pending", "error_message": None}
+
+    site = Site.from_row(row)
+
+    assert site.domain is row["domain"]
+    assert site["id"] == "site-1"
+    assert site.get("cloudflare_account_id") is None
+    assert site.get("status_content", "missing") == "missing"
+    with pytest.raises(KeyError):
+        site["status_content"]
+
+
+def test_site_is_immutable():
+    site = Site("site-1", "example.com")
+
+    with pytest.raises(AttributeError):
+        site.cloudflare_account_id = "cf-1"
+
+    placed = site.replace(cloudflare_account_id="cf-1")
+    assert placed.cloudflare_account_id == "cf-1"
+    assert site.cloudflare_account_id is None
+
+
+class UndefinedColumn(Exception):
+    code = "42703"
+
+
+class MissingColumnClient:
+    """Supabase client whose sites table lacks the migration 014 columns"""
+
+    def table(self, name):
+        return self
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        return self
+
+    def limit(self, count):
+        return self
+
+    def execute(self):
+        raise UndefinedColumn("column sites.cloudflare_zone_id does not exist")
+
+
+def test_missing_site_columns_fail_loudly():
+    data_client = SupabaseService.__new__(SupabaseService)
+    data_client.client = MissingColumnClient()
+
+    with pytest.raises(SchemaError, match="migration_014"):
+        data_client.verify_schema()
+    with pytest.raises(SchemaError):
+        data_client.fetch_pending_dns_sites()
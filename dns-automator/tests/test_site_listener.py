@@ -0,0 +1,41 @@
+"""Tests for the site change listener"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from dns_automator.utils.site_listener import DNS_PENDING_CHANNEL, SiteChangeListener, SiteListenerError
+
+
+class FakeConnection:
+    """Connection with notifications waiting to be polled"""
+
+    def __init__(self, payloads):
+        self.pending = [SimpleNamespace(payload=payload) for payload in payloads]
+        self.notifies = []
+
+    def poll(self):
+        self.notifies.extend(self.pending)
+        self.pending = []
+
+
+def test_notifications_are_dispatched_by_site_id():
+    queued = []
+
+    def on_site(site_id):
+        if site_id == "bad":
+            raise RuntimeError("queue unavailable")
+        queued.append(site_id)
+
+    listener = SiteChangeListener("postgresql://localhost/db", DNS_PENDING_CHANNEL, on_site)
+    conn = FakeConnection(["s1", "", "bad", "s2"])
+
+    listener._drain(conn)
+
+    assert queued == ["s1", "s2"]
+    assert conn.notifies == []
+
+
+def test_rejects_invalid_channel_names():
+    with pytest.raises(SiteListenerError):
+        SiteChangeListener("postgresql://localhost/db", "dns; DROP TABLE sites", lambda site_id: None)
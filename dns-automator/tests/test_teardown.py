@@ -0,0 +1,105 @@
+"""Tests for the DNS teardown of retired sites"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from dns_automator.fleet import FleetChangeState
+from dns_automator.services.cloudflare_client import CloudflareError
+from dns_automator.teardown import DNSTeardown
+from dns_automator.utils.site import Site
+
+
+class FakeCloudflareClient:
+    """In-memory stand-in for CloudflareClient"""
+
+    def __init__(self, zones, fail=False):
+        self.zones = zones
+        self.fail = fail
+        self.deleted = []
+
+    def find_zone(self, domain):
+        return {"id": self.zones[domain]} if domain in self.zones else None
+
+    def delete_zone(self, zone_id, domain):
+        if self.fail:
+            raise CloudflareError("Rate limited", code=10000)
+        self.deleted.append(zone_id)
+        del self.zones[domain]
+
+
+class FakeRegistrarClient:
+    """Registrar holding some domains"""
+
+    def __init__(self, domains):
+        self.domains = domains
+        self.resets = []
+
+    def get_nameservers(self, domain):
+        return ["ns1.cloudflare.com"] if domain in self.domains else None
+
+    def reset_nameservers(self, domain):
+        self.resets.append(domain)
+        return True
+
+
+class FakeDataClient:
+    def __init__(self):
+        self.retired = []
+
+    def retire_site_dns(self, site_id):
+        self.retired.append(site_id)
+        return True
+
+
+@pytest.fixture
+def registrars():
+    return {"namecheap": FakeRegistrarClient({"a.com"}), "spaceship": FakeRegistrarClient({"b.com"})}
+
+
+def make_teardown(tmp_path, registrars, cloudflare):
+    automator = SimpleNamespace(
+        data_client=FakeDataClient(),
+        response_cache=None,
+        get_registrar_client=lambda registrar_type: registrars[registrar_type]
+    )
+    teardown = DNSTeardown(automator, FleetChangeState(str(tmp_path / "state.json")), max_workers=2)
+    teardown._cloudflare_clients["cf-1"] = cloudflare
+    return teardown
+
+
+def test_teardown_resets_nameservers_and_deletes_zones(tmp_path, registrars):
+    cloudflare = FakeCloudflareClient({"a.com": "zone-a", "b.com": "zone-b"})
+    teardown = make_teardown(tmp_path, registrars, cloudflare)
+    sites = [
+        Site("site-a", "a.com", cloudflare_account_id="cf-1", registrar="namecheap"),
+        Site("site-b", "b.com", cloudflare_account_id="cf-1"),
+        Site("site-c", "c.com"),
+    ]
+
+    assert teardown.run(sites) == {"done": 3}
+    assert registrars["namecheap"].resets == ["a.com"]
+    assert registrars["spaceship"].resets == ["b.com"]
+    assert sorted(cloudflare.deleted) == ["zone-a", "zone-b"]
+    assert sorted(teardown.data_client.retired) == ["site-a", "site-b", "site-c"]
+    assert teardown.state.get("c.com")["steps"] == {"registrar_nameservers": "absent", "cloudflare_zone": "absent"}
+
+
+def test_failed_teardown_resumes_after_the_finished_steps(tmp_path, registrars):
+    cloudflare = FakeCloudflareClient({"a.com": "zone-a"}, fail=True)
+    teardown = make_teardown(tmp_path, registrars, cloudflare)
+    site = Site("site-a", "a.com", cloudflare_account_id="cf-1", registrar="namecheap")
+
+    assert teardown.run([site]) == {"failed": 1}
+    entry = teardown.state.get("a.com")
+    assert entry["steps"] == {"registrar_nameservers": "reset"}
+    assert "Rate limited" in entry["error"]
+
+    # A second run with the same state file only retries the zone
+    cloudflare.fail = False
+    resumed = make_teardown(tmp_path, registrars, cloudflare)
+    assert resumed.run([site]) == {"done": 1}
+    assert registrars["namecheap"].resets == ["a.com"]
+    assert cloudflare.deleted == ["zone-a"]
+
+    assert make_teardown(tmp_path, registrars, cloudflare).run([site]) == {}
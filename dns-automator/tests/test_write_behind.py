@@ -0,0 +1,193 @@
+"""Tests for the write-behind status buffer"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from dns_automator.utils.write_behind import WriteBehindBuffer
+
+
+class FakeAPIError(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+
+class FakeQuery:
+    def __init__(self, client, call):
+        self.client = client
+        self.call = call
+
+    def upsert(self, rows, on_conflict=""):
+        self.call = ("upsert", self.call[1], rows, on_conflict)
+        return self
+
+    def update(self, fields):
+        self.call = ("update", self.call[1], fields)
+        return self
+
+    def insert(self, row):
+        self.call = ("insert", self.call[1], row)
+        return self
+
+    def eq(self, column, value):
+        self.call = self.call + (value,)
+        return self
+
+    def execute(self):
+        kind, name = self.call[:2]
+        if self.client.down:
+            raise ConnectionError("Server disconnected")
+        if kind == "rpc" and not self.client.has_rpc:
+            raise FakeAPIError("PGRST202")
+        if kind == "rpc" and any(update["id"] in self.client.bad_sites for update in self.call[2]["updates"]):
+            raise FakeAPIError("23514")
+        if kind == "update" and name == "sites" and self.call[3] in self.client.bad_sites:
+            raise FakeAPIError("23514")
+        if kind == "upsert" and not self.client.has_step_index:
+            raise FakeAPIError("42P10")
+        self.client.calls.append(self.call)
+
+        if kind == "update" and name == "workflow_steps":
+            return SimpleNamespace(data=[self.call[2]] if self.call[3:] in self.client.step_rows else [])
+        if kind == "insert":
+            row = self.call[2]
+            self.client.step_rows.add((row["site_id"], row["phase"], row["step_name"]))
+        return SimpleNamespace(data=[])
+
+
+class FakeClient:
+    """Records the writes a buffer makes"""
+
+    def __init__(self, has_rpc=True, has_step_index=True, bad_sites=()):
+        self.has_rpc = has_rpc
+        self.has_step_index = has_step_index
+        self.bad_sites = set(bad_sites)
+        self.down = False
+        self.calls = []
+        self.step_rows = set()
+
+    def table(self, name):
+        return FakeQuery(self, ("table", name))
+
+    def rpc(self, name, params):
+        return FakeQuery(self, ("rpc", name, params))
+
+
+@pytest.fixture
+def client():
+    return FakeClient()
+
+
+def test_site_updates_are_coalesced_into_one_call(client):
+    buffer = WriteBehindBuffer(client, flush_interval=60)
+
+    buffer.update_site("s1", {"status_dns": "processing", "error_message": "x"})
+    buffer.update_site("s1", {"status_dns": "active", "error_message": None})
+    buffer.update_site("s2", {"status_dns": "failed"})
+    assert client.calls == []
+
+    buffer.close()
+
+    assert client.calls == [("rpc", "apply_site_updates", {"updates": [
+        {"id": "s1", "fields": {"status_dns": "active", "error_message": None}},
+        {"id": "s2", "fields": {"status_dns": "failed"}},
+    ]})]
+
+
+def test_steps_are_upserted_and_counted_on_finish(client):
+    buffer = WriteBehindBuffer(client, flush_interval=60)
+
+    buffer.step("s1", "dns_setup", "cloudflare_zone")
+    buffer.step("s1", "dns_setup", "dns_records")
+    buffer.finish("s1", "dns_setup", success=True)
+
+    upserts = [call for call in client.calls if call[0] == "upsert"]
+    assert len(upserts) == 1
+    _, table, rows, on_conflict = upserts[0]
+    assert table == "workflow_steps" and on_conflict == "site_id,phase,step_name"
+    assert sorted((row["step_name"], row["status"]) for row in rows) == [
+        ("cloudflare_zone", "completed"),
+        ("dns_records", "completed"),
+    ]
+
+    rpc = [call for call in client.calls if call[0] == "rpc"][0]
+    assert rpc[2]["updates"] == [{"id": "s1", "fields": {"dns_steps_completed": 2}}]
+    buffer.close()
+
+
+def test_falls_back_to_single_updates_without_rpc():
+    client = FakeClient(has_rpc=False)
+    buffer = WriteBehindBuffer(client, flush_interval=60)
+
+    buffer.update_site("s1", {"status_dns": "active"})
+    buffer.close()
+
+    assert client.calls == [("update", "sites", {"status_dns": "active"}, "s1")]
+
+
+def test_bad_row_is_dropped_without_blocking_the_batch():
+    client = FakeClient(bad_sites={"s2"})
+    buffer = WriteBehindBuffer(client, flush_interval=60)
+
+    buffer.update_site("s1", {"status_dns": "active"})
+    buffer.update_site("s2", {"status_dns": "bogus"})
+
+    assert buffer.finish("s1", "dns_setup", success=True)
+    assert client.calls == [("update", "sites", {"status_dns": "active"}, "s1")]
+    # The constraint violation is not retried
+    assert not buffer.finish("s2", "dns_setup", success=True)
+    assert len(client.calls) == 1
+    buffer.close()
+
+
+def test_transient_failures_are_retried_a_bounded_number_of_times(client):
+    buffer = WriteBehindBuffer(client, flush_interval=60, max_attempts=3)
+    client.down = True
+
+    buffer.update_site("s1", {"status_dns": "active"})
+    buffer.flush()
+    assert "s1" in buffer._sites
+    buffer.flush()
+    # Dropped on the third failure
+    assert not buffer.finish("s1", "dns_setup", success=True)
+    assert buffer._sites == {}
+
+    # Written again once the database is back
+    client.down = False
+    buffer.update_site("s1", {"status_dns": "active"})
+    assert buffer.finish("s1", "dns_setup", success=True)
+    assert len(client.calls) == 1
+    buffer.close()
+
+
+def test_steps_are_written_one_by_one_without_unique_index():
+    client = FakeClient(has_step_index=False)
+    buffer = WriteBehindBuffer(client, flush_interval=60)
+
+    buffer.step("s1", "dns_setup", "cloudflare_zone")
+    buffer.flush()
+    buffer.step("s1", "dns_setup", "dns_records")
+    assert buffer.finish("s1", "dns_setup", success=True)
+
+    # The first write of a step inserts it, later ones update it
+    inserts = [call[2]["step_name"] for call in client.calls if call[0] == "insert"]
+    updates = [call[-1] for call in client.calls if call[:2] == ("update", "workflow_steps")]
+    assert inserts == ["cloudflare_zone", "dns_records"]
+    assert sorted(updates) == ["cloudflare_zone", "cloudflare_zone", "dns_records"]
+    assert client.step_rows == {("s1", "dns_setup", "cloudflare_zone"), ("s1", "dns_setup", "dns_records")}
+    buffer.close()
+
+
+def test_discard_drops_the_pending_writes_of_a_job(client):
+    buffer = WriteBehindBuffer(client, flush_interval=60)
+
+    buffer.update_site("s1", {"status_dns": "failed"})
+    buffer.step("s1", "dns_setup", "cloudflare_zone")
+    buffer.update_site("s2", {"status_dns": "active"})
+    buffer.discard("s1", "dns_setup")
+    buffer.close()
+
+    assert client.calls == [("rpc", "apply_site_updates", {"updates": [
+        {"id": "s2", "fields": {"status_dns": "active"}},
+    ]})]
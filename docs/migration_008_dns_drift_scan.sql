@@ -0,0 +1,26 @@
+-- Migration 008: DNS drift scanning
+-- Tracks which registrar manages each domain and when its live DNS state was last
+-- compared with the database, and stores the drift found by the scanner
+
+-- Registrar detected by the DNS Automator ('namecheap', 'spaceship')
+ALTER TABLE sites ADD COLUMN IF NOT EXISTS registrar TEXT;
+
+-- Last time the drift scanner checked this site
+ALTER TABLE sites ADD COLUMN IF NOT EXISTS dns_checked_at TIMESTAMPTZ;
+
+-- Drift reports (one row per scanned site and run)
+CREATE TABLE IF NOT EXISTS dns_drift_reports (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    site_id UUID NOT NULL REFERENCES sites(id) ON DELETE CASCADE,
+    in_sync BOOLEAN NOT NULL,
+    issues JSONB NOT NULL DEFAULT '[]'::jsonb
+);
+
+-- Create indexes
+CREATE INDEX IF NOT EXISTS idx_sites_dns_checked_at ON sites(status_dns, dns_checked_at);
+CREATE INDEX IF NOT EXISTS idx_dns_drift_reports_site_id ON dns_drift_reports(site_id);
+CREATE INDEX IF NOT EXISTS idx_dns_drift_reports_created_at ON dns_drift_reports(created_at DESC);
+
+COMMENT ON COLUMN sites.registrar IS 'Registrar managing the domain, detected by the DNS Automator when nameservers are set';
+COMMENT ON COLUMN sites.dns_checked_at IS 'Last DNS drift scan of this site; the scanner only re-checks sites older than its max age';
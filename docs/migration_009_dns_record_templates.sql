@@ -0,0 +1,54 @@
+-- Migration 009: Declarative DNS record templates
+-- Named sets of DNS records with ${variables} that the DNS Automator renders and
+-- applies to a zone in one batched Cloudflare request
+
+-- Record templates
+-- records: [{"type": "TXT", "name": "@", "content": "v=spf1 include:${mail_host} ~all", "ttl": 1, "proxied": false}]
+-- Built-in variables: ${domain}, ${server_ip}, ${site_id}, ${brand_name}
+CREATE TABLE IF NOT EXISTS dns_record_templates (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    name TEXT NOT NULL UNIQUE,
+    description TEXT,
+    records JSONB NOT NULL DEFAULT '[]'::jsonb,
+    is_active BOOLEAN DEFAULT true
+);
+
+-- Template attachments: to one site, to every site of a Cloudflare account, or
+-- (both NULL) to every site in the fleet. variables supplies template-specific
+-- values such as a Search Console verification token.
+CREATE TABLE IF NOT EXISTS dns_template_assignments (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    template_id UUID NOT NULL REFERENCES dns_record_templates(id) ON DELETE CASCADE,
+    site_id UUID REFERENCES sites(id) ON DELETE CASCADE,
+    cloudflare_account_id UUID REFERENCES cloudflare_accounts(id) ON DELETE CASCADE,
+    variables JSONB NOT NULL DEFAULT '{}'::jsonb,
+    CHECK (site_id IS NULL OR cloudflare_account_id IS NULL)
+);
+
+-- Create indexes
+CREATE INDEX IF NOT EXISTS idx_dns_template_assignments_site_id ON dns_template_assignments(site_id);
+CREATE INDEX IF NOT EXISTS idx_dns_template_assignments_cf_account ON dns_template_assignments(cloudflare_account_id);
+
+CREATE TRIGGER update_dns_record_templates_updated_at BEFORE UPDATE ON dns_record_templates
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Base template matching the records the DNS Automator has always created
+INSERT INTO dns_record_templates (name, description, records)
+VALUES (
+    'base',
+    'Proxied A records for the root domain and www pointing at the hosting server',
+    '[{"type": "A", "name": "@", "content": "${server_ip}", "proxied": true},
+      {"type": "A", "name": "www", "content": "${server_ip}", "proxied": true}]'::jsonb
+)
+ON CONFLICT (name) DO NOTHING;
+
+INSERT INTO dns_template_assignments (template_id)
+SELECT id FROM dns_record_templates WHERE name = 'base'
+AND NOT EXISTS (
+    SELECT 1 FROM dns_template_assignments a
+    JOIN dns_record_templates t ON t.id = a.template_id
+    WHERE t.name = 'base' AND a.site_id IS NULL AND a.cloudflare_account_id IS NULL
+);
@@ -0,0 +1,18 @@
+-- Migration 010: Load-aware Cloudflare account placement
+-- New sites may be created without a Cloudflare account; the DNS Automator then
+-- places them on the least loaded account and stores the choice on the site
+
+-- Allow sites to be created unassigned
+ALTER TABLE sites ALTER COLUMN cloudflare_account_id DROP NOT NULL;
+
+-- Per-account zone capacity (falls back to CLOUDFLARE_ZONE_LIMIT when NULL)
+ALTER TABLE cloudflare_accounts ADD COLUMN IF NOT EXISTS zone_limit INTEGER;
+
+-- Accounts excluded from placement keep their existing sites
+ALTER TABLE cloudflare_accounts ADD COLUMN IF NOT EXISTS is_active BOOLEAN NOT NULL DEFAULT true;
+
+-- Create indexes
+CREATE INDEX IF NOT EXISTS idx_sites_cloudflare_account_id ON sites(cloudflare_account_id);
+
+COMMENT ON COLUMN cloudflare_accounts.zone_limit IS 'Maximum zones placed on this account by the DNS Automator; NULL uses the service default';
+COMMENT ON COLUMN cloudflare_accounts.is_active IS 'Whether the DNS Automator may place new sites on this account';
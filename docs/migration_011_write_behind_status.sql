@@ -0,0 +1,54 @@
+-- Migration 011: Batched status and workflow step writes
+-- The automators buffer status and step changes in memory and write them in
+-- batches: one upsert for all changed workflow_steps rows and one call to
+-- apply_site_updates() for all pending site updates
+
+-- One row per step of a site's phase, so step changes can be upserted
+CREATE UNIQUE INDEX IF NOT EXISTS idx_workflow_steps_site_phase_step
+    ON workflow_steps(site_id, phase, step_name);
+
+-- Apply many partial site updates in one call
+-- updates: [{"id": "<site uuid>", "fields": {"status_dns": "active", "error_message": null}}, ...]
+-- Only the columns below can be set; columns missing from "fields" keep their value
+CREATE OR REPLACE FUNCTION apply_site_updates(updates JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    item JSONB;
+    updated INTEGER := 0;
+BEGIN
+    FOR item IN SELECT * FROM jsonb_array_elements(updates) LOOP
+        UPDATE sites s SET (
+            status_dns,
+            status_hosting,
+            error_message,
+            registrar,
+            hosting_doc_root,
+            matomo_site_id,
+            dns_steps_completed,
+            dns_steps_total,
+            hosting_steps_completed,
+            hosting_steps_total
+        ) = (
+            SELECT
+                r.status_dns,
+                r.status_hosting,
+                r.error_message,
+                r.registrar,
+                r.hosting_doc_root,
+                r.matomo_site_id,
+                r.dns_steps_completed,
+                r.dns_steps_total,
+                r.hosting_steps_completed,
+                r.hosting_steps_total
+            FROM jsonb_populate_record(s, item->'fields') r
+        )
+        WHERE s.id = (item->>'id')::uuid;
+
+        updated := updated + 1;
+    END LOOP;
+
+    RETURN updated;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION apply_site_updates(JSONB) IS 'Batched partial updates of sites status columns, used by the automators'' write-behind buffers';
@@ -0,0 +1,80 @@
+-- Migration 012: Lease-based work claiming on active_processing
+-- Several automator replicas can run side by side: a replica claims a site by
+-- taking a time-limited lease on its active_processing row, renews the lease
+-- while it works (heartbeat) and deletes the row when done. Leases of crashed
+-- replicas expire and the site can be claimed again.
+
+ALTER TABLE active_processing ADD COLUMN IF NOT EXISTS lease_owner TEXT;
+ALTER TABLE active_processing ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_active_processing_lease_expires_at ON active_processing(lease_expires_at);
+
+-- Claim one site; succeeds if it is unclaimed, its lease expired, or the caller already holds it
+CREATE OR REPLACE FUNCTION claim_site(p_site_id UUID, p_phase TEXT, p_owner TEXT, p_ttl_seconds INTEGER)
+RETURNS BOOLEAN AS $$
+    WITH claimed AS (
+        INSERT INTO active_processing (site_id, current_phase, lease_owner, lease_expires_at, started_at)
+        VALUES (p_site_id, p_phase, p_owner, NOW() + make_interval(secs => p_ttl_seconds), NOW())
+        ON CONFLICT (site_id) DO UPDATE
+            SET current_phase = EXCLUDED.current_phase,
+                lease_owner = EXCLUDED.lease_owner,
+                lease_expires_at = EXCLUDED.lease_expires_at,
+                started_at = CASE
+                    WHEN active_processing.lease_owner = EXCLUDED.lease_owner THEN active_processing.started_at
+                    ELSE NOW()
+                END
+            WHERE active_processing.lease_owner = EXCLUDED.lease_owner
+               OR active_processing.lease_expires_at IS NULL
+               OR active_processing.lease_expires_at < NOW()
+        RETURNING site_id
+    )
+    SELECT COUNT(*) > 0 FROM claimed;
+$$ LANGUAGE sql;
+
+-- Claim up to p_limit sites waiting for a phase; concurrent callers get disjoint sites
+CREATE OR REPLACE FUNCTION claim_pending_sites(p_phase TEXT, p_owner TEXT, p_ttl_seconds INTEGER, p_limit INTEGER)
+RETURNS SETOF UUID AS $$
+    WITH candidates AS (
+        SELECT s.id
+        FROM sites s
+        LEFT JOIN active_processing ap ON ap.site_id = s.id
+        WHERE CASE p_phase
+                WHEN 'dns_setup' THEN s.status_dns = 'pending'
+                WHEN 'hosting_setup' THEN s.status_dns = 'active' AND s.status_hosting = 'pending'
+                ELSE FALSE
+              END
+          AND (ap.site_id IS NULL OR ap.lease_expires_at IS NULL OR ap.lease_expires_at < NOW())
+        ORDER BY s.created_at
+        LIMIT p_limit
+        FOR UPDATE OF s SKIP LOCKED
+    )
+    INSERT INTO active_processing (site_id, current_phase, lease_owner, lease_expires_at, started_at)
+    SELECT id, p_phase, p_owner, NOW() + make_interval(secs => p_ttl_seconds), NOW()
+    FROM candidates
+    ON CONFLICT (site_id) DO UPDATE
+        SET current_phase = EXCLUDED.current_phase,
+            lease_owner = EXCLUDED.lease_owner,
+            lease_expires_at = EXCLUDED.lease_expires_at,
+            started_at = NOW()
+        WHERE active_processing.lease_expires_at IS NULL
+           OR active_processing.lease_expires_at < NOW()
+    RETURNING site_id;
+$$ LANGUAGE sql;
+
+-- Extend the caller's leases; returns the sites whose lease is still held
+CREATE OR REPLACE FUNCTION renew_site_leases(p_site_ids UUID[], p_owner TEXT, p_ttl_seconds INTEGER)
+RETURNS SETOF UUID AS $$
+    UPDATE active_processing
+    SET lease_expires_at = NOW() + make_interval(secs => p_ttl_seconds)
+    WHERE site_id = ANY(p_site_ids) AND lease_owner = p_owner
+    RETURNING site_id;
+$$ LANGUAGE sql;
+
+-- Give up a lease held by the caller
+CREATE OR REPLACE FUNCTION release_site(p_site_id UUID, p_owner TEXT)
+RETURNS VOID AS $$
+    DELETE FROM active_processing WHERE site_id = p_site_id AND lease_owner = p_owner;
+$$ LANGUAGE sql;
+
+COMMENT ON COLUMN active_processing.lease_owner IS 'Automator replica holding the site (hostname:pid:nonce)';
+COMMENT ON COLUMN active_processing.lease_expires_at IS 'The site can be claimed by another replica after this time unless the lease is renewed';
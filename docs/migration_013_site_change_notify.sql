@@ -0,0 +1,26 @@
+-- Migration 013: Push notifications for site status changes
+-- Automators in listener mode (LISTEN_DATABASE_URL) subscribe to these
+-- channels and queue work as soon as a site becomes ready for their phase,
+-- instead of waiting for a /process call. The payload is the site UUID.
+--   dns_pending: status_dns became 'pending' (new sites included)
+--   dns_active:  status_dns became 'active', the site is ready for hosting
+
+CREATE OR REPLACE FUNCTION notify_site_status_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' OR OLD.status_dns IS DISTINCT FROM NEW.status_dns THEN
+        IF NEW.status_dns = 'pending' THEN
+            PERFORM pg_notify('dns_pending', NEW.id::text);
+        ELSIF NEW.status_dns = 'active' THEN
+            PERFORM pg_notify('dns_active', NEW.id::text);
+        END IF;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS sites_status_notify ON sites;
+CREATE TRIGGER sites_status_notify
+    AFTER INSERT OR UPDATE OF status_dns ON sites
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_site_status_change();
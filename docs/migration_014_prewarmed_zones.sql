@@ -0,0 +1,12 @@
+-- Migration 014: Pre-warmed Cloudflare zones
+-- Stores the zone created for a site and the nameservers Cloudflare assigned to it,
+-- so a zone created ahead of the DNS job (dns_automator.prewarm) is reused by the job
+
+-- Cloudflare zone ID of the site's zone
+ALTER TABLE sites ADD COLUMN IF NOT EXISTS cloudflare_zone_id TEXT;
+
+-- Nameservers Cloudflare assigned to the zone
+ALTER TABLE sites ADD COLUMN IF NOT EXISTS cloudflare_nameservers TEXT[];
+
+COMMENT ON COLUMN sites.cloudflare_zone_id IS 'Cloudflare zone of the site, set once the zone and its base records exist';
+COMMENT ON COLUMN sites.cloudflare_nameservers IS 'Nameservers Cloudflare assigned to the zone; the DNS job points the registrar at them';
@@ -0,0 +1,10 @@
+-- Migration 015: Zone activation
+-- With ZONE_ACTIVATION enabled the DNS Automator leaves a site at
+-- status_dns = 'activating' once its nameservers are set, and its zone
+-- activator marks it 'active' only when Cloudflare reports the zone active.
+-- The hosting phase (status_dns = 'active') therefore starts on a live zone.
+
+-- Activating sites are polled continuously
+CREATE INDEX IF NOT EXISTS idx_sites_dns_activating ON sites(id) WHERE status_dns = 'activating';
+
+COMMENT ON COLUMN sites.status_dns IS 'pending, activating (nameservers set, Cloudflare zone not active yet), active or failed';
@@ -0,0 +1,29 @@
+-- Migration 016: Credential audits
+-- The DNS Automator's credential audit (python -m dns_automator.audit) checks
+-- every row of cloudflare_accounts, registrar_credentials and
+-- infrastructure_credentials in parallel and stores one result per credential
+-- here. Until a result expires the automators skip credentials whose audit
+-- failed instead of failing every site that would use them.
+
+CREATE TABLE IF NOT EXISTS credential_audits (
+    credential_table TEXT NOT NULL, -- cloudflare_accounts, registrar_credentials, infrastructure_credentials
+    credential_id UUID NOT NULL,
+    label TEXT, -- account nickname, registrar provider or infrastructure service
+    healthy BOOLEAN NOT NULL,
+    error TEXT,
+    latency_ms INTEGER,
+    details JSONB DEFAULT '{}'::jsonb, -- scopes, zone/domain/site counts, quota headroom
+    checked_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (credential_table, credential_id)
+);
+
+-- The automators only read unexpired failures
+CREATE INDEX IF NOT EXISTS idx_credential_audits_failed ON credential_audits(credential_table, expires_at) WHERE NOT healthy;
+
+ALTER TABLE credential_audits ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Authenticated users can view credential audits"
+    ON credential_audits FOR SELECT
+    TO authenticated
+    USING (true);
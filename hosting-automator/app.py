@@ -1,21 +1,48 @@
 """FastAPI app for Hosting Automator service"""
 
+import hmac
 import os
 import logging
+from datetime import datetime, timedelta
 from contextlib import asynccontextmanager
-from typing import Optional
+from typing import List, Optional
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from hosting_automator.main import HostingAutomator
+from hosting_automator.core.batch_stream import NDJSON_MEDIA_TYPE, stream_batch, submit_batch
+from hosting_automator.core.event_stream import SSE_MEDIA_TYPE, sse_events
+from hosting_automator.core.config import Config
+from hosting_automator.core.call_ledger import aggregate
+from hosting_automator.core.concurrency import adaptive_limiters
+from hosting_automator.core.job_queue import Job, JobQueue, JobWorker
+from hosting_automator.core.load import load_report
 from hosting_automator.core.logging import setup_logging
+from hosting_automator.core.site_listener import DNS_ACTIVE_CHANNEL, SiteChangeListener
+from hosting_automator.core.single_flight import SingleFlight
+from hosting_automator.core.write_behind import flush_all
+from hosting_automator.services.supabase_client import SupabaseService
 
 # Setup logging
 logger = setup_logging()
 
 
+# Duplicate /process requests for a site attach to the job already running for it
+process_flights = SingleFlight()
+
+# workflow_steps phase run by /process
+HOSTING_PHASE = "hosting_setup"
+
+# Durable queue behind /process, created on first use (see get_job_worker)
+job_worker: Optional[JobWorker] = None
+
+# Queues sites as soon as their DNS is active (listener mode, see start_listener)
+site_listener: Optional[SiteChangeListener] = None
+
+
 class ProcessRequest(BaseModel):
     """Request model for processing hosting"""
     supabase_url: str
@@ -23,6 +50,20 @@ class ProcessRequest(BaseModel):
     site_id: Optional[str] = None
 
 
+class BatchFilter(BaseModel):
+    """Selects sites pending hosting setup for a batch"""
+    server_id: Optional[str] = None
+    limit: Optional[int] = None
+
+
+class BatchRequest(BaseModel):
+    """Request model for processing a batch of sites"""
+    supabase_url: str
+    supabase_service_key: str
+    site_ids: Optional[List[str]] = None
+    filter: Optional[BatchFilter] = None
+
+
 class ProcessResponse(BaseModel):
     """Response model for process request"""
     status: str
@@ -34,8 +75,19 @@ class ProcessResponse(BaseModel):
 async def lifespan(app: FastAPI):
     """Lifecycle manager for the app"""
     logger.info("Hosting Automator service starting up...")
+    # Replays jobs left unfinished by the previous process
+    get_job_worker()
+    if Config.LISTEN_DATABASE_URL:
+        start_listener()
     yield
     logger.info("Hosting Automator service shutting down...")
+    if site_listener:
+        site_listener.stop(timeout=5)
+    # Let running jobs finish; queued jobs stay on disk for the next start
+    if job_worker:
+        job_worker.stop(timeout=Config.SHUTDOWN_TIMEOUT)
+    # Write status updates still buffered before the process exits
+    flush_all()
 
 
 app = FastAPI(
@@ -55,39 +107,70 @@ app.add_middleware(
 )
 
 
-def run_hosting_automation(supabase_url: str, supabase_service_key: str, site_id: Optional[str] = None):
-    """Background task to run hosting automation"""
+def check_credentials(supabase_url: str, supabase_service_key: str) -> None:
+    """
+    Reject request credentials other than the configured ones
+    
+    Queued jobs run on a shared worker pool with the service's own Supabase
+    client (SUPABASE_URL / SUPABASE_SERVICE_KEY), so a request for another
+    project is refused rather than run against the configured one.
+    
+    Raises:
+        HTTPException: 503 if the service has no credentials, 403 if they differ
+    """
+    if not (Config.SUPABASE_URL and Config.SUPABASE_SERVICE_KEY):
+        raise HTTPException(status_code=503, detail="SUPABASE_URL and SUPABASE_SERVICE_KEY are not configured")
+    
+    same_url = supabase_url.rstrip("/") == Config.SUPABASE_URL.rstrip("/")
+    same_key = hmac.compare_digest(supabase_service_key.encode(), Config.SUPABASE_SERVICE_KEY.encode())
+    if not (same_url and same_key):
+        raise HTTPException(status_code=403, detail="Credentials do not match the configured Supabase project")
+
+
+def run_hosting_automation(site_id: Optional[str] = None) -> bool:
+    """Background task to run hosting automation; returns whether it completed"""
     try:
-        # Temporarily set environment variables for this execution
-        original_url = os.environ.get("SUPABASE_URL")
-        original_key = os.environ.get("SUPABASE_SERVICE_KEY")
-        
-        os.environ["SUPABASE_URL"] = supabase_url
-        os.environ["SUPABASE_SERVICE_KEY"] = supabase_service_key
-        
-        if site_id:
-            os.environ["SITE_ID"] = site_id
-        
-        try:
-            # Run the automator
-            automator = HostingAutomator()
-            automator.run()
-        finally:
-            # Restore original environment
-            if original_url:
-                os.environ["SUPABASE_URL"] = original_url
-            else:
-                os.environ.pop("SUPABASE_URL", None)
-                
-            if original_key:
-                os.environ["SUPABASE_SERVICE_KEY"] = original_key
-            else:
-                os.environ.pop("SUPABASE_SERVICE_KEY", None)
-                
-            os.environ.pop("SITE_ID", None)
-            
+        automator = HostingAutomator()
+        return automator.run(site_id)
     except Exception as e:
         logger.error(f"Hosting automation failed: {e}")
+        return False
+
+
+def run_job(job: Job) -> bool:
+    """Run a queued /process job"""
+    site_id = None if job.site_id == "*" else job.site_id
+    
+    result, _ = process_flights.do((job.site_id, job.phase), run_hosting_automation, site_id)
+    return result
+
+
+def get_job_worker() -> JobWorker:
+    """Open the job queue and start its workers once per process"""
+    global job_worker
+    if job_worker is None:
+        job_worker = JobWorker(
+            JobQueue(Config.JOB_QUEUE_PATH),
+            run_job,
+            workers=Config.QUEUE_WORKERS,
+            retention_seconds=Config.JOB_RETENTION_SECONDS
+        )
+        job_worker.start()
+    return job_worker
+
+
+def start_listener() -> None:
+    """Queue hosting jobs from database notifications instead of waiting for /process calls"""
+    global site_listener
+    site_listener = SiteChangeListener(
+        Config.LISTEN_DATABASE_URL,
+        DNS_ACTIVE_CHANNEL,
+        on_site=lambda site_id: get_job_worker().submit(site_id, HOSTING_PHASE),
+        # A run over all pending sites catches up on changes missed while disconnected
+        on_connect=lambda: get_job_worker().submit("*", HOSTING_PHASE)
+    )
+    site_listener.start()
+    logger.info("Listener mode enabled, sites are queued as soon as their DNS is active")
 
 
 @app.get("/")
@@ -97,20 +180,29 @@ async def root():
 
 
 @app.post("/process", response_model=ProcessResponse)
-async def process_hosting(request: ProcessRequest, background_tasks: BackgroundTasks):
+async def process_hosting(request: ProcessRequest):
     """
     Process hosting configuration for pending sites
     
-    This endpoint is called by the Management Hub API with injected credentials
+    This endpoint is called by the Management Hub API with injected credentials.
+    The task is recorded in a durable job queue, so it survives restarts. A
+    request for a site whose hosting setup is already queued or running
+    attaches to that task instead of starting another one. The credentials
+    must be the ones the service is configured with.
     """
+    check_credentials(request.supabase_url, request.supabase_service_key)
+    
     try:
-        # Add the hosting automation to background tasks
-        background_tasks.add_task(
-            run_hosting_automation,
-            request.supabase_url,
-            request.supabase_service_key,
-            request.site_id
-        )
+        # A request without site_id processes every pending site
+        _, created = get_job_worker().submit(request.site_id or "*", HOSTING_PHASE)
+        
+        if not created:
+            logger.info(f"Hosting automation already queued or running for {request.site_id or 'all sites'}, attaching to it")
+            return ProcessResponse(
+                status="attached",
+                message="Hosting automation task already running, attached to it",
+                task_id=request.site_id
+            )
         
         return ProcessResponse(
             status="accepted",
@@ -123,6 +215,106 @@ async def process_hosting(request: ProcessRequest, background_tasks: BackgroundT
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def select_batch_sites(batch_filter: BatchFilter) -> List[str]:
+    """IDs of the sites pending hosting setup matching a batch filter"""
+    site_ids = [
+        site.id for site in SupabaseService().fetch_pending_hosting_sites()
+        if batch_filter.server_id is None or site.server_id == batch_filter.server_id
+    ]
+    return site_ids[:batch_filter.limit] if batch_filter.limit else site_ids
+
+
+@app.post("/process/batch")
+async def process_hosting_batch(request: BatchRequest):
+    """
+    Process hosting configuration for a batch of sites over one connection
+    
+    Takes site_ids, or a filter over the sites pending hosting setup, queues
+    one task per site and streams progress as newline-delimited JSON: a
+    queued line per site, the step events of the tasks, a site_done line with
+    the batch throughput as each site finishes, and a final summary line.
+    """
+    if not request.site_ids and not request.filter:
+        raise HTTPException(status_code=400, detail="site_ids or filter is required")
+    check_credentials(request.supabase_url, request.supabase_service_key)
+    
+    try:
+        site_ids = request.site_ids or select_batch_sites(request.filter)
+        jobs, subscription = submit_batch(lambda site_id: get_job_worker().submit(site_id, HOSTING_PHASE), site_ids)
+    except Exception as e:
+        logger.error(f"Failed to queue hosting batch: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    logger.info(f"Queued hosting batch of {len(jobs)} site(s)")
+    return StreamingResponse(stream_batch(jobs, subscription), media_type=NDJSON_MEDIA_TYPE)
+
+
+@app.get("/events")
+async def stream_events(site_id: Optional[List[str]] = Query(None)):
+    """
+    Live hosting job progress as server-sent events
+    
+    Streams the job_started, step and job_finished events of running jobs
+    as they happen, so dashboards need not poll the database. Repeat
+    ?site_id= to follow only some sites; without it every site is streamed.
+    """
+    return StreamingResponse(
+        sse_events(site_id),
+        media_type=SSE_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/calls/report")
+def calls_report(hours: float = 24.0, top: int = 10):
+    """
+    Outbound API calls of recent hosting jobs
+    
+    Aggregates the call ledgers stored with workflow_executions: calls per
+    job, totals per provider and operation, and the most expensive sites.
+    """
+    try:
+        since = datetime.utcnow() - timedelta(hours=hours)
+        executions = SupabaseService().fetch_executions(since)
+        return {"since": since.isoformat(), **aggregate(executions, top)}
+    except Exception as e:
+        logger.error(f"Failed to build call report: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def count_shared_backlog() -> Optional[int]:
+    """Sites pending for all replicas, or None if the database cannot be reached"""
+    try:
+        return SupabaseService().count_pending_hosting_sites()
+    except Exception as e:
+        logger.warning(f"Could not count pending sites, sizing replicas on the local queue: {e}")
+        return None
+
+
+@app.get("/load")
+def load():
+    """
+    Saturation of this replica, for autoscaling
+    
+    Reports queue depth, active workers, the age of the oldest queued job,
+    recent throughput and per-provider limiter pressure, plus a
+    desired_replicas hint sized to work off the sites pending for all
+    replicas within LOAD_TARGET_DRAIN_SECONDS.
+    """
+    try:
+        return load_report(
+            get_job_worker(),
+            Config.LOAD_WINDOW_SECONDS,
+            Config.LOAD_TARGET_DRAIN_SECONDS,
+            Config.MIN_REPLICAS,
+            Config.MAX_REPLICAS,
+            shared_backlog=count_shared_backlog()
+        )
+    except Exception as e:
+        logger.error(f"Failed to build load report: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/health")
 async def health_check():
     """Detailed health check"""
@@ -134,7 +326,8 @@ async def health_check():
             "cloudpanel",
             "ssl",
             "matomo"
-        ]
+        ],
+        "concurrency": adaptive_limiters.snapshot()
     }
 
 
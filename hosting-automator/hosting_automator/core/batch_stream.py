@@ -0,0 +1,126 @@
+"""Newline-delimited JSON progress stream of a batch of queued site jobs"""
+
+import asyncio
+import json
+import time
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Tuple
+
+from .events import EventBus, Subscription, event_bus
+
+# Media type of the batch progress stream
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def ndjson(record: Dict[str, Any]) -> str:
+    """Encode one stream record as a JSON line"""
+    return json.dumps(record, default=str) + "\n"
+
+
+def submit_batch(
+    submit: Callable[[str], Tuple[Future, bool]],
+    site_ids: Iterable[str],
+    bus: EventBus = event_bus
+) -> Tuple[Dict[str, Tuple[Future, bool]], Subscription]:
+    """
+    Queue the jobs of a batch of sites, listening to their events first
+
+    The subscription is opened before the first job is queued so no step of
+    a fast job is missed. It is closed here if queueing fails; otherwise
+    stream_batch closes it.
+
+    Args:
+        submit: Queues the job of a site, returning (future, created)
+        site_ids: Sites to process; duplicates are queued once
+        bus: Event bus the jobs publish on
+
+    Returns:
+        (future, created) per site ID in request order, and the subscription
+    """
+    site_ids = list(dict.fromkeys(site_ids))
+    subscription = bus.subscribe(site_ids)
+    try:
+        jobs = {site_id: submit(site_id) for site_id in site_ids}
+    except Exception:
+        subscription.close()
+        raise
+    return jobs, subscription
+
+
+async def stream_batch(
+    jobs: Dict[str, Tuple[Future, bool]],
+    subscription: Subscription,
+    poll_interval: float = 0.5
+) -> AsyncIterator[str]:
+    """
+    Yield the progress of queued jobs as JSON lines until all of them finish
+
+    Lines, each with a type field:
+        queued: a site's job was queued (attached if it joined a running job)
+        job_started, step, job_finished: events published by the jobs
+        site_done: a site's job finished, with the batch's done count and throughput
+        summary: the last line, with totals
+
+    Args:
+        jobs: (future, created) per site ID, as returned by submit_batch
+        subscription: Subscription to the events of the sites
+        poll_interval: Seconds to wait for an event before checking jobs again
+    """
+    started = time.monotonic()
+    total = len(jobs)
+    finished: Dict[str, bool] = {}
+    succeeded = 0
+
+    try:
+        for site_id, (_, created) in jobs.items():
+            yield ndjson({"type": "queued", "site_id": site_id, "attached": not created})
+
+        pending = {site_id: future for site_id, (future, _) in jobs.items()}
+        while pending:
+            event = await asyncio.to_thread(subscription.get, poll_interval)
+            # Jobs publish job_finished before their future resolves, so
+            # draining after this snapshot sees the outcome of every done job
+            done = [site_id for site_id, future in pending.items() if future.done()]
+
+            events: List[Dict[str, Any]] = []
+            while event is not None:
+                events.append(event)
+                event = subscription.get(0)
+
+            for event in events:
+                if event["type"] == "job_finished":
+                    finished[event["site_id"]] = bool(event.get("success"))
+                yield ndjson(event)
+
+            for site_id in done:
+                future = pending.pop(site_id)
+                success = finished.get(site_id)
+                if success is None:
+                    # The job ended before publishing an outcome (e.g. site not found)
+                    success = future.exception() is None and bool(future.result())
+                succeeded += success
+
+                elapsed = time.monotonic() - started
+                done_count = total - len(pending)
+                yield ndjson({
+                    "type": "site_done",
+                    "site_id": site_id,
+                    "success": success,
+                    "done": done_count,
+                    "total": total,
+                    "elapsed_seconds": round(elapsed, 3),
+                    "sites_per_minute": round(done_count * 60 / elapsed, 2) if elapsed else None
+                })
+
+        elapsed = time.monotonic() - started
+        yield ndjson({
+            "type": "summary",
+            "total": total,
+            "succeeded": succeeded,
+            "failed": total - succeeded,
+            "elapsed_seconds": round(elapsed, 3),
+            "sites_per_minute": round(total * 60 / elapsed, 2) if elapsed else None,
+            "dropped_events": subscription.dropped
+        })
+    finally:
+        subscription.close()
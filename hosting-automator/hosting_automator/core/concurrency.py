@@ -0,0 +1,258 @@
+"""AIMD adaptive concurrency limits per provider and credential"""
+
+import logging
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Hashable, Mapping, NamedTuple, Optional
+
+logger = logging.getLogger("hosting_automator")
+
+# Cloudflare "Ratelimit: "default";r=50;t=30" (r = requests remaining in the window)
+_REMAINING = re.compile(r"\br=(\d+)")
+
+
+class Signals(NamedTuple):
+    """Rate-limit signals of one provider response"""
+    throttled: bool = False
+    retry_after: Optional[float] = None
+    remaining: Optional[int] = None
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (delay or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def signals_from_response(status: int, headers: Mapping[str, str]) -> Signals:
+    """
+    Read throttling signals from an HTTP response
+
+    Args:
+        status: HTTP status code
+        headers: Response headers (case-insensitive mapping)
+
+    Returns:
+        Signals of the response
+    """
+    retry_after = parse_retry_after(headers.get("Retry-After"))
+
+    remaining = None
+    for name in ("Ratelimit-Remaining", "X-RateLimit-Remaining"):
+        if headers.get(name, "").isdigit():
+            remaining = int(headers[name])
+            break
+    else:
+        match = _REMAINING.search(headers.get("Ratelimit", ""))
+        if match:
+            remaining = int(match.group(1))
+
+    throttled = status == 429 or (status == 503 and retry_after is not None)
+    return Signals(throttled, retry_after, remaining)
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that converges on a provider's real capacity (AIMD)
+
+    Callers take a slot with acquire() and give it back with release(),
+    passing what the provider said. Healthy responses raise the limit by
+    about one slot per window of limit calls (additive increase); a
+    throttled response multiplies it by backoff (multiplicative decrease),
+    at most once per cooldown so a burst of 429s from the same window counts
+    once, and a Retry-After pauses all new calls until it has passed. While
+    the provider reports few remaining requests the limit stops growing.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: int = 4,
+        minimum: int = 1,
+        maximum: int = 32,
+        backoff: float = 0.5,
+        cooldown: float = 1.0,
+        max_pause: float = 60.0
+    ):
+        """
+        Initialize limiter
+
+        Args:
+            name: Provider and credential, for logs
+            initial: Starting concurrency
+            minimum: Lowest concurrency
+            maximum: Highest concurrency
+            backoff: Factor applied to the limit on throttling
+            cooldown: Seconds during which further throttling does not lower the limit again
+            max_pause: Longest Retry-After honoured, in seconds
+        """
+        self.name = name
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.max_pause = max_pause
+        self.limit = float(min(max(initial, minimum), maximum))
+
+        self.throttled = 0
+        self.wait_seconds = 0.0
+        # Requests left in the provider's quota window, as last reported
+        self.remaining: Optional[int] = None
+
+        self._in_flight = 0
+        self._waiting = 0
+        self._paused_until = 0.0
+        self._decreased_at = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> float:
+        """
+        Block until a slot is free and no Retry-After pause is running
+
+        Returns:
+            Seconds spent waiting
+        """
+        start = time.monotonic()
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    if now < self._paused_until:
+                        self._cond.wait(self._paused_until - now)
+                    elif self._in_flight < int(self.limit):
+                        self._in_flight += 1
+                        waited = now - start
+                        self.wait_seconds += waited
+                        return waited
+                    else:
+                        self._cond.wait()
+            finally:
+                self._waiting -= 1
+
+    def release(self, signals: Optional[Signals] = None) -> None:
+        """
+        Give back a slot and adapt the limit
+
+        Args:
+            signals: What the response said; None for calls that failed
+                without reaching the provider (no adjustment)
+        """
+        with self._cond:
+            self._in_flight -= 1
+            now = time.monotonic()
+
+            if signals is not None and signals.throttled:
+                self.throttled += 1
+                if now - self._decreased_at >= self.cooldown:
+                    self._decreased_at = now
+                    self.limit = max(self.minimum, self.limit * self.backoff)
+                    logger.warning(f"{self.name} throttled, concurrency lowered to {int(self.limit)}")
+                if signals.retry_after:
+                    pause = min(signals.retry_after, self.max_pause)
+                    self._paused_until = max(self._paused_until, now + pause)
+            elif signals is not None:
+                if signals.remaining is not None:
+                    self.remaining = signals.remaining
+                if signals.remaining is None or signals.remaining > self.limit:
+                    self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+            self._cond.notify_all()
+
+    def in_flight(self) -> int:
+        """Calls currently holding a slot"""
+        with self._cond:
+            return self._in_flight
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current state, for status endpoints"""
+        with self._cond:
+            return {
+                "limit": int(self.limit),
+                "in_flight": self._in_flight,
+                "waiting": self._waiting,
+                "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 1),
+                "throttled": self.throttled,
+                "wait_seconds": round(self.wait_seconds, 3),
+                "remaining": self.remaining,
+            }
+
+
+class AdaptiveLimiterRegistry:
+    """Hands out one shared AdaptiveLimiter per provider and credential"""
+
+    def __init__(self, **options):
+        """
+        Initialize registry
+
+        Args:
+            **options: AdaptiveLimiter options for every limiter created
+        """
+        self.options = options
+        self._limiters: Dict[Hashable, AdaptiveLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: str, credential: str) -> AdaptiveLimiter:
+        """
+        Get the limiter of a provider credential, creating it on first use
+
+        Args:
+            provider: Provider name (matomo, ...)
+            credential: Credential identifier; use response_cache.scope() for secrets
+
+        Returns:
+            AdaptiveLimiter instance
+        """
+        key = (provider, credential)
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = AdaptiveLimiter(f"{provider}:{credential}", **self.options)
+                self._limiters[key] = limiter
+            return limiter
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """State of every limiter, keyed by provider:credential"""
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {limiter.name: limiter.snapshot() for limiter in limiters}
+
+    def by_provider(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Limiter state summed over the credentials of each provider
+
+        Returns:
+            Per provider: limiters, limit, in_flight, waiting (callers blocked
+            for a slot), throttled, wait_seconds (total since start) and
+            paused_for (longest running Retry-After pause)
+        """
+        with self._lock:
+            limiters = list(self._limiters.items())
+
+        providers: Dict[str, Dict[str, Any]] = {}
+        for (provider, _), limiter in limiters:
+            state = limiter.snapshot()
+            totals = providers.setdefault(provider, {
+                "limiters": 0, "limit": 0, "in_flight": 0, "waiting": 0,
+                "throttled": 0, "wait_seconds": 0.0, "paused_for": 0.0
+            })
+            totals["limiters"] += 1
+            for key in ("limit", "in_flight", "waiting", "throttled", "wait_seconds"):
+                totals[key] += state[key]
+            totals["wait_seconds"] = round(totals["wait_seconds"], 3)
+            totals["paused_for"] = max(totals["paused_for"], state["paused_for"])
+        return providers
+
+
+# Shared by all clients of the process
+adaptive_limiters = AdaptiveLimiterRegistry()
@@ -18,6 +18,43 @@ class Config:
     # Optional site ID for single-site processing
     SITE_ID: Optional[str] = os.environ.get("SITE_ID")
     
+    # Seconds between batched writes of buffered status and step updates
+    STATUS_FLUSH_INTERVAL: float = float(os.environ.get("STATUS_FLUSH_INTERVAL", "0.5"))
+    
+    # Seconds a claimed site stays reserved without a heartbeat, and sites claimed at a time
+    LEASE_TTL_SECONDS: float = float(os.environ.get("LEASE_TTL_SECONDS", "120"))
+    CLAIM_BATCH_SIZE: int = int(os.environ.get("CLAIM_BATCH_SIZE", "5"))
+    
+    # Durable /process job queue (mount a volume at its directory), parallel jobs, shutdown grace seconds,
+    # and age in seconds after which finished jobs are deleted (0 keeps them)
+    JOB_QUEUE_PATH: str = os.environ.get("JOB_QUEUE_PATH", "data/hosting-jobs.sqlite3")
+    QUEUE_WORKERS: int = int(os.environ.get("QUEUE_WORKERS", "2"))
+    SHUTDOWN_TIMEOUT: float = float(os.environ.get("SHUTDOWN_TIMEOUT", "25"))
+    JOB_RETENTION_SECONDS: float = float(os.environ.get("JOB_RETENTION_SECONDS", "604800"))
+    
+    # /load report: throughput look-back, seconds the backlog should be worked off in,
+    # and the bounds of the desired_replicas hint
+    LOAD_WINDOW_SECONDS: float = float(os.environ.get("LOAD_WINDOW_SECONDS", "900"))
+    LOAD_TARGET_DRAIN_SECONDS: float = float(os.environ.get("LOAD_TARGET_DRAIN_SECONDS", "1800"))
+    MIN_REPLICAS: int = int(os.environ.get("MIN_REPLICAS", "1"))
+    MAX_REPLICAS: int = int(os.environ.get("MAX_REPLICAS", "5"))
+    
+    # Seconds one site's hosting job may take; SSH and API calls time out at the deadline
+    # and the site is put back to pending for a retry (0 disables)
+    JOB_BUDGET_SECONDS: float = float(os.environ.get("JOB_BUDGET_SECONDS", "900"))
+    
+    # SQLite file caching read-only Matomo responses; unset disables the cache
+    RESPONSE_CACHE_PATH: Optional[str] = os.environ.get("RESPONSE_CACHE_PATH")
+    
+    # Sites torn down in parallel by python -m hosting_automator.teardown, and clpctl
+    # commands run at a time on one server
+    TEARDOWN_WORKERS: int = int(os.environ.get("TEARDOWN_WORKERS", "8"))
+    TEARDOWN_SSH_CONCURRENCY: int = int(os.environ.get("TEARDOWN_SSH_CONCURRENCY", "4"))
+    
+    # Postgres connection string (direct or session pooler) for listener mode: sites are
+    # queued as soon as status_dns becomes active (see migration 013)
+    LISTEN_DATABASE_URL: Optional[str] = os.environ.get("LISTEN_DATABASE_URL")
+    
     @classmethod
     def validate(cls) -> None:
         """Validate required configuration"""
@@ -0,0 +1,47 @@
+"""Server-sent event stream of job progress events"""
+
+import itertools
+import json
+from typing import Any, AsyncIterator, Dict, Iterable, Optional
+
+from .events import EventBus, event_bus
+
+# Media type of server-sent event streams
+SSE_MEDIA_TYPE = "text/event-stream"
+
+# Seconds between keepalive comments, which stop proxies from closing idle streams
+SSE_KEEPALIVE_SECONDS = 15.0
+
+
+def sse_message(event: Dict[str, Any], event_id: int) -> str:
+    """Encode an event as a server-sent event named after its type"""
+    return f"id: {event_id}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+async def sse_events(
+    site_ids: Optional[Iterable[str]] = None,
+    bus: EventBus = event_bus,
+    keepalive: float = SSE_KEEPALIVE_SECONDS
+) -> AsyncIterator[str]:
+    """
+    Yield progress events as server-sent events until the client disconnects
+
+    Only events published after the subscription are sent; current state
+    comes from the database, as before.
+
+    Args:
+        site_ids: Only events of these sites; all events if None or empty
+        bus: Event bus to read
+        keepalive: Seconds without events before a keepalive comment is sent
+    """
+    subscription = bus.subscribe_async(site_ids or None)
+    try:
+        yield ": connected\n\n"
+        for event_id in itertools.count(1):
+            event = await subscription.next(keepalive)
+            while event is None:
+                yield ": keepalive\n\n"
+                event = await subscription.next(keepalive)
+            yield sse_message(event, event_id)
+    finally:
+        subscription.close()
@@ -0,0 +1,114 @@
+"""Load report of the job queue, for sizing the number of replicas"""
+
+import math
+import time
+from typing import Any, Dict, Optional
+
+from .concurrency import AdaptiveLimiterRegistry, adaptive_limiters
+from .job_queue import JobWorker
+
+
+def desired_replicas(
+    backlog: int,
+    jobs_per_minute: float,
+    workers: int,
+    target_drain_seconds: float,
+    minimum: int,
+    maximum: int
+) -> int:
+    """
+    Replicas needed to work off a backlog within a target time
+
+    One replica is assumed to finish what it finished recently, or at least
+    one job per worker, within the target time. The result is a total for the
+    whole service, so backlog must be the work waiting for all replicas.
+
+    Args:
+        backlog: Sites waiting for any replica
+        jobs_per_minute: Recent throughput of one replica
+        workers: Worker threads of one replica
+        target_drain_seconds: Time the backlog should be worked off in
+        minimum: Fewest replicas to suggest
+        maximum: Most replicas to suggest
+
+    Returns:
+        Suggested number of replicas
+    """
+    if backlog <= 0:
+        return minimum
+    capacity = max(jobs_per_minute * target_drain_seconds / 60, workers, 1)
+    return max(minimum, min(maximum, math.ceil(backlog / capacity)))
+
+
+def load_report(
+    worker: JobWorker,
+    window_seconds: float,
+    target_drain_seconds: float,
+    min_replicas: int,
+    max_replicas: int,
+    limiters: AdaptiveLimiterRegistry = adaptive_limiters,
+    shared_backlog: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Backlog, worker saturation, throughput and provider pressure of this replica
+
+    Providers with callers waiting for a slot, or paused by a Retry-After,
+    are listed as saturated: their quota is shared by all replicas, so more
+    replicas do not speed up jobs that wait on them.
+
+    desired_replicas is sized on shared_backlog, the sites pending in the
+    database that every replica claims from. Without it only this replica's
+    queue is known, and the hint has to be summed over all replicas.
+
+    Args:
+        worker: Job worker of the API service
+        window_seconds: Look-back for throughput
+        target_drain_seconds: Time the backlog should be worked off in
+        min_replicas: Fewest replicas to suggest
+        max_replicas: Most replicas to suggest
+        limiters: Provider concurrency limiters
+        shared_backlog: Sites pending for all replicas, None if unknown
+
+    Returns:
+        Report with queue, workers, throughput, providers and desired_replicas
+    """
+    stats = worker.queue.stats(window_seconds)
+    active = worker.active()
+    finished = stats["done"] + stats["failed"]
+    jobs_per_minute = finished * 60 / window_seconds
+    oldest = stats["oldest_queued_at"]
+    providers = limiters.by_provider()
+    local_backlog = stats["queued"] + stats["running"]
+
+    return {
+        "queue": {
+            "queued": stats["queued"],
+            "running": stats["running"],
+            "oldest_queued_age_seconds": round(time.time() - oldest, 1) if oldest else None,
+            "shared_pending": shared_backlog,
+        },
+        "workers": {
+            "total": worker.workers,
+            "active": active,
+            "utilization": round(active / worker.workers, 2) if worker.workers else None,
+        },
+        "throughput": {
+            "window_seconds": window_seconds,
+            "done": stats["done"],
+            "failed": stats["failed"],
+            "jobs_per_minute": round(jobs_per_minute, 2),
+        },
+        "providers": providers,
+        "saturated_providers": sorted(
+            name for name, state in providers.items() if state["waiting"] or state["paused_for"]
+        ),
+        "backlog_source": "local" if shared_backlog is None else "shared",
+        "desired_replicas": desired_replicas(
+            local_backlog if shared_backlog is None else shared_backlog,
+            jobs_per_minute,
+            worker.workers,
+            target_drain_seconds,
+            min_replicas,
+            max_replicas
+        ),
+    }
@@ -0,0 +1,210 @@
+"""On-disk cache of read-only provider API responses (SQLite)"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# Seconds a response stays valid, per endpoint; endpoints not listed are never cached
+DEFAULT_TTLS: Dict[str, float] = {
+    "namecheap.domains.getInfo": 300,
+    "namecheap.domains.dns.getList": 300,
+    "spaceship.GET /domains": 300,
+    "cloudflare.zones.get": 600,
+    "cloudflare.zones.get_by_name": 3600,
+    "matomo.SitesManager.getAllSites": 300,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    resource TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_resource ON responses(resource);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed_at ON responses(accessed_at);
+"""
+
+_MISSING = object()
+
+_shared: Dict[str, "ResponseCache"] = {}
+_shared_lock = threading.Lock()
+
+
+def scope(secret: str) -> str:
+    """Short non-reversible identifier of a credential, to keep accounts apart in cache keys"""
+    return hashlib.sha256(secret.encode()).hexdigest()[:16]
+
+
+def shared_cache(path: str) -> "ResponseCache":
+    """One cache per database file and process, shared by all clients"""
+    with _shared_lock:
+        if path not in _shared:
+            _shared[path] = ResponseCache(path)
+        return _shared[path]
+
+
+class ResponseCache:
+    """
+    Caches provider responses by endpoint and request, with per-endpoint TTLs
+
+    Values must be JSON serializable. Every entry belongs to a resource (for
+    example "namecheap:example.com"); a write to the resource drops all of
+    its entries, so the next read goes to the provider again. The number of
+    entries is bounded: the least recently read entries are evicted first.
+    The database runs in WAL mode and may be shared by several processes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttls: Optional[Dict[str, float]] = None,
+        max_entries: int = 10000
+    ):
+        """
+        Open (or create) the cache database
+
+        Args:
+            path: SQLite file
+            ttls: Seconds per endpoint, merged over DEFAULT_TTLS
+            max_entries: Entries kept before evicting the least recently read
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def cacheable(self, endpoint: str) -> bool:
+        """Whether responses of an endpoint are cached"""
+        return self.ttls.get(endpoint, 0) > 0
+
+    @staticmethod
+    def _key(endpoint: str, parts: Iterable[Any]) -> str:
+        """Entry key of a request"""
+        raw = json.dumps([endpoint, *parts], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, endpoint: str, parts: Iterable[Any], default: Any = None) -> Any:
+        """
+        Look up a cached response
+
+        Args:
+            endpoint: Endpoint name, e.g. namecheap.domains.getInfo
+            parts: Request identity (account scope, parameters)
+            default: Returned on a miss
+
+        Returns:
+            Cached value, or default if missing or expired
+        """
+        key = self._key(endpoint, parts)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, endpoint: str, parts: Iterable[Any], resource: str, value: Any) -> None:
+        """
+        Store a response
+
+        Args:
+            endpoint: Endpoint name
+            parts: Request identity
+            resource: Resource the response describes, used for invalidation
+            value: JSON serializable response
+        """
+        ttl = self.ttls.get(endpoint, 0)
+        if ttl <= 0:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, endpoint, resource, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self._key(endpoint, parts), endpoint, resource, json.dumps(value), now + ttl, now)
+            )
+            self._writes += 1
+            # Checking the size on every write would cost a COUNT(*) each time
+            if self._writes % 100 == 0:
+                self._evict()
+
+    def fetch(self, endpoint: str, parts: Iterable[Any], resource: str, func: Callable[[], Any]) -> Any:
+        """
+        Return the cached response, or call func and cache its result
+
+        Args:
+            endpoint: Endpoint name
+            parts: Request identity
+            resource: Resource the response describes
+            func: Performs the request
+
+        Returns:
+            Response
+        """
+        if not self.cacheable(endpoint):
+            return func()
+
+        parts = list(parts)
+        value = self.get(endpoint, parts, _MISSING)
+        if value is _MISSING:
+            value = func()
+            self.put(endpoint, parts, resource, value)
+        return value
+
+    def invalidate(self, resource: str) -> int:
+        """
+        Drop every entry of a resource after a write to it
+
+        Args:
+            resource: Resource name
+
+        Returns:
+            Number of entries dropped
+        """
+        with self._lock:
+            return self._db.execute("DELETE FROM responses WHERE resource = ?", (resource,)).rowcount
+
+    def _evict(self) -> None:
+        """Drop expired entries and the least recently read ones above max_entries; caller holds the lock"""
+        self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+        count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        """Close the database"""
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,92 @@
+"""Single-flight execution: concurrent calls with the same key share one run"""
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it runs get the leader's future and receive the same result
+    or exception. Once the run finishes the key is free again.
+    """
+
+    def __init__(self):
+        """Initialize with no calls in flight"""
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def join(self, key: Hashable) -> Tuple[Future, bool]:
+        """
+        Attach to the call in flight for a key, or register a new one
+
+        A caller that becomes the leader must pass the future to run().
+
+        Args:
+            key: Call identity, e.g. (site_id, phase)
+
+        Returns:
+            Tuple of (future of the call, whether the caller is the leader)
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+
+            future = Future()
+            future.set_running_or_notify_cancel()
+            self._calls[key] = future
+            return future, True
+
+    def run(self, key: Hashable, future: Future, func: Callable, *args, **kwargs) -> Any:
+        """
+        Execute a leader's call and publish its outcome to everyone attached
+
+        Args:
+            key: Key the future was registered under
+            future: Future returned by join()
+            func: Function to call
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            Result of func
+        """
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                if self._calls.get(key) is future:
+                    del self._calls[key]
+
+    def do(self, key: Hashable, func: Callable, *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        Call func unless a call with the same key is in flight, then wait for that one
+
+        Args:
+            key: Call identity
+            func: Function to call
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            Tuple of (result, whether it was shared from another caller's run)
+        """
+        future, leader = self.join(key)
+        if leader:
+            return self.run(key, future, func, *args, **kwargs), False
+        return future.result(), True
+
+    def in_flight(self) -> int:
+        """Number of keys currently being executed"""
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,108 @@
+"""Compact site record used by the hosting pipeline"""
+
+from typing import Any, Dict, Optional
+
+
+class Site:
+    """
+    Immutable site record holding only the columns the hosting pipeline uses
+
+    Slotted instead of dict based to keep large batches small; supports
+    site["domain"] and site.get("domain") like a row dict.
+    """
+
+    __slots__ = (
+        "id",
+        "domain",
+        "server_id",
+        "status_hosting",
+        "matomo_site_id",
+    )
+
+    # Column list for PostgREST select() calls
+    COLUMNS = ", ".join(__slots__)
+
+    def __init__(
+        self,
+        id: str,
+        domain: str,
+        server_id: Optional[str] = None,
+        status_hosting: Optional[str] = None,
+        matomo_site_id: Optional[int] = None
+    ):
+        """
+        Initialize site record
+
+        Args:
+            id: UUID of the site
+            domain: Domain name
+            server_id: UUID of the hosting server
+            status_hosting: Hosting status
+            matomo_site_id: Matomo tracking site ID, once created
+        """
+        setter = object.__setattr__
+        setter(self, "id", id)
+        setter(self, "domain", domain)
+        setter(self, "server_id", server_id)
+        setter(self, "status_hosting", status_hosting)
+        setter(self, "matomo_site_id", matomo_site_id)
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "Site":
+        """
+        Build a site from a PostgREST row without copying its values
+
+        The strings parsed from the response are referenced, not copied; other
+        columns of the row are dropped with the row.
+
+        Args:
+            row: Row of the sites table
+
+        Returns:
+            Site instance
+        """
+        site = cls.__new__(cls)
+        setter = object.__setattr__
+        for name in cls.__slots__:
+            setter(site, name, row.get(name))
+        return site
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"Site is immutable, use replace() to change {name}")
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Dict-style access; columns not held by Site return default"""
+        return getattr(self, key, default)
+
+    def replace(self, **changes: Any) -> "Site":
+        """
+        Copy of the site with some fields changed
+
+        Args:
+            **changes: Field values to change
+
+        Returns:
+            New Site instance
+        """
+        return type(self)(**{**self.to_dict(), **changes})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Fields of the site as a dict"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Site):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+    def __repr__(self) -> str:
+        return f"Site(id={self.id!r}, domain={self.domain!r})"
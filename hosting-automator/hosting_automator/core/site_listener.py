@@ -0,0 +1,131 @@
+"""Postgres LISTEN/NOTIFY listener queueing work when sites change"""
+
+import logging
+import re
+import select
+import threading
+from typing import Callable, Optional
+
+try:
+    import psycopg2
+except ImportError:  # Only needed in listener mode
+    psycopg2 = None
+
+logger = logging.getLogger("hosting_automator")
+
+# Channels raised by the sites trigger of migration 013
+DNS_PENDING_CHANNEL = "dns_pending"
+DNS_ACTIVE_CHANNEL = "dns_active"
+
+CHANNEL_NAME = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+class SiteListenerError(Exception):
+    """Custom exception for site listener errors"""
+    pass
+
+
+class SiteChangeListener:
+    """
+    Calls on_site for every site ID notified on a Postgres channel
+
+    Runs a background thread holding one connection that LISTENs on the
+    channel, and reconnects after reconnect_delay seconds if the connection
+    drops. Notifications sent while disconnected are lost, so on_connect is
+    called after every (re)connect to pick up sites that changed meanwhile.
+    The connection must be direct or session pooled; transaction pooling
+    does not deliver notifications.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        channel: str,
+        on_site: Callable[[str], None],
+        on_connect: Optional[Callable[[], None]] = None,
+        reconnect_delay: float = 5.0,
+        poll_interval: float = 1.0
+    ):
+        """
+        Initialize listener
+
+        Args:
+            dsn: Postgres connection string
+            channel: Channel to LISTEN on
+            on_site: Called with the site ID of each notification
+            on_connect: Called after each (re)connect to catch up
+            reconnect_delay: Seconds between connection attempts
+            poll_interval: Seconds between checks for stop()
+        """
+        if not CHANNEL_NAME.match(channel):
+            raise SiteListenerError(f"Invalid channel name: {channel}")
+
+        self.dsn = dsn
+        self.channel = channel
+        self.on_site = on_site
+        self.on_connect = on_connect
+        self.reconnect_delay = reconnect_delay
+        self.poll_interval = poll_interval
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start listening in a background thread"""
+        if psycopg2 is None:
+            raise SiteListenerError("Listener mode requires psycopg2 (pip install psycopg2-binary)")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"listen-{self.channel}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop listening and close the connection"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        """Connect, listen and reconnect until stopped"""
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(self.dsn)
+                conn.autocommit = True
+                self._listen(conn)
+            except Exception as e:
+                logger.warning(f"Listener on '{self.channel}' disconnected, retrying in {self.reconnect_delay:.0f}s: {e}")
+            finally:
+                if conn is not None:
+                    conn.close()
+            self._stop.wait(self.reconnect_delay)
+
+    def _listen(self, conn) -> None:
+        """Listen on an open connection until stopped"""
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {self.channel}")
+        logger.info(f"Listening for site changes on '{self.channel}'")
+
+        if self.on_connect:
+            try:
+                self.on_connect()
+            except Exception as e:
+                logger.error(f"Catch-up after connecting to '{self.channel}' failed: {e}")
+
+        while not self._stop.is_set():
+            if select.select([conn], [], [], self.poll_interval) == ([], [], []):
+                continue
+            self._drain(conn)
+
+    def _drain(self, conn) -> None:
+        """Dispatch every notification received on the connection"""
+        conn.poll()
+        while conn.notifies:
+            site_id = conn.notifies.pop(0).payload
+            if not site_id:
+                continue
+            try:
+                self.on_site(site_id)
+            except Exception as e:
+                logger.error(f"Failed to queue site {site_id} from '{self.channel}': {e}")
@@ -0,0 +1,423 @@
+"""Write-behind buffer coalescing site status and workflow step writes"""
+
+import atexit
+import logging
+import threading
+import weakref
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger("hosting_automator")
+
+# Columns sent for every workflow_steps row, so a batched upsert has uniform keys
+STEP_COLUMNS = (
+    "site_id",
+    "phase",
+    "step_name",
+    "description",
+    "status",
+    "started_at",
+    "completed_at",
+    "duration_seconds",
+    "error_message",
+)
+
+# sites columns counting the completed steps of a phase (see migration 005)
+STEP_COUNT_COLUMNS = {
+    "dns_setup": "dns_steps_completed",
+    "hosting_setup": "hosting_steps_completed",
+    "content_generation": "content_steps_completed",
+    "deployment": "deployment_steps_completed",
+}
+
+# PostgREST error code for an unknown RPC function
+FUNCTION_NOT_FOUND = "PGRST202"
+
+# Postgres error code for an ON CONFLICT target without a unique index (migration 011 missing)
+NO_UNIQUE_INDEX = "42P10"
+
+# Error codes a retry cannot fix: unknown columns, a missing conflict index,
+# constraint violations (class 23) and invalid values (class 22)
+PERMANENT_ERROR_CODES = ("42703", NO_UNIQUE_INDEX, "PGRST204")
+PERMANENT_ERROR_CLASSES = ("22", "23")
+
+# Flushes a failing write is retried before it is dropped
+MAX_ATTEMPTS = 5
+
+
+def is_permanent(error: Exception) -> bool:
+    """Whether a PostgREST error will fail again however often it is retried"""
+    code = str(getattr(error, "code", None) or "")
+    return code in PERMANENT_ERROR_CODES or code[:2] in PERMANENT_ERROR_CLASSES
+
+_buffers: "weakref.WeakSet[WriteBehindBuffer]" = weakref.WeakSet()
+
+
+def flush_all() -> None:
+    """Flush and stop every live buffer (runs at interpreter exit)"""
+    for buffer in list(_buffers):
+        buffer.close()
+
+
+atexit.register(flush_all)
+
+StepKey = Tuple[str, str, str]
+
+
+class WriteBehindBuffer:
+    """
+    Coalesces status and step writes per site and flushes them in batches
+
+    Writes are merged in memory (the last value of a column wins) and written
+    by a background thread every flush_interval seconds: one RPC call for all
+    pending site updates and one upsert for all changed workflow steps. The
+    thread only runs while there is something to write. Call finish() at the
+    end of a job to write its state immediately; everything still pending is
+    flushed when the buffer is closed or the process exits.
+
+    A failed batch is written row by row, so one bad row does not block the
+    others. Rows failing with an error a retry cannot fix are dropped at
+    once, others after max_attempts flushes; finish() reports whether a
+    site's writes were all stored.
+    """
+
+    def __init__(self, client, flush_interval: float = 0.5, max_attempts: int = MAX_ATTEMPTS):
+        """
+        Initialize write-behind buffer
+
+        Args:
+            client: Supabase client
+            flush_interval: Seconds between background flushes
+            max_attempts: Flushes a failing write is retried before it is dropped
+        """
+        self.client = client
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._batch_rpc = True
+        self._steps_upsert = True
+
+        self._sites: Dict[str, Dict[str, Any]] = {}
+        self._steps: Dict[StepKey, Dict[str, Any]] = {}
+        self._dirty_steps: set = set()
+        self._running: Dict[Tuple[str, str], str] = {}
+        self._attempts: Dict[Any, int] = {}
+        self._dropped: set = set()
+
+        _buffers.add(self)
+
+    def update_site(self, site_id: str, fields: Dict[str, Any]) -> None:
+        """
+        Queue column updates for a site
+
+        Args:
+            site_id: UUID of the site
+            fields: Columns to set
+        """
+        with self._lock:
+            self._sites.setdefault(site_id, {}).update(fields)
+        self._schedule()
+
+    def step(
+        self,
+        site_id: str,
+        phase: str,
+        step_name: str,
+        status: str = "running",
+        description: Optional[str] = None,
+        error_message: Optional[str] = None
+    ) -> None:
+        """
+        Queue a workflow step transition
+
+        Starting a step completes the step that was running in the same phase.
+
+        Args:
+            site_id: UUID of the site
+            phase: Workflow phase (dns_setup, hosting_setup, ...)
+            step_name: Step identifier
+            status: running, completed or failed
+            description: Human readable step description
+            error_message: Error of a failed step
+        """
+        now = datetime.now(timezone.utc)
+
+        with self._lock:
+            running = self._running.get((site_id, phase))
+            if status == "running" and running and running != step_name:
+                self._set_step((site_id, phase, running), "completed", now)
+            self._set_step((site_id, phase, step_name), status, now, description, error_message)
+        self._schedule()
+
+    def finish(self, site_id: str, phase: str, success: bool, error_message: Optional[str] = None) -> bool:
+        """
+        End a job: close its running step and write everything pending now
+
+        Args:
+            site_id: UUID of the site
+            phase: Workflow phase of the job
+            success: Whether the job succeeded
+            error_message: Error recorded on the running step if the job failed,
+                defaults to the error_message queued for the site
+
+        Returns:
+            Whether all writes of the site were stored (False if some were dropped or still wait for a retry)
+        """
+        now = datetime.now(timezone.utc)
+
+        with self._lock:
+            running = self._running.get((site_id, phase))
+            if running:
+                status = "completed" if success else "failed"
+                if not success and not error_message:
+                    error_message = self._sites.get(site_id, {}).get("error_message")
+                self._set_step((site_id, phase, running), status, now, error_message=error_message)
+
+        self.flush()
+
+        # Step state is only kept to merge later transitions of a running job
+        with self._lock:
+            for key in [key for key in self._steps if key[:2] == (site_id, phase)]:
+                if key not in self._dirty_steps:
+                    del self._steps[key]
+
+            stored = (
+                site_id not in self._dropped
+                and site_id not in self._sites
+                and not any(key[0] == site_id for key in self._dirty_steps)
+            )
+            self._dropped.discard(site_id)
+        return stored
+
+    def discard(self, site_id: str, phase: str) -> None:
+        """
+        Drop the pending writes of a job that another replica took over
+
+        Args:
+            site_id: UUID of the site
+            phase: Workflow phase of the job
+        """
+        with self._lock:
+            self._sites.pop(site_id, None)
+            for key in [key for key in self._steps if key[:2] == (site_id, phase)]:
+                del self._steps[key]
+                self._dirty_steps.discard(key)
+                self._attempts.pop(key, None)
+            self._running.pop((site_id, phase), None)
+            self._attempts.pop(site_id, None)
+            self._dropped.discard(site_id)
+
+    def _set_step(
+        self,
+        key: StepKey,
+        status: str,
+        now: datetime,
+        description: Optional[str] = None,
+        error_message: Optional[str] = None
+    ) -> None:
+        """Apply a step transition; caller holds the lock"""
+        site_id, phase, step_name = key
+        row = self._steps.get(key)
+        if row is None:
+            row = dict.fromkeys(STEP_COLUMNS)
+            row.update(site_id=site_id, phase=phase, step_name=step_name)
+            self._steps[key] = row
+
+        row["status"] = status
+        if description:
+            row["description"] = description
+        if error_message:
+            row["error_message"] = error_message
+
+        if status == "running":
+            row["started_at"] = now
+            self._running[(site_id, phase)] = step_name
+        else:
+            row["completed_at"] = now
+            if row["started_at"]:
+                row["duration_seconds"] = int((now - row["started_at"]).total_seconds())
+            if self._running.get((site_id, phase)) == step_name:
+                del self._running[(site_id, phase)]
+
+        self._dirty_steps.add(key)
+
+        count_column = STEP_COUNT_COLUMNS.get(phase)
+        if count_column and status == "completed":
+            completed = sum(
+                1 for (s, p, _), step in self._steps.items()
+                if s == site_id and p == phase and step["status"] == "completed"
+            )
+            self._sites.setdefault(site_id, {})[count_column] = completed
+
+    def _schedule(self) -> None:
+        """Make sure the background flusher is running"""
+        if self._closed:
+            self.flush()
+            return
+
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        """Background loop; exits once nothing is left to write"""
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+            with self._lock:
+                if self._closed or (not self._sites and not self._dirty_steps):
+                    self._thread = None
+                    return
+
+    def flush(self) -> None:
+        """Write all pending site updates and step changes"""
+        with self._flush_lock:
+            with self._lock:
+                sites, self._sites = self._sites, {}
+                step_keys, self._dirty_steps = self._dirty_steps, set()
+                steps = {key: _serialize(self._steps[key]) for key in step_keys if key in self._steps}
+
+            if steps:
+                self._write_steps(steps)
+            if sites:
+                self._write_sites(sites)
+
+    def _write_steps(self, steps: Dict[StepKey, Dict[str, Any]]) -> None:
+        """
+        Upsert changed workflow steps, in one call while the conflict index exists
+
+        Args:
+            steps: Serialized row per step key
+        """
+        if self._steps_upsert:
+            try:
+                self.client.table("workflow_steps").upsert(
+                    list(steps.values()), on_conflict="site_id,phase,step_name"
+                ).execute()
+                self._succeeded(steps)
+                return
+            except Exception as e:
+                if getattr(e, "code", None) == NO_UNIQUE_INDEX:
+                    logger.warning("workflow_steps has no unique index (migration 011), writing steps one by one")
+                    self._steps_upsert = False
+                elif not is_permanent(e):
+                    self._retry_steps(steps, e)
+                    return
+                else:
+                    logger.error(f"Failed to write {len(steps)} workflow step(s), writing them one by one: {e}")
+
+        for key, row in steps.items():
+            try:
+                self._write_step(row)
+                self._succeeded([key])
+            except Exception as e:
+                self._retry_steps({key: row}, e)
+
+    def _write_step(self, row: Dict[str, Any]) -> None:
+        """Update a workflow step row, inserting it if it does not exist yet"""
+        response = self.client.table("workflow_steps").update(row)\
+            .eq("site_id", row["site_id"])\
+            .eq("phase", row["phase"])\
+            .eq("step_name", row["step_name"])\
+            .execute()
+        if not response.data:
+            self.client.table("workflow_steps").insert(row).execute()
+
+    def _write_sites(self, sites: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Write coalesced site updates, in one call when the database supports it
+
+        Args:
+            sites: Columns to set per site ID
+        """
+        if self._batch_rpc:
+            updates = [{"id": site_id, "fields": _serialize(fields)} for site_id, fields in sites.items()]
+            try:
+                self.client.rpc("apply_site_updates", {"updates": updates}).execute()
+                self._succeeded(sites)
+                return
+            except Exception as e:
+                if getattr(e, "code", None) == FUNCTION_NOT_FOUND:
+                    logger.warning("apply_site_updates() not installed (migration 011), updating sites one by one")
+                    self._batch_rpc = False
+                elif not is_permanent(e):
+                    self._retry_sites(sites, e)
+                    return
+                else:
+                    # One bad row fails the whole call: find it by writing the rows separately
+                    logger.error(f"Failed to write {len(sites)} site update(s), writing them one by one: {e}")
+
+        for site_id, fields in sites.items():
+            try:
+                self.client.table("sites").update(_serialize(fields)).eq("id", site_id).execute()
+                self._succeeded([site_id])
+            except Exception as e:
+                self._retry_sites({site_id: fields}, e)
+
+    def _succeeded(self, keys) -> None:
+        """Forget the failed attempts of written site IDs or step keys"""
+        with self._lock:
+            for key in keys:
+                self._attempts.pop(key, None)
+
+    def _give_up(self, key, error: Exception) -> bool:
+        """Count a failed attempt; True if the write should be dropped (caller holds the lock)"""
+        attempts = self._attempts.get(key, 0) + 1
+        if is_permanent(error) or attempts >= self.max_attempts:
+            self._attempts.pop(key, None)
+            return True
+        self._attempts[key] = attempts
+        return False
+
+    def _retry_sites(self, sites: Dict[str, Dict[str, Any]], error: Exception) -> None:
+        """Queue failed site updates again, dropping the ones that cannot succeed"""
+        retried = 0
+        with self._lock:
+            for site_id, fields in sites.items():
+                if self._give_up(site_id, error):
+                    logger.error(f"Dropped update of site {site_id} {sorted(fields)}: {error}")
+                    self._dropped.add(site_id)
+                    continue
+                # Newer values queued meanwhile win
+                self._sites[site_id] = {**fields, **self._sites.get(site_id, {})}
+                retried += 1
+        if retried:
+            logger.warning(f"Failed to write {retried} site update(s), will retry: {error}")
+
+    def _retry_steps(self, steps: Dict[StepKey, Dict[str, Any]], error: Exception) -> None:
+        """Mark failed steps dirty again, dropping the ones that cannot succeed"""
+        retried = 0
+        with self._lock:
+            for key in steps:
+                if self._give_up(key, error):
+                    logger.error(f"Dropped workflow step {key}: {error}")
+                    self._dropped.add(key[0])
+                    continue
+                self._dirty_steps.add(key)
+                retried += 1
+        if retried:
+            logger.warning(f"Failed to write {retried} workflow step(s), will retry: {error}")
+
+    def close(self) -> None:
+        """Stop the background flusher and write everything still pending"""
+        self._closed = True
+        self._wakeup.set()
+
+        thread = self._thread
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout=10)
+        self.flush()
+
+
+def _serialize(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert datetimes for JSON"""
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()}
@@ -2,17 +2,27 @@
 
 import logging
 import sys
+from datetime import datetime
 from typing import Optional
 
+from .core.call_ledger import CallLedger, ledger_scope
+from .core.cassette import from_env as cassette_from_env
 from .core.config import Config
+from .core.deadline import Deadline, deadline_scope
+from .core.leases import LeaseLostError, LeaseManager
 from .core.logging import setup_logging
-from .services.supabase_client import SupabaseService
+from .core.response_cache import shared_cache
+from .core.site import Site
+from .services.supabase_client import HOSTING_PHASE, SupabaseService
 from .services.cloudpanel_client import CloudPanelService
 from .services.matomo_client import MatomoService
 
 # Setup logging
 logger = setup_logging()
 
+# workflow_steps recorded by _process_site, in order
+HOSTING_STEPS = ["cloudpanel_site", "ssl_certificate", "matomo_site", "finalize"]
+
 
 class HostingAutomator:
     """Main class for hosting automation workflow"""
@@ -24,6 +34,7 @@ class HostingAutomator:
         try:
             # Initialize services
             self.supabase = SupabaseService()
+            self.leases = LeaseManager(self.supabase.client, HOSTING_PHASE, Config.LEASE_TTL_SECONDS)
             self.cloudpanel = None
             self.matomo = None
             
@@ -31,14 +42,36 @@ class HostingAutomator:
             logger.error(f"Failed to initialize Hosting Automator: {e}")
             raise
     
-    def run(self, site_id: Optional[str] = None) -> None:
+    def create_matomo_service(self) -> MatomoService:
+        """
+        Create the Matomo service from the stored credentials
+        
+        Returns:
+            MatomoService, disabled if there are no credentials or they failed the credential audit
+        """
+        matomo_config = self.supabase.get_matomo_credentials()
+        if matomo_config:
+            # Skip a token that failed the credential audit instead of failing every site on it
+            failed = self.supabase.fetch_failed_credentials("infrastructure_credentials")
+            if matomo_config.get("id") in failed:
+                logger.warning(f"Matomo credentials failed the credential audit, tracking skipped: {failed[matomo_config['id']]}")
+                matomo_config = None
+        cache = shared_cache(Config.RESPONSE_CACHE_PATH) if Config.RESPONSE_CACHE_PATH else None
+        return MatomoService(matomo_config, cache=cache)
+    
+    def run(self, site_id: Optional[str] = None) -> bool:
         """
         Run the hosting automation workflow
         
         Args:
             site_id: Optional specific site ID to process
+            
+        Returns:
+            For a single site, whether its hosting was completed (False if it
+            was not found or skipped); True once a batch run has finished
         """
         logger.info("Starting hosting automation workflow...")
+        outcome = True
         
         try:
             # Get site ID from config if not provided
@@ -46,26 +79,41 @@ class HostingAutomator:
                 site_id = Config.SITE_ID
             
             # Fetch pending sites
-            sites = self.supabase.fetch_pending_hosting_sites(site_id)
-            
-            if not sites:
-                logger.info("No sites pending hosting setup")
-                return
-            
-            # Get server credentials for SSH
-            server_config = self.supabase.get_server_credentials()
+            if site_id:
+                if self.leases.claim(site_id):
+                    # Read after claiming, so a site another replica just finished is seen as done
+                    sites = self.supabase.fetch_pending_hosting_sites(site_id)
+                else:
+                    logger.warning(f"Skipping site {site_id}: another replica is processing it")
+                    sites = []
+                batches = [sites] if sites else []
+                outcome = bool(sites)
+            else:
+                # Batch mode: claim sites a few at a time so replicas work on disjoint sites
+                logger.info(f"Claiming sites in batches of {Config.CLAIM_BATCH_SIZE} as replica {self.leases.owner}")
+                batches = self._iter_claimed_sites(Config.CLAIM_BATCH_SIZE)
             
-            # Initialize CloudPanel service with SSH connection
-            self.cloudpanel = CloudPanelService(server_config)
-            self.cloudpanel.connect()
+            for sites in batches:
+                if not self.cloudpanel:
+                    # Get server credentials for SSH
+                    server_config = self.supabase.get_server_credentials()
+                    
+                    # Initialize CloudPanel service with SSH connection
+                    self.cloudpanel = CloudPanelService(server_config)
+                    self.cloudpanel.connect()
+                    
+                    self.matomo = self.create_matomo_service()
+                
+                # Process each site
+                for site in sites:
+                    completed = self._process_site(site)
+                    if site_id:
+                        outcome = outcome and completed
             
-            # Get Matomo credentials if available
-            matomo_config = self.supabase.get_matomo_credentials()
-            self.matomo = MatomoService(matomo_config)
+            if not self.cloudpanel:
+                logger.info("No sites pending hosting setup")
             
-            # Process each site
-            for site in sites:
-                self._process_site(site)
+            return outcome
             
         except Exception as e:
             logger.error(f"Fatal error in hosting automation: {e}")
@@ -75,24 +123,142 @@ class HostingAutomator:
             # Ensure SSH connection is closed
             if self.cloudpanel:
                 self.cloudpanel.disconnect()
+            # Stop the lease heartbeat and give back sites claimed but not processed
+            self.leases.close()
             
             logger.info("Hosting automation workflow completed")
     
-    def _process_site(self, site: dict) -> None:
+    def _iter_claimed_sites(self, batch_size: int):
+        """
+        Claim pending sites batch by batch until none are left
+        
+        Without the lease functions (single replica) all pending sites are
+        returned as one batch.
+        
+        Args:
+            batch_size: Sites claimed per batch
+            
+        Yields:
+            Lists of claimed sites
+        """
+        seen = set()
+        
+        while True:
+            site_ids = self.leases.claim_pending(batch_size)
+            if site_ids is None:
+                sites = self.supabase.fetch_pending_hosting_sites()
+                if sites:
+                    yield sites
+                return
+            
+            # A site still pending after this run processed it is given back
+            # instead of being retried in a loop
+            fresh = [site_id for site_id in site_ids if site_id not in seen]
+            for site_id in set(site_ids) - set(fresh):
+                self.leases.release(site_id)
+            if not fresh:
+                return
+            
+            sites = self.supabase.fetch_sites_by_ids(fresh)
+            seen.update(fresh)
+            for site_id in set(fresh) - {site.id for site in sites}:
+                self.leases.release(site_id)
+            yield sites
+    
+    def _process_site(self, site: Site) -> bool:
         """
         Process hosting setup for a single site
         
+        The steps run under a deadline of JOB_BUDGET_SECONDS; a site that
+        failed because it ran out of time is put back to pending. The job's
+        outbound calls are counted and stored with its workflow_executions
+        row.
+        
         Args:
             site: Site record from database
+            
+        Returns:
+            Whether the site's hosting was completed; False if it was skipped
         """
-        domain = site.get("domain")
-        site_id = site.get("id")
+        domain = site.domain
+        site_id = site.id
+        
+        if not self.leases.holds(site_id) and not self.leases.claim(site_id):
+            logger.warning(f"Skipping {domain}: another replica is processing it")
+            return False
+        
+        if site.status_hosting != "pending":
+            # Queued by id (listener, batch) but already set up or failed meanwhile
+            logger.info(f"Skipping {domain}: hosting status is {site.status_hosting}, not pending")
+            self.leases.release(site_id)
+            return False
         
         logger.info(f"Processing hosting for site: {domain} (ID: {site_id})")
+        self.supabase.start_job(site_id, len(HOSTING_STEPS))
+        completed = False
+        status = "failed"
+        lease_lost = False
+        ledger = CallLedger()
+        started_at = datetime.utcnow()
+        
+        try:
+            with ledger_scope(ledger), deadline_scope(Config.JOB_BUDGET_SECONDS, f"Hosting job for {domain}") as deadline:
+                completed = self._run_steps(site)
+            if completed:
+                status = "completed"
+            elif deadline and deadline.expired():
+                self.retry_later(site, deadline)
+                status = "retrying"
+        
+        except LeaseLostError as e:
+            # The replica that took the site over owns its status now
+            lease_lost = True
+            logger.warning(f"Stopped {domain} without saving its status: {e}")
+        
+        finally:
+            if lease_lost:
+                self.supabase.abandon_job(site_id)
+            else:
+                # Write this site's buffered status and steps before moving on
+                self.supabase.finish_job(site_id, completed)
+                self.supabase.record_execution(site_id, status, started_at, ledger.summary())
+            self.leases.release(site_id)
+        
+        return completed
+    
+    def retry_later(self, site: Site, deadline: Deadline) -> None:
+        """
+        Put a site whose job ran out of time back to pending for the next run
+        
+        Args:
+            site: Site record
+            deadline: The expired deadline
+        """
+        error_msg = f"Timed out after {deadline.budget:g}s, will be retried"
+        logger.warning(f"{site.domain}: {error_msg}")
+        self.supabase.update_site_hosting_status(site.id, "pending", error_message=error_msg)
+    
+    def _run_steps(self, site: Site) -> bool:
+        """
+        Run the hosting steps for a claimed site
+        
+        Args:
+            site: Site record from database
+            
+        Returns:
+            Whether the site is now active
+            
+        Raises:
+            LeaseLostError: If another replica may have taken the site over between steps
+        """
+        domain = site.domain
+        site_id = site.id
         
         try:
             # Step 1: Create site in CloudPanel
             logger.info(f"Creating CloudPanel site for {domain}...")
+            self.leases.check(site_id)
+            self.supabase.record_step(site_id, "cloudpanel_site", "Create CloudPanel site")
             success, doc_root, error = self.cloudpanel.create_site(domain)
             
             if not success:
@@ -102,10 +268,12 @@ class HostingAutomator:
                     "failed", 
                     error_message=error
                 )
-                return
+                return False
             
             # Step 2: Provision SSL certificate
             logger.info(f"Provisioning SSL certificate for {domain}...")
+            self.leases.check(site_id)
+            self.supabase.record_step(site_id, "ssl_certificate", "Provision SSL certificate")
             ssl_success, ssl_error = self.cloudpanel.provision_ssl(domain)
             
             if not ssl_success:
@@ -116,10 +284,12 @@ class HostingAutomator:
                     doc_root=doc_root,
                     error_message=f"SSL provisioning failed: {ssl_error}"
                 )
-                return
+                return False
             
             # Step 3: Create Matomo tracking site (optional)
             matomo_id = None
+            self.leases.check(site_id)
+            self.supabase.record_step(site_id, "matomo_site", "Create Matomo tracking site")
             if self.matomo and self.matomo.enabled:
                 logger.info(f"Creating Matomo tracking site for {domain}...")
                 
@@ -137,6 +307,8 @@ class HostingAutomator:
             
             # Step 4: Update status to active
             logger.info(f"Updating site status to active...")
+            self.leases.check(site_id)
+            self.supabase.record_step(site_id, "finalize", "Mark hosting active")
             self.supabase.update_site_hosting_status(
                 site_id,
                 "active",
@@ -145,6 +317,10 @@ class HostingAutomator:
             )
             
             logger.info(f"Successfully completed hosting setup for {domain}")
+            return True
+            
+        except LeaseLostError:
+            raise
             
         except Exception as e:
             error_msg = f"Unexpected error processing site: {e}"
@@ -156,11 +332,19 @@ class HostingAutomator:
                 "failed",
                 error_message=error_msg
             )
+            return False
 
 
 def main():
     """Main entry point for the script"""
     try:
+        # CASSETTE_PATH / CASSETTE_MODE record or replay all provider traffic of the run
+        cassette = cassette_from_env()
+        if cassette:
+            with cassette:
+                HostingAutomator().run()
+            return
+        
         # Create and run automator
         automator = HostingAutomator()
         automator.run()
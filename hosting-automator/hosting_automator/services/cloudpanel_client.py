@@ -3,14 +3,22 @@
 import logging
 import re
 import secrets
+import socket
 import string
 import shlex
 from typing import Optional, Tuple, Dict, Any
 from paramiko import SSHClient, AutoAddPolicy, RSAKey
 from io import StringIO
 
+from ..core.call_ledger import track
+from ..core.deadline import call_timeout
+
 logger = logging.getLogger("hosting_automator")
 
+# Seconds for the SSH handshake and for one command, unless the job's deadline is closer
+CONNECT_TIMEOUT = 30
+COMMAND_TIMEOUT = 300
+
 
 class CloudPanelService:
     """Service for interacting with CloudPanel via SSH/CLI"""
@@ -43,13 +51,17 @@ class CloudPanelService:
             private_key = RSAKey.from_private_key(StringIO(self.ssh_key))
             
             # Connect
-            self.ssh_client.connect(
-                hostname=self.ssh_host,
-                port=self.ssh_port,
-                username=self.ssh_user,
-                pkey=private_key,
-                timeout=30
-            )
+            timeout = call_timeout(CONNECT_TIMEOUT)
+            with track("ssh", "connect"):
+                self.ssh_client.connect(
+                    hostname=self.ssh_host,
+                    port=self.ssh_port,
+                    username=self.ssh_user,
+                    pkey=private_key,
+                    timeout=timeout,
+                    banner_timeout=timeout,
+                    auth_timeout=timeout
+                )
             
             logger.info(f"SSH connection established to {self.ssh_host}")
             
@@ -67,6 +79,9 @@ class CloudPanelService:
         """
         Execute command via SSH
         
+        The command gets COMMAND_TIMEOUT seconds, or less if the job's
+        deadline is closer; a command that runs out of time is abandoned.
+        
         Args:
             command: Command to execute
             
@@ -77,12 +92,22 @@ class CloudPanelService:
             raise RuntimeError("SSH client not connected")
         
         try:
-            stdin, stdout, stderr = self.ssh_client.exec_command(command)
-            
-            # Read output
-            stdout_str = stdout.read().decode().strip()
-            stderr_str = stderr.read().decode().strip()
-            exit_code = stdout.channel.recv_exit_status()
+            with track("ssh", " ".join(command.split()[:2])) as call:
+                stdin, stdout, stderr = self.ssh_client.exec_command(command, timeout=call_timeout(COMMAND_TIMEOUT))
+                
+                # Read output
+                try:
+                    stdout_str = stdout.read().decode().strip()
+                    stderr_str = stderr.read().decode().strip()
+                    exit_code = stdout.channel.recv_exit_status()
+                except socket.timeout:
+                    # Stop waiting for the command and free the channel
+                    stdout.channel.close()
+                    raise
+                
+                call.sent = len(command)
+                call.received = len(stdout_str) + len(stderr_str)
+                call.error = exit_code != 0
             
             # Log command result
             if exit_code == 0:
@@ -170,6 +195,39 @@ class CloudPanelService:
             logger.error(error_msg)
             return False, "", error_msg
     
+    def delete_site(self, domain: str) -> Tuple[bool, str]:
+        """
+        Delete a site with its files, database users and certificate
+        
+        A site that does not exist counts as deleted.
+        
+        Args:
+            domain: Domain name of the site
+            
+        Returns:
+            Tuple of (success, error_message)
+        """
+        try:
+            domain = self.sanitize_input(domain)
+            
+            command = f"clpctl site:delete --domainName={shlex.quote(domain)} --force"
+            stdout, stderr, exit_code = self.execute_command(command)
+            
+            if exit_code != 0:
+                output = f"{stdout} {stderr}".lower()
+                if "not found" in output or "does not exist" in output:
+                    logger.warning(f"Site {domain} does not exist, nothing to delete")
+                    return True, ""
+                return False, f"Failed to delete site: {stderr or stdout}"
+            
+            logger.info(f"Successfully deleted site {domain}")
+            return True, ""
+            
+        except Exception as e:
+            error_msg = f"Error deleting site: {e}"
+            logger.error(error_msg)
+            return False, error_msg
+    
     def provision_ssl(self, domain: str) -> Tuple[bool, str]:
         """
         Provision Let's Encrypt SSL certificate
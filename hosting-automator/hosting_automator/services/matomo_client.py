@@ -2,21 +2,33 @@
 
 import logging
 import requests
-from typing import Optional, Tuple, Dict, Any
+from typing import Optional, Tuple, Dict, Any, List
+
+from ..core.call_ledger import track
+from ..core.concurrency import adaptive_limiters, signals_from_response
+from ..core.deadline import call_timeout
+from ..core.response_cache import scope
 
 logger = logging.getLogger("hosting_automator")
 
+# Response cache endpoint of the site list
+ALL_SITES_ENDPOINT = "matomo.SitesManager.getAllSites"
+
 
 class MatomoService:
     """Service for interacting with Matomo API"""
     
-    def __init__(self, matomo_config: Optional[Dict[str, Any]]):
+    def __init__(self, matomo_config: Optional[Dict[str, Any]], cache=None, concurrency=None):
         """
         Initialize Matomo client
         
         Args:
             matomo_config: Matomo configuration from database
+            cache: Optional ResponseCache for the site list
+            concurrency: Optional AdaptiveLimiter; defaults to the process-wide one of this instance
         """
+        self.cache = cache
+        
         if not matomo_config:
             self.enabled = False
             logger.warning("Matomo configuration not found, analytics tracking disabled")
@@ -35,8 +47,25 @@ class MatomoService:
         if not self.api_url.endswith('/'):
             self.api_url += '/'
         
+        self._cache_scope = scope(f"{self.api_url}:{self.api_token}")
+        self.concurrency = concurrency or adaptive_limiters.get("matomo", self._cache_scope)
         logger.info(f"Matomo service initialized for {self.api_url}")
     
+    def _send(self, method: str, **kwargs) -> requests.Response:
+        """Call the API within the instance's adaptive concurrency limit, recording the call"""
+        api_method = (kwargs.get("params") or kwargs.get("data") or {}).get("method", "")
+        self.concurrency.acquire()
+        signals = None
+        try:
+            with track("matomo", api_method) as call:
+                response = requests.request(method, self.api_url, **kwargs)
+                call.received = len(response.content)
+                call.error = response.status_code >= 400
+            signals = signals_from_response(response.status_code, response.headers)
+            return response
+        finally:
+            self.concurrency.release(signals)
+    
     def create_tracking_site(self, domain: str) -> Tuple[Optional[int], str]:
         """
         Create a new tracking site in Matomo
@@ -63,10 +92,10 @@ class MatomoService:
             }
             
             # Make API request
-            response = requests.post(
-                self.api_url,
+            response = self._send(
+                "POST",
                 data=params,
-                timeout=30,
+                timeout=call_timeout(30),
                 verify=True  # Verify SSL certificate
             )
             
@@ -95,6 +124,8 @@ class MatomoService:
                 logger.error(error_msg)
                 return None, error_msg
             
+            if self.cache:
+                self.cache.invalidate(f"matomo:{self._cache_scope}")
             logger.info(f"Successfully created Matomo tracking site for {domain} with ID {site_id}")
             return site_id, ""
             
@@ -118,44 +149,111 @@ class MatomoService:
             logger.error(error_msg)
             return None, error_msg
     
-    def check_site_exists(self, domain: str) -> Optional[int]:
+    def delete_tracking_site(self, matomo_site_id: int) -> Tuple[bool, str]:
         """
-        Check if a site already exists in Matomo
+        Delete a tracking site and its collected data
+        
+        A site that does not exist counts as deleted.
         
         Args:
-            domain: Domain name to check
+            matomo_site_id: Matomo site ID
             
         Returns:
-            Site ID if exists, None otherwise
+            Tuple of (success, error_message)
         """
         if not self.enabled:
-            return None
+            return False, "Matomo is not enabled"
         
         try:
-            # Get all sites
             params = {
                 'module': 'API',
-                'method': 'SitesManager.getAllSites',
+                'method': 'SitesManager.deleteSite',
+                'idSite': matomo_site_id,
                 'format': 'json',
                 'token_auth': self.api_token
             }
             
-            response = requests.get(
-                self.api_url,
-                params=params,
-                timeout=30,
-                verify=True
-            )
+            response = self._send("POST", data=params, timeout=call_timeout(30), verify=True)
+            response.raise_for_status()
+            result = response.json()
+            
+            if isinstance(result, dict) and result.get('result') == 'error':
+                message = result.get('message', 'Unknown Matomo API error')
+                # Matomo rejects unknown IDs as an unexpected website
+                if 'website id' not in message.lower():
+                    return False, message
+                logger.warning(f"Matomo site {matomo_site_id} does not exist, nothing to delete")
+            
+            if self.cache:
+                self.cache.invalidate(f"matomo:{self._cache_scope}")
+            logger.info(f"Deleted Matomo tracking site {matomo_site_id}")
+            return True, ""
+            
+        except requests.exceptions.RequestException as e:
+            error_msg = f"Matomo API request failed: {e}"
+            logger.error(error_msg)
+            return False, error_msg
+            
+        except ValueError as e:
+            error_msg = f"Failed to parse Matomo API response: {e}"
+            logger.error(error_msg)
+            return False, error_msg
+    
+    def check_site_exists(self, domain: str) -> Optional[int]:
+        """
+        Check if a site already exists in Matomo
+        
+        Args:
+            domain: Domain name to check
             
-            if response.status_code == 200:
-                sites = response.json()
-                
-                # Search for domain
-                for site in sites:
-                    if site.get('main_url', '').endswith(domain) or site.get('name', '') == domain:
-                        return int(site.get('idsite'))
+        Returns:
+            Site ID if exists, None otherwise
+        """
+        if not self.enabled:
+            return None
+        
+        try:
+            if not self.cache:
+                return self._find_site(self._get_all_sites(), domain)
+            
+            # Only a hit is trusted: another replica may have added the site since the list was cached
+            cache_parts = [self._cache_scope]
+            cached = self.cache.get(ALL_SITES_ENDPOINT, cache_parts)
+            site_id = self._find_site(cached or [], domain)
+            if site_id is not None:
+                return site_id
+            
+            sites = self._get_all_sites()
+            self.cache.put(ALL_SITES_ENDPOINT, cache_parts, f"matomo:{self._cache_scope}", sites)
+            return self._find_site(sites, domain)
                         
         except Exception as e:
             logger.warning(f"Failed to check existing Matomo sites: {e}")
         
-        return None
\ No newline at end of file
+        return None
+    
+    @staticmethod
+    def _find_site(sites: List[Dict[str, Any]], domain: str) -> Optional[int]:
+        """ID of the site tracking a domain, if any"""
+        for site in sites:
+            if site.get('main_url', '').endswith(domain) or site.get('name', '') == domain:
+                return int(site.get('idsite'))
+        return None
+    
+    def _get_all_sites(self) -> List[Dict[str, Any]]:
+        """Fetch every site of the Matomo instance"""
+        params = {
+            'module': 'API',
+            'method': 'SitesManager.getAllSites',
+            'format': 'json',
+            'token_auth': self.api_token
+        }
+        
+        response = self._send(
+            "GET",
+            params=params,
+            timeout=call_timeout(30),
+            verify=True
+        )
+        response.raise_for_status()
+        return response.json()
\ No newline at end of file
@@ -2,11 +2,22 @@
 
 import logging
 from typing import List, Dict, Any, Optional
+from datetime import datetime
 from supabase import create_client, Client
+from ..core.call_ledger import instrument_httpx
 from ..core.config import Config
+from ..core.events import event_bus
+from ..core.site import Site
+from ..core.write_behind import WriteBehindBuffer
 
 logger = logging.getLogger("hosting_automator")
 
+# workflow_steps phase of the Hosting Automator
+HOSTING_PHASE = "hosting_setup"
+
+# workflow_executions.workflow_type of the Hosting Automator
+HOSTING_WORKFLOW = "hosting"
+
 
 class SupabaseService:
     """Service for interacting with Supabase"""
@@ -19,19 +30,23 @@ class SupabaseService:
             Config.SUPABASE_SERVICE_KEY
         )
         logger.info("Supabase client initialized")
+        # Count this client's PostgREST calls in the call ledger of the running job
+        instrument_httpx(self.client.postgrest.session, "supabase", "/rest/v1/")
+        self.writes = WriteBehindBuffer(self.client, Config.STATUS_FLUSH_INTERVAL)
     
-    def fetch_pending_hosting_sites(self, site_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    def fetch_pending_hosting_sites(self, site_id: Optional[str] = None) -> List[Site]:
         """
         Fetch sites that need hosting setup
         
         Args:
-            site_id: Optional specific site ID to process
+            site_id: Optional specific site ID to process; it is returned
+                whatever its status, the automator skips it unless pending
             
         Returns:
             List of site records
         """
         try:
-            query = self.client.table("sites").select("*")
+            query = self.client.table("sites").select(Site.COLUMNS)
             
             if site_id:
                 # Process specific site
@@ -41,7 +56,7 @@ class SupabaseService:
                 query = query.eq("status_dns", "active").eq("status_hosting", "pending")
             
             response = query.execute()
-            sites = response.data
+            sites = [Site.from_row(row) for row in response.data]
             
             logger.info(f"Found {len(sites)} sites pending hosting setup")
             return sites
@@ -50,6 +65,25 @@ class SupabaseService:
             logger.error(f"Failed to fetch pending sites: {e}")
             raise
     
+    def count_pending_hosting_sites(self) -> Optional[int]:
+        """
+        Count the sites waiting for hosting setup on any replica
+        
+        Returns:
+            Number of pending sites, or None if the count failed
+        """
+        try:
+            response = self.client.table("sites")\
+                .select("id", count="exact")\
+                .eq("status_dns", "active")\
+                .eq("status_hosting", "pending")\
+                .limit(1)\
+                .execute()
+            return response.count or 0
+        except Exception as e:
+            logger.error(f"Failed to count pending sites: {e}")
+            return None
+    
     def update_site_hosting_status(
         self, 
         site_id: str, 
@@ -61,9 +95,12 @@ class SupabaseService:
         """
         Update site hosting status and metadata
         
+        The update is buffered and written in the background together with
+        other updates of the site.
+        
         Args:
             site_id: Site ID to update
-            status: New status ('active' or 'failed')
+            status: New status ('active', 'failed', or 'pending' to retry)
             doc_root: Document root path on server
             matomo_id: Matomo site ID
             error_message: Error message if failed
@@ -80,13 +117,180 @@ class SupabaseService:
             if error_message:
                 update_data["error_message"] = error_message
             
-            self.client.table("sites").update(update_data).eq("id", site_id).execute()
+            self.writes.update_site(site_id, update_data)
             logger.info(f"Updated site {site_id} hosting status to: {status}")
             
         except Exception as e:
             logger.error(f"Failed to update site status: {e}")
             raise
     
+    def fetch_sites_by_ids(self, site_ids: List[str]) -> List[Site]:
+        """
+        Fetch specific sites, e.g. the ones claimed by this replica
+        
+        Args:
+            site_ids: Site IDs
+            
+        Returns:
+            List of site records
+        """
+        if not site_ids:
+            return []
+        
+        response = self.client.table("sites").select(Site.COLUMNS).in_("id", site_ids).execute()
+        return [Site.from_row(row) for row in response.data]
+    
+    def fetch_sites_by_domains(self, domains: List[str]) -> List[Site]:
+        """
+        Fetch sites by domain name, e.g. the ones to tear down
+        
+        Args:
+            domains: Domain names
+            
+        Returns:
+            List of site records
+        """
+        if not domains:
+            return []
+        
+        response = self.client.table("sites").select(Site.COLUMNS).in_("domain", domains).execute()
+        return [Site.from_row(row) for row in response.data]
+    
+    def retire_site_hosting(self, site_id: str) -> bool:
+        """
+        Mark a torn down site's hosting as retired and forget its document root and Matomo site
+        
+        Args:
+            site_id: Site ID
+            
+        Returns:
+            Success boolean
+        """
+        try:
+            self.client.table("sites").update({
+                "status_hosting": "retired",
+                "hosting_doc_root": None,
+                "matomo_site_id": None,
+                "error_message": None
+            }).eq("id", site_id).execute()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to retire hosting of site {site_id}: {e}")
+            return False
+    
+    def start_job(self, site_id: str, steps_total: int) -> None:
+        """
+        Reset the hosting step progress of a site before processing it
+        
+        Args:
+            site_id: Site ID
+            steps_total: Number of steps the job records
+        """
+        self.writes.update_site(site_id, {"hosting_steps_completed": 0, "hosting_steps_total": steps_total})
+        event_bus.publish("job_started", site_id, phase=HOSTING_PHASE, steps_total=steps_total)
+    
+    def record_step(self, site_id: str, step_name: str, description: Optional[str] = None) -> None:
+        """
+        Record the start of a hosting workflow step (buffered); the previous step completes
+        
+        The step is also published on the event bus for progress streams.
+        
+        Args:
+            site_id: Site ID
+            step_name: Step identifier
+            description: Human readable step description
+        """
+        self.writes.step(site_id, HOSTING_PHASE, step_name, "running", description)
+        event_bus.publish(
+            "step", site_id, phase=HOSTING_PHASE, step=step_name, description=description, status="running"
+        )
+    
+    def finish_job(self, site_id: str, success: bool) -> bool:
+        """
+        Close the running hosting step of a site and write its buffered state now
+        
+        Args:
+            site_id: Site ID
+            success: Whether the job succeeded
+            
+        Returns:
+            Whether all buffered writes of the site were stored
+        """
+        stored = self.writes.finish(site_id, HOSTING_PHASE, success)
+        if not stored:
+            logger.error(f"Status of site {site_id} was not fully stored, see the write errors above")
+        event_bus.publish("job_finished", site_id, phase=HOSTING_PHASE, success=success)
+        return stored
+    
+    def abandon_job(self, site_id: str) -> None:
+        """
+        Drop the buffered state of a job whose lease was lost, so it does not
+        overwrite the replica that took the site over
+        
+        Args:
+            site_id: Site ID
+        """
+        self.writes.discard(site_id, HOSTING_PHASE)
+        event_bus.publish("job_finished", site_id, phase=HOSTING_PHASE, success=False)
+    
+    def record_execution(
+        self,
+        site_id: str,
+        status: str,
+        started_at: datetime,
+        calls: Dict[str, Any],
+        error_message: Optional[str] = None
+    ) -> bool:
+        """
+        Insert the workflow_executions row of a finished hosting job
+        
+        Args:
+            site_id: Site ID
+            status: completed, failed or retrying
+            started_at: When the job started (UTC)
+            calls: CallLedger summary, stored as metadata.calls
+            error_message: Error of a failed job
+            
+        Returns:
+            Success boolean
+        """
+        try:
+            self.client.table("workflow_executions").insert({
+                "site_id": site_id,
+                "workflow_type": HOSTING_WORKFLOW,
+                "status": status,
+                "started_at": started_at.isoformat(),
+                "completed_at": datetime.utcnow().isoformat(),
+                "error_message": error_message,
+                "metadata": {"calls": calls}
+            }).execute()
+            return True
+        except Exception as e:
+            logger.warning(f"Could not record workflow execution for site {site_id}: {e}")
+            return False
+    
+    def fetch_executions(self, since: datetime, limit: int = 5000) -> List[Dict[str, Any]]:
+        """
+        Fetch recent hosting workflow executions with their call ledgers
+        
+        Args:
+            since: Oldest creation time (UTC)
+            limit: Most recent rows returned at most
+            
+        Returns:
+            Rows with site_id, status, metadata and created_at
+        """
+        try:
+            response = self.client.table("workflow_executions").select(
+                "site_id, status, metadata, created_at"
+            ).eq("workflow_type", HOSTING_WORKFLOW).gte("created_at", since.isoformat()).order(
+                "created_at", desc=True
+            ).limit(limit).execute()
+            return response.data
+        except Exception as e:
+            logger.error(f"Failed to fetch workflow executions: {e}")
+            return []
+    
     def get_server_credentials(self, server_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Get server credentials for SSH connection
@@ -118,6 +322,29 @@ class SupabaseService:
             logger.error(f"Failed to fetch server credentials: {e}")
             raise
     
+    def fetch_failed_credentials(self, table: str) -> Dict[str, str]:
+        """
+        Fetch the credentials of a table whose latest audit failed and has not expired
+        
+        The audit itself runs in the DNS Automator (python -m dns_automator.audit).
+        
+        Args:
+            table: Audited credentials table
+            
+        Returns:
+            Audit error per credential ID; empty if the audit never ran or the query failed
+        """
+        try:
+            response = self.client.table("credential_audits").select("credential_id, error")\
+                .eq("credential_table", table)\
+                .eq("healthy", False)\
+                .gt("expires_at", datetime.utcnow().isoformat())\
+                .execute()
+            return {row["credential_id"]: row.get("error") or "audit failed" for row in response.data}
+        except Exception as e:
+            logger.warning(f"Could not read credential audits of {table}: {e}")
+            return {}
+    
     def get_matomo_credentials(self) -> Optional[Dict[str, Any]]:
         """
         Get Matomo API credentials
@@ -136,6 +363,7 @@ class SupabaseService:
                 logger.info("Retrieved Matomo credentials")
                 # Transform to expected format
                 return {
+                    "id": matomo.get("id"),
                     "api_url": matomo.get("url"),
                     "api_token": matomo.get("api_token")
                 }
@@ -0,0 +1,292 @@
+"""Tears down the hosting of retired sites: CloudPanel site and Matomo tracking site"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .core.config import Config
+from .core.site import Site
+from .services.cloudpanel_client import CloudPanelService
+from .services.matomo_client import MatomoService
+
+logger = logging.getLogger("hosting_automator")
+
+# The site stops being served before its analytics are deleted
+TEARDOWN_STEPS = ["cloudpanel_site", "matomo_site"]
+
+
+class TeardownError(Exception):
+    """Custom exception for site teardown errors"""
+    pass
+
+
+class TeardownState:
+    """
+    JSON checkpoint of a teardown
+
+    Stores the finished steps per domain, so an interrupted teardown can be
+    resumed by running the same command again.
+    """
+
+    def __init__(self, path: str):
+        """
+        Load or create checkpoint file
+
+        Args:
+            path: Path of the JSON state file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as fh:
+                self.data = json.load(fh)
+        else:
+            self.data = {"created_at": datetime.now().isoformat(), "sites": {}}
+
+    def get(self, domain: str) -> Optional[Dict[str, Any]]:
+        """Get checkpoint entry for a domain"""
+        with self._lock:
+            return self.data["sites"].get(domain)
+
+    def put(self, domain: str, entry: Dict[str, Any]) -> None:
+        """Store checkpoint entry for a domain and persist the file"""
+        with self._lock:
+            self.data["sites"][domain] = entry
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump(self.data, fh, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+class HostingTeardown:
+    """
+    Deletes the CloudPanel site and Matomo tracking site of many sites in parallel
+
+    CloudPanel sites are deleted over one SSH connection per server, with at
+    most TEARDOWN_SSH_CONCURRENCY clpctl commands running on a server at a
+    time; Matomo calls share the instance's adaptive concurrency limit. Every
+    finished step is checkpointed, and a site or tracking site that is
+    already gone counts as deleted. Once both steps are done the site's
+    hosting status becomes 'retired'.
+    """
+
+    def __init__(
+        self,
+        automator,
+        state: TeardownState,
+        max_workers: Optional[int] = None,
+        ssh_concurrency: Optional[int] = None
+    ):
+        """
+        Initialize teardown
+
+        Args:
+            automator: HostingAutomator providing the Supabase and Matomo services
+            state: Checkpoint state
+            max_workers: Sites torn down in parallel
+            ssh_concurrency: clpctl commands run at a time on one server
+        """
+        self.automator = automator
+        self.supabase = automator.supabase
+        self.state = state
+        self.max_workers = max_workers or Config.TEARDOWN_WORKERS
+        self.ssh_concurrency = ssh_concurrency or Config.TEARDOWN_SSH_CONCURRENCY
+
+        self.matomo: Optional[MatomoService] = None
+        self._servers: Dict[Optional[str], Tuple[CloudPanelService, threading.Semaphore]] = {}
+        self._servers_lock = threading.Lock()
+
+    def _cloudpanel_for(self, server_id: Optional[str]) -> Tuple[CloudPanelService, threading.Semaphore]:
+        """
+        Get the connected CloudPanel service of a server and its command slots
+
+        Args:
+            server_id: UUID of the server; None for the first server
+
+        Returns:
+            Tuple of (CloudPanelService, semaphore limiting its commands)
+        """
+        with self._servers_lock:
+            if server_id not in self._servers:
+                cloudpanel = CloudPanelService(self.supabase.get_server_credentials(server_id))
+                cloudpanel.connect()
+                self._servers[server_id] = (cloudpanel, threading.Semaphore(self.ssh_concurrency))
+            return self._servers[server_id]
+
+    def delete_cloudpanel_site(self, site: Site) -> str:
+        """
+        Delete the CloudPanel site of a domain
+
+        Args:
+            site: Site record
+
+        Returns:
+            Outcome of the step
+        """
+        cloudpanel, slots = self._cloudpanel_for(site.server_id)
+        with slots:
+            success, error = cloudpanel.delete_site(site.domain)
+        if not success:
+            raise TeardownError(error)
+        return "deleted"
+
+    def delete_matomo_site(self, site: Site) -> str:
+        """
+        Delete the Matomo tracking site of a domain
+
+        Args:
+            site: Site record
+
+        Returns:
+            Outcome of the step (deleted, or absent if there is no tracking site)
+        """
+        if not self.matomo.enabled:
+            if site.matomo_site_id:
+                raise TeardownError(f"Matomo is not available, cannot delete tracking site {site.matomo_site_id}")
+            return "absent"
+
+        matomo_site_id = site.matomo_site_id or self.matomo.check_site_exists(site.domain)
+        if not matomo_site_id:
+            return "absent"
+
+        success, error = self.matomo.delete_tracking_site(matomo_site_id)
+        if not success:
+            raise TeardownError(error)
+        return "deleted"
+
+    def teardown_site(self, site: Site) -> str:
+        """
+        Run the steps of one site that are not checkpointed yet
+
+        Args:
+            site: Site record
+
+        Returns:
+            Outcome of the site
+        """
+        run_step = {"cloudpanel_site": self.delete_cloudpanel_site, "matomo_site": self.delete_matomo_site}
+        done = dict((self.state.get(site.domain) or {}).get("steps", {}))
+
+        for step in TEARDOWN_STEPS:
+            if step in done:
+                continue
+            done[step] = run_step[step](site)
+            # New dicts per write: other workers serialize the state file meanwhile
+            self.state.put(site.domain, {"site_id": site.id, "status": "in_progress", "steps": dict(done)})
+
+        if not self.supabase.retire_site_hosting(site.id):
+            raise TeardownError(f"Could not mark the hosting of {site.domain} as retired")
+
+        self.state.put(site.domain, {
+            "site_id": site.id,
+            "status": "done",
+            "steps": done,
+            "completed_at": datetime.now().isoformat()
+        })
+        return "done"
+
+    def run(self, sites: List[Site]) -> Dict[str, int]:
+        """
+        Tear down many sites in parallel, skipping the ones already done
+
+        Args:
+            sites: Site records
+
+        Returns:
+            Count of sites per outcome (done, failed)
+        """
+        pending = [site for site in sites if (self.state.get(site.domain) or {}).get("status") != "done"]
+        logger.info(f"Tearing down hosting of {len(pending)} of {len(sites)} site(s) with {self.max_workers} workers")
+
+        if self.matomo is None:
+            self.matomo = self.automator.create_matomo_service()
+
+        summary: Dict[str, int] = {}
+        started_at = time.monotonic()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="teardown") as executor:
+                futures = {executor.submit(self.teardown_site, site): site for site in pending}
+
+                for finished, future in enumerate(as_completed(futures), 1):
+                    domain = futures[future].domain
+                    try:
+                        outcome = future.result()
+                        logger.info(f"[{finished}/{len(pending)}] {domain}: {self.state.get(domain)['steps']}")
+                    except Exception as e:
+                        outcome = self._fail(domain, f"{type(e).__name__}: {e}")
+                        logger.error(f"[{finished}/{len(pending)}] {domain}: {type(e).__name__}: {e}")
+
+                    summary[outcome] = summary.get(outcome, 0) + 1
+        finally:
+            self.close()
+
+        elapsed = time.monotonic() - started_at
+        logger.info(f"Hosting teardown finished: {len(pending)} site(s) in {elapsed:.0f}s - {summary}")
+        return summary
+
+    def close(self) -> None:
+        """Close the SSH connections"""
+        with self._servers_lock:
+            for cloudpanel, _ in self._servers.values():
+                cloudpanel.disconnect()
+            self._servers.clear()
+
+    def _fail(self, domain: str, error: str) -> str:
+        """Checkpoint the error of a site, keeping its finished steps"""
+        entry = self.state.get(domain) or {"steps": {}}
+        self.state.put(domain, {**entry, "status": "failed", "error": error})
+        return "failed"
+
+
+def main():
+    """Command line entry point for the hosting teardown"""
+    parser = argparse.ArgumentParser(
+        description="Delete the CloudPanel sites and Matomo tracking sites of retired sites"
+    )
+    parser.add_argument("--domain", action="append", default=[], help="Domain to tear down (repeatable)")
+    parser.add_argument("--domains-file", help="File with one domain per line to tear down")
+    parser.add_argument("--workers", type=int, help="Sites torn down in parallel")
+    parser.add_argument("--ssh-concurrency", type=int, help="clpctl commands run at a time on one server")
+    parser.add_argument("--state-file", default="hosting-teardown-state.json", help="Checkpoint file for resuming")
+    args = parser.parse_args()
+
+    domains = list(args.domain)
+    if args.domains_file:
+        with open(args.domains_file, "r", encoding="utf-8") as fh:
+            domains.extend(line.strip() for line in fh if line.strip() and not line.startswith("#"))
+    if not domains:
+        parser.error("Nothing to tear down: pass --domain or --domains-file")
+
+    # Imported here: importing main configures logging for the command
+    from .main import HostingAutomator
+
+    automator = HostingAutomator()
+    sites = automator.supabase.fetch_sites_by_domains(domains)
+    missing = sorted(set(domains) - {site.domain for site in sites})
+    if missing:
+        logger.warning(f"{len(missing)} domain(s) not found in the sites table: {', '.join(missing)}")
+
+    teardown = HostingTeardown(
+        automator,
+        TeardownState(args.state_file),
+        max_workers=args.workers,
+        ssh_concurrency=args.ssh_concurrency
+    )
+    summary = teardown.run(sites)
+
+    if summary.get("failed"):
+        logger.info(f"Re-run the same command to resume the failed sites from {args.state_file}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
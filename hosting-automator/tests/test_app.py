@@ -1,8 +1,18 @@
 """Tests for FastAPI app"""
 
+import json
+from concurrent.futures import Future
+
 import pytest
 from fastapi.testclient import TestClient
-from app import app
+
+import app as app_module
+from app import app, HOSTING_PHASE
+from hosting_automator.core.config import Config
+from hosting_automator.core.job_queue import Job, JobQueue, JobWorker
+from hosting_automator.core.site import Site
+from hosting_automator import main as main_module
+from hosting_automator.main import HostingAutomator
 
 
 @pytest.fixture
@@ -11,6 +21,22 @@ def client():
     return TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def configured_credentials(monkeypatch):
+    """Configure the Supabase credentials the test requests send"""
+    monkeypatch.setattr(Config, "SUPABASE_URL", "https://test.supabase.co")
+    monkeypatch.setattr(Config, "SUPABASE_SERVICE_KEY", "test-key")
+
+
+@pytest.fixture(autouse=True)
+def job_worker(tmp_path, monkeypatch):
+    """Queue jobs in a temporary database; workers are not started, so jobs stay queued"""
+    worker = JobWorker(JobQueue(str(tmp_path / "jobs.sqlite3")), lambda job: True)
+    monkeypatch.setattr(app_module, "job_worker", worker)
+    yield worker
+    worker.queue.close()
+
+
 def test_health_check(client):
     """Test health check endpoint"""
     response = client.get("/health")
@@ -40,4 +66,191 @@ def test_process_endpoint(client):
     assert response.status_code == 200
     data = response.json()
     assert data["status"] == "accepted"
-    assert "automation task started" in data["message"]
\ No newline at end of file
+    assert "automation task started" in data["message"]
+
+
+def test_duplicate_process_request_attaches(client, job_worker):
+    """Test a request for a site already queued attaches to the existing task"""
+    job_id, created = job_worker.queue.enqueue("site-1", HOSTING_PHASE)
+    assert created
+    
+    response = client.post("/process", json={
+        "supabase_url": "https://test.supabase.co",
+        "supabase_service_key": "test-key",
+        "site_id": "site-1"
+    })
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "attached"
+    assert [job.id for job in job_worker.queue.unfinished()] == [job_id]
+
+
+def test_process_rejects_other_credentials(client, job_worker):
+    """Test a request for another Supabase project is not queued"""
+    response = client.post("/process", json={
+        "supabase_url": "https://other.supabase.co",
+        "supabase_service_key": "other-key",
+        "site_id": "site-1"
+    })
+    
+    assert response.status_code == 403
+    assert job_worker.queue.unfinished() == []
+
+
+def test_batch_requires_site_ids_or_filter(client):
+    """Test a batch without sites is rejected"""
+    response = client.post("/process/batch", json={
+        "supabase_url": "https://test.supabase.co",
+        "supabase_service_key": "test-key"
+    })
+    assert response.status_code == 400
+
+
+def test_batch_streams_progress(client, monkeypatch):
+    """Test a batch streams one site_done line per site and a summary"""
+    class CompletedWorker:
+        def submit(self, site_id, phase):
+            future = Future()
+            future.set_result(True)
+            return future, True
+    
+    monkeypatch.setattr(app_module, "job_worker", CompletedWorker())
+    
+    response = client.post("/process/batch", json={
+        "supabase_url": "https://test.supabase.co",
+        "supabase_service_key": "test-key",
+        "site_ids": ["site-1", "site-2"]
+    })
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["site_id"] for line in lines if line["type"] == "site_done"] == ["site-1", "site-2"]
+    assert lines[-1]["type"] == "summary"
+    assert lines[-1]["succeeded"] == 2
+
+
+class HeldElsewhereLeases:
+    """Leases of sites another replica is processing"""
+    
+    owner = "replica-test"
+    
+    def holds(self, site_id):
+        return False
+    
+    def claim(self, site_id):
+        return False
+    
+    def close(self):
+        pass
+
+
+class OneSiteSupabase:
+    def __init__(self, sites):
+        self.sites = sites
+    
+    def fetch_pending_hosting_sites(self, site_id=None):
+        return [site for site in self.sites if site.id == site_id]
+    
+    def get_server_credentials(self):
+        return {}
+    
+    def get_matomo_credentials(self):
+        return None
+
+
+class UnusedCloudPanel:
+    def __init__(self, server_config):
+        pass
+    
+    def connect(self):
+        pass
+    
+    def disconnect(self):
+        pass
+
+
+def test_batch_reports_skipped_site_as_failed(client, monkeypatch):
+    """Test a site the automator skips is streamed as site_done with success false"""
+    def make_automator():
+        automator = HostingAutomator.__new__(HostingAutomator)
+        automator.supabase = OneSiteSupabase([Site("site-1", "a.com", status_hosting="pending")])
+        automator.leases = HeldElsewhereLeases()
+        automator.cloudpanel = None
+        automator.matomo = None
+        return automator
+    
+    class InlineWorker:
+        def submit(self, site_id, phase):
+            future = Future()
+            future.set_result(app_module.run_job(Job(1, site_id, phase, 0, 0.0)))
+            return future, True
+    
+    monkeypatch.setattr(app_module, "HostingAutomator", make_automator)
+    monkeypatch.setattr(main_module, "CloudPanelService", UnusedCloudPanel)
+    monkeypatch.setattr(app_module, "job_worker", InlineWorker())
+    
+    response = client.post("/process/batch", json={
+        "supabase_url": "https://test.supabase.co",
+        "supabase_service_key": "test-key",
+        "site_ids": ["site-1", "site-2"]
+    })
+    
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    done = {line["site_id"]: line["success"] for line in lines if line["type"] == "site_done"}
+    assert done == {"site-1": False, "site-2": False}
+    assert lines[-1]["succeeded"] == 0
+
+
+class FreeLeases:
+    """Leases no other replica holds"""
+    
+    owner = "replica-test"
+    
+    def __init__(self):
+        self.held = set()
+    
+    def holds(self, site_id):
+        return site_id in self.held
+    
+    def claim(self, site_id):
+        self.held.add(site_id)
+        return True
+    
+    def release(self, site_id):
+        self.held.discard(site_id)
+    
+    def close(self):
+        self.held.clear()
+
+
+def test_site_no_longer_pending_is_skipped(monkeypatch):
+    """Test a site queued by id whose hosting was set up meanwhile is not processed again"""
+    automator = HostingAutomator.__new__(HostingAutomator)
+    automator.supabase = OneSiteSupabase([Site("site-1", "a.com", status_hosting="completed")])
+    automator.leases = FreeLeases()
+    automator.cloudpanel = None
+    automator.matomo = None
+    monkeypatch.setattr(main_module, "CloudPanelService", UnusedCloudPanel)
+    monkeypatch.setattr(automator, "_run_steps", lambda site: pytest.fail("site was processed"))
+    
+    assert automator.run("site-1") is False
+    assert automator.leases.held == set()
+
+
+def test_load_reports_queue_depth(client, job_worker, monkeypatch):
+    """Test the load report counts queued jobs and sizes replicas on the shared backlog"""
+    monkeypatch.setattr(app_module, "count_shared_backlog", lambda: 12)
+    job_worker.queue.enqueue("site-1", HOSTING_PHASE)
+    job_worker.queue.enqueue("site-2", HOSTING_PHASE)
+    
+    response = client.get("/load")
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert data["queue"]["queued"] == 2
+    assert data["queue"]["shared_pending"] == 12
+    assert data["backlog_source"] == "shared"
+    assert data["workers"]["active"] == 0
+    assert data["desired_replicas"] >= 1
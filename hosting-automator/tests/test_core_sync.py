@@ -0,0 +1,52 @@
+"""Checks that the core modules shared with the DNS Automator stay in sync"""
+
+import re
+from pathlib import Path
+
+import pytest
+
+HOSTING_CORE = Path(__file__).resolve().parents[1] / "hosting_automator" / "core"
+DNS_UTILS = Path(__file__).resolve().parents[2] / "dns-automator" / "dns_automator" / "utils"
+
+# Modules copied from dns_automator/utils; fixes must land in both copies
+SHARED_MODULES = [
+    "batch_stream",
+    "call_ledger",
+    "cassette",
+    "concurrency",
+    "deadline",
+    "event_stream",
+    "events",
+    "job_queue",
+    "leases",
+    "load",
+    "response_cache",
+    "single_flight",
+    "site_listener",
+    "write_behind",
+]
+
+LOGGER_LINE = re.compile(r"logging\.getLogger\([^)]*\)")
+# Leading emoji of DNS Automator log messages
+EMOJI = re.compile(r"""(f?["'])[^\x00-\x7f]+\s*""")
+# Docstring examples naming each service's own providers
+PROVIDER_EXAMPLES = re.compile(r"(provider: |Provider name ).*")
+
+
+def normalize(source):
+    """Drop the differences each copy is allowed to have"""
+    source = LOGGER_LINE.sub("logging.getLogger(...)", source)
+    source = EMOJI.sub(r"\1", source)
+    return PROVIDER_EXAMPLES.sub(r"\1...", source)
+
+
+@pytest.mark.parametrize("module", SHARED_MODULES)
+def test_core_module_matches_dns_copy(module):
+    """Test a shared module differs from the DNS Automator copy only in logging"""
+    if not DNS_UTILS.is_dir():
+        pytest.skip("dns-automator is not checked out next to hosting-automator")
+    
+    hosting = normalize((HOSTING_CORE / f"{module}.py").read_text(encoding="utf-8"))
+    dns = normalize((DNS_UTILS / f"{module}.py").read_text(encoding="utf-8"))
+    
+    assert hosting == dns, f"core/{module}.py and dns_automator/utils/{module}.py have diverged"
@@ -0,0 +1,92 @@
+"""Tests for the durable job queue"""
+
+import threading
+
+from hosting_automator.core.job_queue import DONE, FAILED, QUEUED, JobQueue, JobWorker
+
+
+def test_enqueue_deduplicates_unfinished_jobs(tmp_path):
+    """Test a site has at most one unfinished job per phase"""
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    
+    first, created = queue.enqueue("s1", "hosting_setup")
+    assert created
+    assert queue.enqueue("s1", "hosting_setup") == (first, False)
+    
+    job = queue.claim_next()
+    assert job.id == first and job.attempts == 1
+    queue.finish(job.id, success=True)
+    
+    # A finished job no longer blocks a new one
+    assert queue.enqueue("s1", "hosting_setup")[1]
+    queue.close()
+
+
+def test_running_jobs_are_replayed_after_restart(tmp_path):
+    """Test a job running when the process died is run again on start"""
+    path = str(tmp_path / "jobs.sqlite3")
+    queue = JobQueue(path)
+    queue.enqueue("s1", "hosting_setup")
+    assert queue.claim_next().site_id == "s1"
+    queue.close()
+    
+    queue = JobQueue(path)
+    handled = threading.Event()
+    seen = []
+    
+    def handler(job):
+        seen.append((job.site_id, job.attempts))
+        handled.set()
+        return True
+    
+    worker = JobWorker(queue, handler)
+    worker.start()
+    assert handled.wait(5)
+    worker.stop(timeout=5)
+    
+    assert seen == [("s1", 2)]
+    assert queue.counts() == {DONE: 1}
+    queue.close()
+
+
+def test_submit_resolves_with_handler_result(tmp_path):
+    """Test submitting returns a future with the job outcome, shared by duplicates"""
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    release = threading.Event()
+    
+    def handler(job):
+        release.wait(5)
+        return job.site_id == "ok"
+    
+    worker = JobWorker(queue, handler, workers=2)
+    worker.start()
+    
+    ok, created = worker.submit("ok", "hosting_setup")
+    duplicate, duplicate_created = worker.submit("ok", "hosting_setup")
+    failing, _ = worker.submit("bad", "hosting_setup")
+    assert created and not duplicate_created
+    assert duplicate is ok
+    
+    release.set()
+    assert ok.result(5) is True
+    assert failing.result(5) is False
+    worker.stop(timeout=5)
+    
+    assert queue.counts() == {DONE: 1, FAILED: 1}
+    queue.close()
+
+
+def test_worker_prunes_old_finished_jobs(tmp_path):
+    """Test finished jobs older than the retention are deleted, queued ones kept"""
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    for site_id in ("old", "recent"):
+        job_id, _ = queue.enqueue(site_id, "hosting_setup")
+        queue.finish(job_id, success=site_id == "recent")
+    queue._db.execute("UPDATE jobs SET updated_at = updated_at - 7200 WHERE site_id = 'old'")
+    queue.enqueue("queued", "hosting_setup")
+    
+    worker = JobWorker(queue, lambda job: True, retention_seconds=3600)
+    worker._prune()
+    
+    assert queue.counts() == {DONE: 1, QUEUED: 1}
+    queue.close()
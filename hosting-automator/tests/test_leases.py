@@ -0,0 +1,93 @@
+"""Tests for lease-based site claims"""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from hosting_automator.core.leases import LeaseLostError, LeaseManager
+
+
+class FakeAPIError(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+
+class FakeLeaseClient:
+    """Implements the lease functions of migration 012 in memory"""
+    
+    def __init__(self, installed=True):
+        self.installed = installed
+        self.leases = {}
+        self.pending = []
+    
+    def rpc(self, name, params):
+        return SimpleNamespace(execute=lambda: self._call(name, params))
+    
+    def _call(self, name, params):
+        if not self.installed:
+            raise FakeAPIError("PGRST202")
+        
+        owner = params.get("p_owner")
+        if name == "claim_site":
+            holder = self.leases.get(params["p_site_id"])
+            if holder not in (None, owner):
+                return SimpleNamespace(data=False)
+            self.leases[params["p_site_id"]] = owner
+            return SimpleNamespace(data=True)
+        if name == "claim_pending_sites":
+            free = [s for s in self.pending if s not in self.leases][:params["p_limit"]]
+            for site_id in free:
+                self.leases[site_id] = owner
+            return SimpleNamespace(data=free)
+        if name == "renew_site_leases":
+            return SimpleNamespace(data=[s for s in params["p_site_ids"] if self.leases.get(s) == owner])
+        if name == "release_site":
+            if self.leases.get(params["p_site_id"]) == owner:
+                del self.leases[params["p_site_id"]]
+            return SimpleNamespace(data=None)
+
+
+def test_replicas_claim_disjoint_sites():
+    """Test two replicas never claim the same site"""
+    client = FakeLeaseClient()
+    client.pending = ["s1", "s2", "s3"]
+    a = LeaseManager(client, "hosting_setup", owner="a")
+    b = LeaseManager(client, "hosting_setup", owner="b")
+    
+    assert a.claim_pending(2) == ["s1", "s2"]
+    assert b.claim_pending(2) == ["s3"]
+    assert not b.claim("s1")
+    
+    a.release("s1")
+    assert b.claim("s1")
+    a.close()
+    b.close()
+
+
+def test_claims_always_succeed_without_lease_functions():
+    """Test a single replica without migration 012 still processes sites"""
+    leases = LeaseManager(FakeLeaseClient(installed=False), "hosting_setup", owner="a")
+    
+    assert leases.claim("s1")
+    assert leases.claim_pending(5) is None
+    leases.close()
+
+
+def test_check_raises_once_the_lease_is_lost():
+    """Test the heartbeat notices a lease taken over and check stops the job"""
+    client = FakeLeaseClient()
+    leases = LeaseManager(client, "hosting_setup", heartbeat=0.01, owner="a")
+    
+    assert leases.claim("s1")
+    leases.check("s1")
+    client.leases["s1"] = "b"
+    
+    deadline = time.monotonic() + 2
+    while not leases.lost("s1") and time.monotonic() < deadline:
+        time.sleep(0.01)
+    
+    with pytest.raises(LeaseLostError):
+        leases.check("s1")
+    leases.close()
@@ -0,0 +1,123 @@
+"""Tests for the hosting teardown of retired sites"""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from hosting_automator.core.site import Site
+from hosting_automator.services.cloudpanel_client import CloudPanelService
+from hosting_automator.services.matomo_client import MatomoService
+from hosting_automator.teardown import HostingTeardown, TeardownState
+
+
+class FakeCloudPanel(CloudPanelService):
+    """CloudPanel service answering clpctl commands from a set of existing sites"""
+
+    def __init__(self, sites):
+        self.sites = set(sites)
+        self.ssh_client = None
+        self.commands = []
+
+    def execute_command(self, command):
+        self.commands.append(command)
+        domain = command.split("--domainName=")[1].split()[0]
+        if domain not in self.sites:
+            return "", f"Site {domain} not found.", 1
+        self.sites.discard(domain)
+        return f"Site {domain} deleted.", "", 0
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class FakeMatomo(MatomoService):
+    """Matomo service answering deleteSite from a set of existing tracking sites"""
+
+    def __init__(self, site_ids, error=None):
+        super().__init__({"api_url": "https://matomo.test", "api_token": "token"}, concurrency=object())
+        self.site_ids = set(site_ids)
+        self.error = error
+        self.deleted = []
+
+    def _send(self, method, **kwargs):
+        site_id = kwargs["data"]["idSite"]
+        if self.error:
+            return FakeResponse({"result": "error", "message": self.error})
+        if site_id not in self.site_ids:
+            return FakeResponse({
+                "result": "error",
+                "message": f"An unexpected website was found in the request: website id was set to '{site_id}' ."
+            })
+        self.site_ids.discard(site_id)
+        self.deleted.append(site_id)
+        return FakeResponse({"result": "success", "message": "ok"})
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.retired = []
+
+    def retire_site_hosting(self, site_id):
+        self.retired.append(site_id)
+        return True
+
+
+def make_teardown(tmp_path, cloudpanel, matomo):
+    """Teardown over the fakes, with the server connection already open"""
+    automator = SimpleNamespace(supabase=FakeSupabase(), create_matomo_service=lambda: matomo)
+    teardown = HostingTeardown(automator, TeardownState(str(tmp_path / "state.json")), max_workers=2)
+    teardown._servers["srv-1"] = (cloudpanel, threading.Semaphore(1))
+    return teardown
+
+
+@pytest.fixture
+def sites():
+    return [
+        Site("site-a", "a.com", server_id="srv-1", matomo_site_id=5),
+        Site("site-b", "b.com", server_id="srv-1", matomo_site_id=6),
+    ]
+
+
+def test_teardown_treats_missing_sites_as_deleted(tmp_path, sites):
+    """Test a CloudPanel site or Matomo ID that is already gone still completes the teardown"""
+    cloudpanel = FakeCloudPanel({"a.com"})
+    matomo = FakeMatomo({5})
+    teardown = make_teardown(tmp_path, cloudpanel, matomo)
+
+    assert teardown.run(sites) == {"done": 2}
+    assert sorted(teardown.supabase.retired) == ["site-a", "site-b"]
+    assert matomo.deleted == [5]
+    assert teardown.state.get("b.com")["steps"] == {"cloudpanel_site": "deleted", "matomo_site": "deleted"}
+    assert teardown.state.get("b.com")["status"] == "done"
+
+
+def test_failed_teardown_resumes_after_the_finished_steps(tmp_path, sites):
+    """Test a failed step is checkpointed and a second run only retries what is left"""
+    site = sites[0]
+    cloudpanel = FakeCloudPanel({"a.com"})
+    matomo = FakeMatomo({5}, error="Token is invalid")
+
+    assert make_teardown(tmp_path, cloudpanel, matomo).run([site]) == {"failed": 1}
+    entry = TeardownState(str(tmp_path / "state.json")).get("a.com")
+    assert entry["status"] == "failed"
+    assert entry["steps"] == {"cloudpanel_site": "deleted"}
+    assert "Token is invalid" in entry["error"]
+
+    # A second run with the same state file does not touch CloudPanel again
+    matomo.error = None
+    resumed = make_teardown(tmp_path, cloudpanel, matomo)
+    assert resumed.run([site]) == {"done": 1}
+    assert len(cloudpanel.commands) == 1
+    assert matomo.deleted == [5]
+    assert resumed.supabase.retired == ["site-a"]
+
+    assert make_teardown(tmp_path, cloudpanel, matomo).run([site]) == {}
@@ -0,0 +1,135 @@
+"""Tests for the write-behind status buffer"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from hosting_automator.core.write_behind import WriteBehindBuffer
+
+
+class FakeAPIError(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+
+class FakeQuery:
+    def __init__(self, client, call):
+        self.client = client
+        self.call = call
+    
+    def upsert(self, rows, on_conflict=""):
+        self.call = ("upsert", self.call[1], rows, on_conflict)
+        return self
+    
+    def update(self, fields):
+        self.call = ("update", self.call[1], fields)
+        return self
+    
+    def eq(self, column, value):
+        self.call = self.call + (value,)
+        return self
+    
+    def execute(self):
+        kind = self.call[0]
+        if self.client.down:
+            raise ConnectionError("Server disconnected")
+        if kind == "rpc" and not self.client.has_rpc:
+            raise FakeAPIError("PGRST202")
+        if kind == "update" and self.call[3] in self.client.bad_sites:
+            raise FakeAPIError("23514")
+        self.client.calls.append(self.call)
+        return SimpleNamespace(data=[])
+
+
+class FakeClient:
+    """Records the writes a buffer makes"""
+    
+    def __init__(self, has_rpc=True, bad_sites=()):
+        self.has_rpc = has_rpc
+        self.bad_sites = set(bad_sites)
+        self.down = False
+        self.calls = []
+    
+    def table(self, name):
+        return FakeQuery(self, ("table", name))
+    
+    def rpc(self, name, params):
+        return FakeQuery(self, ("rpc", name, params))
+
+
+@pytest.fixture
+def client():
+    return FakeClient()
+
+
+def test_site_updates_are_coalesced_into_one_call(client):
+    """Test the last value of a column wins and all sites go out in one RPC"""
+    buffer = WriteBehindBuffer(client, flush_interval=60)
+    
+    buffer.update_site("s1", {"status_hosting": "processing"})
+    buffer.update_site("s1", {"status_hosting": "completed"})
+    buffer.update_site("s2", {"status_hosting": "failed"})
+    assert client.calls == []
+    
+    buffer.close()
+    
+    assert client.calls == [("rpc", "apply_site_updates", {"updates": [
+        {"id": "s1", "fields": {"status_hosting": "completed"}},
+        {"id": "s2", "fields": {"status_hosting": "failed"}},
+    ]})]
+
+
+def test_steps_are_upserted_and_counted_on_finish(client):
+    """Test finish completes the running step and stores the step count"""
+    buffer = WriteBehindBuffer(client, flush_interval=60)
+    
+    buffer.step("s1", "hosting_setup", "cloudpanel_site")
+    buffer.step("s1", "hosting_setup", "ssl_certificate")
+    assert buffer.finish("s1", "hosting_setup", success=True)
+    
+    upserts = [call for call in client.calls if call[0] == "upsert"]
+    assert sorted((row["step_name"], row["status"]) for row in upserts[0][2]) == [
+        ("cloudpanel_site", "completed"),
+        ("ssl_certificate", "completed"),
+    ]
+    buffer.close()
+
+
+def test_bad_row_is_dropped_without_blocking_the_batch():
+    """Test a constraint violation drops only the offending site, without retries"""
+    client = FakeClient(has_rpc=False, bad_sites={"s2"})
+    buffer = WriteBehindBuffer(client, flush_interval=60)
+    
+    buffer.update_site("s1", {"status_hosting": "completed"})
+    buffer.update_site("s2", {"status_hosting": "bogus"})
+    
+    assert buffer.finish("s1", "hosting_setup", success=True)
+    assert not buffer.finish("s2", "hosting_setup", success=True)
+    assert client.calls == [("update", "sites", {"status_hosting": "completed"}, "s1")]
+    buffer.close()
+
+
+def test_transient_failures_are_retried_a_bounded_number_of_times(client):
+    """Test a write failing max_attempts times is dropped and reported"""
+    buffer = WriteBehindBuffer(client, flush_interval=60, max_attempts=2)
+    client.down = True
+    
+    buffer.update_site("s1", {"status_hosting": "completed"})
+    buffer.flush()
+    assert "s1" in buffer._sites
+    assert not buffer.finish("s1", "hosting_setup", success=True)
+    assert buffer._sites == {}
+    buffer.close()
+
+
+def test_discard_drops_the_pending_writes_of_a_job(client):
+    """Test a job whose lease was lost writes nothing"""
+    buffer = WriteBehindBuffer(client, flush_interval=60)
+    
+    buffer.update_site("s1", {"status_hosting": "failed"})
+    buffer.step("s1", "hosting_setup", "cloudpanel_site")
+    buffer.discard("s1", "hosting_setup")
+    buffer.close()
+    
+    assert client.calls == []